@@ -0,0 +1,237 @@
+"""Bangumi 客户端与元数据缓存管理 API。"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from ..core.logging import logger
+from ..services.mapping_service import mapping_service
+from ..utils import http_transport
+from ..utils.bangumi_api_pool import bangumi_api_pool
+from ..utils.bgm_circuit_breaker import bgm_circuit_breaker
+from ..utils.bgm_collection_ledger import bgm_collection_ledger
+from ..utils.bgm_learned_mappings import bgm_learned_mappings
+from ..utils.bgm_metadata_cache import bgm_metadata_cache
+from ..utils.bgm_rate_limiter import bgm_rate_limiter
+from ..utils.bgm_retry_queue import bgm_retry_queue
+from ..utils.bgm_route_manager import bgm_route_manager
+from ..utils.bgm_sequel_graph import bgm_sequel_graph
+from ..utils.bgm_unmatched_cache import bgm_unmatched_cache
+from ..utils.single_flight import bgm_single_flight
+from .deps import get_current_user_flexible
+
+router = APIRouter(prefix="/api/bgm/cache", tags=["bgm"])
+
+
+class LearnedMappingUpdate(BaseModel):
+    cache_key: str
+    subject_id: str
+    season_matched: bool = False
+
+
+class LearnedMappingPromote(BaseModel):
+    cache_key: str
+    subject_id: Optional[str] = None
+
+
+@router.get("/stats")
+async def get_bgm_cache_stats(
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """返回 BangumiApi 客户端池、各账号实例缓存、元数据二级缓存、续集关系图、收藏账本、未匹配缓存、学习映射、限速器、熔断器、线路选择、HTTP 连接复用、请求合并与延迟重试的统计。"""
+    try:
+        return {
+            "status": "success",
+            "data": {
+                "client_pool": bangumi_api_pool.get_stats(),
+                "metadata": bgm_metadata_cache.get_stats(),
+                "sequel_graph": bgm_sequel_graph.get_stats(),
+                "collection_ledger": bgm_collection_ledger.get_stats(),
+                "unmatched": bgm_unmatched_cache.get_stats(),
+                "learned": bgm_learned_mappings.get_stats(),
+                "rate_limiter": bgm_rate_limiter.get_stats(),
+                "circuit_breaker": bgm_circuit_breaker.get_stats(),
+                "routes": bgm_route_manager.get_stats(),
+                "transport": http_transport.get_stats(),
+                "single_flight": bgm_single_flight.get_stats(),
+                "retry_queue": bgm_retry_queue.get_stats(),
+            },
+        }
+    except Exception as e:
+        logger.error(f"获取 Bangumi 缓存统计失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取缓存统计失败: {str(e)}")
+
+
+@router.delete("/subjects/{subject_id}")
+async def purge_bgm_subject_cache(
+    subject_id: int,
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """清除某条目的条目/章节/关联条目缓存（持久化与内存两级）及其续集关系图节点，下次访问时重新拉取。"""
+    try:
+        persisted = bgm_metadata_cache.purge_subject(str(subject_id))
+        in_memory = bangumi_api_pool.purge_subject(subject_id)
+        graph = bgm_sequel_graph.delete_subject(subject_id)
+        return {
+            "status": "success",
+            "data": {
+                "subject_id": subject_id,
+                "persisted_removed": persisted,
+                "memory_removed": in_memory,
+                "graph_removed": graph,
+            },
+        }
+    except Exception as e:
+        logger.error(f"清除条目 {subject_id} 缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=f"清除条目缓存失败: {str(e)}")
+
+
+@router.delete("/metadata")
+async def clear_bgm_metadata_cache(
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """清空全部 Bangumi 元数据持久化缓存。"""
+    try:
+        removed = bgm_metadata_cache.clear()
+        return {"status": "success", "data": {"persisted_removed": removed}}
+    except Exception as e:
+        logger.error(f"清空 Bangumi 元数据缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=f"清空元数据缓存失败: {str(e)}")
+
+
+@router.delete("/ledger")
+async def clear_bgm_collection_ledger(
+    account: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """清空收藏账本（可按 Bangumi 用户名），下次标记时重新与 Bangumi 对账。"""
+    try:
+        removed = bgm_collection_ledger.clear(account)
+        return {"status": "success", "data": {"subjects_removed": removed}}
+    except Exception as e:
+        logger.error(f"清空 Bangumi 收藏账本失败: {e}")
+        raise HTTPException(status_code=500, detail=f"清空收藏账本失败: {str(e)}")
+
+
+@router.get("/unmatched")
+async def list_bgm_unmatched_titles(
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """列出未匹配缓存中的标题（有效期内同步这些标题时不再搜索 Bangumi）。"""
+    try:
+        return {
+            "status": "success",
+            "data": {"entries": bgm_unmatched_cache.list_entries()},
+        }
+    except Exception as e:
+        logger.error(f"获取未匹配缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取未匹配缓存失败: {str(e)}")
+
+
+@router.delete("/unmatched")
+async def clear_bgm_unmatched_titles(
+    cache_key: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """清除未匹配缓存（可只清除 cache_key 对应的一条），下次同步时重新搜索。"""
+    try:
+        if cache_key is None:
+            removed = bgm_unmatched_cache.clear()
+        else:
+            removed = bgm_unmatched_cache.delete(cache_key)
+        return {"status": "success", "data": {"removed": removed}}
+    except Exception as e:
+        logger.error(f"清除未匹配缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=f"清除未匹配缓存失败: {str(e)}")
+
+
+@router.get("/learned")
+async def list_bgm_learned_mappings(
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """列出学习映射（同步成功后自动记录的标题 → 番剧ID）。"""
+    try:
+        return {
+            "status": "success",
+            "data": {"entries": bgm_learned_mappings.list_entries()},
+        }
+    except Exception as e:
+        logger.error(f"获取学习映射失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取学习映射失败: {str(e)}")
+
+
+@router.put("/learned")
+async def update_bgm_learned_mapping(
+    body: LearnedMappingUpdate,
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """修改一条学习映射的番剧ID（修改后视为已确认，可信度为 1）。"""
+    subject_id = body.subject_id.strip()
+    if not subject_id.isdigit():
+        raise HTTPException(status_code=400, detail="番剧ID必须为数字")
+    try:
+        entry = bgm_learned_mappings.update(
+            body.cache_key, subject_id, body.season_matched
+        )
+    except Exception as e:
+        logger.error(f"修改学习映射失败: {e}")
+        raise HTTPException(status_code=500, detail=f"修改学习映射失败: {str(e)}")
+    if entry is None:
+        raise HTTPException(status_code=404, detail="学习映射不存在")
+    return {"status": "success", "data": {"entry": entry}}
+
+
+@router.post("/learned/promote")
+async def promote_bgm_learned_mapping(
+    body: LearnedMappingPromote,
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """将一条学习映射提升为自定义映射（标题 → 第一季番剧ID），并删除该学习映射。
+
+    未指定 subject_id 时使用记录中的番剧ID；第二季及以后且已确定为该季度条目的记录
+    无法得知第一季的番剧ID，须指定 subject_id。
+    """
+    entry = bgm_learned_mappings.get(body.cache_key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="学习映射不存在")
+    subject_id = (body.subject_id or "").strip()
+    if not subject_id:
+        if entry["season"] > 1 and entry["season_matched"]:
+            raise HTTPException(
+                status_code=400,
+                detail="该记录为第二季及以后的季度条目，请指定第一季的番剧ID",
+            )
+        subject_id = entry["subject_id"]
+    if not subject_id.isdigit():
+        raise HTTPException(status_code=400, detail="番剧ID必须为数字")
+    try:
+        mappings = mapping_service.get_all_mappings()
+        mappings[entry["title"]] = subject_id
+        if not mapping_service.update_mappings(mappings):
+            raise RuntimeError("写入自定义映射失败")
+        bgm_learned_mappings.delete(body.cache_key)
+        return {
+            "status": "success",
+            "data": {"title": entry["title"], "subject_id": subject_id},
+        }
+    except Exception as e:
+        logger.error(f"提升学习映射失败: {e}")
+        raise HTTPException(status_code=500, detail=f"提升学习映射失败: {str(e)}")
+
+
+@router.delete("/learned")
+async def clear_bgm_learned_mappings(
+    cache_key: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_flexible),
+):
+    """删除学习映射（可只删除 cache_key 对应的一条），下次同步时重新匹配。"""
+    try:
+        if cache_key is None:
+            removed = bgm_learned_mappings.clear()
+        else:
+            removed = bgm_learned_mappings.delete(cache_key)
+        return {"status": "success", "data": {"removed": removed}}
+    except Exception as e:
+        logger.error(f"删除学习映射失败: {e}")
+        raise HTTPException(status_code=500, detail=f"删除学习映射失败: {str(e)}")
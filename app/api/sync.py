@@ -70,7 +70,7 @@ async def _handle_custom_sync(
             }
         else:
             # 同步处理模式（保持向后兼容）
-            result = sync_service.sync_custom_item(item, source)
+            result = await sync_service.sync_custom_item_native(item, source)
 
             # 根据结果设置响应状态码
             if result.status == "error":
@@ -183,7 +183,9 @@ async def test_sync(
             }
         else:
             # 同步处理模式（配置页面使用，立即返回结果）
-            result = sync_service.sync_custom_item(test_item, source="test")
+            result = await sync_service.sync_custom_item_native(
+                test_item, source="test"
+            )
 
             # 计算耗时
             elapsed_time = round(time.time() - start_time, 2)
@@ -317,7 +319,9 @@ async def retry_sync_record(
         )
 
         # 执行同步
-        result = sync_service.sync_custom_item(retry_item, source=retry_source)
+        result = await sync_service.sync_custom_item_native(
+            retry_item, source=retry_source
+        )
 
         # 如果重试成功，更新原记录的状态
         if result.status == "success":
@@ -407,7 +411,7 @@ async def _handle_plex_sync(plex_request: Request, webhook_key: str = ""):
             logger.error(f"Plex同步服务调用失败: {sync_error}")
             # 如果异步提交失败，回退到同步模式
             try:
-                sync_service.sync_plex_item(plex_data)
+                await sync_service.sync_plex_item(plex_data)
                 return {
                     "status": "accepted",
                     "message": "Plex同步请求已接收（同步模式）",
@@ -482,7 +486,7 @@ async def _handle_emby_sync(emby_request: Request, webhook_key: str = ""):
             logger.error(f"Emby同步服务调用失败: {sync_error}")
             # 如果异步提交失败，回退到同步模式
             try:
-                sync_service.sync_emby_item(emby_data)
+                await sync_service.sync_emby_item(emby_data)
                 return {
                     "status": "accepted",
                     "message": "Emby同步请求已接收（同步模式）",
@@ -541,7 +545,7 @@ async def _handle_jellyfin_sync(jellyfin_request: Request, webhook_key: str = ""
             logger.error(f"Jellyfin同步服务调用失败: {sync_error}")
             # 如果异步提交失败，回退到同步模式
             try:
-                sync_service.sync_jellyfin_item(jellyfin_data)
+                await sync_service.sync_jellyfin_item(jellyfin_data)
                 return {
                     "status": "accepted",
                     "message": "Jellyfin同步请求已接收（同步模式）",
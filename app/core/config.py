@@ -393,6 +393,8 @@ class ConfigManager:
         default_config = {
             "startup_delay": 30,
             "max_concurrent_syncs": 3,
+            "max_concurrent_native_syncs": 64,
+            "mark_batch_window_ms": 300,
             "job_timeout": 300,
             "max_retries": 3,
             "retry_delay": 60,
@@ -506,6 +508,71 @@ class ConfigManager:
             max_episode = 9999
         return max_season, max_episode
 
+    def get_bgm_rate_limit_config(self) -> dict[str, Any]:
+        """Bangumi API 全局限速：每主机每秒请求数（≤0 不限速）与突发上限。"""
+        rate = self.get("dev", "bgm_rate_limit", fallback=4)
+        burst = self.get("dev", "bgm_rate_burst", fallback=8)
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            rate = 4.0
+        try:
+            burst = max(1, int(burst))
+        except (TypeError, ValueError):
+            burst = 8
+        return {"rate": rate, "burst": burst}
+
+    def get_bgm_circuit_breaker_config(self) -> dict[str, Any]:
+        """Bangumi API 熔断：连续失败阈值（≤0 关闭）、冷却秒数与恢复后排空间隔。"""
+        values = {
+            "threshold": (self.get("dev", "bgm_breaker_threshold", fallback=5), 5, int),
+            "cooldown": (
+                self.get("dev", "bgm_breaker_cooldown", fallback=30),
+                30,
+                float,
+            ),
+            "drain_interval": (
+                self.get("dev", "bgm_queue_drain_interval", fallback=1),
+                1,
+                float,
+            ),
+        }
+        result = {}
+        for key, (value, default, cast) in values.items():
+            try:
+                result[key] = cast(value)
+            except (TypeError, ValueError):
+                result[key] = cast(default)
+        return result
+
+    def get_bgm_route_config(self) -> dict[str, Any]:
+        """Bangumi API 线路选择：后台探测间隔（秒，≤0 关闭）与 GET 请求对冲开关。"""
+        interval = self.get("dev", "bgm_route_probe_interval", fallback=300)
+        hedge = self.get("dev", "bgm_route_hedge", fallback=False)
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            interval = 300.0
+        return {"probe_interval": interval, "hedge": hedge is True}
+
+    def get_bgm_unmatched_ttl(self) -> float:
+        """未匹配缓存有效期（秒），由 bgm_unmatched_cache_hours 换算，≤0 关闭。"""
+        hours = self.get("dev", "bgm_unmatched_cache_hours", fallback=24)
+        try:
+            return float(hours) * 3600
+        except (TypeError, ValueError):
+            return 24 * 3600.0
+
+    def get_bgm_learned_config(self) -> dict[str, Any]:
+        """学习映射：是否启用，以及使用记录所需的最低可信度（0-1）。"""
+        enabled = self.get("dev", "bgm_learned_mappings", fallback=True)
+        min_confidence = self.get("dev", "bgm_learned_min_confidence", fallback=0.6)
+        try:
+            min_confidence = float(min_confidence)
+        except (TypeError, ValueError):
+            min_confidence = 0.6
+        return {"enabled": enabled is not False, "min_confidence": min_confidence}
+
     def get_all_config(self) -> dict[str, dict[str, Any]]:
         """获取所有配置"""
         config = self.get_config_parser()
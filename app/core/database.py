@@ -232,6 +232,101 @@ class DatabaseManager:
             )
         """)
 
+        # Bangumi 元数据二级缓存（条目/章节/关联条目，跨重启复用）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_metadata_cache (
+                category TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                subject_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (category, cache_key)
+            )
+        """)
+
+        # Bangumi 续集链关系图（续集边、条目类型与章节，用于离线解析季度/集数）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_sequel_graph (
+                subject_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+        # Bangumi 账号收藏状态本地账本（条目收藏类型 / 已看章节），减少标记前的查询
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_collection_subjects (
+                account TEXT NOT NULL,
+                subject_id TEXT NOT NULL,
+                type INTEGER NOT NULL,
+                ep_status INTEGER,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (account, subject_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_collection_episodes (
+                account TEXT NOT NULL,
+                episode_id TEXT NOT NULL,
+                subject_id TEXT NOT NULL,
+                type INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (account, episode_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_collection_accounts (
+                account TEXT PRIMARY KEY,
+                reconciled_at REAL NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_retry_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_run_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+
+        # 无法匹配到 Bangumi 条目的标题（未匹配缓存），在有效期内跳过重复搜索
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_unmatched_titles (
+                cache_key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                ori_title TEXT NOT NULL,
+                media_type TEXT NOT NULL,
+                premiere_date TEXT NOT NULL,
+                detail TEXT NOT NULL,
+                version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+        # 同步成功后自动学习的 (标题, 原标题, 媒体类型, 季度) → 番剧ID 映射
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bgm_learned_mappings (
+                cache_key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                ori_title TEXT NOT NULL,
+                media_type TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                subject_id TEXT NOT NULL,
+                season_matched INTEGER NOT NULL,
+                season_subject_id TEXT NOT NULL,
+                method TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                hits INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+
         # 创建二级索引以加速常用查询
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_sync_records_timestamp ON sync_records(timestamp)"
@@ -251,6 +346,15 @@ class DatabaseManager:
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_in_app_notifications_unread ON in_app_notifications(read_at)"
         )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bgm_collection_episodes_subject ON bgm_collection_episodes(account, subject_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bgm_metadata_cache_subject ON bgm_metadata_cache(subject_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bgm_retry_queue_next_run ON bgm_retry_queue(next_run_at)"
+        )
 
         conn.commit()
         logger.info(f"数据库初始化完成: {self.db_path}")
@@ -465,19 +569,29 @@ class DatabaseManager:
             raise
 
     def update_sync_record_status(
-        self, record_id: int, status: str, message: str = ""
+        self,
+        record_id: int,
+        status: str,
+        message: str = "",
+        subject_id: Optional[str] = None,
+        episode_id: Optional[str] = None,
+        bgm_title: Optional[str] = None,
     ) -> bool:
-        """更新同步记录的状态"""
+        """更新同步记录的状态；给出 subject_id / episode_id / bgm_title 时一并更新"""
         try:
 
             def _write(conn):
+                self._ensure_sync_records_bgm_title(conn.cursor())
                 cursor = conn.execute(
                     """
                     UPDATE sync_records
-                    SET status = ?, message = ?
+                    SET status = ?, message = ?,
+                        subject_id = COALESCE(?, subject_id),
+                        episode_id = COALESCE(?, episode_id),
+                        bgm_title = COALESCE(?, bgm_title)
                     WHERE id = ?
                 """,
-                    (status, message, record_id),
+                    (status, message, subject_id, episode_id, bgm_title, record_id),
                 )
                 conn.commit()
                 return cursor.rowcount
@@ -1292,6 +1406,834 @@ class DatabaseManager:
             logger.error(f"统计未读通知失败: {e}")
             return 0
 
+    def get_bgm_metadata_cache(
+        self, category: str, cache_key: str
+    ) -> Optional[dict[str, Any]]:
+        """读取一条 Bangumi 元数据缓存（payload 为 JSON 文本）"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT subject_id, payload, fetched_at, expires_at
+                    FROM bgm_metadata_cache
+                    WHERE category = ? AND cache_key = ?
+                    LIMIT 1
+                    """,
+                    (category, cache_key),
+                )
+                return cursor.fetchone()
+
+            row = self._execute_with_lock(_read)
+            if not row:
+                return None
+            return {
+                "subject_id": row[0],
+                "payload": row[1],
+                "fetched_at": float(row[2]),
+                "expires_at": float(row[3]),
+            }
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 元数据缓存失败: {e}")
+            return None
+
+    def set_bgm_metadata_cache(
+        self,
+        category: str,
+        cache_key: str,
+        subject_id: str,
+        payload: str,
+        fetched_at: float,
+        expires_at: float,
+    ) -> bool:
+        """写入或覆盖一条 Bangumi 元数据缓存"""
+        try:
+
+            def _write(conn):
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO bgm_metadata_cache
+                    (category, cache_key, subject_id, payload, fetched_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (category, cache_key, subject_id, payload, fetched_at, expires_at),
+                )
+                conn.commit()
+
+            self._execute_with_lock(_write)
+            return True
+        except Exception as e:
+            logger.error(f"写入 Bangumi 元数据缓存失败: {e}")
+            return False
+
+    def delete_bgm_metadata_cache_by_subject(self, subject_id: str) -> int:
+        """删除某条目的全部元数据缓存，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    "DELETE FROM bgm_metadata_cache WHERE subject_id = ?",
+                    (subject_id,),
+                )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"删除 Bangumi 元数据缓存失败: {e}")
+            return 0
+
+    def clear_bgm_metadata_cache(self, older_than: Optional[float] = None) -> int:
+        """清空元数据缓存；指定 older_than 时只删除 expires_at 早于该时间戳的行"""
+        try:
+
+            def _write(conn):
+                if older_than is None:
+                    cursor = conn.execute("DELETE FROM bgm_metadata_cache")
+                else:
+                    cursor = conn.execute(
+                        "DELETE FROM bgm_metadata_cache WHERE expires_at < ?",
+                        (older_than,),
+                    )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"清理 Bangumi 元数据缓存失败: {e}")
+            return 0
+
+    def get_bgm_metadata_cache_counts(self) -> dict[str, dict[str, int]]:
+        """按类别统计元数据缓存条目数（total / 已过期 expired）"""
+        try:
+            now = time.time()
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT category, COUNT(*),
+                           SUM(CASE WHEN expires_at <= ? THEN 1 ELSE 0 END)
+                    FROM bgm_metadata_cache
+                    GROUP BY category
+                    """,
+                    (now,),
+                )
+                return cursor.fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return {
+                row[0]: {"total": int(row[1]), "expired": int(row[2] or 0)}
+                for row in rows
+            }
+        except Exception as e:
+            logger.error(f"统计 Bangumi 元数据缓存失败: {e}")
+            return {}
+
+    def get_bgm_sequel_node(self, subject_id: str) -> Optional[dict[str, Any]]:
+        """读取续集关系图中的一个条目节点（payload 为 JSON 文本）"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT payload, fetched_at FROM bgm_sequel_graph
+                    WHERE subject_id = ?
+                    LIMIT 1
+                    """,
+                    (subject_id,),
+                )
+                return cursor.fetchone()
+
+            row = self._execute_with_lock(_read)
+            if not row:
+                return None
+            return {"payload": row[0], "fetched_at": float(row[1])}
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 续集关系图失败: {e}")
+            return None
+
+    def set_bgm_sequel_node(
+        self, subject_id: str, payload: str, fetched_at: float
+    ) -> bool:
+        """写入或覆盖续集关系图中的一个条目节点"""
+        try:
+
+            def _write(conn):
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO bgm_sequel_graph
+                    (subject_id, payload, fetched_at)
+                    VALUES (?, ?, ?)
+                    """,
+                    (subject_id, payload, fetched_at),
+                )
+                conn.commit()
+
+            self._execute_with_lock(_write)
+            return True
+        except Exception as e:
+            logger.error(f"写入 Bangumi 续集关系图失败: {e}")
+            return False
+
+    def delete_bgm_sequel_node(self, subject_id: str) -> int:
+        """删除续集关系图中的一个条目节点，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    "DELETE FROM bgm_sequel_graph WHERE subject_id = ?",
+                    (subject_id,),
+                )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"删除 Bangumi 续集关系图节点失败: {e}")
+            return 0
+
+    def clear_bgm_sequel_graph(self) -> int:
+        """清空续集关系图，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute("DELETE FROM bgm_sequel_graph")
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"清空 Bangumi 续集关系图失败: {e}")
+            return 0
+
+    def count_bgm_sequel_nodes(self) -> int:
+        """续集关系图中的节点数"""
+        try:
+
+            def _read(conn):
+                return conn.execute("SELECT COUNT(*) FROM bgm_sequel_graph").fetchone()
+
+            row = self._execute_with_lock(_read)
+            return int(row[0]) if row else 0
+        except Exception as e:
+            logger.error(f"统计 Bangumi 续集关系图失败: {e}")
+            return 0
+
+    def get_bgm_collection_subject(
+        self, account: str, subject_id: str
+    ) -> Optional[dict[str, Any]]:
+        """读取账本中某账号对某条目的收藏状态"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT type, ep_status, updated_at FROM bgm_collection_subjects
+                    WHERE account = ? AND subject_id = ?
+                    LIMIT 1
+                    """,
+                    (account, subject_id),
+                )
+                return cursor.fetchone()
+
+            row = self._execute_with_lock(_read)
+            if not row:
+                return None
+            return {
+                "type": int(row[0]),
+                "ep_status": row[1],
+                "updated_at": float(row[2]),
+            }
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 收藏账本失败: {e}")
+            return None
+
+    def set_bgm_collection_subject(
+        self,
+        account: str,
+        subject_id: str,
+        collection_type: int,
+        ep_status: Optional[int],
+        updated_at: float,
+    ) -> bool:
+        """写入账本中某条目的收藏状态（ep_status 为 None 时保留原值）"""
+        try:
+
+            def _write(conn):
+                conn.execute(
+                    """
+                    INSERT INTO bgm_collection_subjects
+                    (account, subject_id, type, ep_status, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(account, subject_id) DO UPDATE SET
+                        type = excluded.type,
+                        ep_status = COALESCE(excluded.ep_status, ep_status),
+                        updated_at = excluded.updated_at
+                    """,
+                    (account, subject_id, collection_type, ep_status, updated_at),
+                )
+                conn.commit()
+
+            self._execute_with_lock(_write)
+            return True
+        except Exception as e:
+            logger.error(f"写入 Bangumi 收藏账本失败: {e}")
+            return False
+
+    def replace_bgm_collection_subjects(
+        self,
+        account: str,
+        rows: list[tuple[str, int, Optional[int]]],
+        now: float,
+        since: Optional[float] = None,
+        watched_type: Optional[int] = None,
+    ) -> int:
+        """用完整收藏列表替换某账号的条目收藏状态，并记录对账时间，返回写入行数。
+
+        传入 since（开始拉取收藏列表的时间）时，保留此后写入的条目行，
+        避免对账期间标记写入的状态被较旧的列表覆盖。
+        传入 watched_type 时，列表中 ep_status 与账本记录的看过章节数不一致的条目
+        （在其他客户端改过进度）删除其章节行，下次标记时重新读取。
+        """
+        try:
+
+            def _write(conn):
+                conn.execute(
+                    "DELETE FROM bgm_collection_subjects WHERE account = ? AND updated_at < ?",
+                    (account, float("inf") if since is None else since),
+                )
+                if watched_type is not None:
+                    # 对账期间写入的条目章节行同样较新，保留
+                    kept = {
+                        row[0]
+                        for row in conn.execute(
+                            "SELECT subject_id FROM bgm_collection_subjects WHERE account = ?",
+                            (account,),
+                        )
+                    }
+                    conn.executemany(
+                        """
+                        DELETE FROM bgm_collection_episodes
+                        WHERE account = ? AND subject_id = ? AND (
+                            SELECT COUNT(*) FROM bgm_collection_episodes
+                            WHERE account = ? AND subject_id = ? AND type = ?
+                        ) != ?
+                        """,
+                        [
+                            (account, sid, account, sid, watched_type, eps)
+                            for sid, _, eps in rows
+                            if eps is not None and sid not in kept
+                        ],
+                    )
+                conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO bgm_collection_subjects
+                    (account, subject_id, type, ep_status, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    [(account, sid, t, eps, now) for sid, t, eps in rows],
+                )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO bgm_collection_accounts
+                    (account, reconciled_at) VALUES (?, ?)
+                    """,
+                    (account, now),
+                )
+                conn.commit()
+                return len(rows)
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"对账 Bangumi 收藏账本失败: {e}")
+            return 0
+
+    def get_bgm_collection_reconciled_at(self, account: str) -> Optional[float]:
+        """某账号收藏账本最近一次与 Bangumi 对账的时间"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    "SELECT reconciled_at FROM bgm_collection_accounts WHERE account = ?",
+                    (account,),
+                )
+                return cursor.fetchone()
+
+            row = self._execute_with_lock(_read)
+            return float(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 收藏账本对账时间失败: {e}")
+            return None
+
+    def get_bgm_collection_episode_types(
+        self, account: str, episode_ids: list[str]
+    ) -> dict[str, int]:
+        """读取账本中若干章节的收藏类型，未记录的章节不在结果中"""
+        if not episode_ids:
+            return {}
+        try:
+            placeholders = ",".join("?" * len(episode_ids))
+
+            def _read(conn):
+                cursor = conn.execute(
+                    f"""
+                    SELECT episode_id, type FROM bgm_collection_episodes
+                    WHERE account = ? AND episode_id IN ({placeholders})
+                    """,
+                    (account, *episode_ids),
+                )
+                return cursor.fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return {row[0]: int(row[1]) for row in rows}
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 章节收藏账本失败: {e}")
+            return {}
+
+    def has_bgm_collection_episodes(self, account: str, subject_id: str) -> bool:
+        """账本中是否已有某条目的章节记录"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT 1 FROM bgm_collection_episodes
+                    WHERE account = ? AND subject_id = ? LIMIT 1
+                    """,
+                    (account, subject_id),
+                )
+                return cursor.fetchone()
+
+            return self._execute_with_lock(_read) is not None
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 章节收藏账本失败: {e}")
+            return False
+
+    def set_bgm_collection_episodes(
+        self,
+        account: str,
+        subject_id: str,
+        episode_ids: list[str],
+        collection_type: int,
+        updated_at: float,
+    ) -> bool:
+        """批量写入账本中章节的收藏类型"""
+        try:
+
+            def _write(conn):
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO bgm_collection_episodes
+                    (account, episode_id, subject_id, type, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (account, ep_id, subject_id, collection_type, updated_at)
+                        for ep_id in episode_ids
+                    ],
+                )
+                conn.commit()
+
+            self._execute_with_lock(_write)
+            return True
+        except Exception as e:
+            logger.error(f"写入 Bangumi 章节收藏账本失败: {e}")
+            return False
+
+    def clear_bgm_collection_ledger(self, account: Optional[str] = None) -> int:
+        """清空收藏账本；指定 account 时只清除该账号，返回删除的条目行数"""
+        try:
+
+            def _write(conn):
+                removed = 0
+                for table in (
+                    "bgm_collection_subjects",
+                    "bgm_collection_episodes",
+                    "bgm_collection_accounts",
+                ):
+                    if account is None:
+                        cursor = conn.execute(f"DELETE FROM {table}")
+                    else:
+                        cursor = conn.execute(
+                            f"DELETE FROM {table} WHERE account = ?", (account,)
+                        )
+                    if table == "bgm_collection_subjects":
+                        removed = cursor.rowcount
+                conn.commit()
+                return removed
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"清空 Bangumi 收藏账本失败: {e}")
+            return 0
+
+    def get_bgm_collection_ledger_counts(self) -> dict[str, dict[str, Any]]:
+        """按账号统计收藏账本的条目数、章节数与最近对账时间"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT a.account, a.reconciled_at,
+                           (SELECT COUNT(*) FROM bgm_collection_subjects s
+                            WHERE s.account = a.account),
+                           (SELECT COUNT(*) FROM bgm_collection_episodes e
+                            WHERE e.account = a.account)
+                    FROM bgm_collection_accounts a
+                    """
+                )
+                return cursor.fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return {
+                row[0]: {
+                    "reconciled_at": float(row[1]),
+                    "subjects": int(row[2]),
+                    "episodes": int(row[3]),
+                }
+                for row in rows
+            }
+        except Exception as e:
+            logger.error(f"统计 Bangumi 收藏账本失败: {e}")
+            return {}
+
+    def add_bgm_retry_task(
+        self,
+        kind: str,
+        payload: str,
+        next_run_at: float,
+        last_error: Optional[str] = None,
+    ) -> Optional[int]:
+        """写入一条延迟重试任务，返回任务 id（失败时 None）"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    """
+                    INSERT INTO bgm_retry_queue
+                    (kind, payload, attempts, next_run_at, last_error, created_at)
+                    VALUES (?, ?, 0, ?, ?, ?)
+                    """,
+                    (kind, payload, next_run_at, last_error, time.time()),
+                )
+                conn.commit()
+                return cursor.lastrowid
+
+            return self._execute_with_lock(_write)
+        except Exception as e:
+            logger.error(f"写入 Bangumi 重试队列失败: {e}")
+            return None
+
+    def get_due_bgm_retry_tasks(
+        self, now: float, limit: int = 20
+    ) -> list[dict[str, Any]]:
+        """读取已到期的延迟重试任务（按到期时间排序）"""
+        try:
+
+            def _read(conn):
+                cursor = conn.execute(
+                    """
+                    SELECT id, kind, payload, attempts, next_run_at, last_error
+                    FROM bgm_retry_queue
+                    WHERE next_run_at <= ?
+                    ORDER BY next_run_at, id
+                    LIMIT ?
+                    """,
+                    (now, limit),
+                )
+                return cursor.fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return [
+                {
+                    "id": row[0],
+                    "kind": row[1],
+                    "payload": row[2],
+                    "attempts": int(row[3]),
+                    "next_run_at": float(row[4]),
+                    "last_error": row[5],
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 重试队列失败: {e}")
+            return []
+
+    def get_next_bgm_retry_at(self) -> Optional[float]:
+        """最早一条延迟重试任务的到期时间；队列为空返回 None"""
+        try:
+
+            def _read(conn):
+                return conn.execute(
+                    "SELECT MIN(next_run_at) FROM bgm_retry_queue"
+                ).fetchone()
+
+            row = self._execute_with_lock(_read)
+            return float(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 重试队列失败: {e}")
+            return None
+
+    def reschedule_bgm_retry_task(
+        self, task_id: int, attempts: int, next_run_at: float, last_error: str
+    ) -> bool:
+        """更新延迟重试任务的尝试次数与下次执行时间"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    """
+                    UPDATE bgm_retry_queue
+                    SET attempts = ?, next_run_at = ?, last_error = ?
+                    WHERE id = ?
+                    """,
+                    (attempts, next_run_at, last_error, task_id),
+                )
+                conn.commit()
+                return cursor.rowcount
+
+            return bool(self._execute_with_lock(_write))
+        except Exception as e:
+            logger.error(f"更新 Bangumi 重试任务失败: {e}")
+            return False
+
+    def delete_bgm_retry_task(self, task_id: int) -> int:
+        """删除延迟重试任务，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    "DELETE FROM bgm_retry_queue WHERE id = ?", (task_id,)
+                )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"删除 Bangumi 重试任务失败: {e}")
+            return 0
+
+    def count_bgm_retry_tasks(self) -> dict[str, int]:
+        """按任务类型统计待执行的延迟重试任务数"""
+        try:
+
+            def _read(conn):
+                return conn.execute(
+                    "SELECT kind, COUNT(*) FROM bgm_retry_queue GROUP BY kind"
+                ).fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return {row[0]: int(row[1]) for row in rows}
+        except Exception as e:
+            logger.warning(f"统计 Bangumi 重试队列失败: {e}")
+            return {}
+
+    def get_bgm_unmatched_titles(self) -> list[dict[str, Any]]:
+        """读取全部未匹配缓存条目"""
+        try:
+
+            def _read(conn):
+                return conn.execute(
+                    """
+                    SELECT cache_key, title, ori_title, media_type, premiere_date,
+                           detail, version, created_at, expires_at
+                    FROM bgm_unmatched_titles
+                    """
+                ).fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return [
+                {
+                    "cache_key": row[0],
+                    "title": row[1],
+                    "ori_title": row[2],
+                    "media_type": row[3],
+                    "premiere_date": row[4],
+                    "detail": row[5],
+                    "version": row[6],
+                    "created_at": float(row[7]),
+                    "expires_at": float(row[8]),
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 未匹配缓存失败: {e}")
+            return []
+
+    def set_bgm_unmatched_title(self, entry: dict[str, Any]) -> bool:
+        """写入或覆盖一条未匹配缓存"""
+        try:
+
+            def _write(conn):
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO bgm_unmatched_titles
+                    (cache_key, title, ori_title, media_type, premiere_date,
+                     detail, version, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        entry["cache_key"],
+                        entry["title"],
+                        entry["ori_title"],
+                        entry["media_type"],
+                        entry["premiere_date"],
+                        entry["detail"],
+                        entry["version"],
+                        entry["created_at"],
+                        entry["expires_at"],
+                    ),
+                )
+                conn.commit()
+
+            self._execute_with_lock(_write)
+            return True
+        except Exception as e:
+            logger.error(f"写入 Bangumi 未匹配缓存失败: {e}")
+            return False
+
+    def delete_bgm_unmatched_title(self, cache_key: str) -> int:
+        """删除一条未匹配缓存，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    "DELETE FROM bgm_unmatched_titles WHERE cache_key = ?",
+                    (cache_key,),
+                )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"删除 Bangumi 未匹配缓存失败: {e}")
+            return 0
+
+    def clear_bgm_unmatched_titles(self, except_version: Optional[str] = None) -> int:
+        """清空未匹配缓存（或仅清除版本不是 except_version 的条目），返回删除行数"""
+        try:
+
+            def _write(conn):
+                if except_version is None:
+                    cursor = conn.execute("DELETE FROM bgm_unmatched_titles")
+                else:
+                    cursor = conn.execute(
+                        "DELETE FROM bgm_unmatched_titles WHERE version != ?",
+                        (except_version,),
+                    )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"清空 Bangumi 未匹配缓存失败: {e}")
+            return 0
+
+    def get_bgm_learned_mappings(self) -> list[dict[str, Any]]:
+        """读取全部学习映射"""
+        try:
+
+            def _read(conn):
+                return conn.execute(
+                    """
+                    SELECT cache_key, title, ori_title, media_type, season,
+                           subject_id, season_matched, season_subject_id, method,
+                           confidence, hits, created_at, last_used_at
+                    FROM bgm_learned_mappings
+                    """
+                ).fetchall()
+
+            rows = self._execute_with_lock(_read) or []
+            return [
+                {
+                    "cache_key": row[0],
+                    "title": row[1],
+                    "ori_title": row[2],
+                    "media_type": row[3],
+                    "season": int(row[4]),
+                    "subject_id": row[5],
+                    "season_matched": bool(row[6]),
+                    "season_subject_id": row[7],
+                    "method": row[8],
+                    "confidence": float(row[9]),
+                    "hits": int(row[10]),
+                    "created_at": float(row[11]),
+                    "last_used_at": float(row[12]),
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.warning(f"读取 Bangumi 学习映射失败: {e}")
+            return []
+
+    def set_bgm_learned_mapping(self, entry: dict[str, Any]) -> bool:
+        """写入或覆盖一条学习映射"""
+        try:
+
+            def _write(conn):
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO bgm_learned_mappings
+                    (cache_key, title, ori_title, media_type, season, subject_id,
+                     season_matched, season_subject_id, method, confidence, hits,
+                     created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        entry["cache_key"],
+                        entry["title"],
+                        entry["ori_title"],
+                        entry["media_type"],
+                        entry["season"],
+                        entry["subject_id"],
+                        int(entry["season_matched"]),
+                        entry["season_subject_id"],
+                        entry["method"],
+                        entry["confidence"],
+                        entry["hits"],
+                        entry["created_at"],
+                        entry["last_used_at"],
+                    ),
+                )
+                conn.commit()
+
+            self._execute_with_lock(_write)
+            return True
+        except Exception as e:
+            logger.error(f"写入 Bangumi 学习映射失败: {e}")
+            return False
+
+    def delete_bgm_learned_mapping(self, cache_key: str) -> int:
+        """删除一条学习映射，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute(
+                    "DELETE FROM bgm_learned_mappings WHERE cache_key = ?",
+                    (cache_key,),
+                )
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"删除 Bangumi 学习映射失败: {e}")
+            return 0
+
+    def clear_bgm_learned_mappings(self) -> int:
+        """清空学习映射，返回删除行数"""
+        try:
+
+            def _write(conn):
+                cursor = conn.execute("DELETE FROM bgm_learned_mappings")
+                conn.commit()
+                return cursor.rowcount
+
+            return int(self._execute_with_lock(_write) or 0)
+        except Exception as e:
+            logger.error(f"清空 Bangumi 学习映射失败: {e}")
+            return 0
+
 
 # 全局数据库实例
 database_manager = DatabaseManager()
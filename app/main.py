@@ -11,6 +11,7 @@ from fastapi.staticfiles import StaticFiles
 
 from .api.app_release import router as app_release_router
 from .api.auth import router as auth_router
+from .api.bgm_cache import router as bgm_cache_router
 from .api.bgm_poster import router as bgm_poster_router
 from .api.config import router as config_router
 from .api.feiniu import router as feiniu_router
@@ -35,8 +36,10 @@ from .services.feiniu.scheduler import feiniu_scheduler
 from .services.feiniu.sync_service import ensure_feiniu_startup_watermark
 from .services.fongmi.scheduler import fongmi_scheduler
 from .services.mapping_service import mapping_service
-from .services.sync_service import sync_service
 from .services.trakt.scheduler import trakt_scheduler
+from .utils.bangumi_data import bangumi_data
+from .utils.bgm_retry_queue import bgm_retry_queue
+from .utils.http_transport import close_async_clients, close_pooled_adapter
 
 _background_tasks: set[asyncio.Task] = set()
 
@@ -65,6 +68,7 @@ app.include_router(root_router)  # 无前缀的同步接口（包含媒体服务
 app.include_router(auth_router)
 app.include_router(config_router)
 app.include_router(bgm_poster_router)
+app.include_router(bgm_cache_router)
 app.include_router(mappings_router)
 app.include_router(logs_router)
 app.include_router(pages_router)
@@ -154,6 +158,18 @@ async def startup_event():
     except Exception as e:
         logger.error(f"启动 Trakt 调度器失败: {e}")
 
+    # 后台加载 bangumi-data，加载完成前的匹配直接改用 API 搜索
+    try:
+        bangumi_data.start()
+    except Exception as e:
+        logger.error(f"启动 bangumi-data 后台加载失败: {e}")
+
+    # 启动 Bangumi 延迟重试队列（继续执行重启前未完成的重试）
+    try:
+        bgm_retry_queue.start()
+    except Exception as e:
+        logger.error(f"启动 Bangumi 延迟重试队列失败: {e}")
+
     startup_info.print_startup_complete()
 
 
@@ -186,12 +202,20 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"停止 fongmi 调度器失败: {e}")
 
-    # 关闭同步服务线程池
+    # 停止延迟重试队列（未执行的任务保留在数据库中）
+    try:
+        bgm_retry_queue.stop()
+        logger.info("Bangumi 延迟重试队列已停止")
+    except Exception as e:
+        logger.error(f"停止 Bangumi 延迟重试队列失败: {e}")
+
+    # 关闭共享 HTTP 连接池
     try:
-        sync_service.shutdown()
-        logger.info("同步服务线程池已关闭")
+        await close_async_clients()
+        close_pooled_adapter()
+        logger.info("共享 HTTP 连接池已关闭")
     except Exception as e:
-        logger.error(f"关闭同步服务线程池失败: {e}")
+        logger.error(f"关闭共享 HTTP 连接池失败: {e}")
 
     # 关闭数据库连接
     try:
@@ -45,6 +45,10 @@ class BangumiDataConfig(BaseModel):
     local_cache_path: str = Field(
         "./bangumi_data_cache.json", description="本地缓存路径"
     )
+    ready_timeout: int = Field(5, description="数据尚未载入时匹配的最长等待时间（秒）")
+    date_window_days: int = Field(
+        400, description="模糊匹配的开播日期窗口（天），0 表示不限制"
+    )
 
 
 class AuthConfig(BaseModel):
@@ -25,6 +25,11 @@ class CustomItem(BaseModel):
         None,
         description='可选：如 "mark_watching" 时仅将剧场版条目标为在看（用于 Tautulli 等 /Custom）',
     )
+    provider_ids: Optional[dict[str, str]] = Field(
+        None,
+        description='可选：外部 ID，如 {"tmdb": "209867", "imdb": "tt22248376"}；剧集为整部剧的 ID，'
+        "电影为影片的 ID。bangumi-data 收录时直接据此匹配条目",
+    )
 
 
 class SyncResponse(BaseModel):
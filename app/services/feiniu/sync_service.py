@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import asyncio
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -137,8 +136,10 @@ class FeiniuSyncService:
         synced_set = database_manager.get_feiniu_synced_set(user_guids)
 
         synced = skipped = errors = 0
+        pending = []
         for rec in records:
-            if (rec.user_guid, rec.item_guid) in synced_set:
+            key = (rec.user_guid, rec.item_guid)
+            if key in synced_set:
                 skipped += 1
                 continue
 
@@ -146,28 +147,28 @@ class FeiniuSyncService:
             if not item:
                 skipped += 1
                 continue
+            synced_set.add(key)
+            pending.append((rec, item))
 
-            try:
-                result = await asyncio.to_thread(
-                    sync_service.sync_custom_item, item, FEINIU_SYNC_SOURCE
-                )
-            except Exception as e:
-                logger.error(f"飞牛单条同步执行失败: {e}")
+        # 同一作品同一季的记录并发同步，同一条目的多集合并为一次批量标记
+        results = await sync_service.sync_custom_items_native(
+            [item for _, item in pending], FEINIU_SYNC_SOURCE, pause=0.05
+        )
+        for (rec, _), result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.error(f"飞牛单条同步执行失败: {result}")
                 errors += 1
-                await asyncio.sleep(0.05)
                 continue
 
             if result.status == "success":
                 database_manager.save_feiniu_sync_history(
                     rec.user_guid, rec.item_guid, rec.update_time_ms or None
                 )
-                synced_set.add((rec.user_guid, rec.item_guid))
                 synced += 1
             elif result.status == "ignored":
                 skipped += 1
             else:
                 errors += 1
-            await asyncio.sleep(0.05)
 
         ok = errors == 0
         return FeiniuSyncResult(
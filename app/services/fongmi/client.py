@@ -17,6 +17,7 @@ import re
 import httpx
 
 from ...core.logging import logger
+from ...utils.http_transport import get_async_client
 from .models import FongmiDevice, FongmiWatchRecord
 
 # 端口与超时
@@ -387,17 +388,17 @@ async def fetch_completed_records(
     if not devices:
         return []
     records: list[FongmiWatchRecord] = []
-    async with httpx.AsyncClient() as client:
-        tasks = [fetch_media(d, client) for d in devices]
-        media_list = await asyncio.gather(*tasks, return_exceptions=True)
-        for device, media in zip(devices, media_list):
-            if isinstance(media, Exception) or not media:
-                continue
-            if not media_is_complete(media, min_percent):
-                continue
-            rec = media_to_record(device, media)
-            if rec:
-                records.append(rec)
+    client = get_async_client()
+    tasks = [fetch_media(d, client) for d in devices]
+    media_list = await asyncio.gather(*tasks, return_exceptions=True)
+    for device, media in zip(devices, media_list):
+        if isinstance(media, Exception) or not media:
+            continue
+        if not media_is_complete(media, min_percent):
+            continue
+        rec = media_to_record(device, media)
+        if rec:
+            records.append(rec)
     return records
 
 
@@ -405,9 +406,9 @@ async def fetch_all_media_status(devices: list[FongmiDevice]) -> list[dict]:
     """并行拉取所有设备的 /media 当前状态（不过滤完成），返回调试展示用 dict 列表"""
     if not devices:
         return []
-    async with httpx.AsyncClient() as client:
-        tasks = [fetch_media(d, client) for d in devices]
-        media_list = await asyncio.gather(*tasks, return_exceptions=True)
+    client = get_async_client()
+    tasks = [fetch_media(d, client) for d in devices]
+    media_list = await asyncio.gather(*tasks, return_exceptions=True)
     return [
         media_to_debug_dict(d, m if isinstance(m, dict) else None)
         for d, m in zip(devices, media_list)
@@ -9,11 +9,10 @@ from __future__ import annotations
 import asyncio
 from dataclasses import dataclass
 
-import httpx
-
 from ...core.config import config_manager
 from ...core.logging import logger
 from ...models.sync import CustomItem
+from ...utils.http_transport import get_async_client
 from ..sync_service import sync_service
 from .client import (
     discover_devices,
@@ -101,19 +100,23 @@ class FongmiSyncService:
         records = await fetch_completed_records(devices, min_percent)
 
         synced = skipped = errors = 0
+        pending = []
+        queued = set()
         for rec in records:
             key = (rec.device_ip, rec.episode_url)
-            if key in self._synced_keys:
+            if key in self._synced_keys or key in queued:
                 skipped += 1
                 continue
+            queued.add(key)
+            pending.append((key, self._record_to_custom_item(rec)))
 
-            item = self._record_to_custom_item(rec)
-            try:
-                result = await asyncio.to_thread(
-                    sync_service.sync_custom_item, item, FONGMI_SYNC_SOURCE
-                )
-            except Exception as e:
-                logger.error(f"fongmi 单条同步执行失败: {e}")
+        # 同一作品同一季的记录并发同步，同一条目的多集合并为一次批量标记
+        results = await sync_service.sync_custom_items_native(
+            [item for _, item in pending], FONGMI_SYNC_SOURCE
+        )
+        for (key, _), result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.error(f"fongmi 单条同步执行失败: {result}")
                 errors += 1
                 continue
 
@@ -164,8 +167,7 @@ class FongmiSyncService:
             device_type=0,
         )
 
-        async with httpx.AsyncClient() as client:
-            media = await fetch_media(device, client)
+        media = await fetch_media(device, get_async_client())
 
         if not media:
             return {
@@ -197,8 +199,8 @@ class FongmiSyncService:
 
         item = self._record_to_custom_item(rec)
         try:
-            result = await asyncio.to_thread(
-                sync_service.sync_custom_item, item, FONGMI_SYNC_SOURCE
+            result = await sync_service.sync_custom_item_native(
+                item, FONGMI_SYNC_SOURCE
             )
         except Exception as e:
             logger.error(f"fongmi 调试同步执行失败: {e}")
@@ -7,6 +7,8 @@ import os
 from typing import Any, Optional
 
 from ..core.logging import logger
+from ..utils.bangumi_data import bangumi_data
+from ..utils.bgm_unmatched_cache import bgm_unmatched_cache
 
 
 class MappingService:
@@ -77,6 +79,8 @@ class MappingService:
                     self._cached_mappings = mappings
                     self._mapping_file_path = current_file_path
                     self._last_modified_time = current_modified_time
+                    # 映射变化后 bangumi-data 的匹配结果缓存随之失效
+                    bangumi_data.clear_match_cache()
 
                     if mappings:
                         logger.debug(
@@ -139,8 +143,9 @@ class MappingService:
             with open(mapping_file_path, "w", encoding="utf-8") as f:
                 json.dump(config_data, f, ensure_ascii=False, indent=2)
 
-            # 重新加载映射
+            # 重新加载映射；映射变化后之前未匹配的标题可能已可匹配
             self.reload_custom_mappings()
+            bgm_unmatched_cache.clear()
 
             logger.info(f"自定义映射已更新，共 {len(mappings)} 个映射")
             return True
@@ -179,6 +184,10 @@ class MappingService:
             "mappings": mappings,
         }
 
+    def get_version(self) -> str:
+        """当前映射文件的版本（路径与修改时间），映射变化时随之改变"""
+        return f"{self._mapping_file_path}:{self._last_modified_time}"
+
     def get_all_mappings(self) -> dict[str, str]:
         """获取所有映射"""
         return self.load_custom_mappings()
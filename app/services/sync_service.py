@@ -3,27 +3,59 @@
 """
 
 import asyncio
+import contextvars
+import functools
 import re
 import threading
 import time
 import traceback
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Optional
+import weakref
+from typing import Any, Optional, Union
 
 from ..core.config import config_manager
 from ..core.database import database_manager
 from ..core.logging import logger
 from ..models.sync import CustomItem, SyncResponse
-from ..utils.bangumi_api import BangumiApi
+from ..utils.bangumi_api_async import AsyncBangumiApi
+from ..utils.bangumi_api_pool import bangumi_api_pool
 from ..utils.bangumi_data import BangumiData, bangumi_data
+from ..utils.bgm_circuit_breaker import BangumiCircuitOpenError
+from ..utils.bgm_learned_mappings import bgm_learned_mappings
+from ..utils.bgm_retry_queue import (
+    bgm_retry_queue,
+    current_retry_task,
+    defer_retries,
+    is_retryable_error,
+    retries_deferred,
+)
+from ..utils.bgm_unmatched_cache import bgm_unmatched_cache
 from ..utils.data_util import (
     extract_emby_data,
     extract_jellyfin_data,
     extract_plex_data,
 )
+from ..utils.http_transport import close_async_clients
 from ..utils.notifier import send_notify
+from ..utils.title_normalizer import contains_keyword, lookup_title
 from .mapping_service import mapping_service
 
+# 延迟重试队列中的任务类型：整条同步请求重新执行
+RETRY_KIND_SYNC_ITEM = "sync_item"
+
+# 本次请求找到番剧ID的途径 (来源, 番剧ID, 是否为该季度的条目)，同步成功后据此写入学习映射
+_subject_match: contextvars.ContextVar[Optional[tuple[str, str, bool]]] = (
+    contextvars.ContextVar("subject_match", default=None)
+)
+
+# 延迟重试队列正在重新执行的同步所对应的「待重试」记录（至多一个元素的列表）；
+# 写入结果时取出并更新该记录而非新增
+_queued_record: contextvars.ContextVar[Optional[list[int]]] = contextvars.ContextVar(
+    "queued_record", default=None
+)
+
+# 合并标记被放弃（发起者被取消且本批未完成）时交给等待者的结果：由等待者自行重新标记
+_MARK_AGAIN = object()
+
 
 class SyncService:
     """同步服务"""
@@ -33,23 +65,27 @@ class SyncService:
         self._cached_mappings: dict[str, str] = {}
         self._mapping_file_path: Optional[str] = None
         self._last_modified_time: float = 0
-        # 线程池大小从配置读取
-        try:
-            scheduler_cfg = config_manager.get_scheduler_config()
-            max_workers = max(1, int(scheduler_cfg.get("max_concurrent_syncs", 3)))
-        except (TypeError, ValueError, KeyError):
-            max_workers = 3
-        self._executor = ThreadPoolExecutor(
-            max_workers=max_workers, thread_name_prefix="sync_worker"
-        )
         # 同步任务状态跟踪
         self._tasks_lock = threading.Lock()
         self._sync_tasks = {}
         self._task_counter = 0
-
-    def shutdown(self):
-        """关闭线程池，等待正在执行的任务完成"""
-        self._executor.shutdown(wait=True)
+        # 原生异步同步的并发上限：事件循环 -> 信号量（首次使用时在该事件循环内创建；
+        # 应用主循环与延迟重试队列的临时循环各自计数，互不替换）
+        self._native_semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        # 持有后台协程任务的引用，避免被垃圾回收
+        self._background_tasks: set[asyncio.Task] = set()
+        # 等待合并标记的章节：(事件循环, 客户端, 条目) -> {ep_id: [等待者 Future]}
+        self._pending_marks: dict[tuple[int, int, str], dict[Any, list]] = {}
+        # 正在标记的条目：(事件循环, 客户端, 条目) -> 标记完成时置位的事件
+        self._marks_in_flight: dict[tuple[int, int, str], asyncio.Event] = {}
+        # 网络失败的同步写入延迟重试队列，由队列后台线程重新执行
+        bgm_retry_queue.register(
+            RETRY_KIND_SYNC_ITEM,
+            self._run_queued_sync,
+            on_give_up=self._give_up_queued_sync,
+        )
 
     def _register_task(self, task_id: str, item_data: Any, source: str) -> None:
         """注册新任务到状态跟踪（需持有锁）"""
@@ -84,27 +120,53 @@ class SyncService:
             task_id = f"sync_{self._task_counter}_{int(time.time())}"
             self._register_task(task_id, item.dict(), source)
 
-        # 提交到线程池异步执行
-        self._executor.submit(self._sync_custom_item_sync, item, source, task_id)
+        # 在事件循环中以原生协程执行，不占用线程池
+        self._spawn(self._run_native_task(task_id, "", source, lambda: (item, False)))
 
         # 不等待结果，立即返回任务ID
         logger.info(f"同步任务 {task_id} 已提交到异步队列")
         return task_id
 
-    def _sync_custom_item_sync(
-        self, item: CustomItem, source: str, task_id: str
-    ) -> SyncResponse:
-        """同步执行的内部方法"""
+    def _spawn(self, coro) -> asyncio.Task:
+        """在当前事件循环中启动后台协程并持有引用"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _run_native_task(self, task_id: str, label: str, source: str, prepare):
+        """执行原生异步同步任务并更新任务状态"""
         try:
             self._update_task_status(task_id, "running")
-            result = self.sync_custom_item(item, source)
+            result = await self._sync_prepared(label, source, prepare)
             self._update_task_status(task_id, "completed", result=result.dict())
             return result
         except Exception as e:
             self._update_task_status(task_id, "failed", error=str(e))
-            logger.error(f"异步同步任务 {task_id} 失败: {e}")
+            logger.error(f"异步{label}同步任务 {task_id} 失败: {e}")
             return SyncResponse(status="error", message=f"异步处理失败: {str(e)}")
 
+    async def _sync_prepared(self, label: str, source: str, prepare) -> SyncResponse:
+        """解析报文并同步。
+
+        prepare 返回 SyncResponse（无需同步或请求无效）或 (CustomItem, 是否仅标记在看)。
+        """
+        try:
+            prepared = prepare()
+        except Exception as e:
+            logger.error(f"{label}同步处理出错: {e}")
+            return SyncResponse(status="error", message=f"处理失败: {str(e)}")
+
+        if isinstance(prepared, SyncResponse):
+            return prepared
+        custom_item, mark_watching = prepared
+        if mark_watching:
+            # 开始播放剧场版：走 sync_custom_item_native 的标记在看分支
+            custom_item = custom_item.model_copy(
+                update={"sync_action": "mark_watching"}
+            )
+        return await self.sync_custom_item_native(custom_item, source)
+
     def get_sync_task_status(self, task_id: str) -> Optional[dict]:
         """获取任务状态（线程安全）"""
         with self._tasks_lock:
@@ -132,443 +194,795 @@ class SyncService:
         if old_tasks:
             logger.info(f"清理了 {len(old_tasks)} 个旧的同步任务记录")
 
-    def sync_movie_watching(
-        self, item: CustomItem, source: str = "custom"
+    async def _sync_movie_watching_native(
+        self, item: CustomItem, actual_source: str
     ) -> SyncResponse:
-        """剧场版：仅将 Bangumi 条目收藏标为「在看」，不解析章节、不点单集。"""
+        """剧场版：仅将 Bangumi 条目收藏标为「在看」，不解析章节、不点单集（异常由调用方记录）"""
+        logger.info(f"接收到剧场版在看请求：{item}")
+        self._notify_first_attempt("request_received", item, actual_source)
+
+        rejected = self._precheck_movie_watching(item)
+        if rejected is not None:
+            return rejected
+
+        subject_id, _, subject_find_error = await self._find_subject_id_async(item)
+        if not subject_id:
+            return await asyncio.to_thread(
+                self._record_subject_not_found, item, actual_source, subject_find_error
+            )
+
+        bgm = self._get_async_bangumi_api_for_user(item.user_name)
+        if not bgm:
+            logger.error(f"无法为用户 {item.user_name} 创建bangumi API实例")
+            return SyncResponse(status="error", message="bangumi配置错误")
+
+        self._notify_first_attempt(
+            "bangumi_id_found", item, actual_source, subject_id=str(subject_id)
+        )
+
         try:
-            actual_source = item.source if item.source else source
-            logger.info(f"接收到剧场版在看请求：{item}")
-            send_notify("request_received", item, actual_source)
+            mark_st = await bgm.ensure_subject_watching(str(subject_id))
+        except ValueError as ve:
+            if self._is_auth_error(ve):
+                return SyncResponse(status="error", message=str(ve))
+            raise
+
+        return await asyncio.to_thread(
+            self._record_movie_watching, item, actual_source, subject_id, mark_st
+        )
 
-            if not config_manager.get(
-                "sync", "movie_playback_start_mark_watching", fallback=True
-            ):
-                return SyncResponse(
-                    status="ignored",
-                    message="已在配置中关闭剧场版播放开始标记在看",
-                )
+    def _precheck_movie_watching(self, item: CustomItem) -> Optional[SyncResponse]:
+        """剧场版在看：配置、类型、权限与屏蔽词检查；不通过时返回应直接返回的响应"""
+        if not config_manager.get(
+            "sync", "movie_playback_start_mark_watching", fallback=True
+        ):
+            return SyncResponse(
+                status="ignored",
+                message="已在配置中关闭剧场版播放开始标记在看",
+            )
 
-            if item.media_type != "movie":
-                return SyncResponse(
-                    status="ignored", message="仅剧场版支持播放开始标记在看"
-                )
+        if item.media_type != "movie":
+            return SyncResponse(
+                status="ignored", message="仅剧场版支持播放开始标记在看"
+            )
 
-            if not item.title:
-                logger.error("同步名称为空，跳过")
-                return SyncResponse(status="error", message="同步名称为空")
+        if not item.title:
+            logger.error("同步名称为空，跳过")
+            return SyncResponse(status="error", message="同步名称为空")
 
-            if not self._check_user_permission(item.user_name):
-                return SyncResponse(status="error", message="用户无权限同步")
+        if not self._check_user_permission(item.user_name):
+            return SyncResponse(status="error", message="用户无权限同步")
 
-            if self._is_title_blocked(item.title, item.ori_title):
-                return SyncResponse(
-                    status="ignored", message="番剧标题包含屏蔽关键词，跳过同步"
-                )
+        if self._is_title_blocked(item.title, item.ori_title):
+            return SyncResponse(
+                status="ignored", message="番剧标题包含屏蔽关键词，跳过同步"
+            )
+        return None
+
+    def _record_movie_watching(
+        self, item: CustomItem, actual_source: str, subject_id, mark_st: int
+    ) -> SyncResponse:
+        if mark_st == 0:
+            result_message = "条目已在看或已看过，无需变更"
+        else:
+            result_message = "播放开始：条目标记为在看"
+
+        logger.info(
+            f"bgm: {item.title} {result_message} https://bgm.tv/subject/{subject_id}"
+        )
+
+        self._log_sync_record(
+            user_name=item.user_name,
+            title=item.title,
+            ori_title=item.ori_title or "",
+            season=item.season,
+            episode=item.episode,
+            subject_id=str(subject_id),
+            episode_id=None,
+            status="success",
+            message=result_message,
+            source=actual_source,
+            media_type=item.media_type,
+        )
+
+        return SyncResponse(
+            status="success",
+            message=result_message,
+            data={
+                "title": item.title,
+                "season": item.season,
+                "episode": item.episode,
+                "subject_id": str(subject_id),
+            },
+        )
+
+    async def sync_custom_item_native(
+        self, item: CustomItem, source: str = "custom"
+    ) -> SyncResponse:
+        """同步自定义项目：直接 await AsyncBangumiApi，不占用线程池。
 
-            subject_id, _, subject_find_error = self._find_subject_id(item)
-            if not subject_id:
-                send_notify(
-                    "anime_not_found",
+        数据库记录与通知在后台线程中完成，不阻塞事件循环；网络失败不原地重试，
+        转入延迟重试队列。
+        """
+        actual_source = item.source if item.source else source
+        with defer_retries():
+            try:
+                sync_action = (item.sync_action or "").strip().lower()
+                if sync_action == "mark_watching":
+                    if item.media_type != "movie":
+                        return SyncResponse(
+                            status="ignored",
+                            message="仅支持剧场版标记在看",
+                        )
+                    async with self._native_sync_slot():
+                        return await self._sync_movie_watching_native(
+                            item, actual_source
+                        )
+
+                async with self._native_sync_slot():
+                    return await self._sync_custom_item_native(item, actual_source)
+            except Exception as e:
+                return await asyncio.to_thread(
+                    self._record_sync_failure,
                     item,
                     actual_source,
-                    error_message="未找到匹配的番剧",
+                    e,
+                    traceback.format_exc(),
                 )
-                database_manager.log_sync_record(
-                    user_name=item.user_name,
-                    title=item.title,
-                    ori_title=item.ori_title or "",
-                    season=item.season,
-                    episode=item.episode,
-                    subject_id=None,
-                    episode_id=None,
-                    status="error",
-                    message=self._format_subject_not_found_message(
-                        item, subject_find_error
-                    ),
-                    source=actual_source,
-                    media_type=item.media_type,
-                )
-                return SyncResponse(status="error", message="未找到匹配的番剧")
 
-            bgm = self._get_bangumi_api_for_user(item.user_name)
-            if not bgm:
-                logger.error(f"无法为用户 {item.user_name} 创建bangumi API实例")
-                return SyncResponse(status="error", message="bangumi配置错误")
+    async def sync_custom_items_native(
+        self, items: list[CustomItem], source: str = "custom", pause: float = 0
+    ) -> list[Union[SyncResponse, BaseException]]:
+        """回填多条记录：同一用户、同一作品同一季的记录并发同步，使同一条目待标记的
+        多集合并为一次批量标记（见 _mark_episode_batched）；不同作品依次同步，
+        之间间隔 pause 秒。
 
-            send_notify(
-                "bangumi_id_found", item, actual_source, subject_id=str(subject_id)
+        返回与 items 顺序一致的结果；单条同步抛出的异常放在对应位置。
+        """
+        groups: dict[tuple, list[int]] = {}
+        for index, item in enumerate(items):
+            key = (item.user_name, item.media_type, item.title, item.season)
+            groups.setdefault(key, []).append(index)
+
+        results: dict[int, Union[SyncResponse, BaseException]] = {}
+        for n, indexes in enumerate(groups.values()):
+            if n and pause > 0:
+                await asyncio.sleep(pause)
+            outcomes = await asyncio.gather(
+                *(self.sync_custom_item_native(items[i], source) for i in indexes),
+                return_exceptions=True,
             )
+            results.update(zip(indexes, outcomes))
+        return [results[index] for index in range(len(items))]
 
-            try:
-                mark_st = bgm.ensure_subject_watching(str(subject_id))
-            except ValueError as ve:
-                if "认证失败" in str(ve) or "access_token" in str(ve):
-                    return SyncResponse(status="error", message=str(ve))
-                raise ve
-
-            if mark_st == 0:
-                result_message = "条目已在看或已看过，无需变更"
+    async def _sync_custom_item_native(
+        self, item: CustomItem, actual_source: str
+    ) -> SyncResponse:
+        logger.info(f"接收到同步请求：{item}")
+        self._notify_first_attempt("request_received", item, actual_source)
+
+        rejected = self._precheck_custom_item(item)
+        if rejected is not None:
+            return rejected
+
+        (
+            subject_id,
+            is_season_matched_id,
+            subject_find_error,
+        ) = await self._find_subject_id_async(item)
+        if not subject_id:
+            return await asyncio.to_thread(
+                self._record_subject_not_found, item, actual_source, subject_find_error
+            )
+
+        bgm = self._get_async_bangumi_api_for_user(item.user_name)
+        if not bgm:
+            logger.error(f"无法为用户 {item.user_name} 创建bangumi API实例")
+            return SyncResponse(status="error", message="bangumi配置错误")
+
+        try:
+            if item.media_type == "movie":
+                bgm_se_id, bgm_ep_id = await bgm.get_movie_main_episode_id(
+                    subject_id, target_sort=item.episode
+                )
             else:
-                result_message = "播放开始：条目标记为在看"
+                bgm_se_id, bgm_ep_id = await bgm.get_target_season_episode_id(
+                    subject_id=subject_id,
+                    target_season=item.season,
+                    target_ep=item.episode,
+                    is_season_subject_id=is_season_matched_id,
+                    release_date=self._item_release_date(item),
+                )
+        except ValueError as ve:
+            if self._is_auth_error(ve):
+                return SyncResponse(status="error", message=str(ve))
+            raise
 
-            logger.info(
-                f"bgm: {item.title} {result_message} https://bgm.tv/subject/{subject_id}"
-            )
+        if not bgm_ep_id:
+            return self._report_episode_not_found(item, actual_source, subject_id)
 
-            database_manager.log_sync_record(
-                user_name=item.user_name,
-                title=item.title,
-                ori_title=item.ori_title or "",
-                season=item.season,
-                episode=item.episode,
-                subject_id=str(subject_id),
-                episode_id=None,
-                status="success",
-                message=result_message,
-                source=actual_source,
-                media_type=item.media_type,
-            )
+        bgm_title = self._subject_title(await bgm.get_subject(bgm_se_id))
+        self._report_subject_found(item, actual_source, bgm_se_id, bgm_ep_id, bgm_title)
 
-            return SyncResponse(
-                status="success",
-                message=result_message,
-                data={
-                    "title": item.title,
-                    "season": item.season,
-                    "episode": item.episode,
-                    "subject_id": str(subject_id),
-                },
-            )
-        except Exception as e:
-            logger.error(f"剧场版在看处理出错: {e}")
-            database_manager.log_sync_record(
-                user_name=item.user_name if "item" in locals() else "unknown",
-                title=item.title if "item" in locals() else "unknown",
-                ori_title=item.ori_title if "item" in locals() else "",
-                season=item.season if "item" in locals() else 0,
-                episode=item.episode if "item" in locals() else 0,
-                status="error",
-                message=str(e),
-                source=actual_source if "actual_source" in locals() else source,
-                media_type=item.media_type if "item" in locals() else "movie",
-            )
-            send_notify(
-                "mark_failed",
-                item if "item" in locals() else None,
-                actual_source if "actual_source" in locals() else source,
-                error_message=str(e),
-                error_type="sync_error",
-                additional_info=f"完整错误信息: {traceback.format_exc()}",
-            )
-            return SyncResponse(status="error", message=f"处理失败: {str(e)}")
+        try:
+            mark_status = await self._mark_episode_batched(bgm, bgm_se_id, bgm_ep_id)
+        except ValueError as ve:
+            if self._is_auth_error(ve):
+                return SyncResponse(status="error", message=str(ve))
+            raise
+
+        result_message = self._report_mark_result(
+            item,
+            actual_source,
+            mark_status,
+            bgm_se_id,
+            bgm_ep_id,
+            bgm_title,
+        )
+        await self._mark_subject_completed_async(bgm, item, bgm_se_id, bgm_title)
+
+        return await asyncio.to_thread(
+            self._record_sync_success,
+            item,
+            actual_source,
+            bgm_se_id,
+            bgm_ep_id,
+            bgm_title,
+            result_message,
+        )
 
-    def sync_custom_item(
-        self, item: CustomItem, source: str = "custom"
-    ) -> SyncResponse:
-        """同步自定义项目"""
+    def _native_sync_slot(self) -> asyncio.Semaphore:
+        """原生异步同步的并发上限（按事件循环各自创建信号量）"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._native_semaphores.get(loop)
+        if semaphore is None:
+            try:
+                scheduler_cfg = config_manager.get_scheduler_config()
+                limit = int(scheduler_cfg.get("max_concurrent_native_syncs", 64))
+            except (TypeError, ValueError, KeyError):
+                limit = 64
+            semaphore = asyncio.Semaphore(max(1, limit))
+            self._native_semaphores[loop] = semaphore
+        return semaphore
+
+    @staticmethod
+    def _mark_batch_window() -> float:
+        """同一条目的章节标记合并等待时间（秒）"""
         try:
-            # 如果item中包含source字段，优先使用item的source
-            actual_source = item.source if item.source else source
-            sync_action = (item.sync_action or "").strip().lower()
-            if sync_action == "mark_watching":
-                if item.media_type == "movie":
-                    return self.sync_movie_watching(item, source)
-                return SyncResponse(
-                    status="ignored",
-                    message="仅支持剧场版标记在看",
+            scheduler_cfg = config_manager.get_scheduler_config()
+            window_ms = int(scheduler_cfg.get("mark_batch_window_ms", 300))
+        except (TypeError, ValueError, KeyError):
+            window_ms = 300
+        return max(0, window_ms) / 1000
+
+    async def _mark_episode_batched(
+        self, bgm: AsyncBangumiApi, subject_id, ep_id
+    ) -> int:
+        """标记单集；同一账号、同一条目有多集同时等待标记时合并为一次批量标记。
+
+        该条目没有正在进行的标记时立即标记，不增加延迟；已有标记进行中时，后到的章节
+        合并为一批，等待进行中的标记完成（最多 mark_batch_window_ms，为 0 时不等待）后
+        一起标记。一批只有一集时仍走 mark_episode_watched，多集时读取一次章节收藏
+        状态并用一次 PATCH 标记。
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), id(bgm), str(subject_id))
+        batch = self._pending_marks.get(key)
+        if batch is not None:
+            waiter = loop.create_future()
+            batch.setdefault(ep_id, []).append(waiter)
+            status = await waiter
+            if status is _MARK_AGAIN:
+                return await self._mark_episode_batched(bgm, subject_id, ep_id)
+            return status
+
+        batch = {ep_id: []}
+        in_flight = self._marks_in_flight.get(key)
+        window = self._mark_batch_window() if in_flight is not None else 0
+        if window > 0:
+            self._pending_marks[key] = batch
+            try:
+                await asyncio.wait_for(in_flight.wait(), window)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # 等待期间被取消：已加入本批的请求各自重新标记，不随之取消
+                self._release_mark_waiters(batch)
+                raise
+            finally:
+                self._pending_marks.pop(key, None)
+
+        # 标记在独立任务中执行并 shield 等待：发起者被取消不影响本批其他请求
+        done = asyncio.Event()
+        self._marks_in_flight[key] = done
+        flush = loop.create_task(self._flush_mark_batch(bgm, subject_id, ep_id, batch))
+        flush.add_done_callback(functools.partial(self._finish_mark_batch, key, done))
+        try:
+            return await asyncio.shield(flush)
+        except asyncio.CancelledError:
+            if not any(not w.done() for waiters in batch.values() for w in waiters):
+                flush.cancel()
+            raise
+
+    def _finish_mark_batch(self, key: tuple, done: asyncio.Event, flush) -> None:
+        if self._marks_in_flight.get(key) is done:
+            del self._marks_in_flight[key]
+        done.set()
+        if not flush.cancelled():
+            # 标记异常已被读取，发起者已取消时不输出 "never retrieved" 警告
+            flush.exception()
+
+    @staticmethod
+    def _release_mark_waiters(batch: dict[Any, list]) -> None:
+        """本批不再标记：仍在等待的请求改为各自重新标记"""
+        for waiters in batch.values():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(_MARK_AGAIN)
+
+    async def _flush_mark_batch(
+        self, bgm: AsyncBangumiApi, subject_id, ep_id, batch: dict[Any, list]
+    ) -> int:
+        """标记一批章节，并把各章节的结果交给等待中的请求"""
+        try:
+            if len(batch) == 1:
+                # 网络失败直接抛出，由延迟重试队列重新执行整条同步
+                statuses = {
+                    ep_id: await bgm.mark_episode_watched(
+                        subject_id=subject_id, ep_id=ep_id
+                    )
+                }
+            else:
+                logger.info(
+                    f"合并标记条目 {subject_id} 的 {len(batch)} 集: {list(batch)}"
+                )
+                statuses = await bgm.mark_episodes_watched(
+                    subject_id=subject_id, ep_ids=list(batch)
                 )
+        except asyncio.CancelledError:
+            self._release_mark_waiters(batch)
+            raise
+        except Exception as e:
+            for waiters in batch.values():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            raise
+
+        for batched_ep_id, waiters in batch.items():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(statuses.get(batched_ep_id, 0))
+        return statuses.get(ep_id, 0)
+
+    def _notify_nowait(self, notification_type: str, item=None, source=None, **kwargs):
+        """在默认线程池中发送通知，不等待结果（通知渠道为阻塞 I/O）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            send_notify(notification_type, item, source, **kwargs)
+            return
+        loop.run_in_executor(
+            None,
+            functools.partial(send_notify, notification_type, item, source, **kwargs),
+        )
 
-            logger.info(f"接收到同步请求：{item}")
+    @staticmethod
+    def _is_auth_error(error: Exception) -> bool:
+        return "认证失败" in str(error) or "access_token" in str(error)
 
-            send_notify("request_received", item, actual_source)
+    @staticmethod
+    def _item_release_date(item: CustomItem) -> Optional[str]:
+        if item.release_date and len(item.release_date) >= 8:
+            return item.release_date[:10]
+        return None
 
-            # 基本验证
-            if item.media_type not in ("episode", "movie"):
-                logger.error(f"同步类型{item.media_type}不支持，跳过")
-                return SyncResponse(
-                    status="error", message=f"同步类型{item.media_type}不支持"
-                )
+    @staticmethod
+    def _subject_title(subject_info: Optional[dict]) -> str:
+        if not subject_info:
+            return ""
+        return subject_info.get("name_cn") or subject_info.get("name") or ""
 
-            if not item.title:
-                logger.error("同步名称为空，跳过")
-                return SyncResponse(status="error", message="同步名称为空")
+    def _precheck_custom_item(self, item: CustomItem) -> Optional[SyncResponse]:
+        """基本校验、用户权限与屏蔽词检查；不通过时返回应直接返回的响应"""
+        if item.media_type not in ("episode", "movie"):
+            logger.error(f"同步类型{item.media_type}不支持，跳过")
+            return SyncResponse(
+                status="error", message=f"同步类型{item.media_type}不支持"
+            )
 
-            if item.media_type == "episode" and item.season == 0:
-                logger.error("不支持SP标记同步，跳过")
-                return SyncResponse(status="error", message="不支持SP标记同步")
+        if not item.title:
+            logger.error("同步名称为空，跳过")
+            return SyncResponse(status="error", message="同步名称为空")
 
-            if item.episode == 0:
-                logger.error(f"集数{item.episode}不能为0，跳过")
-                return SyncResponse(
-                    status="error", message=f"集数{item.episode}不能为0"
-                )
+        if item.media_type == "episode" and item.season == 0:
+            logger.error("不支持SP标记同步，跳过")
+            return SyncResponse(status="error", message="不支持SP标记同步")
 
-            # 检查用户权限
-            if not self._check_user_permission(item.user_name):
-                return SyncResponse(status="error", message="用户无权限同步")
+        if item.episode == 0:
+            logger.error(f"集数{item.episode}不能为0，跳过")
+            return SyncResponse(status="error", message=f"集数{item.episode}不能为0")
 
-            # 检查是否包含屏蔽关键词
-            if self._is_title_blocked(item.title, item.ori_title):
-                return SyncResponse(
-                    status="ignored", message="番剧标题包含屏蔽关键词，跳过同步"
-                )
+        # 检查用户权限
+        if not self._check_user_permission(item.user_name):
+            return SyncResponse(status="error", message="用户无权限同步")
 
-            # 查找番剧ID及其是否为特定季度ID的标记
-            subject_id, is_season_matched_id, subject_find_error = (
-                self._find_subject_id(item)
+        # 检查是否包含屏蔽关键词
+        if self._is_title_blocked(item.title, item.ori_title):
+            return SyncResponse(
+                status="ignored", message="番剧标题包含屏蔽关键词，跳过同步"
             )
-            if not subject_id:
-                send_notify(
-                    "anime_not_found",
-                    item,
-                    actual_source,
-                    error_message="未找到匹配的番剧",
-                )
-                database_manager.log_sync_record(
-                    user_name=item.user_name,
-                    title=item.title,
-                    ori_title=item.ori_title or "",
-                    season=item.season,
-                    episode=item.episode,
-                    subject_id=None,
-                    episode_id=None,
-                    status="error",
-                    message=self._format_subject_not_found_message(
-                        item, subject_find_error
-                    ),
-                    source=actual_source,
-                    media_type=item.media_type,
-                )
-                return SyncResponse(status="error", message="未找到匹配的番剧")
+        return None
 
-            # 获取对应用户的bangumi API实例
-            bgm = self._get_bangumi_api_for_user(item.user_name)
-            if not bgm:
-                logger.error(f"无法为用户 {item.user_name} 创建bangumi API实例")
-                return SyncResponse(status="error", message="bangumi配置错误")
+    def _record_subject_not_found(
+        self, item: CustomItem, actual_source: str, detail: str
+    ) -> SyncResponse:
+        send_notify(
+            "anime_not_found",
+            item,
+            actual_source,
+            error_message="未找到匹配的番剧",
+        )
+        self._log_sync_record(
+            user_name=item.user_name,
+            title=item.title,
+            ori_title=item.ori_title or "",
+            season=item.season,
+            episode=item.episode,
+            subject_id=None,
+            episode_id=None,
+            status="error",
+            message=self._format_subject_not_found_message(item, detail),
+            source=actual_source,
+            media_type=item.media_type,
+        )
+        return SyncResponse(status="error", message="未找到匹配的番剧")
 
-            # 查询 bangumi 章节：电影走短路径，剧集走季番解析
-            try:
-                release_for_ep = None
-                if item.release_date and len(item.release_date) >= 8:
-                    release_for_ep = item.release_date[:10]
-                if item.media_type == "movie":
-                    bgm_se_id, bgm_ep_id = bgm.get_movie_main_episode_id(
-                        subject_id, target_sort=item.episode
-                    )
-                else:
-                    bgm_se_id, bgm_ep_id = bgm.get_target_season_episode_id(
-                        subject_id=subject_id,
-                        target_season=item.season,
-                        target_ep=item.episode,
-                        is_season_subject_id=is_season_matched_id,
-                        release_date=release_for_ep,
-                    )
-            except ValueError as ve:
-                # 捕获认证错误（通知已在 BangumiApi 中发送）
-                if "认证失败" in str(ve) or "access_token" in str(ve):
-                    return SyncResponse(status="error", message=str(ve))
-                else:
-                    raise ve
+    def _report_episode_not_found(
+        self, item: CustomItem, actual_source: str, subject_id
+    ) -> SyncResponse:
+        logger.error(
+            f"bgm: {subject_id=} {item.season=} {item.episode=}, 不存在或集数过多，跳过"
+        )
+        self._notify_nowait(
+            "episode_not_found",
+            item,
+            actual_source,
+            subject_id=subject_id,
+            error_message="不存在或集数过多",
+        )
+        return SyncResponse(status="error", message="未找到对应的剧集")
+
+    def _report_subject_found(
+        self,
+        item: CustomItem,
+        actual_source: str,
+        bgm_se_id,
+        bgm_ep_id,
+        bgm_title: str,
+    ) -> None:
+        logger.debug(
+            f"bgm: 查询到 {bgm_title or item.title} (https://bgm.tv/subject/{bgm_se_id}) "
+            f"S{item.season:02d}E{item.episode:02d} (https://bgm.tv/ep/{bgm_ep_id})"
+        )
 
-            if not bgm_ep_id:
-                logger.error(
-                    f"bgm: {subject_id=} {item.season=} {item.episode=}, 不存在或集数过多，跳过"
-                )
-                send_notify(
-                    "episode_not_found",
-                    item,
-                    actual_source,
-                    subject_id=subject_id,
-                    error_message="不存在或集数过多",
-                )
-                return SyncResponse(status="error", message="未找到对应的剧集")
-
-            # 通过实例缓存获取 Bangumi 平台标题（无额外 API 调用）
-            subject_info = bgm.get_subject(bgm_se_id)
-            bgm_title = ""
-            if subject_info:
-                bgm_title = (
-                    subject_info.get("name_cn") or subject_info.get("name") or ""
-                )
+        # 发送匹配成功的通知，使用解析后的正确季度ID
+        self._notify_first_attempt(
+            "bangumi_id_found",
+            item,
+            actual_source,
+            subject_id=bgm_se_id,
+            bgm_title=bgm_title,
+        )
 
-            logger.debug(
-                f"bgm: 查询到 {bgm_title or item.title} (https://bgm.tv/subject/{bgm_se_id}) "
-                f"S{item.season:02d}E{item.episode:02d} (https://bgm.tv/ep/{bgm_ep_id})"
+    def _report_mark_result(
+        self,
+        item: CustomItem,
+        actual_source: str,
+        mark_status: int,
+        bgm_se_id,
+        bgm_ep_id,
+        bgm_title: str,
+    ) -> str:
+        """按标记结果输出日志并发送通知，返回结果说明"""
+        if mark_status == 0:
+            result_message = "已看过，不再重复标记"
+            logger.info(
+                f"bgm: {bgm_title or item.title} S{item.season:02d}E{item.episode:02d} {result_message}"
             )
 
-            # 发送匹配成功的通知，使用解析后的正确季度ID
-            send_notify(
-                "bangumi_id_found",
+            self._notify_nowait(
+                "mark_skipped",
                 item,
                 actual_source,
                 subject_id=bgm_se_id,
+                episode_id=bgm_ep_id,
                 bgm_title=bgm_title,
             )
 
-            # 标记为看过
-            try:
-                mark_status = self._retry_mark_episode(bgm, bgm_se_id, bgm_ep_id)
-            except ValueError as ve:
-                # 捕获认证错误（通知已在 BangumiApi 中发送）
-                if "认证失败" in str(ve) or "access_token" in str(ve):
-                    return SyncResponse(status="error", message=str(ve))
-                else:
-                    raise ve
+        elif mark_status == 1:
+            result_message = "已标记为看过"
+            logger.info(
+                f"bgm: {bgm_title or item.title} S{item.season:02d}E{item.episode:02d} {result_message} https://bgm.tv/ep/{bgm_ep_id}"
+            )
 
-            result_message = ""
+            self._notify_nowait(
+                "mark_success",
+                item,
+                actual_source,
+                subject_id=bgm_se_id,
+                episode_id=bgm_ep_id,
+                bgm_title=bgm_title,
+            )
 
-            if mark_status == 0:
-                result_message = "已看过，不再重复标记"
-                logger.info(
-                    f"bgm: {bgm_title or item.title} S{item.season:02d}E{item.episode:02d} {result_message}"
-                )
+        else:
+            result_message = "已添加到收藏并标记为看过"
+            logger.info(
+                f"bgm: {bgm_title or item.title} 已添加到收藏 https://bgm.tv/subject/{bgm_se_id}"
+            )
+            logger.info(
+                f"bgm: {bgm_title or item.title} S{item.season:02d}E{item.episode:02d} 已标记为看过 https://bgm.tv/ep/{bgm_ep_id}"
+            )
 
-                send_notify(
-                    "mark_skipped",
-                    item,
-                    actual_source,
-                    subject_id=bgm_se_id,
-                    episode_id=bgm_ep_id,
-                    bgm_title=bgm_title,
-                )
+            self._notify_nowait(
+                "mark_success",
+                item,
+                actual_source,
+                subject_id=bgm_se_id,
+                episode_id=bgm_ep_id,
+                bgm_title=bgm_title,
+            )
+        return result_message
 
-            elif mark_status == 1:
-                result_message = "已标记为看过"
-                logger.info(
-                    f"bgm: {bgm_title or item.title} S{item.season:02d}E{item.episode:02d} {result_message} https://bgm.tv/ep/{bgm_ep_id}"
+    async def _mark_subject_completed_async(
+        self, bgm: AsyncBangumiApi, item: CustomItem, bgm_se_id, bgm_title: str
+    ) -> None:
+        """单集标记后按配置将条目收藏归档为「看过」"""
+        if item.media_type == "movie" and config_manager.get(
+            "sync", "movie_mark_subject_completed", fallback=True
+        ):
+            try:
+                coll = await bgm.get_subject_collection(str(bgm_se_id))
+                if coll.get("type") == 2:
+                    logger.debug(
+                        "剧场版条目收藏状态已为「看过」，跳过条目标记: "
+                        f"subject_id={bgm_se_id}"
+                    )
+                else:
+                    await bgm.change_collection_state(
+                        subject_id=str(bgm_se_id), state=2
+                    )
+            except Exception as e:
+                logger.warning(
+                    f"剧场版条目标记为看过失败（单集已处理）: subject_id={bgm_se_id} {e}"
                 )
 
-                send_notify(
-                    "mark_success",
-                    item,
-                    actual_source,
-                    subject_id=bgm_se_id,
-                    episode_id=bgm_ep_id,
-                    bgm_title=bgm_title,
+        if item.media_type != "movie" and config_manager.get(
+            "sync", "anime_mark_subject_completed", fallback=False
+        ):
+            try:
+                coll = await bgm.get_subject_collection(str(bgm_se_id))
+                if coll.get("type") == 2:
+                    logger.debug(
+                        "TV条目收藏状态已为「看过」，跳过条目标记: "
+                        f"subject_id={bgm_se_id}"
+                    )
+                else:
+                    subject_info = await bgm.get_subject(bgm_se_id)
+                    if self._all_episodes_watched(bgm_se_id, subject_info, coll):
+                        await bgm.change_collection_state(
+                            subject_id=str(bgm_se_id), state=2
+                        )
+                        self._log_subject_completed(item, bgm_title, subject_info, coll)
+            except Exception as e:
+                logger.warning(
+                    f"TV番剧自动归档为「看过」失败（单集已处理）: subject_id={bgm_se_id} {e}"
                 )
 
-            else:
-                result_message = "已添加到收藏并标记为看过"
-                logger.info(
-                    f"bgm: {bgm_title or item.title} 已添加到收藏 https://bgm.tv/subject/{bgm_se_id}"
-                )
-                logger.info(
-                    f"bgm: {bgm_title or item.title} S{item.season:02d}E{item.episode:02d} 已标记为看过 https://bgm.tv/ep/{bgm_ep_id}"
-                )
+    @staticmethod
+    def _all_episodes_watched(bgm_se_id, subject_info: dict, coll: dict) -> bool:
+        total_eps = subject_info.get("eps", 0)
+        watched_eps = coll.get("ep_status", 0) or 0
+        logger.debug(
+            f"获取到Subject: {bgm_se_id}, 总ep: {total_eps}, 已观看: {watched_eps}, coll: {coll}"
+        )
+        return total_eps > 0 and watched_eps >= total_eps
 
-                send_notify(
-                    "mark_success",
-                    item,
-                    actual_source,
-                    subject_id=bgm_se_id,
-                    episode_id=bgm_ep_id,
-                    bgm_title=bgm_title,
-                )
+    @staticmethod
+    def _log_subject_completed(
+        item: CustomItem, bgm_title: str, subject_info: dict, coll: dict
+    ) -> None:
+        logger.info(
+            f"bgm: {bgm_title or item.title} 所有剧集已看完（已看 {coll.get('ep_status', 0) or 0}/{subject_info.get('eps', 0)} 集），已自动归档为「看过」"
+        )
 
-            if item.media_type == "movie" and config_manager.get(
-                "sync", "movie_mark_subject_completed", fallback=True
-            ):
-                try:
-                    coll = bgm.get_subject_collection(str(bgm_se_id))
-                    if coll.get("type") == 2:
-                        logger.debug(
-                            "剧场版条目收藏状态已为「看过」，跳过条目标记: "
-                            f"subject_id={bgm_se_id}"
-                        )
-                    else:
-                        bgm.change_collection_state(subject_id=str(bgm_se_id), state=2)
-                except Exception as e:
-                    logger.warning(
-                        f"剧场版条目标记为看过失败（单集已处理）: subject_id={bgm_se_id} {e}"
-                    )
+    def _record_sync_success(
+        self,
+        item: CustomItem,
+        actual_source: str,
+        bgm_se_id,
+        bgm_ep_id,
+        bgm_title: str,
+        result_message: str,
+    ) -> SyncResponse:
+        self._learn_subject(item, bgm_se_id)
+
+        # 记录同步成功到数据库
+        self._log_sync_record(
+            user_name=item.user_name,
+            title=item.title,
+            ori_title=item.ori_title or "",
+            season=item.season,
+            episode=item.episode,
+            subject_id=bgm_se_id,
+            episode_id=bgm_ep_id,
+            status="success",
+            message=result_message,
+            source=actual_source,
+            media_type=item.media_type,
+            bgm_title=bgm_title,
+        )
 
-            if item.media_type != "movie" and config_manager.get(
-                "sync", "anime_mark_subject_completed", fallback=False
-            ):
-                try:
-                    coll = bgm.get_subject_collection(str(bgm_se_id))
-                    if coll.get("type") == 2:
-                        logger.debug(
-                            "TV条目收藏状态已为「看过」，跳过条目标记: "
-                            f"subject_id={bgm_se_id}"
-                        )
-                    else:
-                        # 获取番剧的总集数，如果已看集数等于或多于总集数，则自动归档为「看过」
-                        subject_info = bgm.get_subject(bgm_se_id)
-                        total_eps = subject_info.get("eps", 0)
-                        watched_eps = coll.get("ep_status", 0) or 0
-                        logger.debug(
-                            f"获取到Subject: {bgm_se_id}, 总ep: {total_eps}, 已观看: {watched_eps}, coll: {coll}"
-                        )
-                        if total_eps > 0:
-                            if watched_eps >= total_eps:
-                                bgm.change_collection_state(
-                                    subject_id=str(bgm_se_id), state=2
-                                )
-                                logger.info(
-                                    f"bgm: {bgm_title or item.title} 所有剧集已看完（已看 {watched_eps}/{total_eps} 集），已自动归档为「看过」"
-                                )
-                except Exception as e:
-                    logger.warning(
-                        f"TV番剧自动归档为「看过」失败（单集已处理）: subject_id={bgm_se_id} {e}"
-                    )
+        return SyncResponse(
+            status="success",
+            message=result_message,
+            data={
+                "title": item.title,
+                "bgm_title": bgm_title,
+                "season": item.season,
+                "episode": item.episode,
+                "subject_id": bgm_se_id,
+                "episode_id": bgm_ep_id,
+            },
+        )
 
-            # 记录同步成功到数据库
-            database_manager.log_sync_record(
-                user_name=item.user_name,
-                title=item.title,
-                ori_title=item.ori_title or "",
-                season=item.season,
-                episode=item.episode,
-                subject_id=bgm_se_id,
-                episode_id=bgm_ep_id,
-                status="success",
-                message=result_message,
-                source=actual_source,
-                media_type=item.media_type,
-                bgm_title=bgm_title,
-            )
+    def _record_sync_failure(
+        self,
+        item: CustomItem,
+        actual_source: str,
+        error: Exception,
+        error_traceback: Optional[str] = None,
+    ) -> SyncResponse:
+        if retries_deferred() and is_retryable_error(error):
+            if current_retry_task() is not None:
+                # 已在延迟重试队列中执行：抛出后由队列按退避重新排期
+                raise error
+            deferred = self._defer_sync_item(item, actual_source, error)
+            if deferred is not None:
+                return deferred
+
+        logger.error(f"自定义同步处理出错: {error}")
+
+        # 记录同步失败到数据库
+        self._log_sync_record(
+            user_name=item.user_name,
+            title=item.title,
+            ori_title=item.ori_title or "",
+            season=item.season,
+            episode=item.episode,
+            status="error",
+            message=str(error),
+            source=actual_source,
+            media_type=item.media_type,
+        )
 
-            return SyncResponse(
-                status="success",
-                message=result_message,
-                data={
-                    "title": item.title,
-                    "bgm_title": bgm_title,
-                    "season": item.season,
-                    "episode": item.episode,
-                    "subject_id": bgm_se_id,
-                    "episode_id": bgm_ep_id,
-                },
+        send_notify(
+            "mark_failed",
+            item,
+            actual_source,
+            error_message=str(error),
+            error_type="sync_error",
+            additional_info=f"完整错误信息: {error_traceback or traceback.format_exc()}",
+        )
+
+        return SyncResponse(status="error", message=f"处理失败: {str(error)}")
+
+    def _defer_sync_item(
+        self, item: CustomItem, actual_source: str, error: Exception
+    ) -> Optional[SyncResponse]:
+        """记录待重试的同步并写入延迟重试队列；入队失败返回 None（按失败处理）"""
+        if isinstance(error, BangumiCircuitOpenError):
+            message = f"Bangumi API 暂不可用，已暂存到待同步队列: {error}"
+        else:
+            message = f"网络异常，已加入延迟重试队列: {error}"
+        logger.warning(f"{item.title} S{item.season:02d}E{item.episode:02d} {message}")
+        record_id = database_manager.log_sync_record(
+            user_name=item.user_name,
+            title=item.title,
+            ori_title=item.ori_title or "",
+            season=item.season,
+            episode=item.episode,
+            status="queued",
+            message=message,
+            source=actual_source,
+            media_type=item.media_type,
+        )
+        task_id = bgm_retry_queue.schedule(
+            RETRY_KIND_SYNC_ITEM,
+            {"item": item.dict(), "source": actual_source, "record_id": record_id},
+            error,
+        )
+        if task_id is None:
+            if record_id:
+                database_manager.update_sync_record_status(
+                    record_id, "error", str(error)
+                )
+            return None
+        return SyncResponse(
+            status="queued", message=message, data={"retry_task_id": task_id}
+        )
+
+    def _run_queued_sync(self, payload: dict[str, Any]) -> SyncResponse:
+        """延迟重试队列处理函数：重新执行整条同步（网络失败时抛出，由队列重新排期）
+
+        在队列线程的临时事件循环中执行 sync_custom_item_native。同步结果写回入队时的
+        「待重试」记录，不新增记录，也不再发送首次请求时已发出的通知。
+        """
+        item = CustomItem(**payload["item"])
+        record_id = payload.get("record_id")
+        # 写入记录在其他线程的上下文副本中进行，用可变列表带回是否已写入
+        queued = [record_id] if record_id else []
+        token = _queued_record.set(queued)
+        try:
+            result = asyncio.run(
+                self._sync_queued_item(item, payload.get("source") or "custom")
             )
-        except Exception as e:
-            logger.error(f"自定义同步处理出错: {e}")
-
-            # 记录同步失败到数据库
-            database_manager.log_sync_record(
-                user_name=item.user_name if "item" in locals() else "unknown",
-                title=item.title if "item" in locals() else "unknown",
-                ori_title=item.ori_title if "item" in locals() else "",
-                season=item.season if "item" in locals() else 0,
-                episode=item.episode if "item" in locals() else 0,
-                status="error",
-                message=str(e),
-                source=actual_source if "actual_source" in locals() else source,
-                media_type=item.media_type if "item" in locals() else "episode",
+        finally:
+            _queued_record.reset(token)
+        if queued:
+            # 未写入记录就返回（如被忽略、未找到剧集）时按结果更新待重试记录
+            status = "retried" if result.status == "success" else "error"
+            database_manager.update_sync_record_status(
+                queued[0], status, f"延迟重试完成: {result.message}"
             )
+        return result
 
-            send_notify(
-                "mark_failed",
-                item if "item" in locals() else None,
-                actual_source if "actual_source" in locals() else source,
-                error_message=str(e),
-                error_type="sync_error",
-                additional_info=f"完整错误信息: {traceback.format_exc()}",
-            )
+    async def _sync_queued_item(self, item: CustomItem, source: str) -> SyncResponse:
+        """队列线程的临时事件循环结束前关闭其中创建的共享 HTTP 客户端"""
+        try:
+            return await self.sync_custom_item_native(item, source)
+        finally:
+            await close_async_clients()
+
+    def _log_sync_record(self, **record: Any) -> Optional[int]:
+        """写入同步记录；延迟重试中则更新入队时的待重试记录"""
+        queued = _queued_record.get()
+        if not queued:
+            return database_manager.log_sync_record(**record)
+        record_id = queued.pop()
+        status = "retried" if record["status"] == "success" else record["status"]
+        database_manager.update_sync_record_status(
+            record_id,
+            status,
+            f"延迟重试完成: {record['message']}",
+            subject_id=record.get("subject_id"),
+            episode_id=record.get("episode_id"),
+            bgm_title=record.get("bgm_title") or None,
+        )
+        return record_id
 
-            return SyncResponse(status="error", message=f"处理失败: {str(e)}")
+    def _notify_first_attempt(
+        self, notification_type: str, item=None, source=None, **kwargs
+    ) -> None:
+        """发送收到请求、匹配成功等过程通知；延迟重试时首次请求已发送过，不再重复"""
+        if current_retry_task() is None:
+            self._notify_nowait(notification_type, item, source, **kwargs)
+
+    def _give_up_queued_sync(self, payload: dict[str, Any], error: Exception) -> None:
+        """延迟重试多次仍失败：更新同步记录并发送失败通知"""
+        item = CustomItem(**payload["item"])
+        source = payload.get("source") or "custom"
+        message = f"延迟重试失败，已放弃: {error}"
+        record_id = payload.get("record_id")
+        if record_id:
+            database_manager.update_sync_record_status(record_id, "error", message)
+        send_notify(
+            "mark_failed",
+            item,
+            source,
+            error_message=message,
+            error_type="sync_error",
+        )
 
     def _check_user_permission(self, user_name: str) -> bool:
         """检查用户是否有权限同步"""
@@ -630,10 +1044,10 @@ class SyncService:
         if not blocked_keywords:
             return False
 
-        # 检查主标题
+        # 检查主标题（按规范化写法比较，繁简、全半角与标点差异不影响匹配）
         if title:
             for keyword in blocked_keywords:
-                if keyword.lower() in title.lower():
+                if contains_keyword(title, keyword):
                     logger.info(
                         f'番剧标题 "{title}" 包含屏蔽关键词 "{keyword}"，跳过同步'
                     )
@@ -642,7 +1056,7 @@ class SyncService:
         # 检查原始标题
         if ori_title:
             for keyword in blocked_keywords:
-                if keyword.lower() in ori_title.lower():
+                if contains_keyword(ori_title, keyword):
                     logger.info(
                         f'番剧原始标题 "{ori_title}" 包含屏蔽关键词 "{keyword}"，跳过同步'
                     )
@@ -659,37 +1073,232 @@ class SyncService:
             parts.append(f"premiere_date={item.release_date[:10]}")
         return "；".join(parts)
 
-    def _find_subject_id(self, item: CustomItem) -> tuple[Optional[str], bool, str]:
+    async def _find_subject_id_async(
+        self, item: CustomItem
+    ) -> tuple[Optional[str], bool, str]:
         """根据标题和日期查找番剧ID。
 
         返回 (subject_id, is_season_matched_id, failure_detail)。
         成功时 failure_detail 为空字符串；失败时为简短原因，供同步记录与日志使用。
+
+        未匹配缓存与学习映射读取数据库，bangumi-data 尚未载入时查询会等待加载，
+        这些步骤都在线程中执行，不阻塞事件循环。
         """
+        _subject_match.set(None)
+        unmatched, version = await asyncio.to_thread(self._lookup_unmatched, item)
+        if unmatched is not None:
+            return unmatched
+
+        # 本地匹配在线程中记录的匹配途径需要带回当前上下文，供同步成功后写入学习映射
+        ctx = contextvars.copy_context()
+        local = await asyncio.to_thread(ctx.run, self._find_subject_id_local, item)
+        _subject_match.set(ctx.get(_subject_match))
+        if local is not None:
+            return local
+
+        _ctx = self._subject_search_context(item)
+        try:
+            bgm = self._get_async_bangumi_api_for_user(item.user_name)
+            if not bgm:
+                logger.error(f"bgm: 无法为用户创建 Bangumi API 实例进行搜索；{_ctx}")
+                return None, False, "无法创建 Bangumi API 实例，无法搜索条目"
+
+            premiere_date = self._item_release_date(item)
+            bgm_data = await bgm.bgm_search(
+                title=item.title,
+                ori_title=item.ori_title or "",
+                premiere_date=premiere_date or "",
+                is_movie=(item.media_type == "movie"),
+            )
+            result = self._subject_from_search(item, bgm_data, _ctx, premiere_date)
+            await asyncio.to_thread(self._remember_unmatched, item, result, version)
+            return result
+        except Exception as e:
+            if is_retryable_error(e):
+                # 网络异常与熔断（BangumiCircuitOpenError）交由同步流程
+                # 加入延迟重试队列，不当作未找到条目
+                raise
+            detail = f"Bangumi API 搜索出错: {e}"
+            logger.error(f"bgm: {detail}；{_ctx}")
+            return None, False, detail
+
+    def _unmatched_version(self) -> str:
+        """自定义映射与 bangumi-data 的数据版本，任一变化时未匹配缓存失效"""
+        self._load_custom_mappings()
+        version = mapping_service.get_version()
+        if config_manager.get("bangumi_data", "enabled", fallback=True):
+            version = f"{version}|{self._get_bangumi_data().get_data_version()}"
+        return version
+
+    def _lookup_unmatched(
+        self, item: CustomItem
+    ) -> tuple[Optional[tuple[Optional[str], bool, str]], str]:
+        """查询未匹配缓存，返回 (命中时的查找结果或 None, 当前数据版本)"""
+        try:
+            version = self._unmatched_version()
+            entry = bgm_unmatched_cache.lookup(
+                item.title,
+                item.ori_title,
+                item.media_type,
+                self._item_release_date(item),
+                version,
+            )
+        except Exception as e:
+            logger.debug(f"读取未匹配缓存失败，继续搜索: {e}")
+            return None, ""
+        if entry is None:
+            return None, version
+        logger.info(
+            f"bgm: 命中未匹配缓存，跳过搜索；{self._subject_search_context(item)}"
+        )
+        return (None, False, f"{entry['detail']}（未匹配缓存）"), version
+
+    def _remember_unmatched(
+        self,
+        item: CustomItem,
+        result: tuple[Optional[str], bool, str],
+        version: str,
+    ) -> None:
+        """Bangumi 搜索确定无结果时写入未匹配缓存（网络错误等不写入）"""
+        if result[0] is not None or not version:
+            return
+        try:
+            bgm_unmatched_cache.remember(
+                item.title,
+                item.ori_title,
+                item.media_type,
+                self._item_release_date(item),
+                result[2],
+                version,
+                config_manager.get_bgm_unmatched_ttl(),
+            )
+        except Exception as e:
+            logger.debug(f"写入未匹配缓存失败: {e}")
+
+    @staticmethod
+    def _note_match(
+        result: tuple[Optional[str], bool, str], method: str
+    ) -> tuple[Optional[str], bool, str]:
+        """记录本次请求找到番剧ID的途径（同步成功后据此写入学习映射），原样返回结果"""
+        if result[0]:
+            _subject_match.set((method, str(result[0]), bool(result[1])))
+        return result
+
+    def _lookup_learned(
+        self, item: CustomItem
+    ) -> Optional[tuple[Optional[str], bool, str]]:
+        """查询学习映射，未命中或可信度不足时返回 None"""
+        try:
+            learned_cfg = config_manager.get_bgm_learned_config()
+            if not learned_cfg["enabled"]:
+                return None
+            entry = bgm_learned_mappings.lookup(
+                item.title,
+                item.ori_title,
+                item.media_type,
+                item.season,
+                learned_cfg["min_confidence"],
+                self._item_release_date(item),
+            )
+        except Exception as e:
+            logger.debug(f"读取学习映射失败，继续匹配: {e}")
+            return None
+        if entry is None:
+            return None
+        logger.info(
+            f"命中学习映射：{item.title} 第{item.season}季 = {entry['subject_id']}"
+            f"（来源: {entry['method']}, 可信度: {entry['confidence']:.2f}）"
+        )
+        return self._note_match(
+            (entry["subject_id"], entry["season_matched"], ""), "learned"
+        )
+
+    def _learn_subject(self, item: CustomItem, bgm_se_id) -> None:
+        """同步成功后写入学习映射（自定义映射得出的结果不写入）"""
+        match = _subject_match.get()
+        if match is None or match[0] == "mapping":
+            return
+        method, subject_id, season_matched = match
+        try:
+            if not config_manager.get_bgm_learned_config()["enabled"]:
+                return
+            bgm_learned_mappings.record(
+                item.title,
+                item.ori_title,
+                item.media_type,
+                item.season,
+                subject_id,
+                season_matched,
+                str(bgm_se_id),
+                method,
+                self._item_release_date(item),
+            )
+        except Exception as e:
+            logger.debug(f"写入学习映射失败: {e}")
+
+    @staticmethod
+    def _match_external_ids(
+        bgm_data: BangumiData, item: CustomItem, release_date: Optional[str]
+    ) -> Optional[tuple[Optional[str], bool, str]]:
+        """按外部 ID 在 bangumi-data 中查找番剧ID，未命中返回 None"""
+        if not item.provider_ids:
+            return None
+        result = bgm_data.find_bangumi_id_by_external_ids(
+            item.provider_ids,
+            is_movie=(item.media_type == "movie"),
+            season=item.season,
+            release_date=release_date,
+        )
+        if not result:
+            return None
+        bangumi_data_id, matched_title, season_matched = result
+        logger.info(
+            f"通过外部 ID {item.provider_ids} 匹配到番剧 ID: {bangumi_data_id}, "
+            f"匹配标题: {matched_title}, 季度确定: {season_matched}"
+        )
+        # 季度不确定时由调用方从该ID遍历续集查找对应季度
+        return bangumi_data_id, season_matched, ""
+
+    def _find_subject_id_local(
+        self, item: CustomItem
+    ) -> Optional[tuple[Optional[str], bool, str]]:
+        """通过自定义映射与 bangumi-data 查找番剧ID，未命中返回 None"""
         # 获取自定义映射
         custom_mappings = self._load_custom_mappings()
-        mapping_subject_id = custom_mappings.get(item.title, "") or custom_mappings.get(
-            item.ori_title or "", ""
-        )
+        mapping_subject_id = lookup_title(custom_mappings, item.title, item.ori_title)
 
         if mapping_subject_id:
             logger.debug(f"匹配到自定义映射：{item.title}={mapping_subject_id}")
             # 自定义映射的ID不视为特定季度的ID
-            return mapping_subject_id, False, ""
+            return self._note_match((mapping_subject_id, False, ""), "mapping")
 
-        # 标记是否通过bangumi-data获取的ID
-        is_season_matched_id = False
-
-        # 尝试使用 bangumi-data 匹配番剧ID
+        bgm_data = None
+        release_date = self._item_release_date(item)
         if config_manager.get("bangumi_data", "enabled", fallback=True):
             try:
                 bgm_data = self._get_bangumi_data()
-                release_date = None
-
-                if item.release_date and len(item.release_date) >= 8:
-                    release_date = item.release_date[:10]
-                else:
+                if release_date is None:
                     logger.debug("release_date为空或无效，尝试从bangumi-data中获取日期")
 
+                # 带外部 ID（TMDB 等）时先按站点 ID 直接查找，无需标题匹配；
+                # 结果确定，优先于按标题记录的学习映射
+                external = self._match_external_ids(bgm_data, item, release_date)
+                if external is not None:
+                    return self._note_match(external, "external_id")
+            except Exception as e:
+                logger.error(f"bangumi-data 匹配出错: {e}")
+                bgm_data = None
+
+        learned = self._lookup_learned(item)
+        if learned is not None:
+            return learned
+
+        # 标记是否通过bangumi-data获取的ID
+        is_season_matched_id = False
+
+        # 尝试使用 bangumi-data 匹配番剧ID
+        if bgm_data is not None:
+            try:
                 bangumi_data_result = bgm_data.find_bangumi_id(
                     title=item.title,
                     ori_title=item.ori_title,
@@ -734,56 +1343,50 @@ class SyncService:
                         # 第一季总是返回True
                         is_season_matched_id = True
 
-                    return bangumi_data_id, is_season_matched_id, ""
+                    return self._note_match(
+                        (bangumi_data_id, is_season_matched_id, ""), "bangumi_data"
+                    )
             except Exception as e:
                 logger.error(f"bangumi-data 匹配出错: {e}")
 
-        # 如果没有匹配到，使用 bangumi API 搜索
-        _ctx = (
+        return None
+
+    @staticmethod
+    def _subject_search_context(item: CustomItem) -> str:
+        return (
             f"user_name={item.user_name!r} source={item.source!r} "
             f"S{item.season:02d}E{item.episode:02d} media_type={item.media_type!r} "
             f"title={item.title!r} ori_title={item.ori_title!r}"
         )
-        try:
-            # 使用对应用户的bangumi API实例进行搜索
-            bgm = self._get_bangumi_api_for_user(item.user_name)
-            if not bgm:
-                logger.error(f"bgm: 无法为用户创建 Bangumi API 实例进行搜索；{_ctx}")
-                return None, False, "无法创建 Bangumi API 实例，无法搜索条目"
 
-            premiere_date = None
-            if item.release_date and len(item.release_date) >= 8:
-                premiere_date = item.release_date[:10]
-
-            bgm_data = bgm.bgm_search(
-                title=item.title,
-                ori_title=item.ori_title or "",
-                premiere_date=premiere_date or "",
-                is_movie=(item.media_type == "movie"),
+    def _subject_from_search(
+        self,
+        item: CustomItem,
+        bgm_data: Optional[list],
+        _ctx: str,
+        premiere_date: Optional[str],
+    ) -> tuple[Optional[str], bool, str]:
+        """由 bgm_search 结果得出 (subject_id, is_season_matched_id, failure_detail)"""
+        if not bgm_data:
+            logger.error(
+                f"bgm: 未查询到番剧信息，跳过；{_ctx} premiere_date={premiere_date!r}"
             )
-            if not bgm_data:
-                logger.error(
-                    "bgm: 未查询到番剧信息，跳过；"
-                    f"{_ctx} premiere_date={premiere_date!r}"
-                )
-                return None, False, "Bangumi 搜索无结果"
+            return None, False, "Bangumi 搜索无结果"
 
-            # 校验返回结果的标题是否包含目标季度信息，确认是否精准命中季度本体
-            is_api_season_matched = False
-            if item.season > 1:
-                returned_name = bgm_data[0].get("name", "")
-                returned_name_cn = bgm_data[0].get("name_cn", "")
+        # 校验返回结果的标题是否包含目标季度信息，确认是否精准命中季度本体
+        is_api_season_matched = False
+        if item.season > 1:
+            returned_name = bgm_data[0].get("name", "")
+            returned_name_cn = bgm_data[0].get("name_cn", "")
 
-                if self._check_season_info_in_title(
-                    returned_name, item.season
-                ) or self._check_season_info_in_title(returned_name_cn, item.season):
-                    is_api_season_matched = True
+            if self._check_season_info_in_title(
+                returned_name, item.season
+            ) or self._check_season_info_in_title(returned_name_cn, item.season):
+                is_api_season_matched = True
 
-            return bgm_data[0]["id"], is_api_season_matched, ""
-        except Exception as e:
-            detail = f"Bangumi API 搜索出错: {e}"
-            logger.error(f"bgm: {detail}；{_ctx}")
-            return None, False, detail
+        return self._note_match(
+            (bgm_data[0]["id"], is_api_season_matched, ""), "search"
+        )
 
     def _check_season_info_in_title(self, title: str, season: int) -> bool:
         """检查标题中是否包含季度信息"""
@@ -852,69 +1455,6 @@ class SyncService:
 
         return False
 
-    def _retry_mark_episode(
-        self, bgm_api: BangumiApi, subject_id: str, ep_id: str, max_retries: int = 3
-    ) -> int:
-        """带重试机制的标记剧集方法（优化版，减少阻塞时间）"""
-        for attempt in range(max_retries + 1):
-            try:
-                mark_status = bgm_api.mark_episode_watched(
-                    subject_id=subject_id, ep_id=ep_id
-                )
-                if attempt > 0:
-                    logger.info(f"重试成功，第 {attempt + 1} 次尝试标记成功")
-                return mark_status
-            except Exception as e:
-                if attempt < max_retries:
-                    # 优化延迟策略：减少最大延迟时间
-                    delay = min(2**attempt, 3)  # 最大延迟3秒: 1, 2, 3秒
-                    logger.error(
-                        f"标记剧集失败: {str(e)}，第 {attempt + 1}/{max_retries} 次重试，{delay}秒后重试"
-                    )
-
-                    # 使用非阻塞方式等待（在线程池中执行时不会阻塞主线程）
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error(
-                        f"标记剧集失败，已达到最大重试次数 {max_retries}: {str(e)}"
-                    )
-                    raise e
-        # This line should never be reached due to the loop logic
-        return 0  # pragma: no cover
-
-    async def _retry_mark_episode_async(
-        self, bgm_api: BangumiApi, subject_id: str, ep_id: str, max_retries: int = 3
-    ) -> int:
-        """异步版本的重试标记剧集方法"""
-        for attempt in range(max_retries + 1):
-            try:
-                # 在线程池中执行同步操作
-                loop = asyncio.get_running_loop()
-                mark_status = await loop.run_in_executor(
-                    self._executor, bgm_api.mark_episode_watched, subject_id, ep_id
-                )
-                if attempt > 0:
-                    logger.info(f"异步重试成功，第 {attempt + 1} 次尝试标记成功")
-                return mark_status
-            except Exception as e:
-                if attempt < max_retries:
-                    delay = min(2**attempt, 3)  # 最大延迟3秒
-                    logger.error(
-                        f"异步标记剧集失败: {str(e)}，第 {attempt + 1}/{max_retries} 次重试，{delay}秒后重试"
-                    )
-
-                    # 使用异步等待，不阻塞事件循环
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logger.error(
-                        f"异步标记剧集失败，已达到最大重试次数 {max_retries}: {str(e)}"
-                    )
-                    raise e
-        # This line should never be reached due to the loop logic
-        return 0  # pragma: no cover
-
     def _get_bangumi_config_for_user(self, user_name: str) -> Optional[dict[str, str]]:
         """根据媒体服务器用户名获取对应的bangumi配置"""
         mode = config_manager.get("sync", "mode", fallback="single")
@@ -942,8 +1482,8 @@ class SyncService:
 
         return None
 
-    def _get_bangumi_api_for_user(self, user_name: str) -> Optional[BangumiApi]:
-        """根据用户名创建对应的BangumiApi实例"""
+    def _bangumi_client_config(self, user_name: str) -> Optional[dict[str, Any]]:
+        """组装用户对应的 Bangumi 客户端参数（账号 + 代理配置）"""
         bangumi_config = self._get_bangumi_config_for_user(user_name)
         if not bangumi_config:
             return None
@@ -952,15 +1492,24 @@ class SyncService:
             logger.error(f"用户 {user_name} 的bangumi配置不完整")
             return None
 
-        return BangumiApi(
-            username=bangumi_config["username"],
-            access_token=bangumi_config["access_token"],
-            private=bangumi_config["private"],
-            http_proxy=config_manager.get("dev", "script_proxy", fallback=""),
-            ssl_verify=config_manager.get("dev", "ssl_verify", fallback=True),
-            bgm_api_proxy=config_manager.get("dev", "bgm_api_proxy", fallback=""),
-            bgm_next_proxy=config_manager.get("dev", "bgm_next_proxy", fallback=""),
-        )
+        return {
+            "username": bangumi_config["username"],
+            "access_token": bangumi_config["access_token"],
+            "private": bangumi_config["private"],
+            "http_proxy": config_manager.get("dev", "script_proxy", fallback=""),
+            "ssl_verify": config_manager.get("dev", "ssl_verify", fallback=True),
+            "bgm_api_proxy": config_manager.get("dev", "bgm_api_proxy", fallback=""),
+            "bgm_next_proxy": config_manager.get("dev", "bgm_next_proxy", fallback=""),
+        }
+
+    def _get_async_bangumi_api_for_user(
+        self, user_name: str
+    ) -> Optional[AsyncBangumiApi]:
+        """根据用户名获取对应的 AsyncBangumiApi 实例（从进程级客户端池复用）"""
+        client_config = self._bangumi_client_config(user_name)
+        if not client_config:
+            return None
+        return bangumi_api_pool.get_async(**client_config, factory=AsyncBangumiApi)
 
     def _get_bangumi_data(self) -> BangumiData:
         """获取BangumiData实例（使用实例缓存避免内存泄漏）"""
@@ -980,62 +1529,57 @@ class SyncService:
             task_id = f"plex_{self._task_counter}_{int(time.time())}"
             self._register_task(task_id, plex_data, "plex")
 
-        self._executor.submit(self._sync_plex_item_sync, plex_data, task_id)
+        self._spawn(
+            self._run_native_task(
+                task_id,
+                "Plex",
+                "plex",
+                lambda: self._prepare_plex_item(plex_data),
+            )
+        )
         logger.info(f"Plex同步任务 {task_id} 已提交到异步队列")
         return task_id
 
-    def _sync_plex_item_sync(
-        self, plex_data: dict[str, Any], task_id: str
-    ) -> SyncResponse:
-        """同步执行Plex同步的内部方法"""
-        try:
-            self._update_task_status(task_id, "running")
-            result = self.sync_plex_item(plex_data)
-            self._update_task_status(task_id, "completed", result=result.dict())
-            return result
-        except Exception as e:
-            self._update_task_status(task_id, "failed", error=str(e))
-            logger.error(f"异步Plex同步任务 {task_id} 失败: {e}")
-            return SyncResponse(status="error", message=f"异步处理失败: {str(e)}")
+    async def sync_plex_item(self, plex_data: dict[str, Any]) -> SyncResponse:
+        """处理Plex同步请求，等待同步完成"""
+        return await self._sync_prepared(
+            "Plex", "plex", lambda: self._prepare_plex_item(plex_data)
+        )
 
-    def sync_plex_item(self, plex_data: dict[str, Any]) -> SyncResponse:
-        """处理Plex同步请求"""
-        try:
-            ev = plex_data["event"]
-            if ev not in ("media.play", "media.scrobble"):
-                logger.debug(f"事件类型{ev}无需同步，跳过")
-                return SyncResponse(status="ignored", message=f"事件类型{ev}无需同步")
-
-            md = plex_data["Metadata"]
-            mtype = (md.get("type") or "").lower()
-            if ev == "media.play" and mtype != "movie":
-                logger.debug(f"事件类型{ev}非电影，无需同步")
-                return SyncResponse(
-                    status="ignored",
-                    message=f"事件类型{ev}非电影，无需同步",
-                )
+    def _prepare_plex_item(
+        self, plex_data: dict[str, Any]
+    ) -> Union[SyncResponse, tuple[CustomItem, bool]]:
+        """解析 Plex 报文：返回无需同步时的响应，或 (CustomItem, 是否仅标记在看)"""
+        ev = plex_data["event"]
+        if ev not in ("media.play", "media.scrobble"):
+            logger.debug(f"事件类型{ev}无需同步，跳过")
+            return SyncResponse(status="ignored", message=f"事件类型{ev}无需同步")
+
+        md = plex_data["Metadata"]
+        mtype = (md.get("type") or "").lower()
+        if ev == "media.play" and mtype != "movie":
+            logger.debug(f"事件类型{ev}非电影，无需同步")
+            return SyncResponse(
+                status="ignored",
+                message=f"事件类型{ev}非电影，无需同步",
+            )
 
-            if mtype == "movie":
-                logger.debug(
-                    f"接收到Plex同步请求：{plex_data['event']} "
-                    f"{plex_data['Account']['title']} 电影 {md.get('title', '')}"
-                )
-            else:
-                logger.debug(
-                    f"接收到Plex同步请求：{plex_data['event']} {plex_data['Account']['title']} "
-                    f"S{md['parentIndex']:02d}E{md['index']:02d} {md.get('grandparentTitle', '')}"
-                )
+        if mtype == "movie":
+            logger.debug(
+                f"接收到Plex同步请求：{plex_data['event']} "
+                f"{plex_data['Account']['title']} 电影 {md.get('title', '')}"
+            )
+        else:
+            logger.debug(
+                f"接收到Plex同步请求：{plex_data['event']} {plex_data['Account']['title']} "
+                f"S{md['parentIndex']:02d}E{md['index']:02d} {md.get('grandparentTitle', '')}"
+            )
 
-            # 提取数据并调用自定义同步
-            custom_item = extract_plex_data(plex_data)
-            logger.debug(f"Plex重新组装JSON报文：{custom_item}")
+        # 提取数据并调用自定义同步
+        custom_item = extract_plex_data(plex_data)
+        logger.debug(f"Plex重新组装JSON报文：{custom_item}")
 
-            if ev == "media.play":
-                return self.sync_movie_watching(custom_item, source="plex")
-            return self.sync_custom_item(custom_item, source="plex")
-        except Exception as e:
-            logger.error(f"Plex同步处理出错: {e}")
-            return SyncResponse(status="error", message=f"处理失败: {str(e)}")
+        return custom_item, ev == "media.play"
 
     async def sync_emby_item_async(self, emby_data: dict[str, Any]) -> str:
         """异步同步Emby项目，返回任务ID"""
@@ -1045,107 +1589,95 @@ class SyncService:
             task_id = f"emby_{self._task_counter}_{int(time.time())}"
             self._register_task(task_id, emby_data, "emby")
 
-        self._executor.submit(self._sync_emby_item_sync, emby_data, task_id)
+        self._spawn(
+            self._run_native_task(
+                task_id,
+                "Emby",
+                "emby",
+                lambda: self._prepare_emby_item(emby_data),
+            )
+        )
         logger.info(f"Emby同步任务 {task_id} 已提交到异步队列")
         return task_id
 
-    def _sync_emby_item_sync(
-        self, emby_data: dict[str, Any], task_id: str
-    ) -> SyncResponse:
-        """同步执行Emby同步的内部方法"""
-        try:
-            self._update_task_status(task_id, "running")
-            result = self.sync_emby_item(emby_data)
-            self._update_task_status(task_id, "completed", result=result.dict())
-            return result
-        except Exception as e:
-            self._update_task_status(task_id, "failed", error=str(e))
-            logger.error(f"异步Emby同步任务 {task_id} 失败: {e}")
-            return SyncResponse(status="error", message=f"异步处理失败: {str(e)}")
+    async def sync_emby_item(self, emby_data: dict[str, Any]) -> SyncResponse:
+        """处理Emby同步请求，等待同步完成"""
+        return await self._sync_prepared(
+            "Emby", "emby", lambda: self._prepare_emby_item(emby_data)
+        )
 
-    def sync_emby_item(self, emby_data: dict[str, Any]) -> SyncResponse:
-        """处理Emby同步请求"""
-        try:
-            # 记录接收到的数据
-            logger.debug(f"接收到Emby同步请求：{emby_data}")
-
-            # 验证必要字段是否存在
-            required_fields = ["Event", "Item", "User"]
-            for field in required_fields:
-                if field not in emby_data:
-                    logger.error(f"Emby请求缺少必要字段: {field}")
+    def _prepare_emby_item(
+        self, emby_data: dict[str, Any]
+    ) -> Union[SyncResponse, tuple[CustomItem, bool]]:
+        """解析 Emby 报文：返回无需同步时的响应，或 (CustomItem, 是否仅标记在看)"""
+        # 记录接收到的数据
+        logger.debug(f"接收到Emby同步请求：{emby_data}")
+
+        # 验证必要字段是否存在
+        required_fields = ["Event", "Item", "User"]
+        for field in required_fields:
+            if field not in emby_data:
+                logger.error(f"Emby请求缺少必要字段: {field}")
+                return SyncResponse(
+                    status="error", message=f"请求缺少必要字段: {field}"
+                )
+
+        event = emby_data["Event"]
+        emby_item = emby_data["Item"]
+        is_movie = str(emby_item.get("Type") or "").lower() == "movie"
+        playback_start_movie = event == "playback.start" and is_movie
+
+        if (
+            event != "item.markplayed"
+            and event != "playback.stop"
+            and not playback_start_movie
+        ):
+            logger.debug(f"事件类型{event}无需同步，跳过")
+            return SyncResponse(status="ignored", message=f"事件类型{event}无需同步")
+
+        if is_movie:
+            if "Name" not in emby_item:
+                logger.error("Emby 电影 Item 缺少 Name 字段")
+                return SyncResponse(status="error", message="Item缺少必要字段: Name")
+        else:
+            item_required_fields = [
+                "Type",
+                "SeriesName",
+                "ParentIndexNumber",
+                "IndexNumber",
+            ]
+            for field in item_required_fields:
+                if field not in emby_item:
+                    logger.error(f"Emby Item缺少必要字段: {field}")
                     return SyncResponse(
-                        status="error", message=f"请求缺少必要字段: {field}"
+                        status="error", message=f"Item缺少必要字段: {field}"
                     )
 
-            event = emby_data["Event"]
-            emby_item = emby_data["Item"]
-            is_movie = str(emby_item.get("Type") or "").lower() == "movie"
-            playback_start_movie = event == "playback.start" and is_movie
-
+        # 如果是播放停止事件,只有播放完成才判断为看过
+        if event == "playback.stop":
             if (
-                event != "item.markplayed"
-                and event != "playback.stop"
-                and not playback_start_movie
+                "PlaybackInfo" not in emby_data
+                or "PlayedToCompletion" not in emby_data["PlaybackInfo"]
             ):
-                logger.debug(f"事件类型{event}无需同步，跳过")
-                return SyncResponse(
-                    status="ignored", message=f"事件类型{event}无需同步"
+                logger.debug(
+                    "播放停止事件缺少PlaybackInfo.PlayedToCompletion字段，跳过"
                 )
+                return SyncResponse(status="ignored", message="播放信息不完整")
 
-            if is_movie:
-                if "Name" not in emby_item:
-                    logger.error("Emby 电影 Item 缺少 Name 字段")
-                    return SyncResponse(
-                        status="error", message="Item缺少必要字段: Name"
-                    )
-            else:
-                item_required_fields = [
-                    "Type",
-                    "SeriesName",
-                    "ParentIndexNumber",
-                    "IndexNumber",
-                ]
-                for field in item_required_fields:
-                    if field not in emby_item:
-                        logger.error(f"Emby Item缺少必要字段: {field}")
-                        return SyncResponse(
-                            status="error", message=f"Item缺少必要字段: {field}"
-                        )
-
-            # 如果是播放停止事件,只有播放完成才判断为看过
-            if event == "playback.stop":
-                if (
-                    "PlaybackInfo" not in emby_data
-                    or "PlayedToCompletion" not in emby_data["PlaybackInfo"]
-                ):
+            if emby_data["PlaybackInfo"]["PlayedToCompletion"] is not True:
+                if is_movie:
+                    logger.debug(f"{emby_item.get('Name', '')} 电影未播放完成，跳过")
+                else:
                     logger.debug(
-                        "播放停止事件缺少PlaybackInfo.PlayedToCompletion字段，跳过"
+                        f"{emby_item['SeriesName']} S{emby_item['ParentIndexNumber']:02d}E{emby_item['IndexNumber']:02d}未播放完成，跳过"
                     )
-                    return SyncResponse(status="ignored", message="播放信息不完整")
+                return SyncResponse(status="ignored", message="未播放完成")
 
-                if emby_data["PlaybackInfo"]["PlayedToCompletion"] is not True:
-                    if is_movie:
-                        logger.debug(
-                            f"{emby_item.get('Name', '')} 电影未播放完成，跳过"
-                        )
-                    else:
-                        logger.debug(
-                            f"{emby_item['SeriesName']} S{emby_item['ParentIndexNumber']:02d}E{emby_item['IndexNumber']:02d}未播放完成，跳过"
-                        )
-                    return SyncResponse(status="ignored", message="未播放完成")
+        # 提取数据并调用自定义同步
+        custom_item = extract_emby_data(emby_data)
+        logger.debug(f"Emby重新组装JSON报文：{custom_item}")
 
-            # 提取数据并调用自定义同步
-            custom_item = extract_emby_data(emby_data)
-            logger.debug(f"Emby重新组装JSON报文：{custom_item}")
-
-            if playback_start_movie:
-                return self.sync_movie_watching(custom_item, source="emby")
-            return self.sync_custom_item(custom_item, source="emby")
-        except Exception as e:
-            logger.error(f"Emby同步处理出错: {e}")
-            logger.error(traceback.format_exc())
-            return SyncResponse(status="error", message=f"处理失败: {str(e)}")
+        return custom_item, playback_start_movie
 
     async def sync_jellyfin_item_async(self, jellyfin_data: dict[str, Any]) -> str:
         """异步同步Jellyfin项目，返回任务ID"""
@@ -1155,59 +1687,52 @@ class SyncService:
             task_id = f"jellyfin_{self._task_counter}_{int(time.time())}"
             self._register_task(task_id, jellyfin_data, "jellyfin")
 
-        self._executor.submit(self._sync_jellyfin_item_sync, jellyfin_data, task_id)
+        self._spawn(
+            self._run_native_task(
+                task_id,
+                "Jellyfin",
+                "jellyfin",
+                lambda: self._prepare_jellyfin_item(jellyfin_data),
+            )
+        )
         logger.info(f"Jellyfin同步任务 {task_id} 已提交到异步队列")
         return task_id
 
-    def _sync_jellyfin_item_sync(
-        self, jellyfin_data: dict[str, Any], task_id: str
-    ) -> SyncResponse:
-        """同步执行Jellyfin同步的内部方法"""
-        try:
-            self._update_task_status(task_id, "running")
-            result = self.sync_jellyfin_item(jellyfin_data)
-            self._update_task_status(task_id, "completed", result=result.dict())
-            return result
-        except Exception as e:
-            self._update_task_status(task_id, "failed", error=str(e))
-            logger.error(f"异步Jellyfin同步任务 {task_id} 失败: {e}")
-            return SyncResponse(status="error", message=f"异步处理失败: {str(e)}")
+    async def sync_jellyfin_item(self, jellyfin_data: dict[str, Any]) -> SyncResponse:
+        """处理Jellyfin同步请求，等待同步完成"""
+        return await self._sync_prepared(
+            "Jellyfin", "jellyfin", lambda: self._prepare_jellyfin_item(jellyfin_data)
+        )
 
-    def sync_jellyfin_item(self, jellyfin_data: dict[str, Any]) -> SyncResponse:
-        """处理Jellyfin同步请求"""
-        try:
-            logger.debug(f"接收到Jellyfin同步请求：{jellyfin_data}")
+    def _prepare_jellyfin_item(
+        self, jellyfin_data: dict[str, Any]
+    ) -> Union[SyncResponse, tuple[CustomItem, bool]]:
+        """解析 Jellyfin 报文：返回无需同步时的响应，或 (CustomItem, 是否仅标记在看)"""
+        logger.debug(f"接收到Jellyfin同步请求：{jellyfin_data}")
 
-            ntype = jellyfin_data.get("NotificationType", "")
-            mtype = (jellyfin_data.get("media_type") or "").lower()
-            playback_start_movie = ntype == "PlaybackStart" and mtype == "movie"
+        ntype = jellyfin_data.get("NotificationType", "")
+        mtype = (jellyfin_data.get("media_type") or "").lower()
+        playback_start_movie = ntype == "PlaybackStart" and mtype == "movie"
 
-            if ntype != "PlaybackStop" and not playback_start_movie:
-                logger.debug(f"事件类型{ntype}无需同步，跳过")
-                return SyncResponse(
-                    status="ignored",
-                    message=f"事件类型{ntype}无需同步",
-                )
+        if ntype != "PlaybackStop" and not playback_start_movie:
+            logger.debug(f"事件类型{ntype}无需同步，跳过")
+            return SyncResponse(
+                status="ignored",
+                message=f"事件类型{ntype}无需同步",
+            )
 
-            if ntype == "PlaybackStop":
-                if jellyfin_data["PlayedToCompletion"] == "False":
-                    logger.debug(
-                        f"是否播完：{jellyfin_data['PlayedToCompletion']}，无需同步，跳过"
-                    )
-                    return SyncResponse(
-                        status="ignored", message="未播放完成，跳过同步"
-                    )
+        if ntype == "PlaybackStop":
+            if jellyfin_data["PlayedToCompletion"] == "False":
+                logger.debug(
+                    f"是否播完：{jellyfin_data['PlayedToCompletion']}，无需同步，跳过"
+                )
+                return SyncResponse(status="ignored", message="未播放完成，跳过同步")
 
-            # 提取数据并调用自定义同步
-            custom_item = extract_jellyfin_data(jellyfin_data)
-            logger.debug(f"Jellyfin重新组装JSON报文：{custom_item}")
+        # 提取数据并调用自定义同步
+        custom_item = extract_jellyfin_data(jellyfin_data)
+        logger.debug(f"Jellyfin重新组装JSON报文：{custom_item}")
 
-            if playback_start_movie:
-                return self.sync_movie_watching(custom_item, source="jellyfin")
-            return self.sync_custom_item(custom_item, source="jellyfin")
-        except Exception as e:
-            logger.error(f"Jellyfin同步处理出错: {e}")
-            return SyncResponse(status="error", message=f"处理失败: {str(e)}")
+        return custom_item, playback_start_movie
 
 
 # 全局同步服务实例
@@ -12,6 +12,7 @@ import httpx
 
 from ...core.config import config_manager
 from ...core.logging import logger
+from ...utils.http_transport import get_async_client
 
 # ===== 数据模型导入 =====
 from .models import TraktCollectionItem, TraktHistoryItem, TraktRatingItem
@@ -57,19 +58,13 @@ class TraktClient:
         await self.close()
 
     async def _ensure_client(self) -> None:
-        """确保 HTTP 客户端已初始化"""
+        """确保 HTTP 客户端已初始化（使用进程共享的连接池）"""
         if self._client is None:
-            self._client = httpx.AsyncClient(
-                headers=self.headers,
-                timeout=30.0,
-                follow_redirects=True,
-            )
+            self._client = get_async_client()
 
     async def close(self) -> None:
-        """关闭 HTTP 客户端"""
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        """释放 HTTP 客户端引用（共享连接池由应用关闭时统一关闭）"""
+        self._client = None
 
     async def _make_request(
         self,
@@ -96,6 +91,8 @@ class TraktClient:
                     url=url,
                     json=data,
                     headers=self.headers,
+                    timeout=30.0,
+                    follow_redirects=True,
                 )
 
                 # 更新速率限制信息
@@ -14,11 +14,15 @@ from ...core.logging import logger
 from ...models.sync import CustomItem
 from ...services.mapping_service import mapping_service
 from ...services.sync_service import sync_service
+from ...utils.data_util import normalize_provider_ids
 from ...utils.notifier import send_notify
 from .auth import trakt_auth_service
 from .client import TraktClient, TraktClientFactory
 from .models import TraktHistoryItem, TraktSyncResult, TraktSyncStats
 
+# Trakt ids 中传给 bangumi-data 外部 ID 查找的站点
+_PROVIDER_KEYS = ("tmdb", "tvdb", "imdb")
+
 
 class TraktSyncService:
     """Trakt 数据同步服务"""
@@ -612,6 +616,7 @@ class TraktSyncService:
                 release_date=release_date,
                 user_name=user_id,  # 使用 user_id 作为 user_name
                 source="trakt",
+                provider_ids=self._trakt_provider_ids(show.get("ids")),
             )
 
         except Exception as e:
@@ -662,6 +667,14 @@ class TraktSyncService:
             release_date=release_date,
             user_name=user_id,
             source="trakt",
+            provider_ids=self._trakt_provider_ids(ids),
+        )
+
+    @staticmethod
+    def _trakt_provider_ids(ids: Optional[dict[str, Any]]) -> Optional[dict[str, str]]:
+        """Trakt ids 中可用于 bangumi-data 查找的外部 ID（TMDB / TVDB / IMDb）"""
+        return normalize_provider_ids(
+            {key: value for key, value in (ids or {}).items() if key in _PROVIDER_KEYS}
         )
 
     async def start_user_sync_task(self, user_id: str, full_sync: bool = False) -> str:
@@ -14,6 +14,7 @@ import httpx
 
 from ..core.config import config_manager
 from ..core.logging import logger
+from .http_transport import get_async_client
 
 ANNOUNCEMENTS_RAW_URL = "https://raw.githubusercontent.com/SanaeMio/Bangumi-syncer/main/docs/announcements.json"
 _GH_PROXY_MIRRORS = (
@@ -135,14 +136,10 @@ def _build_fetch_urls() -> list[str]:
 
 
 async def _fetch_url(url: str, proxy: str | None) -> httpx.Response:
-    kwargs: dict[str, Any] = {
-        "timeout": REQUEST_TIMEOUT,
-        "headers": {"User-Agent": USER_AGENT},
-    }
-    if proxy:
-        kwargs["proxy"] = proxy
-    async with httpx.AsyncClient(**kwargs) as client:
-        return await client.get(url)
+    client = get_async_client(proxy)
+    return await client.get(
+        url, headers={"User-Agent": USER_AGENT}, timeout=REQUEST_TIMEOUT
+    )
 
 
 async def fetch_announcements() -> AnnouncementsFetchResult:
@@ -1,24 +1,1045 @@
+import contextvars
 import datetime
+import hashlib
 import os
 import re
 import socket
+import threading
 import time
 import warnings
 from collections import OrderedDict
-from typing import Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Optional, Union
 
 import requests
 from rapidfuzz import fuzz
 
 from ..core.logging import logger
+from .bgm_circuit_breaker import bgm_circuit_breaker
+from .bgm_collection_ledger import LEDGER_SUBJECT_TYPE
+from .bgm_episode_index import EPISODE_INDEX_MIN_SORT, EpisodeIndex
+from .bgm_rate_limiter import bgm_rate_limiter
+from .bgm_retry_queue import (
+    bgm_retry_queue,
+    retries_deferred,
+    retry_budget,
+    with_retry_after,
+)
+from .bgm_route_manager import bgm_route_manager, build_routes, route_candidates
+from .bgm_search_plan import SearchPlan, SearchTask
+from .bgm_sequel_graph import MAX_GRAPH_HOPS, SEQUEL_GRAPH_MISS
+from .http_transport import mount_pooled_adapter
+from .single_flight import bgm_single_flight
 
 # 使用全局logger实例
 
 _EPISODES_PAGE_LIMIT = 200
+# 已知章节总数后并发拉取其余分页的并发数
+_EPISODES_PAGE_CONCURRENCY = 4
 _LONG_SERIES_AIRDATE_MIN_TOTAL = 100
+# 条目章节收藏状态接口单页上限
+_EP_COLLECTIONS_PAGE_LIMIT = 1000
+# 用户收藏列表接口单页上限
+_USER_COLLECTIONS_PAGE_LIMIT = 100
+# 缓存未命中哨兵（缓存值本身可能是 None/空列表）
+_CACHE_MISS = object()
+# 需要重试的响应状态码
+_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# bgm_search 各搜索策略共用的线程池上限（多个同步同时搜索时排队）
+_SEARCH_WORKERS = 8
+_search_pool = ThreadPoolExecutor(
+    max_workers=_SEARCH_WORKERS, thread_name_prefix="bgm-search"
+)
+
+
+class BangumiApiBase:
+    """同步与异步 Bangumi 客户端共用的缓存与纯逻辑（不涉及网络 I/O）"""
+
+    username: Optional[str] = None
+
+    def _init_cache(
+        self,
+        cache_ttl: Optional[dict[str, float]] = None,
+        metadata_cache=None,
+        sequel_graph=None,
+        collection_ledger=None,
+    ) -> None:
+        # 实例级别的带大小限制缓存，避免无限增长
+        _MAX_CACHE_SIZE = 200
+        self._cache = {
+            "search": OrderedDict(),
+            "search_old": OrderedDict(),
+            "get_subject": OrderedDict(),
+            "get_related_subjects": OrderedDict(),
+            "get_episodes": OrderedDict(),
+            "episode_index": OrderedDict(),
+        }
+        self._max_cache_size = _MAX_CACHE_SIZE
+        # 按类别的缓存有效期（秒）；未配置的类别不过期。长期复用的实例（客户端池）
+        # 需要设置，避免连载中番剧的新章节被旧缓存挡住
+        self._cache_ttl: dict[str, float] = dict(cache_ttl or {})
+        self._cache_expires: dict[str, dict] = {k: {} for k in self._cache}
+        self._cache_hits: dict[str, int] = dict.fromkeys(self._cache, 0)
+        self._cache_misses: dict[str, int] = dict.fromkeys(self._cache, 0)
+        self._cache_lock = threading.Lock()
+        # 可选的二级持久化缓存（条目/章节/关联条目），由客户端池注入
+        self._metadata_cache = metadata_cache
+        # 可选的续集链关系图，季度/集数解析优先离线命中，由客户端池注入
+        self._sequel_graph = sequel_graph
+        # 可选的账号收藏状态账本，标记前优先本地判断，由客户端池注入
+        self._collection_ledger = collection_ledger
+
+    def _get_cache(self, category: str, key):
+        """读取缓存并统计命中/未命中；未命中或已过期返回 _CACHE_MISS"""
+        cache = self._cache[category]
+        with self._cache_lock:
+            if key in cache:
+                expires_at = self._cache_expires[category].get(key)
+                if expires_at is None or time.monotonic() < expires_at:
+                    cache.move_to_end(key)
+                    self._cache_hits[category] += 1
+                    return cache[key]
+                cache.pop(key, None)
+                self._cache_expires[category].pop(key, None)
+            self._cache_misses[category] += 1
+        return _CACHE_MISS
+
+    def _put_cache(self, category: str, key, value) -> None:
+        """写入缓存并淘汰超限条目（LRU）"""
+        cache = self._cache[category]
+        expires = self._cache_expires[category]
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            ttl = self._cache_ttl.get(category)
+            if ttl:
+                expires[key] = time.monotonic() + ttl
+            else:
+                expires.pop(key, None)
+            while len(cache) > self._max_cache_size:
+                old_key, _ = cache.popitem(last=False)
+                expires.pop(old_key, None)
+
+    def get_cache_stats(self) -> dict:
+        """按类别返回实例缓存的命中/未命中次数与当前条目数"""
+        with self._cache_lock:
+            return {
+                category: {
+                    "hits": self._cache_hits[category],
+                    "misses": self._cache_misses[category],
+                    "size": len(cache),
+                }
+                for category, cache in self._cache.items()
+            }
+
+    @staticmethod
+    def _persist_key(key) -> str:
+        if isinstance(key, tuple):
+            return ":".join(str(int(k) if isinstance(k, bool) else k) for k in key)
+        return str(key)
+
+    def _flight_key(self, method: str, url: str, params=None) -> tuple:
+        """请求合并键：同一账号（token）、URL 与参数的请求视为相同请求"""
+        return (
+            method,
+            self.access_token or "",
+            url,
+            tuple(sorted((params or {}).items())),
+        )
+
+    def _account_flight_key(self, kind: str, *parts) -> tuple:
+        """带 token 请求的合并键：结果可能因账号而异（NSFW 可见性、私有收藏），不跨账号合并"""
+        return (kind, self.access_token or "", *parts)
+
+    def _persist_scope(self) -> str:
+        """二级缓存的账号范围：带 token 取得的数据（NSFW 条目等）可能因账号而异，
+        按 token 摘要隔离；未配置 token 的客户端共用 anon"""
+        if not self.access_token:
+            return "anon"
+        return hashlib.sha256(self.access_token.encode()).hexdigest()[:16]
+
+    def _put_persistent(self, category: str, key, subject_id, value) -> None:
+        if self._metadata_cache is None:
+            return
+        try:
+            self._metadata_cache.put(
+                category,
+                self._persist_key(key),
+                str(subject_id),
+                value,
+                scope=self._persist_scope(),
+            )
+        except Exception as e:
+            logger.debug(f"写入 Bangumi 元数据缓存失败: {e}")
+
+    def purge_subject_cache(self, subject_id) -> int:
+        """移除实例缓存中与某条目相关的条目，返回移除数量"""
+        target = str(subject_id)
+        removed = 0
+        with self._cache_lock:
+            for category in (
+                "get_subject",
+                "get_related_subjects",
+                "get_episodes",
+                "episode_index",
+            ):
+                cache = self._cache[category]
+                for key in list(cache):
+                    sid = key[0] if isinstance(key, tuple) else key
+                    if str(sid) == target:
+                        cache.pop(key, None)
+                        self._cache_expires[category].pop(key, None)
+                        removed += 1
+        return removed
+
+    def _resolve_from_sequel_graph(
+        self,
+        subject_id,
+        target_season: int,
+        target_ep: int,
+        is_season_subject_id: bool = False,
+        release_date: Optional[str] = None,
+    ):
+        """由续集链关系图离线解析季度/集数；未注入关系图或无法确定时返回 SEQUEL_GRAPH_MISS"""
+        if self._sequel_graph is None:
+            return SEQUEL_GRAPH_MISS
+        try:
+            return self._sequel_graph.resolve(
+                self,
+                subject_id,
+                target_season,
+                target_ep,
+                is_season_subject_id=is_season_subject_id,
+                release_date=release_date,
+            )
+        except Exception as e:
+            logger.debug(f"续集关系图解析失败: {e}")
+            return SEQUEL_GRAPH_MISS
+
+    def _ledger_account(self) -> Optional[str]:
+        """收藏账本按 Bangumi 用户名区分账号；未注入账本或未配置用户名时不启用"""
+        if self._collection_ledger is None or not self.username:
+            return None
+        return str(self.username)
+
+    def _ledger_subject_type(self, account: Optional[str], subject_id) -> Optional[int]:
+        if account is None:
+            return None
+        try:
+            return self._collection_ledger.subject_type(account, subject_id)
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 收藏账本失败: {e}")
+            return None
+
+    def _ledger_watched(self, account: Optional[str], ep_ids: list) -> set[str]:
+        if account is None:
+            return set()
+        try:
+            return self._collection_ledger.watched_episodes(account, ep_ids)
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 章节收藏账本失败: {e}")
+            return set()
+
+    def _ledger_missing_episodes(self, account: Optional[str], subject_id) -> bool:
+        """账本启用但尚无该条目的章节状态时返回 True（需先读取一次章节收藏）"""
+        if account is None:
+            return False
+        try:
+            return not self._collection_ledger.has_episodes(account, subject_id)
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 章节收藏账本失败: {e}")
+            return False
+
+    def _ledger_seed_episodes(
+        self, account: str, subject_id, collections: list
+    ) -> None:
+        try:
+            self._collection_ledger.seed_episodes(account, subject_id, collections)
+        except Exception as e:
+            logger.debug(f"写入 Bangumi 章节收藏账本失败: {e}")
+
+    def _ledger_record_subject(
+        self, subject_id, collection_type, ep_status: Optional[int] = None, res=None
+    ) -> None:
+        """写入条目收藏状态；传入 res 时仅在写操作成功后记录"""
+        account = self._ledger_account()
+        if account is None or (res is not None and res.status_code >= 400):
+            return
+        try:
+            self._collection_ledger.record_subject(
+                account, subject_id, collection_type, ep_status
+            )
+        except Exception as e:
+            logger.debug(f"写入 Bangumi 收藏账本失败: {e}")
+
+    def _ledger_record_episodes(self, subject_id, ep_ids: list, state: int = 2) -> None:
+        account = self._ledger_account()
+        if account is None:
+            return
+        try:
+            self._collection_ledger.record_episodes(account, subject_id, ep_ids, state)
+        except Exception as e:
+            logger.debug(f"写入 Bangumi 章节收藏账本失败: {e}")
+
+    @staticmethod
+    def _watched_episode_ids(collections: list) -> set[str]:
+        """从条目章节收藏列表中取出已看过（type=2）的章节 ID"""
+        watched = set()
+        for row in collections:
+            if not isinstance(row, dict) or row.get("type") != 2:
+                continue
+            episode = row.get("episode") or {}
+            if episode.get("id") is not None:
+                watched.add(str(episode["id"]))
+        return watched
+
+    def _notify(self, notification_type: str, **kwargs) -> None:
+        """发送通知（webhook和邮件），异步客户端改为在线程池中发送"""
+        from .notifier import send_notify
+
+        send_notify(notification_type, **kwargs)
+
+    def _check_auth_error(self, res):
+        """统一检查认证错误"""
+        if res.status_code == 401:
+            error_msg = "Bangumi API 认证失败: access_token可能已过期（有效期1年）或无效，请更新token"
+            logger.error(error_msg)
+
+            # 发送API认证失败通知（webhook和邮件）
+            self._notify(
+                "api_auth_error",
+                user_name=self.username,
+                status_code=res.status_code,
+                error_message=error_msg,
+            )
+
+            raise ValueError(error_msg)
+        return res
+
+    # 客户端的网络异常类型（requests / httpx），_request_walk 据此重试
+    _TRANSPORT_ERRORS: tuple = ()
+
+    def _status_error(self, message: str, res) -> Exception:
+        """构造重试耗尽时抛出的 HTTP 状态异常（客户端各自的异常类型）"""
+        raise NotImplementedError
+
+    def _request_walk(
+        self, method: str, url: str, max_retries: int = 3, hedge: bool = False
+    ):
+        """
+        请求的重试策略（不涉及 I/O）：状态码分类、Retry-After / 指数退避与熔断统计，
+        每次尝试内的线路选择见 _route_walk。以元组形式 yield 网络操作：acquire（经
+        限速器）、send（发送一次请求，网络异常以 throw 传回）、hedge（对冲请求）、
+        sleep（退避等待）与 diagnose（网络诊断），同步、异步客户端分别执行这些
+        操作，返回最终响应。
+
+        处于延迟重试模式（defer_retries）时不原地等待重试，失败立即抛出；
+        目标主机熔断中时抛出 BangumiCircuitOpenError，不发出请求。
+        """
+        dns_error_occurred = False
+        max_retries = retry_budget(max_retries)
+
+        for attempt in range(max_retries + 1):
+            bgm_circuit_breaker.before_request(url)
+            try:
+                res = yield from self._route_walk(method, url, hedge)
+            except self._TRANSPORT_ERRORS as e:
+                bgm_circuit_breaker.record_failure(url)
+
+                # 检查是否是DNS解析错误
+                if "Failed to resolve" in str(
+                    e
+                ) or "Temporary failure in name resolution" in str(e):
+                    dns_error_occurred = True
+
+                if attempt < max_retries:
+                    delay = 2**attempt  # 指数退避: 1, 2, 4秒
+                    logger.error(
+                        f"请求异常: {str(e)}，第 {attempt + 1}/{max_retries} 次重试，{delay}秒后重试"
+                    )
+                    bgm_retry_queue.record_retry(url)
+                    yield ("sleep", delay)
+                    continue
+                logger.error(f"请求异常: {str(e)}，已达到最大重试次数 {max_retries}")
+                if retries_deferred():
+                    bgm_retry_queue.record_retry(url, deferred=True)
+
+                # 如果是DNS错误，进行网络诊断
+                if dns_error_occurred:
+                    logger.warning("⚠️  检测到DNS解析问题，开始网络诊断...")
+                    yield ("diagnose",)
+                raise
+
+            if res.status_code >= 500:
+                bgm_circuit_breaker.record_failure(url)
+            else:
+                bgm_circuit_breaker.record_success(url)
+
+            # 检查是否需要重试的状态码
+            if res.status_code not in _RETRY_STATUS_CODES:
+                return res
+            retry_after = bgm_rate_limiter.parse_retry_after(
+                res.headers.get("Retry-After")
+            )
+            # 优先遵循 Retry-After，否则指数退避: 1, 2, 4秒
+            delay = retry_after if retry_after is not None else 2**attempt
+            # 限流响应暂停整个主机，其他调用方随之排队；否则仅本请求等待
+            throttled = res.status_code in (429, 503) or retry_after
+            if attempt < max_retries:
+                logger.error(
+                    f"HTTP {res.status_code} 错误，第 {attempt + 1}/{max_retries} 次重试，{delay}秒后重试"
+                )
+                bgm_retry_queue.record_retry(url)
+                if not (throttled and bgm_rate_limiter.penalize(url, delay)):
+                    yield ("sleep", delay)
+                continue
+            if retries_deferred():
+                # 延迟重试模式同样暂停该主机，并把 Retry-After 交给队列排期；
+                # 不发送错误通知
+                if throttled:
+                    bgm_rate_limiter.penalize(url, delay)
+                logger.warning(f"HTTP {res.status_code} 错误，交由延迟重试队列处理")
+                bgm_retry_queue.record_retry(url, deferred=True)
+                raise with_retry_after(
+                    self._status_error(
+                        f"HTTP {res.status_code} 错误，已加入延迟重试", res
+                    ),
+                    retry_after,
+                )
+            logger.error(
+                f"HTTP {res.status_code} 错误，已达到最大重试次数 {max_retries}"
+            )
+            # 发送API错误通知
+            self._notify(
+                "api_error",
+                status_code=res.status_code,
+                url=url,
+                method=method,
+                error_message=f"HTTP {res.status_code} 错误，已达到最大重试次数 {max_retries}",
+                retry_count=attempt + 1,
+            )
+            raise self._status_error(
+                f"HTTP {res.status_code} 错误，已达到最大重试次数", res
+            )
+
+    def _route_walk(self, method: str, url: str, hedge: bool = False):
+        """
+        单次尝试的线路选择（不涉及 I/O）：按线路得分依次发送，网络错误时换下一条线路。
+
+        send 操作为 ("send", 线路, 实际 URL, 是否使用该线路的代理)；只有一条候选线路
+        时直接发送，不计入线路统计。hedge 为 True 且开启对冲时 yield
+        ("hedge", 首选, 次优, 延迟, 次优线路)，由客户端经 bgm_route_manager 并行执行
+        两个 _route_call_walk。所有线路都失败时抛出最后一个异常。
+        """
+        candidates = route_candidates(self._routes, url)
+        if len(candidates) == 1:
+            route, routed = candidates[0]
+            yield ("acquire", routed)
+            return (yield ("send", route, routed, False))
+
+        urls = {route.key: routed for route, routed in candidates}
+        ranked = bgm_route_manager.rank([route for route, _ in candidates])
+
+        last_error = None
+        if hedge and method.upper() == "GET":
+            delay = bgm_route_manager.hedge_delay(ranked[0])
+            if delay is not None:
+                primary, backup = ranked[0], ranked[1]
+                try:
+                    return (
+                        yield (
+                            "hedge",
+                            self._route_call_walk(primary, urls[primary.key]),
+                            self._route_call_walk(backup, urls[backup.key]),
+                            delay,
+                            backup,
+                        )
+                    )
+                except self._TRANSPORT_ERRORS as e:
+                    logger.warning(
+                        f"⚠️  线路 {primary.label} 与 {backup.label} 均失败: {e}"
+                    )
+                    last_error = e
+                    ranked = ranked[2:]
+
+        for index, route in enumerate(ranked):
+            try:
+                res = yield from self._route_call_walk(route, urls[route.key])
+            except self._TRANSPORT_ERRORS as e:
+                logger.warning(f"⚠️  线路 {route.label} 请求失败: {e}")
+                last_error = e
+                continue
+            if index or last_error is not None:
+                logger.info(f"✅ 已切换到线路 {route.label}")
+            return res
+        raise last_error
+
+    def _route_call_walk(self, route, routed: str):
+        """经指定线路发送一次请求，并把延迟 / 失败计入线路统计"""
+        yield ("acquire", routed)
+        started = time.monotonic()
+        try:
+            res = yield ("send", route, routed, True)
+        except self._TRANSPORT_ERRORS:
+            bgm_route_manager.record_failure(route)
+            raise
+        bgm_route_manager.record_response(
+            route, res.status_code, time.monotonic() - started
+        )
+        return res
+
+    def _diagnose_network_issue(self, url):
+        """诊断网络连接问题"""
+        from urllib.parse import urlparse
+
+        parsed = urlparse(url)
+        hostname = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+
+        logger.info(f"🔍 开始网络诊断 - 目标: {hostname}:{port}")
+
+        # 1. DNS解析测试
+        try:
+            ip_list = socket.getaddrinfo(
+                hostname, port, socket.AF_UNSPEC, socket.SOCK_STREAM
+            )
+            ips = [ip[4][0] for ip in ip_list]
+            logger.info(f"✅ DNS解析成功: {hostname} -> {', '.join(set(ips))}")
+        except socket.gaierror as e:
+            logger.error(f"❌ DNS解析失败: {e}")
+            logger.info("💡 建议检查:")
+            logger.info("   1. 网络连接是否正常")
+            logger.info("   2. DNS设置是否正确 (可尝试8.8.8.8或114.114.114.114)")
+            logger.info("   3. 是否需要配置代理")
+            return
+        except Exception as e:
+            logger.error(f"❌ DNS解析异常: {e}")
+            return
+
+        # 2. TCP连接测试
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(10)
+            result = sock.connect_ex((ips[0], port))
+            sock.close()
+
+            if result == 0:
+                logger.info(f"✅ TCP连接成功: {ips[0]}:{port}")
+            else:
+                logger.error(f"❌ TCP连接失败: {ips[0]}:{port} (错误码: {result})")
+                logger.info("💡 建议检查:")
+                logger.info("   1. 防火墙设置")
+                logger.info("   2. 网络代理配置")
+                logger.info("   3. 是否需要VPN或其他网络工具")
+        except Exception as e:
+            logger.error(f"❌ TCP连接测试异常: {e}")
+
+    @staticmethod
+    def _op(name: str, *args, **kwargs) -> tuple:
+        """调用类数据请求：请客户端以给定参数调用同名方法（见 _call_op）"""
+        return (name, args, kwargs)
+
+    def _call_op(self, request: tuple):
+        """应答 _op 请求"""
+        name, args, kwargs = request
+        return getattr(self, name)(*args, **kwargs)
+
+    @staticmethod
+    def _json_or(res, expected: tuple, default: Any, label: str):
+        """解析响应 JSON；解析失败或类型不符时记录并返回 default"""
+        try:
+            payload = res.json()
+        except Exception as e:
+            logger.error(f"{label} JSON解析失败: {e}")
+            return default
+        if not isinstance(payload, expected):
+            logger.error(f"{label} API返回异常类型: {type(payload)}, 内容: {payload}")
+            return default
+        return payload
+
+    def _paged_walk(self, path: str, params: dict, page_limit: int, label: str):
+        """按 offset 分页读取 {data, total} 形式的列表接口（以 _op 请求 get）；
+        404 视为空列表"""
+        items: list = []
+        offset = 0
+        while True:
+            res = yield self._op(
+                "get", path, params={**params, "offset": offset, "limit": page_limit}
+            )
+            if res.status_code == 404:
+                break
+            payload = self._json_or(res, (dict,), None, label)
+            if payload is None:
+                break
+            batch = payload.get("data") or []
+            items.extend(batch)
+            total = int(payload.get("total") or len(items))
+            if len(batch) < page_limit or len(items) >= total:
+                break
+            offset += page_limit
+        return items
+
+    def _mark_episode_walk(self, subject_id, ep_id):
+        """
+        单集标记为看过的规则（以 _op 请求客户端方法）。返回 0 表示无需变更，
+        1 表示已标记，2 表示新增收藏后标记。
+        """
+        account = yield self._op("_refresh_collection_ledger")
+        subject_type = yield self._op("_ledger_subject_type", account, subject_id)
+        if subject_type is None:
+            data = yield self._op("get_subject_collection", subject_id)
+
+            # 如果未收藏，则先标记为在看，再点单集格子
+            if not data:
+                yield self._op("add_collection_subject", subject_id=subject_id)
+                yield self._op("change_episode_state", ep_id=ep_id, state=2)
+                yield self._op("_ledger_record_episodes", subject_id, [ep_id])
+                return 2
+            subject_type = data.get("type")
+
+        # 如果整部番已看过则跳过
+        if subject_type == 2:
+            return 0
+        #  如果条目状态是想看或搁置则调整为在看
+        if subject_type in (1, 4):
+            yield self._op("change_collection_state", subject_id=subject_id, state=3)
+
+        if account is not None:
+            # 账本启用时按本地记录判断单集是否看过；条目尚无章节记录时先读取一次
+            yield self._op("_seed_episode_ledger", account, subject_id)
+            if (yield self._op("_ledger_watched", account, [ep_id])):
+                return 0
+        else:
+            ep_data = yield self._op("get_ep_collection", ep_id)
+            logger.debug(ep_data)
+            # 如果单集已看过则跳过
+            if ep_data.get("type") == 2:
+                return 0
+        # 否则直接点单集格子
+        yield self._op("change_episode_state", ep_id=ep_id, state=2)
+        yield self._op("_ledger_record_episodes", subject_id, [ep_id])
+        return 1
+
+    def _mark_episodes_walk(self, subject_id, ep_ids):
+        """
+        批量标记同一条目下的多集为看过（以 _op 请求客户端方法）：一次读取条目章节
+        收藏状态，跳过已看过的章节，其余章节一次 PATCH 标记。返回 {ep_id: 状态}，
+        状态含义同 _mark_episode_walk。
+        """
+        ep_ids = list(dict.fromkeys(ep_ids))
+        account = yield self._op("_refresh_collection_ledger")
+        subject_type = yield self._op("_ledger_subject_type", account, subject_id)
+        if subject_type is None:
+            data = yield self._op("get_subject_collection", subject_id)
+
+            # 如果未收藏，则先标记为在看，再批量点格子
+            if not data:
+                yield self._op("add_collection_subject", subject_id=subject_id)
+                yield self._op("change_episodes_state", subject_id, ep_ids, state=2)
+                return dict.fromkeys(ep_ids, 2)
+            subject_type = data.get("type")
+
+        # 如果整部番已看过则跳过
+        if subject_type == 2:
+            return dict.fromkeys(ep_ids, 0)
+        #  如果条目状态是想看或搁置则调整为在看
+        if subject_type in (1, 4):
+            yield self._op("change_collection_state", subject_id=subject_id, state=3)
+
+        if account is not None:
+            yield self._op("_seed_episode_ledger", account, subject_id)
+            watched = yield self._op("_ledger_watched", account, ep_ids)
+        else:
+            watched = self._watched_episode_ids(
+                (yield self._op("get_subject_ep_collections", subject_id))
+            )
+        pending = [ep_id for ep_id in ep_ids if str(ep_id) not in watched]
+        if pending:
+            yield self._op("change_episodes_state", subject_id, pending, state=2)
+        return {ep_id: 0 if str(ep_id) in watched else 1 for ep_id in ep_ids}
+
+    def _search_task_walk(self, task: SearchTask):
+        """执行单个搜索策略（以 _op 请求客户端方法）"""
+        if task.kind == "v0":
+            return (
+                yield self._op(
+                    "search",
+                    title=task.title,
+                    start_date=task.start_date,
+                    end_date=task.end_date,
+                )
+            )
+        bgm_data_old = yield self._op("search_old", title=task.title)
+        if not bgm_data_old:
+            return None
+        # 旧版接口返回数据不含 infobox 别名信息，需拉取完整条目进行准确相似度计算
+        return (yield self._op("get_subject", bgm_data_old[0]["id"]))
+
+    @staticmethod
+    def _get_episode_sync_limits() -> tuple[int, int]:
+        try:
+            from ..core.config import config_manager
+
+            return config_manager.get_episode_sync_limits()
+        except Exception:
+            return 100, 9999
+
+    @staticmethod
+    def _parse_iso_date_ymd(value: Optional[str]) -> Optional[datetime.date]:
+        if not value:
+            return None
+        m = re.match(r"(\d{4})-(\d{1,2})-(\d{1,2})", value.strip())
+        if not m:
+            return None
+        try:
+            return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            return None
+
+    _CN_NUM = {
+        "一": 1,
+        "二": 2,
+        "三": 3,
+        "四": 4,
+        "五": 5,
+        "六": 6,
+        "七": 7,
+        "八": 8,
+        "九": 9,
+        "十": 10,
+    }
+
+    def _extract_season_number(self, name: str, name_cn: str) -> Optional[int]:
+        """从名称中提取季度编号，用于续集链季度去重计数"""
+        text = f"{name} {name_cn}"
+        # "第X期" / "第X季"（阿拉伯数字）
+        m = re.search(r"第\s*(\d+)\s*[期季]", text)
+        if m:
+            return int(m.group(1))
+        # "第X期" / "第X季"（中文数字）
+        m = re.search(r"第\s*([一二三四五六七八九十]+)\s*[期季]", text)
+        if m:
+            cn = m.group(1)
+            if len(cn) == 1:
+                return self._CN_NUM.get(cn)
+            # "十一"~"十九"
+            if cn.startswith("十"):
+                return 10 + self._CN_NUM.get(cn[1], 0)
+            return self._CN_NUM.get(cn)
+        # "Xnd/Xrd/Xth season"
+        m = re.search(r"(\d+)(?:st|nd|rd|th)\s+season", text, re.IGNORECASE)
+        if m:
+            return int(m.group(1))
+        return None
+
+    def _match_target_ep_rows(self, ep_info: list, target_ep: int):
+        """与 target_season>1 分支一致的章节匹配规则。"""
+        rows = [i for i in ep_info if i.get("sort") == target_ep]
+        if not rows:
+            rows = [
+                i
+                for i in ep_info
+                if i.get("ep") == target_ep and i.get("ep", 0) <= i.get("sort", 0)
+            ]
+        return rows
+
+    @staticmethod
+    def _drive_walk(walk, answer):
+        """执行 *_walk 生成器：逐个应答其 yield 的请求（应答出错时把异常抛回生成器），
+        返回其结果"""
+        try:
+            request = next(walk)
+            while True:
+                try:
+                    value = answer(request)
+                except Exception as e:
+                    request = walk.throw(e)
+                else:
+                    request = walk.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+    def _season_walk(
+        self,
+        subject_id,
+        target_season: int,
+        target_ep: int,
+        is_season_subject_id: bool = False,
+        release_date: Optional[str] = None,
+    ):
+        """
+        季度/集数解析规则（不涉及 I/O）。以 (操作, subject_id, ...) 的形式 yield 数据请求：
+        subject（条目）、next（首个续集 ID）、episodes（章节首页）、find（按 sort 查找
+        章节）与 fallback（匹配失败后的回退）。同步客户端、异步客户端与续集关系图
+        分别应答这些请求，三者共用同一套解析规则。
+        """
+        season_num = 1
+        current_id = subject_id
+
+        # 获取根条目的 subject type，续集链遍历时仅放行相同媒体类型的条目
+        root_info = yield ("subject", subject_id)
+        root_type = root_info.get("type") if root_info else None
+
+        # 如果已经是目标季数的ID，直接尝试匹配集数
+        if is_season_subject_id:
+            logger.debug(
+                f"直接尝试从指定季度ID匹配集数: {subject_id}, 目标季度: {target_season}, 目标集数: {target_ep}"
+            )
+            if not target_ep:
+                return current_id
+
+            found = yield ("find", current_id, target_ep)
+            if found:
+                return current_id, found["id"]
+
+            logger.debug(
+                f"在指定季度ID中未找到匹配的集数: {subject_id}, 目标集数: {target_ep}"
+            )
+            logger.debug("回退到传统方式查找集数")
+
+        if target_season == 1:
+            if not target_ep:
+                return current_id
+            first_part = True
+            for _ in range(MAX_GRAPH_HOPS + 1):
+                if not first_part:
+                    current_info = yield ("subject", current_id)
+                    if not current_info:
+                        break
+                    if root_type is not None and current_info.get("type") != root_type:
+                        break
+                found = yield ("find", current_id, target_ep)
+                if found:
+                    return current_id, found["id"]
+                episodes = yield ("episodes", current_id)
+                ep_info = episodes.get("data", [])
+                if not ep_info:
+                    logger.debug(f"未获取到剧集信息: {current_id}")
+                    break
+                normal_season = (
+                    episodes.get("total", 0) > 3 and ep_info[0].get("sort", 0) <= 1
+                )
+                if not first_part and normal_season:
+                    break
+                next_id = yield ("next", current_id)
+                if next_id is None:
+                    break
+                current_id = next_id
+                first_part = False
+            return (yield ("fallback", subject_id, target_ep, release_date))
+
+        # Plex 季数与 Bangumi 多期/续集计数不一致时，用播出日 + 章节 airdate 择优
+        if release_date and target_season > 1 and target_ep:
+            air_pick = yield from self._airdate_walk(
+                subject_id, target_ep, release_date, root_type=root_type
+            )
+            if air_pick is not None:
+                return air_pick[0], air_pick[1]
+
+        last_season_num = None
+        for _ in range(MAX_GRAPH_HOPS):
+            next_id = yield ("next", current_id)
+            if next_id is None:
+                break
+            current_id = next_id
+            current_info = yield ("subject", current_id)
+            if not current_info:
+                continue
+            if root_type is not None and current_info.get("type") != root_type:
+                continue
+            episodes = yield ("episodes", current_id)
+            ep_info = episodes.get("data", [])
+            if not ep_info:
+                logger.debug(f"未获取到剧集信息: {current_id}")
+                break
+            sort_rows = [i for i in ep_info if i.get("sort") == target_ep]
+            _target_ep = self._match_target_ep_rows(ep_info, target_ep)
+            ep_found = bool(target_ep and _target_ep)
+
+            sn = self._extract_season_number(
+                current_info.get("name", ""), current_info.get("name_cn", "")
+            )
+            if sn is not None and sn != last_season_num:
+                season_num += 1
+                last_season_num = sn
+            elif sn is None:
+                if not sort_rows:
+                    if (
+                        target_ep
+                        and _target_ep
+                        and "第2部分" not in current_info.get("name_cn", "")
+                    ):
+                        season_num += 1
+                elif any(ep.get("sort") == 1 for ep in ep_info):
+                    season_num += 1
+                    last_season_num = None
+            if season_num > target_season:
+                break
+            if season_num == target_season:
+                if not target_ep:
+                    return current_id
+                if target_ep > 99:
+                    found = yield ("find", current_id, target_ep)
+                    if found:
+                        return current_id, found["id"]
+                if not ep_found:
+                    continue
+                return current_id, _target_ep[0]["id"]
+        return (yield ("fallback", subject_id, target_ep, release_date))
 
+    def _airdate_walk(
+        self,
+        subject_id,
+        target_ep: int,
+        release_date: str,
+        max_hops: int = 15,
+        max_days_diff: int = 120,
+        root_type: Optional[int] = None,
+    ):
+        """
+        沿「续集」链查找与 release_date 最接近的 target_ep 章节（用于 Plex 季数与 Bangumi
+        分段不一致）。仅在存在有效 airdate 且与播出日差距不超过 max_days_diff 时返回。
+        数据请求形式同 _season_walk。
+        """
+        target_day = self._parse_iso_date_ymd(release_date)
+        if not target_day:
+            return None
+
+        candidates: list[
+            tuple[Union[str, int], Union[str, int], int, int]
+        ] = []  # sid, ep_id, diff_days, hop
+        current_id: Union[str, int] = subject_id
+        for hop in range(max_hops):
+            nxt = yield ("next", current_id)
+            if nxt is None:
+                break
+            current_id = nxt
+            current_info = yield ("subject", current_id)
+            if not current_info:
+                continue
+            if root_type is not None and current_info.get("type") != root_type:
+                continue
+            episodes = yield ("episodes", current_id)
+            ep_info = episodes.get("data", [])
+            if not ep_info:
+                continue
+            rows = self._match_target_ep_rows(ep_info, target_ep)
+            if not rows:
+                continue
+            ep_day = self._parse_iso_date_ymd((rows[0].get("airdate") or "").strip())
+            if not ep_day:
+                continue
+            diff_days = abs((ep_day - target_day).days)
+            candidates.append((current_id, rows[0]["id"], diff_days, hop))
+
+        if not candidates:
+            return None
+        # 日期差最小；并列时取续集链更靠后的条目（通常更新）
+        best = min(candidates, key=lambda x: (x[2], -x[3]))
+        if best[2] > max_days_diff:
+            return None
+        logger.debug(
+            f"按 airdate 择优续集链匹配: subject_id={best[0]} ep_id={best[1]} "
+            f"与播出日相差 {best[2]} 天"
+        )
+        return best[0], best[1]
+
+    def _peek_cache(self, category: str, key):
+        """读取实例缓存但不计入命中统计、不检查有效期；未命中返回 None"""
+        with self._cache_lock:
+            return self._cache[category].get(key)
+
+    def _observe_walk(self, seen: Optional[dict], request: tuple, value) -> None:
+        """记录一次网络解析中各条目实际取得的数据，解析结束后写入续集关系图"""
+        if seen is None:
+            return
+        op, sid = request[0], request[1]
+        parts = seen.setdefault(str(sid), {})
+        if op == "subject":
+            parts["subject"] = value
+        elif op == "next":
+            parts["sequels"] = [] if value is None else [value]
+        elif op == "episodes":
+            parts["episodes"] = value
+        elif op == "find":
+            # 章节查找经由实例缓存取数，取回同一份数据（不发请求）
+            if request[2] > EPISODE_INDEX_MIN_SORT:
+                index = self._peek_cache("episode_index", (sid, 0))
+                if isinstance(index, EpisodeIndex) and index.complete:
+                    parts["index"] = index
+            elif "episodes" not in parts:
+                episodes = self._peek_cache("get_episodes", (sid, 0, False))
+                if episodes is not None:
+                    parts["episodes"] = episodes
+
+    def _record_sequel_walk(self, seen: Optional[dict]) -> None:
+        """把解析中访问过的条目写入续集关系图（仅含本次已取得的数据）"""
+        if not seen or self._sequel_graph is None:
+            return
+        try:
+            self._sequel_graph.record_walk(seen)
+        except Exception as e:
+            logger.debug(f"记录续集关系图失败: {e}")
+
+    @staticmethod
+    def _search_result(task, bgm_data):
+        """bgm_search 的返回值；记录采用的搜索"""
+        if not bgm_data:
+            return None
+        if task is not None and task.start_date:
+            window = f"{task.start_date} 至 {task.end_date}"
+        else:
+            window = "无日期 至 无日期"
+        logger.debug(f"搜索日期区间: {window} | 结果: {bgm_data[0].get('name')}")
+        return bgm_data
+
+    @staticmethod
+    def title_diff_ratio(title, ori_title, bgm_data):
+        ori_title = ori_title or title
+        candidates = []
+
+        # 提取基础候选项：原名与中文名
+        if bgm_data.get("name"):
+            candidates.append(bgm_data["name"])
+        if bgm_data.get("name_cn"):
+            candidates.append(bgm_data["name_cn"])
+
+        # 提取 infobox 中的别名，兼容多种历史数据格式
+        infobox = bgm_data.get("infobox", [])
+        if isinstance(infobox, list):
+            for info in infobox:
+                if info.get("key") == "别名":
+                    alias_value = info.get("value")
+                    if isinstance(alias_value, list):
+                        for alias_item in alias_value:
+                            if isinstance(alias_item, dict) and "v" in alias_item:
+                                candidates.append(alias_item["v"])
+                            elif isinstance(alias_item, str):
+                                candidates.append(alias_item)
+                    elif isinstance(alias_value, str):
+                        candidates.append(alias_value)
+                    break
+
+        # 计算所有候选项的相似度，取最大值
+        max_ratio = 0.0
+        for candidate in candidates:
+            if not candidate:
+                continue
+
+            ratio_title = fuzz.ratio(candidate, title) / 100.0
+            ratio_ori = fuzz.ratio(candidate, ori_title) / 100.0
+            max_ratio = max(max_ratio, ratio_title, ratio_ori)
+
+            # 若发现完全匹配，提前返回
+            if max_ratio >= 1.0:
+                return 1.0
+
+        return max_ratio
+
+
+class BangumiApi(BangumiApiBase):
+    _TRANSPORT_ERRORS = (requests.exceptions.RequestException,)
 
-class BangumiApi:
     def __init__(
         self,
         username=None,
@@ -28,6 +1049,10 @@ class BangumiApi:
         ssl_verify=True,
         bgm_api_proxy=None,
         bgm_next_proxy=None,
+        cache_ttl: Optional[dict[str, float]] = None,
+        metadata_cache=None,
+        sequel_graph=None,
+        collection_ledger=None,
     ):
         self.api_base = (
             bgm_api_proxy.rstrip("/") if bgm_api_proxy else "https://api.bgm.tv"
@@ -42,22 +1067,14 @@ class BangumiApi:
         self.private = private
         self.http_proxy = http_proxy
         self.ssl_verify = ssl_verify
-        self.req = requests.Session()
-        self._req_not_auth = requests.Session()
+        # 会话各自保存认证头与代理，连接池由 http_transport 的共享适配器提供
+        self.req = mount_pooled_adapter(requests.Session())
+        self._req_not_auth = mount_pooled_adapter(requests.Session())
 
-        # 代理失败标记：一旦代理失败，后续请求都直接使用直连
-        self._proxy_failed = False
+        # 候选线路（反向代理 / HTTP 代理 / 直连），由 bgm_route_manager 按实测数据排序
+        self._routes = build_routes(self.api_base, http_proxy, ssl_verify)
 
-        # 实例级别的带大小限制缓存，避免无限增长
-        _MAX_CACHE_SIZE = 200
-        self._cache = {
-            "search": OrderedDict(),
-            "search_old": OrderedDict(),
-            "get_subject": OrderedDict(),
-            "get_related_subjects": OrderedDict(),
-            "get_episodes": OrderedDict(),
-        }
-        self._max_cache_size = _MAX_CACHE_SIZE
+        self._init_cache(cache_ttl, metadata_cache, sequel_graph, collection_ledger)
 
         # 如果禁用SSL验证，抑制urllib3的警告
         if not ssl_verify:
@@ -74,13 +1091,58 @@ class BangumiApi:
         )
         self.init()
 
-    def _put_cache(self, category: str, key, value) -> None:
-        """写入缓存并淘汰超限条目（LRU）"""
-        cache = self._cache[category]
-        cache[key] = value
-        cache.move_to_end(key)
-        while len(cache) > self._max_cache_size:
-            cache.popitem(last=False)
+    def _get_persistent(self, category: str, key, subject_id, fetch):
+        """读取二级缓存；过期但仍在宽限期内时返回旧值并在后台用 fetch 刷新"""
+        if self._metadata_cache is None:
+            return _CACHE_MISS
+
+        def _refresh():
+            value = fetch()
+            self._put_cache(category, key, value)
+            self._put_persistent(category, key, subject_id, value)
+
+        try:
+            value = self._metadata_cache.get(
+                category,
+                self._persist_key(key),
+                refresh=_refresh,
+                scope=self._persist_scope(),
+            )
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 元数据缓存失败: {e}")
+            return _CACHE_MISS
+        return _CACHE_MISS if value is None else value
+
+    def _cached_fetch(self, category: str, key, subject_id, fetch):
+        """依次查询实例缓存、二级缓存，均未命中时调用 fetch 并回填两级缓存"""
+        cached = self._get_cache(category, key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        persisted = self._get_persistent(category, key, subject_id, fetch)
+        if persisted is not _CACHE_MISS:
+            self._put_cache(category, key, persisted)
+            return persisted
+
+        def _fetch_and_persist():
+            value = fetch()
+            self._put_persistent(category, key, subject_id, value)
+            return value
+
+        value = bgm_single_flight.do(
+            self._account_flight_key(category, self._persist_key(key)),
+            _fetch_and_persist,
+        )
+        self._put_cache(category, key, value)
+        return value
+
+    def close(self) -> None:
+        """关闭底层 HTTP 会话"""
+        for session in (self.req, self._req_not_auth):
+            try:
+                session.close()
+            except Exception:
+                pass
 
     def init(self):
         for r in self.req, self._req_not_auth:
@@ -98,241 +1160,77 @@ class BangumiApi:
             k: v for k, v in self._req_not_auth.headers.items() if k != "Authorization"
         }
 
-    def _try_direct_connection(self, method, url, **kwargs):
-        """尝试直连（不使用代理）"""
-        logger.info(f"🔄 尝试直连: {url}")
-
-        # 创建一个临时的session，不使用代理
-        temp_session = requests.Session()
-        temp_session.headers.update(
-            {
-                "Accept": "application/json",
-                "User-Agent": "SanaeMio/Bangumi-syncer (https://github.com/SanaeMio/Bangumi-syncer)",
-            }
-        )
-
-        if self.access_token:
-            temp_session.headers.update(
-                {"Authorization": f"Bearer {self.access_token}"}
-            )
-
-        # 明确设置不使用代理
-        temp_session.proxies = {}
-
-        # 移除kwargs中可能存在的代理设置
-        kwargs_copy = kwargs.copy()
-        if "proxies" in kwargs_copy:
-            del kwargs_copy["proxies"]
-
-        # 设置较短的超时时间，避免直连等待过久
-        if "timeout" not in kwargs_copy:
-            kwargs_copy["timeout"] = 15
-
-        try:
-            if method.upper() == "GET":
-                res = temp_session.get(url, **kwargs_copy)
-            elif method.upper() == "POST":
-                res = temp_session.post(url, **kwargs_copy)
-            elif method.upper() == "PUT":
-                res = temp_session.put(url, **kwargs_copy)
-            elif method.upper() == "PATCH":
-                res = temp_session.patch(url, **kwargs_copy)
-            else:
-                raise ValueError(f"不支持的HTTP方法: {method}")
-
-            # 检查响应状态
-            if res.status_code < 400:
-                return res
-            else:
-                logger.warning(f"⚠️  直连请求返回错误状态码: {res.status_code}")
-                return None
-
-        except Exception as e:
-            logger.error(f"直连请求失败: {str(e)}")
-            raise e
-        finally:
-            temp_session.close()
-
-    def _diagnose_network_issue(self, url):
-        """诊断网络连接问题"""
-        from urllib.parse import urlparse
-
-        parsed = urlparse(url)
-        hostname = parsed.hostname
-        port = parsed.port or (443 if parsed.scheme == "https" else 80)
-
-        logger.info(f"🔍 开始网络诊断 - 目标: {hostname}:{port}")
-
-        # 1. DNS解析测试
-        try:
-            ip_list = socket.getaddrinfo(
-                hostname, port, socket.AF_UNSPEC, socket.SOCK_STREAM
-            )
-            ips = [ip[4][0] for ip in ip_list]
-            logger.info(f"✅ DNS解析成功: {hostname} -> {', '.join(set(ips))}")
-        except socket.gaierror as e:
-            logger.error(f"❌ DNS解析失败: {e}")
-            logger.info("💡 建议检查:")
-            logger.info("   1. 网络连接是否正常")
-            logger.info("   2. DNS设置是否正确 (可尝试8.8.8.8或114.114.114.114)")
-            logger.info("   3. 是否需要配置代理")
-            return
-        except Exception as e:
-            logger.error(f"❌ DNS解析异常: {e}")
-            return
-
-        # 2. TCP连接测试
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(10)
-            result = sock.connect_ex((ips[0], port))
-            sock.close()
-
-            if result == 0:
-                logger.info(f"✅ TCP连接成功: {ips[0]}:{port}")
-            else:
-                logger.error(f"❌ TCP连接失败: {ips[0]}:{port} (错误码: {result})")
-                logger.info("💡 建议检查:")
-                logger.info("   1. 防火墙设置")
-                logger.info("   2. 网络代理配置")
-                logger.info("   3. 是否需要VPN或其他网络工具")
-        except Exception as e:
-            logger.error(f"❌ TCP连接测试异常: {e}")
-
-    def _request_with_retry(self, method, session, url, max_retries=3, **kwargs):
-        """带重试机制的请求方法（支持代理失败后直连重试）"""
+    @staticmethod
+    def _session_request(session, method, url, **kwargs):
+        if method.upper() == "GET":
+            return session.get(url, **kwargs)
+        elif method.upper() == "POST":
+            return session.post(url, **kwargs)
+        elif method.upper() == "PUT":
+            return session.put(url, **kwargs)
+        elif method.upper() == "PATCH":
+            return session.patch(url, **kwargs)
+        raise ValueError(f"不支持的HTTP方法: {method}")
+
+    def _status_error(self, message: str, res) -> Exception:
+        return requests.exceptions.HTTPError(message)
+
+    def _request_with_retry(
+        self, method, session, url, max_retries=3, hedge=False, **kwargs
+    ):
+        """带重试机制的请求方法，重试、熔断与线路策略见 _request_walk"""
         kwargs.setdefault("timeout", 15)
-        dns_error_occurred = False
-
-        # 如果之前代理已经失败过，直接使用直连
-        if self.http_proxy and self._proxy_failed:
-            logger.info("💡 检测到代理之前已失败，本次请求直接使用直连")
-            try:
-                return self._try_direct_connection(method, url, **kwargs)
-            except Exception as e:
-                logger.error(f"直连请求失败: {str(e)}")
-                raise e
-
-        for attempt in range(max_retries + 1):
-            try:
-                # 添加SSL验证配置
-                kwargs["verify"] = self.ssl_verify
-
-                if method.upper() == "GET":
-                    res = session.get(url, **kwargs)
-                elif method.upper() == "POST":
-                    res = session.post(url, **kwargs)
-                elif method.upper() == "PUT":
-                    res = session.put(url, **kwargs)
-                elif method.upper() == "PATCH":
-                    res = session.patch(url, **kwargs)
-                else:
-                    raise ValueError(f"不支持的HTTP方法: {method}")
-
-                # 检查是否需要重试的状态码
-                if res.status_code in [429, 500, 502, 503, 504]:
-                    if attempt < max_retries:
-                        delay = 2**attempt  # 指数退避: 2, 4, 8秒
-                        logger.error(
-                            f"HTTP {res.status_code} 错误，第 {attempt + 1}/{max_retries} 次重试，{delay}秒后重试"
-                        )
-                        time.sleep(delay)
-                        continue
-                    else:
-                        logger.error(
-                            f"HTTP {res.status_code} 错误，已达到最大重试次数 {max_retries}"
-                        )
-                        # 发送API错误通知
-                        from .notifier import send_notify
-
-                        send_notify(
-                            "api_error",
-                            status_code=res.status_code,
-                            url=url,
-                            method=method,
-                            error_message=f"HTTP {res.status_code} 错误，已达到最大重试次数 {max_retries}",
-                            retry_count=attempt + 1,
-                        )
-                        raise requests.exceptions.HTTPError(
-                            f"HTTP {res.status_code} 错误，已达到最大重试次数"
-                        )
-
-                return res
-
-            except (
-                requests.exceptions.Timeout,
-                requests.exceptions.ConnectionError,
-                requests.exceptions.RequestException,
-            ) as e:
-                # 检查是否是DNS解析错误
-                if "Failed to resolve" in str(
-                    e
-                ) or "Temporary failure in name resolution" in str(e):
-                    dns_error_occurred = True
-
-                if attempt < max_retries:
-                    delay = 2**attempt  # 指数退避: 2, 4, 8秒
-                    logger.error(
-                        f"请求异常: {str(e)}，第 {attempt + 1}/{max_retries} 次重试，{delay}秒后重试"
-                    )
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error(
-                        f"请求异常: {str(e)}，已达到最大重试次数 {max_retries}"
+        # 添加SSL验证配置
+        kwargs["verify"] = self.ssl_verify
+
+        def _answer(request):
+            op = request[0]
+            if op == "acquire":
+                return bgm_rate_limiter.acquire(request[1])
+            if op == "send":
+                _, route, routed, via_route = request
+                if via_route:
+                    return self._session_request(
+                        session,
+                        method,
+                        routed,
+                        proxies=route.requests_proxies,
+                        **kwargs,
                     )
+                return self._session_request(session, method, routed, **kwargs)
+            if op == "hedge":
+                _, primary, backup, delay, backup_route = request
+                return bgm_route_manager.run_hedged(
+                    lambda: self._drive_walk(primary, _answer),
+                    lambda: self._drive_walk(backup, _answer),
+                    delay,
+                    backup_route,
+                )
+            if op == "sleep":
+                return time.sleep(request[1])
+            return self._diagnose_network_issue(url)
 
-                    # 如果配置了代理且重试失败，尝试直连
-                    if self.http_proxy:
-                        logger.warning("⚠️  代理请求失败，尝试抛弃代理直连...")
-
-                        # 尝试直连（不使用代理）
-                        try:
-                            direct_result = self._try_direct_connection(
-                                method, url, **kwargs
-                            )
-                            if direct_result:
-                                # 标记代理已失败，后续请求直接使用直连
-                                self._proxy_failed = True
-                                logger.info("✅ 直连成功！已成功绕过代理问题")
-                                return direct_result
-                        except Exception as direct_error:
-                            logger.error(f"❌ 直连也失败了: {str(direct_error)}")
-
-                    # 如果是DNS错误，进行网络诊断
-                    if dns_error_occurred:
-                        logger.warning("⚠️  检测到DNS解析问题，开始网络诊断...")
-                        self._diagnose_network_issue(url)
-
-                    raise e
-
-    def _check_auth_error(self, res):
-        """统一检查认证错误"""
-        if res.status_code == 401:
-            error_msg = "Bangumi API 认证失败: access_token可能已过期（有效期1年）或无效，请更新token"
-            logger.error(error_msg)
-
-            # 发送API认证失败通知（webhook和邮件）
-            from .notifier import send_notify
-
-            send_notify(
-                "api_auth_error",
-                user_name=self.username,
-                status_code=res.status_code,
-                error_message=error_msg,
-            )
-
-            raise ValueError(error_msg)
-        return res
+        return self._drive_walk(
+            self._request_walk(method, url, max_retries, hedge), _answer
+        )
 
     def get(self, path, params=None):
         logger.debug(
             f"BangumiApi GET请求: {self.host}/{path}, 代理: {self.req.proxies if self.req.proxies else '无'}"
         )
-        res = self._request_with_retry(
-            "GET", self.req, f"{self.host}/{path}", params=params
-        )
-        return self._check_auth_error(res)
+        url = f"{self.host}/{path}"
+
+        def _request():
+            res = self._check_auth_error(
+                self._request_with_retry(
+                    "GET", self.req, url, params=params, hedge=True
+                )
+            )
+            # 读取响应体，合并的调用方共享同一响应时无需再读网络流
+            _ = res.content
+            return res
+
+        return bgm_single_flight.do(self._flight_key("GET", url, params), _request)
 
     def post(self, path, _json, params=None):
         logger.debug(
@@ -375,33 +1273,31 @@ class BangumiApi:
     def search(self, title, start_date, end_date, limit=5, list_only=True):
         # 使用实例缓存避免内存泄漏
         cache_key = (title, start_date, end_date, limit, list_only)
-        if cache_key in self._cache["search"]:
-            return self._cache["search"][cache_key]
-
-        res = self._request_with_retry(
-            "POST",
-            self._req_not_auth,
-            f"{self.host}/search/subjects",
-            json={
-                "keyword": title,
-                "filter": {
-                    "type": [2],
-                    "air_date": [f">={start_date}", f"<{end_date}"],
-                    "nsfw": True,
+        cached = self._get_cache("search", cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        def _search():
+            res = self._request_with_retry(
+                "POST",
+                self._req_not_auth,
+                f"{self.host}/search/subjects",
+                json={
+                    "keyword": title,
+                    "filter": {
+                        "type": [2],
+                        "air_date": [f">={start_date}", f"<{end_date}"],
+                        "nsfw": True,
+                    },
                 },
-            },
-            params={"limit": limit},
-        )
-        try:
-            res = res.json()
-            # 确保返回的是字典类型
-            if not isinstance(res, dict):
-                logger.error(f"search API返回非字典类型: {type(res)}, 内容: {res}")
-                res = {"data": []}
-        except Exception as e:
-            logger.error(f"search JSON解析失败: {e}")
-            res = {"data": []}
+                params={"limit": limit},
+            )
+            return self._json_or(res, (dict,), {"data": []}, "search")
 
+        # 搜索为匿名请求，跨账号合并
+        res = bgm_single_flight.do(
+            ("search", self.host, title, start_date, end_date, limit), _search
+        )
         result = res.get("data", []) if list_only else res
         self._put_cache("search", cache_key, result)
         return result
@@ -409,77 +1305,50 @@ class BangumiApi:
     def search_old(self, title, list_only=True):
         # 使用实例缓存避免内存泄漏
         cache_key = (title, list_only)
-        if cache_key in self._cache["search_old"]:
-            return self._cache["search_old"][cache_key]
+        cached = self._get_cache("search_old", cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        def _search_old():
+            res = self._request_with_retry(
+                "GET",
+                self.req,
+                f"{self.api_base}/search/subject/{title}",
+                params={"type": 2},
+            )
+            return self._json_or(res, (dict,), {"results": 0, "list": []}, "search_old")
 
-        res = self._request_with_retry(
-            "GET",
-            self.req,
-            f"{self.api_base}/search/subject/{title}",
-            params={"type": 2},
+        res = bgm_single_flight.do(
+            self._account_flight_key("search_old", self.api_base, title), _search_old
         )
-        try:
-            res = res.json()
-            # 确保返回的是字典类型
-            if not isinstance(res, dict):
-                logger.error(f"search_old API返回非字典类型: {type(res)}, 内容: {res}")
-                res = {"results": 0, "list": []}
-        except Exception as e:
-            logger.error(f"search_old JSON解析失败: {e}")
-            res = {"results": 0, "list": []}
-
         result = res.get("list", []) if list_only else res
         self._put_cache("search_old", cache_key, result)
         return result
 
     def get_subject(self, subject_id):
-        # 使用实例缓存避免内存泄漏
-        if subject_id in self._cache["get_subject"]:
-            return self._cache["get_subject"][subject_id]
+        return self._cached_fetch(
+            "get_subject",
+            subject_id,
+            subject_id,
+            lambda: self._fetch_subject(subject_id),
+        )
 
+    def _fetch_subject(self, subject_id):
         res = self.get(f"subjects/{subject_id}")
-        try:
-            res = res.json()
-            # 确保返回的是字典类型
-            if not isinstance(res, dict):
-                logger.error(f"get_subject API返回非字典类型: {type(res)}, 内容: {res}")
-                res = {}
-        except Exception as e:
-            logger.error(f"get_subject JSON解析失败: {e}")
-            res = {}
-
-        self._put_cache("get_subject", subject_id, res)
-        return res
+        return self._json_or(res, (dict,), {}, "get_subject")
 
     def get_related_subjects(self, subject_id):
-        # 使用实例缓存避免内存泄漏
-        if subject_id in self._cache["get_related_subjects"]:
-            return self._cache["get_related_subjects"][subject_id]
+        return self._cached_fetch(
+            "get_related_subjects",
+            subject_id,
+            subject_id,
+            lambda: self._fetch_related_subjects(subject_id),
+        )
 
+    def _fetch_related_subjects(self, subject_id):
         res = self.get(f"subjects/{subject_id}/subjects")
-        try:
-            res = res.json()
-            # get_related_subjects 可能返回列表或字典，都是正常的
-            if not isinstance(res, (dict, list)):
-                logger.error(
-                    f"get_related_subjects API返回异常类型: {type(res)}, 内容: {res}"
-                )
-                res = []
-        except Exception as e:
-            logger.error(f"get_related_subjects JSON解析失败: {e}")
-            res = []
-
-        self._put_cache("get_related_subjects", subject_id, res)
-        return res
-
-    @staticmethod
-    def _get_episode_sync_limits() -> tuple[int, int]:
-        try:
-            from ..core.config import config_manager
-
-            return config_manager.get_episode_sync_limits()
-        except Exception:
-            return 100, 9999
+        # get_related_subjects 可能返回列表或字典，都是正常的
+        return self._json_or(res, (dict, list), [], "get_related_subjects")
 
     def _fetch_episodes_page(
         self,
@@ -499,61 +1368,77 @@ class BangumiApi:
                 "offset": offset,
             },
         )
-        try:
-            payload = res.json()
-            if not isinstance(payload, dict):
-                logger.error(
-                    f"get_episodes API返回非字典类型: {type(payload)}, 内容: {payload}"
-                )
-                return {"data": [], "total": 0}
-            return payload
-        except Exception as e:
-            logger.error(f"get_episodes JSON解析失败: {e}")
-            return {"data": [], "total": 0}
+        return self._json_or(res, (dict,), {"data": [], "total": 0}, "get_episodes")
 
     def get_episodes(self, subject_id, _type=0, fetch_all: bool = False):
-        # 使用实例缓存避免内存泄漏
-        cache_key = (subject_id, _type, fetch_all)
-        if cache_key in self._cache["get_episodes"]:
-            return self._cache["get_episodes"][cache_key]
+        return self._cached_fetch(
+            "get_episodes",
+            (subject_id, _type, fetch_all),
+            subject_id,
+            lambda: self._fetch_episodes(subject_id, _type, fetch_all),
+        )
 
+    def _fetch_episodes(self, subject_id, _type=0, fetch_all: bool = False) -> dict:
         if not fetch_all:
-            result = self._fetch_episodes_page(subject_id, _type)
-        else:
-            all_data: list = []
-            offset = 0
-            total = 0
-            while True:
-                page = self._fetch_episodes_page(
-                    subject_id, _type, limit=_EPISODES_PAGE_LIMIT, offset=offset
-                )
-                batch = page.get("data") or []
-                all_data.extend(batch)
-                total = int(page.get("total") or len(all_data))
-                if len(batch) < _EPISODES_PAGE_LIMIT or len(all_data) >= total:
-                    break
-                offset += _EPISODES_PAGE_LIMIT
-            result = {"data": all_data, "total": total}
+            return self._fetch_episodes_page(subject_id, _type)
+        all_data, total = self._fetch_all_episode_pages(subject_id, _type)
+        return {"data": all_data, "total": total}
+
+    def _fetch_all_episode_pages(self, subject_id, _type=0) -> tuple[list, int]:
+        """拉取全部章节：第一页得到总数后，其余分页并发请求"""
+        first = self._fetch_episodes_page(subject_id, _type)
+        all_data = list(first.get("data") or [])
+        total = int(first.get("total") or len(all_data))
+        if len(all_data) < _EPISODES_PAGE_LIMIT:
+            return all_data, total
+
+        offsets = range(_EPISODES_PAGE_LIMIT, total, _EPISODES_PAGE_LIMIT)
+        workers = min(_EPISODES_PAGE_CONCURRENCY, len(offsets))
+        if workers:
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="bgm-episodes"
+            ) as pool:
+                # 每个分页在调用方上下文的副本中执行（延迟重试等上下文变量随之传递）
+                futures = [
+                    pool.submit(
+                        contextvars.copy_context().run,
+                        self._fetch_episodes_page,
+                        subject_id,
+                        _type,
+                        offset=offset,
+                    )
+                    for offset in offsets
+                ]
+                for future in futures:
+                    all_data.extend(future.result().get("data") or [])
+        return all_data, total
+
+    def get_episode_index(self, subject_id, _type: int = 0) -> EpisodeIndex:
+        """条目的章节索引（sort / ep / 播出日 → 章节 ID），两级缓存"""
+        return self._cached_fetch(
+            "episode_index",
+            (subject_id, _type),
+            subject_id,
+            lambda: self._fetch_episode_index(subject_id, _type),
+        )
 
-        self._put_cache("get_episodes", cache_key, result)
-        return result
+    def _fetch_episode_index(self, subject_id, _type: int = 0) -> EpisodeIndex:
+        rows, total = self._fetch_all_episode_pages(subject_id, _type)
+        index = EpisodeIndex.from_episodes(rows, total, _type)
+        logger.debug(
+            f"章节索引已建立 subject_id={subject_id} 章节数={len(index)}/{total} "
+            f"占用 {index.nbytes} 字节"
+        )
+        return index
 
     def _find_episode_by_sort(
         self, subject_id, target_sort: int, _type: int = 0
     ) -> Optional[dict]:
-        """在 subject 内按 sort/ep 规则查找章节；ep>99 时优先 offset 快速路径。"""
-        if target_sort > 99:
-            page = self._fetch_episodes_page(
-                subject_id, _type, limit=1, offset=target_sort - 1
-            )
-            data = page.get("data") or []
-            if data and data[0].get("sort") == target_sort:
-                logger.debug(
-                    f"offset 快速路径命中 sort={target_sort} subject_id={subject_id}"
-                )
-                return data[0]
+        """在 subject 内按 sort/ep 规则查找章节；长篇（ep>99）使用章节索引。"""
+        if target_sort > EPISODE_INDEX_MIN_SORT:
+            return self.get_episode_index(subject_id, _type).find_by_sort(target_sort)
 
-        episodes = self.get_episodes(subject_id, _type, fetch_all=target_sort > 99)
+        episodes = self.get_episodes(subject_id, _type)
         ep_info = episodes.get("data") or []
         rows = self._match_target_ep_rows(ep_info, target_sort)
         return rows[0] if rows else None
@@ -573,28 +1458,15 @@ class BangumiApi:
         if not target_day:
             return None
 
-        episodes = self.get_episodes(subject_id, fetch_all=True)
-        total = int(episodes.get("total") or 0)
-        if total < min_total:
+        index = self.get_episode_index(subject_id)
+        if index.total < min_total:
             return None
 
-        ep_info = episodes.get("data") or []
-        candidates: list[tuple[dict, int]] = []
-        for ep in ep_info:
-            if ep.get("type", 0) != 0 and "type" in ep:
-                continue
-            air_raw = (ep.get("airdate") or "").strip()
-            ep_day = self._parse_iso_date_ymd(air_raw)
-            if not ep_day:
-                continue
-            diff_days = abs((ep_day - target_day).days)
-            if diff_days <= max_days_diff:
-                candidates.append((ep, diff_days))
-
-        if not candidates:
+        nearest = index.nearest_by_airdate(target_day, max_days_diff)
+        if nearest is None:
             return None
 
-        best_ep, best_diff = min(candidates, key=lambda x: x[1])
+        best_ep, best_diff = nearest
         logger.debug(
             f"单条目 airdate 择优: subject_id={subject_id} ep_id={best_ep['id']} "
             f"与播出日相差 {best_diff} 天"
@@ -614,79 +1486,20 @@ class BangumiApi:
             )
             if air_pick is not None:
                 return air_pick
-        return None, None if target_ep else None
-
-    @staticmethod
-    def _parse_iso_date_ymd(value: Optional[str]) -> Optional[datetime.date]:
-        if not value:
-            return None
-        m = re.match(r"(\d{4})-(\d{1,2})-(\d{1,2})", value.strip())
-        if not m:
-            return None
-        try:
-            return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-        except ValueError:
-            return None
-
-    def _sequel_next_tv_subject_id(self, current_id: Union[str, int]) -> Optional[int]:
-        related = self.get_related_subjects(current_id)
-        if isinstance(related, list):
-            nxt = [i for i in related if i.get("relation") == "续集"]
-        elif isinstance(related, dict):
-            related_list = related.get("data", [])
-            nxt = [i for i in related_list if i.get("relation") == "续集"]
-        else:
-            nxt = []
-        if not nxt:
-            return None
-        return nxt[0]["id"]
-
-    _CN_NUM = {
-        "一": 1,
-        "二": 2,
-        "三": 3,
-        "四": 4,
-        "五": 5,
-        "六": 6,
-        "七": 7,
-        "八": 8,
-        "九": 9,
-        "十": 10,
-    }
-
-    def _extract_season_number(self, name: str, name_cn: str) -> Optional[int]:
-        """从名称中提取季度编号，用于续集链季度去重计数"""
-        text = f"{name} {name_cn}"
-        # "第X期" / "第X季"（阿拉伯数字）
-        m = re.search(r"第\s*(\d+)\s*[期季]", text)
-        if m:
-            return int(m.group(1))
-        # "第X期" / "第X季"（中文数字）
-        m = re.search(r"第\s*([一二三四五六七八九十]+)\s*[期季]", text)
-        if m:
-            cn = m.group(1)
-            if len(cn) == 1:
-                return self._CN_NUM.get(cn)
-            # "十一"~"十九"
-            if cn.startswith("十"):
-                return 10 + self._CN_NUM.get(cn[1], 0)
-            return self._CN_NUM.get(cn)
-        # "Xnd/Xrd/Xth season"
-        m = re.search(r"(\d+)(?:st|nd|rd|th)\s+season", text, re.IGNORECASE)
-        if m:
-            return int(m.group(1))
-        return None
-
-    def _match_target_ep_rows(self, ep_info: list, target_ep: int):
-        """与 target_season>1 分支一致的章节匹配规则。"""
-        rows = [i for i in ep_info if i.get("sort") == target_ep]
-        if not rows:
-            rows = [
-                i
-                for i in ep_info
-                if i.get("ep") == target_ep and i.get("ep", 0) <= i.get("sort", 0)
-            ]
-        return rows
+        return None, None if target_ep else None
+
+    def _sequel_next_tv_subject_id(self, current_id: Union[str, int]) -> Optional[int]:
+        related = self.get_related_subjects(current_id)
+        if isinstance(related, list):
+            nxt = [i for i in related if i.get("relation") == "续集"]
+        elif isinstance(related, dict):
+            related_list = related.get("data", [])
+            nxt = [i for i in related_list if i.get("relation") == "续集"]
+        else:
+            nxt = []
+        if not nxt:
+            return None
+        return nxt[0]["id"]
 
     def get_movie_main_episode_id(
         self,
@@ -733,53 +1546,13 @@ class BangumiApi:
         max_days_diff: int = 120,
         root_type: Optional[int] = None,
     ) -> Optional[tuple[Union[str, int], Union[str, int]]]:
-        """
-        沿「续集」链查找与 release_date 最接近的 target_ep 章节（用于 Plex 季数与 Bangumi 分段不一致）。
-        仅在存在有效 airdate 且与播出日差距不超过 max_days_diff 时返回。
-        """
-        target_day = self._parse_iso_date_ymd(release_date)
-        if not target_day:
-            return None
-
-        candidates: list[
-            tuple[Union[str, int], Union[str, int], int, int]
-        ] = []  # sid, ep_id, diff_days, hop
-        current_id: Union[str, int] = subject_id
-        for hop in range(max_hops):
-            nxt = self._sequel_next_tv_subject_id(current_id)
-            if nxt is None:
-                break
-            current_id = nxt
-            current_info = self.get_subject(current_id)
-            if not current_info:
-                continue
-            if root_type is not None and current_info.get("type") != root_type:
-                continue
-            episodes = self.get_episodes(current_id)
-            ep_info = episodes.get("data", [])
-            if not ep_info:
-                continue
-            rows = self._match_target_ep_rows(ep_info, target_ep)
-            if not rows:
-                continue
-            air_raw = (rows[0].get("airdate") or "").strip()
-            ep_day = self._parse_iso_date_ymd(air_raw)
-            if not ep_day:
-                continue
-            diff_days = abs((ep_day - target_day).days)
-            candidates.append((current_id, rows[0]["id"], diff_days, hop))
-
-        if not candidates:
-            return None
-        # 日期差最小；并列时取续集链更靠后的条目（通常更新）
-        best = min(candidates, key=lambda x: (x[2], -x[3]))
-        if best[2] > max_days_diff:
-            return None
-        logger.debug(
-            f"按 airdate 择优续集链匹配: subject_id={best[0]} ep_id={best[1]} "
-            f"与播出日相差 {best[2]} 天"
+        """沿「续集」链查找与 release_date 最接近的 target_ep 章节（见 _airdate_walk）"""
+        return self._drive_walk(
+            self._airdate_walk(
+                subject_id, target_ep, release_date, max_hops, max_days_diff, root_type
+            ),
+            self._walk_answer,
         )
-        return best[0], best[1]
 
     def get_target_season_episode_id(
         self,
@@ -789,175 +1562,77 @@ class BangumiApi:
         is_season_subject_id: bool = False,
         release_date: Optional[str] = None,
     ):
-        season_num = 1
-        current_id = subject_id
         max_season, max_episode = self._get_episode_sync_limits()
-
         if target_season > max_season or (target_ep and target_ep > max_episode):
             return None, None if target_ep else None
 
-        # 获取根条目的 subject type，续集链遍历时仅放行相同媒体类型的条目
-        root_info = self.get_subject(subject_id)
-        root_type = root_info.get("type") if root_info else None
-
-        # 如果已经是目标季数的ID，直接尝试匹配集数
-        if is_season_subject_id:
-            logger.debug(
-                f"直接尝试从指定季度ID匹配集数: {subject_id}, 目标季度: {target_season}, 目标集数: {target_ep}"
-            )
-            if not target_ep:
-                return current_id
-
-            found = self._find_episode_by_sort(current_id, target_ep)
-            if found:
-                return current_id, found["id"]
-
-            logger.debug(
-                f"在指定季度ID中未找到匹配的集数: {subject_id}, 目标集数: {target_ep}"
-            )
-            logger.debug("回退到传统方式查找集数")
-
-        if target_season == 1:
-            if not target_ep:
-                return current_id
-            fist_part = True
-            while True:
-                if not fist_part:
-                    current_info = self.get_subject(current_id)
-                    if not current_info:
-                        continue
-                    if root_type is not None and current_info.get("type") != root_type:
-                        continue
-                found = self._find_episode_by_sort(current_id, target_ep)
-                if found:
-                    return current_id, found["id"]
-                episodes = self.get_episodes(current_id)
-                ep_info = episodes.get("data", [])
-                if not ep_info:
-                    logger.debug(f"未获取到剧集信息: {current_id}")
-                    break
-                normal_season = (
-                    True
-                    if episodes.get("total", 0) > 3 and ep_info[0].get("sort", 0) <= 1
-                    else False
-                )
-                if not fist_part and normal_season:
-                    break
-                related = self.get_related_subjects(current_id)
-                if isinstance(related, list):
-                    next_id = [i for i in related if i.get("relation") == "续集"]
-                elif isinstance(related, dict):
-                    related_list = related.get("data", [])
-                    next_id = [i for i in related_list if i.get("relation") == "续集"]
-                else:
-                    next_id = []
-                if not next_id:
-                    break
-                current_id = next_id[0]["id"]
-                fist_part = False
-            return self._episode_lookup_failed(subject_id, target_ep, release_date)
-
-        # Plex 季数与 Bangumi 多期/续集计数不一致时，用播出日 + 章节 airdate 择优
-        if release_date and target_season > 1 and target_ep:
-            air_pick = self._try_resolve_sequel_by_airdate(
-                subject_id, target_ep, release_date, root_type=root_type
-            )
-            if air_pick is not None:
-                return air_pick[0], air_pick[1]
+        indexed = self._resolve_from_sequel_graph(
+            subject_id, target_season, target_ep, is_season_subject_id, release_date
+        )
+        if indexed is not SEQUEL_GRAPH_MISS:
+            return indexed
+
+        seen: Optional[dict] = {} if self._sequel_graph is not None else None
+        result = self._walk_target_season_episode_id(
+            subject_id,
+            target_season,
+            target_ep,
+            is_season_subject_id,
+            release_date,
+            seen=seen,
+        )
+        self._record_sequel_walk(seen)
+        return result
 
-        last_season_num = None
-        while True:
-            related = self.get_related_subjects(current_id)
-            if isinstance(related, list):
-                next_id = [i for i in related if i.get("relation") == "续集"]
-            elif isinstance(related, dict):
-                related_list = related.get("data", [])
-                next_id = [i for i in related_list if i.get("relation") == "续集"]
-            else:
-                next_id = []
-            if not next_id:
-                break
-            current_id = next_id[0]["id"]
-            current_info = self.get_subject(current_id)
-            if not current_info:
-                continue
-            if root_type is not None and current_info.get("type") != root_type:
-                continue
-            episodes = self.get_episodes(current_id)
-            ep_info = episodes.get("data", [])
-            if not ep_info:
-                logger.debug(f"未获取到剧集信息: {current_id}")
-                break
-            logger.debug(ep_info)
-            sort_rows = [i for i in ep_info if i.get("sort") == target_ep]
-            _target_ep = self._match_target_ep_rows(ep_info, target_ep)
-            logger.debug(_target_ep)
-            ep_found = True if target_ep and _target_ep else False
+    def _walk_answer(self, request: tuple, seen: Optional[dict] = None):
+        """通过网络（及两级缓存）应答 _season_walk 的数据请求"""
+        op, sid = request[0], request[1]
+        if op == "fallback":
+            return self._episode_lookup_failed(*request[1:])
+        if op == "subject":
+            value = self.get_subject(sid)
+        elif op == "next":
+            value = self._sequel_next_tv_subject_id(sid)
+        elif op == "episodes":
+            value = self.get_episodes(sid)
+        else:
+            value = self._find_episode_by_sort(sid, request[2])
+        self._observe_walk(seen, request, value)
+        return value
 
-            sn = self._extract_season_number(
-                current_info.get("name", ""), current_info.get("name_cn", "")
-            )
-            if sn is not None and sn != last_season_num:
-                season_num += 1
-                last_season_num = sn
-            elif sn is None:
-                if not sort_rows:
-                    if (
-                        target_ep
-                        and _target_ep
-                        and "第2部分" not in current_info.get("name_cn", "")
-                    ):
-                        season_num += 1
-                elif any(ep.get("sort") == 1 for ep in ep_info):
-                    season_num += 1
-                    last_season_num = None
-            if season_num > target_season:
-                break
-            if season_num == target_season:
-                if not target_ep:
-                    return current_id
-                if target_ep > 99:
-                    found = self._find_episode_by_sort(current_id, target_ep)
-                    if found:
-                        return current_id, found["id"]
-                if not ep_found:
-                    continue
-                return current_id, _target_ep[0]["id"]
-        return self._episode_lookup_failed(subject_id, target_ep, release_date)
+    def _walk_target_season_episode_id(
+        self,
+        subject_id,
+        target_season: int,
+        target_ep: int,
+        is_season_subject_id: bool = False,
+        release_date: Optional[str] = None,
+        seen: Optional[dict] = None,
+    ):
+        """沿续集链逐条目请求接口解析季度/集数；seen 收集访问过的条目数据"""
+        return self._drive_walk(
+            self._season_walk(
+                subject_id, target_season, target_ep, is_season_subject_id, release_date
+            ),
+            lambda request: self._walk_answer(request, seen),
+        )
 
     def get_subject_collection(self, subject_id):
         res = self.get(f"users/{self.username}/collections/{subject_id}")
         if res.status_code == 404:
             return {}
-        try:
-            res = res.json()
-            # 确保返回的是字典类型
-            if not isinstance(res, dict):
-                logger.error(
-                    f"get_subject_collection API返回非字典类型: {type(res)}, 内容: {res}"
-                )
-                res = {}
-        except Exception as e:
-            logger.error(f"get_subject_collection JSON解析失败: {e}")
-            res = {}
-        return res
+        data = self._json_or(res, (dict,), {}, "get_subject_collection")
+        if data:
+            self._ledger_record_subject(
+                subject_id, data.get("type"), data.get("ep_status")
+            )
+        return data
 
     def get_ep_collection(self, episode_id):
         res = self.get(f"users/-/collections/-/episodes/{episode_id}")
         if res.status_code == 404:
             return {}
-        try:
-            res = res.json()
-            # 确保返回的是字典类型
-            if not isinstance(res, dict):
-                logger.error(
-                    f"get_ep_collection API返回非字典类型: {type(res)}, 内容: {res}"
-                )
-                res = {}
-        except Exception as e:
-            logger.error(f"get_ep_collection JSON解析失败: {e}")
-            res = {}
-        return res
+        return self._json_or(res, (dict,), {}, "get_ep_collection")
 
     def ensure_subject_watching(self, subject_id):
         """
@@ -979,44 +1654,88 @@ class BangumiApi:
         return 0
 
     def mark_episode_watched(self, subject_id, ep_id):
-        data = self.get_subject_collection(subject_id)
+        """标记单集为看过，规则与返回值见 _mark_episode_walk"""
+        return self._drive_walk(
+            self._mark_episode_walk(subject_id, ep_id), self._call_op
+        )
 
-        # 如果未收藏，则先标记为在看，再点单集格子
-        if not data:
-            self.add_collection_subject(subject_id=subject_id)
-            self.change_episode_state(ep_id=ep_id, state=2)
-            return 2
-        else:
-            # 如果整部番已看过则跳过
-            if data.get("type") == 2:
-                return 0
-            #  如果条目状态是想看或搁置则调整为在看
-            if data.get("type") == 1 or data.get("type") == 4:
-                self.change_collection_state(subject_id=subject_id, state=3)
-
-        ep_data = self.get_ep_collection(ep_id)
-        logger.debug(ep_data)
-        # 如果单集已看过则跳过
-        if ep_data.get("type") == 2:
-            return 0
-        else:
-            # 否则直接点单集格子
-            self.change_episode_state(ep_id=ep_id, state=2)
-            return 1
+    def mark_episodes_watched(self, subject_id, ep_ids) -> dict:
+        """批量标记同一条目下的多集为看过，规则与返回值见 _mark_episodes_walk"""
+        return self._drive_walk(
+            self._mark_episodes_walk(subject_id, ep_ids), self._call_op
+        )
+
+    def _get_paged(self, path: str, params: dict, page_limit: int, label: str) -> list:
+        """按 offset 分页读取列表接口（见 _paged_walk）"""
+        return self._drive_walk(
+            self._paged_walk(path, params, page_limit, label), self._call_op
+        )
+
+    def get_subject_ep_collections(self, subject_id, episode_type: int = 0) -> list:
+        """分页读取条目下全部章节的收藏状态；条目未收藏时返回空列表"""
+        return self._get_paged(
+            f"users/-/collections/{subject_id}/episodes",
+            {"episode_type": episode_type},
+            _EP_COLLECTIONS_PAGE_LIMIT,
+            "get_subject_ep_collections",
+        )
+
+    def _seed_episode_ledger(self, account: str, subject_id) -> None:
+        """账本中没有该条目的章节状态时读取一次条目章节收藏写入账本
+        （对账不含单集状态，在其他客户端看过的章节据此跳过）"""
+        if self._ledger_missing_episodes(account, subject_id):
+            self._ledger_seed_episodes(
+                account, subject_id, self.get_subject_ep_collections(subject_id)
+            )
+
+    def get_user_collections(self, subject_type: Optional[int] = None) -> list:
+        """分页读取当前用户的全部条目收藏"""
+        params = {} if subject_type is None else {"subject_type": subject_type}
+        return self._get_paged(
+            f"users/{self.username}/collections",
+            params,
+            _USER_COLLECTIONS_PAGE_LIMIT,
+            "get_user_collections",
+        )
+
+    def _refresh_collection_ledger(self) -> Optional[str]:
+        """返回账本账号（未启用账本时为 None）；需要对账时在后台线程进行，
+        本次标记按账本现有内容继续，不等待对账完成"""
+        account = self._ledger_account()
+        if account is not None and self._collection_ledger.begin_reconcile(account):
+            threading.Thread(
+                target=self.reconcile_collection_ledger,
+                args=(account,),
+                name="bgm-ledger-reconcile",
+                daemon=True,
+            ).start()
+        return account
+
+    def reconcile_collection_ledger(self, account: str) -> None:
+        """分页拉取账号收藏并与账本对账（阻塞）；失败时记录并退避"""
+        ledger = self._collection_ledger
+        started_at = time.time()
+        try:
+            collections = self.get_user_collections(subject_type=LEDGER_SUBJECT_TYPE)
+            ledger.reconcile(account, collections, started_at=started_at)
+        except Exception as e:
+            ledger.reconcile_failed(account, e)
 
     def add_collection_subject(self, subject_id, private=None, state=3):
         private = self.private if private is None else private
-        self.post(
+        res = self.post(
             f"users/-/collections/{subject_id}",
             _json={"type": state, "private": bool(private)},
         )
+        self._ledger_record_subject(subject_id, state, res=res)
 
     def change_collection_state(self, subject_id, private=None, state=3):
         private = self.private if private is None else private
-        self.post(
+        res = self.post(
             f"users/-/collections/{subject_id}",
             _json={"type": state, "private": bool(private)},
         )
+        self._ledger_record_subject(subject_id, state, res=res)
 
     def change_episode_state(self, ep_id, state=2):
         res = self.put(f"users/-/collections/-/episodes/{ep_id}", _json={"type": state})
@@ -1024,123 +1743,55 @@ class BangumiApi:
             raise ValueError(f"{res.status_code=} {res.text}")
         return res
 
-    def bgm_search(self, title, ori_title, premiere_date: str, is_movie=False):
-        bgm_data = None
-        start_date_str = "无日期"
-        end_date_str = "无日期"
-
-        # 尝试使用 v0 接口进行带首播日期的精确搜索
-        if premiere_date and len(premiere_date) >= 10:
-            try:
-                air_date = datetime.datetime.fromisoformat(premiere_date[:10])
-                start_date = air_date - datetime.timedelta(days=2)
-                end_date = air_date + datetime.timedelta(days=2)
-
-                start_date_str = start_date.strftime("%Y-%m-%d")
-                end_date_str = end_date.strftime("%Y-%m-%d")
-
-                if ori_title:
-                    bgm_data = self.search(
-                        title=ori_title,
-                        start_date=start_date_str,
-                        end_date=end_date_str,
-                    )
-                bgm_data = bgm_data or self.search(
-                    title=title, start_date=start_date_str, end_date=end_date_str
-                )
-
-                if not bgm_data and is_movie:
-                    movie_search_title = ori_title or title
-                    movie_end_date = air_date + datetime.timedelta(days=200)
-                    end_date_str = movie_end_date.strftime("%Y-%m-%d")
-                    bgm_data = self.search(
-                        title=movie_search_title,
-                        start_date=start_date_str,
-                        end_date=end_date_str,
-                    )
-            except ValueError:
-                logger.warning(
-                    f"首播日期格式解析失败: {premiere_date}，降级至无日期模式搜索"
-                )
-
-        # 若精确搜索无结果或相似度低于阈值，使用旧版接口进行无日期名称搜索
-        if not bgm_data or (
-            bgm_data
-            and len(bgm_data) > 0
-            and self.title_diff_ratio(
-                title=title, ori_title=ori_title, bgm_data=bgm_data[0]
-            )
-            < 0.5
-        ):
-            # 过滤无效的空标题
-            search_titles = [t for t in (ori_title, title) if t and t.strip()]
-
-            for t in search_titles:
-                bgm_data_old = self.search_old(title=t)
-
-                if bgm_data_old and len(bgm_data_old) > 0:
-                    # 旧版接口返回数据不含 infobox 别名信息，需拉取完整条目进行准确相似度计算
-                    subject_id = bgm_data_old[0]["id"]
-                    full_info = self.get_subject(subject_id)
-
-                    if (
-                        full_info
-                        and self.title_diff_ratio(title, ori_title, bgm_data=full_info)
-                        > 0.5
-                    ):
-                        # 包装为统一的列表格式返回
-                        bgm_data = [full_info]
-                        break
-            else:
-                bgm_data = None
-
-        if not bgm_data or len(bgm_data) == 0:
-            return None
-
-        logger.debug(
-            f"搜索日期区间: {start_date_str} 至 {end_date_str} | 结果: {bgm_data[0].get('name')}"
+    def change_episodes_state(self, subject_id, ep_ids, state=2):
+        res = self.patch(
+            f"users/-/collections/{subject_id}/episodes",
+            _json={"episode_id": [int(ep_id) for ep_id in ep_ids], "type": state},
         )
-        return bgm_data
-
-    @staticmethod
-    def title_diff_ratio(title, ori_title, bgm_data):
-        ori_title = ori_title or title
-        candidates = []
+        if 333 < res.status_code < 444:
+            raise ValueError(f"{res.status_code=} {res.text}")
+        self._ledger_record_episodes(subject_id, ep_ids, state)
+        return res
 
-        # 提取基础候选项：原名与中文名
-        if bgm_data.get("name"):
-            candidates.append(bgm_data["name"])
-        if bgm_data.get("name_cn"):
-            candidates.append(bgm_data["name_cn"])
+    def bgm_search(self, title, ori_title, premiere_date: str, is_movie=False):
+        """并发执行各搜索策略，按原串行优先级确定结果（见 bgm_search_plan）"""
+        plan = SearchPlan(
+            title, ori_title, premiere_date, is_movie, self.title_diff_ratio
+        )
+        if not plan.tasks:
+            return None
 
-        # 提取 infobox 中的别名，兼容多种历史数据格式
-        infobox = bgm_data.get("infobox", [])
-        if isinstance(infobox, list):
-            for info in infobox:
-                if info.get("key") == "别名":
-                    alias_value = info.get("value")
-                    if isinstance(alias_value, list):
-                        for alias_item in alias_value:
-                            if isinstance(alias_item, dict) and "v" in alias_item:
-                                candidates.append(alias_item["v"])
-                            elif isinstance(alias_item, str):
-                                candidates.append(alias_item)
-                    elif isinstance(alias_value, str):
-                        candidates.append(alias_value)
+        # 结果确定后置位，其余搜索据此不再发出新请求
+        stop = threading.Event()
+        # 每个搜索在调用方上下文的副本中执行（延迟重试等上下文变量随之传递）
+        futures = {
+            _search_pool.submit(
+                contextvars.copy_context().run, self._run_search_task, task, stop
+            ): task.key
+            for task in plan.tasks
+        }
+        decided, task, bgm_data = False, None, None
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    plan.add_result(key, future.result())
+                except Exception as e:
+                    plan.add_error(key, e)
+                decided, task, bgm_data = plan.decide()
+                if decided:
                     break
-
-        # 计算所有候选项的相似度，取最大值
-        max_ratio = 0.0
-        for candidate in candidates:
-            if not candidate:
-                continue
-
-            ratio_title = fuzz.ratio(candidate, title) / 100.0
-            ratio_ori = fuzz.ratio(candidate, ori_title) / 100.0
-            max_ratio = max(max_ratio, ratio_title, ratio_ori)
-
-            # 若发现完全匹配，提前返回
-            if max_ratio >= 1.0:
-                return 1.0
-
-        return max_ratio
+        finally:
+            # 不等待仍在进行的请求；尚在线程池中排队的搜索直接取消
+            stop.set()
+            for future in futures:
+                future.cancel()
+
+        return self._search_result(task, bgm_data)
+
+    def _run_search_task(self, task: SearchTask, stop: threading.Event):
+        """执行单个搜索策略；stop 置位后不再发出请求，返回 None"""
+        return self._drive_walk(
+            self._search_task_walk(task),
+            lambda request: None if stop.is_set() else self._call_op(request),
+        )
@@ -0,0 +1,802 @@
+"""基于 httpx.AsyncClient 的原生异步 Bangumi 客户端。
+
+接口与 BangumiApi 保持一致（方法均为协程），缓存与季度解析的纯逻辑复用
+BangumiApiBase。HTTP 客户端取自 http_transport：同一事件循环内按代理配置共享，
+所有账号复用连接池，单个进程可同时进行大量同步而无需每个请求占用一个线程。
+"""
+
+import asyncio
+import functools
+import time
+from typing import Optional, Union
+
+import httpx
+
+from ..core.logging import logger
+from .bangumi_api import (
+    _CACHE_MISS,
+    _EP_COLLECTIONS_PAGE_LIMIT,
+    _EPISODES_PAGE_CONCURRENCY,
+    _EPISODES_PAGE_LIMIT,
+    _LONG_SERIES_AIRDATE_MIN_TOTAL,
+    _USER_COLLECTIONS_PAGE_LIMIT,
+    BangumiApiBase,
+)
+from .bgm_collection_ledger import LEDGER_SUBJECT_TYPE
+from .bgm_episode_index import EPISODE_INDEX_MIN_SORT, EpisodeIndex
+from .bgm_rate_limiter import bgm_rate_limiter
+from .bgm_route_manager import bgm_route_manager, build_routes
+from .bgm_search_plan import SearchPlan, SearchTask
+from .bgm_sequel_graph import SEQUEL_GRAPH_MISS
+from .http_transport import get_async_client
+from .single_flight import bgm_single_flight
+
+_USER_AGENT = "SanaeMio/Bangumi-syncer (https://github.com/SanaeMio/Bangumi-syncer)"
+# 后台对账任务（持有引用，避免被回收）
+_reconcile_tasks: set = set()
+# 后台刷新二级缓存的任务，按 (账号范围, 类别, 缓存键) 去重
+_refresh_tasks: dict = {}
+
+
+class AsyncBangumiApi(BangumiApiBase):
+    """BangumiApi 的原生异步版本"""
+
+    _TRANSPORT_ERRORS = (httpx.TransportError,)
+
+    def __init__(
+        self,
+        username=None,
+        access_token=None,
+        private=True,
+        http_proxy=None,
+        ssl_verify=True,
+        bgm_api_proxy=None,
+        bgm_next_proxy=None,
+        cache_ttl: Optional[dict[str, float]] = None,
+        metadata_cache=None,
+        sequel_graph=None,
+        collection_ledger=None,
+    ):
+        self.api_base = (
+            bgm_api_proxy.rstrip("/") if bgm_api_proxy else "https://api.bgm.tv"
+        )
+        self.next_base = (
+            bgm_next_proxy.rstrip("/") if bgm_next_proxy else "https://next.bgm.tv"
+        )
+        self.host = f"{self.api_base}/v0"
+        self.username = username
+        self.access_token = access_token
+        self.private = private
+        self.http_proxy = http_proxy
+        self.ssl_verify = ssl_verify
+
+        # 候选线路（反向代理 / HTTP 代理 / 直连），由 bgm_route_manager 按实测数据排序
+        self._routes = build_routes(self.api_base, http_proxy, ssl_verify)
+        self._init_cache(cache_ttl, metadata_cache, sequel_graph, collection_ledger)
+
+    def _client(self, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        return get_async_client(proxy, self.ssl_verify)
+
+    def _notify(self, notification_type: str, **kwargs) -> None:
+        """在默认线程池中发送通知，不等待结果（通知渠道为阻塞 I/O）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            super()._notify(notification_type, **kwargs)
+            return
+        loop.run_in_executor(
+            None, functools.partial(super()._notify, notification_type, **kwargs)
+        )
+
+    def _headers(self, auth: bool = True) -> dict[str, str]:
+        headers = {"Accept": "application/json", "User-Agent": _USER_AGENT}
+        if auth and self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        return headers
+
+    def _status_error(self, message: str, res) -> Exception:
+        return httpx.HTTPStatusError(message, request=res.request, response=res)
+
+    async def _request_with_retry(
+        self, method, url, max_retries=3, auth: bool = True, hedge=False, **kwargs
+    ) -> httpx.Response:
+        """带重试机制的请求方法，重试、熔断与线路策略见 BangumiApiBase._request_walk"""
+        headers = self._headers(auth)
+
+        async def _answer(request):
+            op = request[0]
+            if op == "acquire":
+                return await bgm_rate_limiter.acquire_async(request[1])
+            if op == "send":
+                route, routed = request[1], request[2]
+                return await self._client(route.proxy).request(
+                    method, routed, headers=headers, **kwargs
+                )
+            if op == "hedge":
+                _, primary, backup, delay, backup_route = request
+                return await bgm_route_manager.run_hedged_async(
+                    lambda: self._drive_walk_async(primary, _answer),
+                    lambda: self._drive_walk_async(backup, _answer),
+                    delay,
+                    backup_route,
+                )
+            if op == "sleep":
+                return await asyncio.sleep(request[1])
+            return await asyncio.to_thread(self._diagnose_network_issue, url)
+
+        return await self._drive_walk_async(
+            self._request_walk(method, url, max_retries, hedge), _answer
+        )
+
+    async def get(self, path, params=None):
+        url = f"{self.host}/{path}"
+
+        async def _request():
+            res = await self._request_with_retry("GET", url, params=params, hedge=True)
+            return self._check_auth_error(res)
+
+        return await bgm_single_flight.do_async(
+            self._flight_key("GET", url, params), _request
+        )
+
+    async def post(self, path, _json, params=None):
+        res = await self._request_with_retry(
+            "POST", f"{self.host}/{path}", json=_json, params=params
+        )
+        return self._check_auth_error(res)
+
+    async def put(self, path, _json, params=None):
+        res = await self._request_with_retry(
+            "PUT", f"{self.host}/{path}", json=_json, params=params
+        )
+        return self._check_auth_error(res)
+
+    async def patch(self, path, _json, params=None):
+        res = await self._request_with_retry(
+            "PATCH", f"{self.host}/{path}", json=_json, params=params
+        )
+        return self._check_auth_error(res)
+
+    async def get_me(self):
+        res = await self.get("me")
+        if 400 <= res.status_code < 500:
+            self._notify(
+                "api_auth_error",
+                user_name=self.username,
+                status_code=res.status_code,
+                error_message="BangumiApi: 未授权, access_token不正确或未设置",
+            )
+            raise ValueError("BangumiApi: 未授权, access_token不正确或未设置")
+        return res.json()
+
+    async def search(self, title, start_date, end_date, limit=5, list_only=True):
+        cache_key = (title, start_date, end_date, limit, list_only)
+        cached = self._get_cache("search", cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        async def _search():
+            res = await self._request_with_retry(
+                "POST",
+                f"{self.host}/search/subjects",
+                auth=False,
+                json={
+                    "keyword": title,
+                    "filter": {
+                        "type": [2],
+                        "air_date": [f">={start_date}", f"<{end_date}"],
+                        "nsfw": True,
+                    },
+                },
+                params={"limit": limit},
+            )
+            return self._json_or(res, (dict,), {"data": []}, "search")
+
+        payload = await bgm_single_flight.do_async(
+            ("search", self.host, title, start_date, end_date, limit), _search
+        )
+        result = payload.get("data", []) if list_only else payload
+        self._put_cache("search", cache_key, result)
+        return result
+
+    async def search_old(self, title, list_only=True):
+        cache_key = (title, list_only)
+        cached = self._get_cache("search_old", cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        async def _search_old():
+            res = await self._request_with_retry(
+                "GET", f"{self.api_base}/search/subject/{title}", params={"type": 2}
+            )
+            return self._json_or(res, (dict,), {"results": 0, "list": []}, "search_old")
+
+        payload = await bgm_single_flight.do_async(
+            self._account_flight_key("search_old", self.api_base, title), _search_old
+        )
+        result = payload.get("list", []) if list_only else payload
+        self._put_cache("search_old", cache_key, result)
+        return result
+
+    async def _get_persistent(self, category: str, key, subject_id, fetch):
+        """读取二级缓存；过期但仍在宽限期内时返回旧值并在当前事件循环中后台刷新"""
+        if self._metadata_cache is None:
+            return _CACHE_MISS
+        try:
+            # 二级缓存是 SQLite（经 DatabaseManager 的全局锁），在线程中读取
+            value, stale = await asyncio.to_thread(
+                functools.partial(
+                    self._metadata_cache.lookup,
+                    category,
+                    self._persist_key(key),
+                    scope=self._persist_scope(),
+                )
+            )
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 元数据缓存失败: {e}")
+            return _CACHE_MISS
+        if value is None:
+            return _CACHE_MISS
+        if stale:
+            self._schedule_refresh(category, key, subject_id, fetch)
+        return value
+
+    def _schedule_refresh(self, category: str, key, subject_id, fetch) -> None:
+        """在当前事件循环中后台刷新过期的二级缓存；同一缓存键同时只刷新一次"""
+        loop = asyncio.get_running_loop()
+        token = (self._persist_scope(), category, self._persist_key(key))
+        running = _refresh_tasks.get(token)
+        if running is not None and not running.done() and running.get_loop() is loop:
+            return
+
+        async def _refresh():
+            try:
+                value = await fetch()
+                self._put_cache(category, key, value)
+                await asyncio.to_thread(
+                    self._put_persistent, category, key, subject_id, value
+                )
+            except Exception as e:
+                self._metadata_cache.record_refresh(False)
+                logger.debug(f"后台刷新 Bangumi 元数据失败 {category}/{token[2]}: {e}")
+            else:
+                self._metadata_cache.record_refresh(True)
+
+        def _done(task):
+            if _refresh_tasks.get(token) is task:
+                del _refresh_tasks[token]
+
+        task = loop.create_task(_refresh())
+        _refresh_tasks[token] = task
+        task.add_done_callback(_done)
+
+    async def _cached_fetch(self, category: str, key, subject_id, fetch):
+        """依次查询实例缓存、二级缓存，均未命中时 await fetch 并回填两级缓存"""
+        cached = self._get_cache(category, key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        persisted = await self._get_persistent(category, key, subject_id, fetch)
+        if persisted is not _CACHE_MISS:
+            self._put_cache(category, key, persisted)
+            return persisted
+
+        async def _fetch_and_persist():
+            value = await fetch()
+            await asyncio.to_thread(
+                self._put_persistent, category, key, subject_id, value
+            )
+            return value
+
+        value = await bgm_single_flight.do_async(
+            self._account_flight_key(category, self._persist_key(key)),
+            _fetch_and_persist,
+        )
+        self._put_cache(category, key, value)
+        return value
+
+    async def get_subject(self, subject_id):
+        return await self._cached_fetch(
+            "get_subject",
+            subject_id,
+            subject_id,
+            lambda: self._fetch_subject(subject_id),
+        )
+
+    async def _fetch_subject(self, subject_id):
+        res = await self.get(f"subjects/{subject_id}")
+        return self._json_or(res, (dict,), {}, "get_subject")
+
+    async def get_related_subjects(self, subject_id):
+        return await self._cached_fetch(
+            "get_related_subjects",
+            subject_id,
+            subject_id,
+            lambda: self._fetch_related_subjects(subject_id),
+        )
+
+    async def _fetch_related_subjects(self, subject_id):
+        res = await self.get(f"subjects/{subject_id}/subjects")
+        return self._json_or(res, (dict, list), [], "get_related_subjects")
+
+    async def _fetch_episodes_page(
+        self,
+        subject_id,
+        _type: int = 0,
+        *,
+        limit: int = _EPISODES_PAGE_LIMIT,
+        offset: int = 0,
+    ) -> dict:
+        """单次分页请求章节列表（不写入实例缓存）。"""
+        res = await self.get(
+            "episodes",
+            params={
+                "subject_id": subject_id,
+                "type": _type,
+                "limit": limit,
+                "offset": offset,
+            },
+        )
+        return self._json_or(res, (dict,), {"data": [], "total": 0}, "get_episodes")
+
+    async def get_episodes(self, subject_id, _type=0, fetch_all: bool = False):
+        return await self._cached_fetch(
+            "get_episodes",
+            (subject_id, _type, fetch_all),
+            subject_id,
+            lambda: self._fetch_episodes(subject_id, _type, fetch_all),
+        )
+
+    async def _fetch_episodes(
+        self, subject_id, _type=0, fetch_all: bool = False
+    ) -> dict:
+        if not fetch_all:
+            return await self._fetch_episodes_page(subject_id, _type)
+        all_data, total = await self._fetch_all_episode_pages(subject_id, _type)
+        return {"data": all_data, "total": total}
+
+    async def _fetch_all_episode_pages(self, subject_id, _type=0) -> tuple[list, int]:
+        """拉取全部章节：第一页得到总数后，其余分页并发请求"""
+        first = await self._fetch_episodes_page(subject_id, _type)
+        all_data = list(first.get("data") or [])
+        total = int(first.get("total") or len(all_data))
+        if len(all_data) < _EPISODES_PAGE_LIMIT:
+            return all_data, total
+
+        semaphore = asyncio.Semaphore(_EPISODES_PAGE_CONCURRENCY)
+
+        async def _page(offset: int) -> dict:
+            async with semaphore:
+                return await self._fetch_episodes_page(subject_id, _type, offset=offset)
+
+        pages = await asyncio.gather(
+            *(
+                _page(offset)
+                for offset in range(_EPISODES_PAGE_LIMIT, total, _EPISODES_PAGE_LIMIT)
+            )
+        )
+        for page in pages:
+            all_data.extend(page.get("data") or [])
+        return all_data, total
+
+    async def get_episode_index(self, subject_id, _type: int = 0) -> EpisodeIndex:
+        """条目的章节索引（sort / ep / 播出日 → 章节 ID），两级缓存"""
+        return await self._cached_fetch(
+            "episode_index",
+            (subject_id, _type),
+            subject_id,
+            lambda: self._fetch_episode_index(subject_id, _type),
+        )
+
+    async def _fetch_episode_index(self, subject_id, _type: int = 0) -> EpisodeIndex:
+        rows, total = await self._fetch_all_episode_pages(subject_id, _type)
+        index = EpisodeIndex.from_episodes(rows, total, _type)
+        logger.debug(
+            f"章节索引已建立 subject_id={subject_id} 章节数={len(index)}/{total} "
+            f"占用 {index.nbytes} 字节"
+        )
+        return index
+
+    async def _find_episode_by_sort(
+        self, subject_id, target_sort: int, _type: int = 0
+    ) -> Optional[dict]:
+        """在 subject 内按 sort/ep 规则查找章节；长篇（ep>99）使用章节索引。"""
+        if target_sort > EPISODE_INDEX_MIN_SORT:
+            index = await self.get_episode_index(subject_id, _type)
+            return index.find_by_sort(target_sort)
+
+        episodes = await self.get_episodes(subject_id, _type)
+        ep_info = episodes.get("data") or []
+        rows = self._match_target_ep_rows(ep_info, target_sort)
+        return rows[0] if rows else None
+
+    async def _resolve_episode_by_airdate_in_subject(
+        self,
+        subject_id: Union[str, int],
+        release_date: str,
+        max_days_diff: int = 120,
+        min_total: int = _LONG_SERIES_AIRDATE_MIN_TOTAL,
+    ) -> Optional[tuple[Union[str, int], Union[str, int]]]:
+        """在同一 Bangumi subject 内按 airdate 与 release_date 择优。"""
+        target_day = self._parse_iso_date_ymd(release_date)
+        if not target_day:
+            return None
+
+        index = await self.get_episode_index(subject_id)
+        if index.total < min_total:
+            return None
+
+        nearest = index.nearest_by_airdate(target_day, max_days_diff)
+        if nearest is None:
+            return None
+
+        best_ep, best_diff = nearest
+        logger.debug(
+            f"单条目 airdate 择优: subject_id={subject_id} ep_id={best_ep['id']} "
+            f"与播出日相差 {best_diff} 天"
+        )
+        return subject_id, best_ep["id"]
+
+    async def _episode_lookup_failed(
+        self,
+        subject_id,
+        target_ep: int,
+        release_date: Optional[str],
+    ):
+        """季集匹配失败后的统一回退：单条目 airdate 择优。"""
+        if release_date and target_ep:
+            air_pick = await self._resolve_episode_by_airdate_in_subject(
+                subject_id, release_date
+            )
+            if air_pick is not None:
+                return air_pick
+        return None, None if target_ep else None
+
+    async def _sequel_ids(self, current_id: Union[str, int]) -> list:
+        related = await self.get_related_subjects(current_id)
+        if isinstance(related, list):
+            return [i for i in related if i.get("relation") == "续集"]
+        if isinstance(related, dict):
+            return [i for i in related.get("data", []) if i.get("relation") == "续集"]
+        return []
+
+    async def _sequel_next_tv_subject_id(
+        self, current_id: Union[str, int]
+    ) -> Optional[int]:
+        nxt = await self._sequel_ids(current_id)
+        return nxt[0]["id"] if nxt else None
+
+    async def get_movie_main_episode_id(
+        self,
+        subject_id: Union[str, int],
+        target_sort: int = 1,
+    ) -> tuple[Optional[str], Optional[str]]:
+        """剧场版 / 独立电影：在同一 subject 下解析本篇章节，不走续集链。"""
+        sid = str(subject_id)
+        episodes = await self.get_episodes(subject_id)
+        ep_info: list = episodes.get("data") or []
+        if not ep_info:
+            logger.debug(
+                f"get_movie_main_episode_id: 无章节数据 subject_id={subject_id}"
+            )
+            return sid, None
+
+        has_type = any("type" in e for e in ep_info)
+        pool = [e for e in ep_info if e.get("type") == 0] if has_type else list(ep_info)
+        if not pool:
+            pool = list(ep_info)
+
+        rows = self._match_target_ep_rows(pool, target_sort)
+        if rows:
+            return sid, str(rows[0]["id"])
+
+        def _sort_key(e: dict) -> tuple:
+            s = e.get("sort")
+            return (s is None, s if s is not None else 9999)
+
+        pool_sorted = sorted(pool, key=_sort_key)
+        if pool_sorted:
+            return sid, str(pool_sorted[0]["id"])
+        return sid, None
+
+    @staticmethod
+    async def _drive_walk_async(walk, answer):
+        """_drive_walk 的异步版本：answer 为协程函数"""
+        try:
+            request = next(walk)
+            while True:
+                try:
+                    value = await answer(request)
+                except Exception as e:
+                    request = walk.throw(e)
+                else:
+                    request = walk.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _call_op(self, request: tuple):
+        """应答 _op 请求：协程方法直接等待，其余（收藏账本等 SQLite 读写）在线程中执行"""
+        name, args, kwargs = request
+        method = getattr(self, name)
+        if asyncio.iscoroutinefunction(method):
+            return await method(*args, **kwargs)
+        return await asyncio.to_thread(functools.partial(method, *args, **kwargs))
+
+    async def _try_resolve_sequel_by_airdate(
+        self,
+        subject_id: Union[str, int],
+        target_ep: int,
+        release_date: str,
+        max_hops: int = 15,
+        max_days_diff: int = 120,
+        root_type: Optional[int] = None,
+    ) -> Optional[tuple[Union[str, int], Union[str, int]]]:
+        """沿「续集」链查找与 release_date 最接近的 target_ep 章节（见 _airdate_walk）"""
+        return await self._drive_walk_async(
+            self._airdate_walk(
+                subject_id, target_ep, release_date, max_hops, max_days_diff, root_type
+            ),
+            self._walk_answer,
+        )
+
+    async def get_target_season_episode_id(
+        self,
+        subject_id,
+        target_season: int,
+        target_ep: int,
+        is_season_subject_id: bool = False,
+        release_date: Optional[str] = None,
+    ):
+        """与 BangumiApi.get_target_season_episode_id 相同的季度 / 集数解析规则"""
+        max_season, max_episode = self._get_episode_sync_limits()
+        if target_season > max_season or (target_ep and target_ep > max_episode):
+            return None, None if target_ep else None
+
+        indexed = await asyncio.to_thread(
+            self._resolve_from_sequel_graph,
+            subject_id,
+            target_season,
+            target_ep,
+            is_season_subject_id,
+            release_date,
+        )
+        if indexed is not SEQUEL_GRAPH_MISS:
+            return indexed
+
+        seen: Optional[dict] = {} if self._sequel_graph is not None else None
+        result = await self._walk_target_season_episode_id(
+            subject_id,
+            target_season,
+            target_ep,
+            is_season_subject_id,
+            release_date,
+            seen=seen,
+        )
+        await asyncio.to_thread(self._record_sequel_walk, seen)
+        return result
+
+    async def _walk_answer(self, request: tuple, seen: Optional[dict] = None):
+        """通过网络（及两级缓存）应答 _season_walk 的数据请求"""
+        op, sid = request[0], request[1]
+        if op == "fallback":
+            return await self._episode_lookup_failed(*request[1:])
+        if op == "subject":
+            value = await self.get_subject(sid)
+        elif op == "next":
+            value = await self._sequel_next_tv_subject_id(sid)
+        elif op == "episodes":
+            value = await self.get_episodes(sid)
+        else:
+            value = await self._find_episode_by_sort(sid, request[2])
+        self._observe_walk(seen, request, value)
+        return value
+
+    async def _walk_target_season_episode_id(
+        self,
+        subject_id,
+        target_season: int,
+        target_ep: int,
+        is_season_subject_id: bool = False,
+        release_date: Optional[str] = None,
+        seen: Optional[dict] = None,
+    ):
+        """沿续集链逐条目请求接口解析季度/集数；seen 收集访问过的条目数据"""
+        return await self._drive_walk_async(
+            self._season_walk(
+                subject_id, target_season, target_ep, is_season_subject_id, release_date
+            ),
+            lambda request: self._walk_answer(request, seen),
+        )
+
+    async def get_subject_collection(self, subject_id):
+        res = await self.get(f"users/{self.username}/collections/{subject_id}")
+        if res.status_code == 404:
+            return {}
+        data = self._json_or(res, (dict,), {}, "get_subject_collection")
+        if data:
+            await asyncio.to_thread(
+                self._ledger_record_subject,
+                subject_id,
+                data.get("type"),
+                data.get("ep_status"),
+            )
+        return data
+
+    async def get_ep_collection(self, episode_id):
+        res = await self.get(f"users/-/collections/-/episodes/{episode_id}")
+        if res.status_code == 404:
+            return {}
+        return self._json_or(res, (dict,), {}, "get_ep_collection")
+
+    async def ensure_subject_watching(self, subject_id):
+        """仅将条目收藏置为「在看」(type=3)，返回值含义同 BangumiApi"""
+        data = await self.get_subject_collection(subject_id)
+        if not data:
+            await self.add_collection_subject(subject_id=subject_id, state=3)
+            return 1
+        if data.get("type") == 2:
+            return 0
+        if data.get("type") in (1, 4):
+            await self.change_collection_state(subject_id=subject_id, state=3)
+            return 1
+        return 0
+
+    async def mark_episode_watched(self, subject_id, ep_id):
+        """标记单集为看过，规则与返回值见 _mark_episode_walk"""
+        return await self._drive_walk_async(
+            self._mark_episode_walk(subject_id, ep_id), self._call_op
+        )
+
+    async def mark_episodes_watched(self, subject_id, ep_ids) -> dict:
+        """批量标记同一条目下的多集为看过，规则与返回值见 _mark_episodes_walk"""
+        return await self._drive_walk_async(
+            self._mark_episodes_walk(subject_id, ep_ids), self._call_op
+        )
+
+    async def _get_paged(
+        self, path: str, params: dict, page_limit: int, label: str
+    ) -> list:
+        """按 offset 分页读取列表接口（见 _paged_walk）"""
+        return await self._drive_walk_async(
+            self._paged_walk(path, params, page_limit, label), self._call_op
+        )
+
+    async def get_subject_ep_collections(
+        self, subject_id, episode_type: int = 0
+    ) -> list:
+        """分页读取条目下全部章节的收藏状态；条目未收藏时返回空列表"""
+        return await self._get_paged(
+            f"users/-/collections/{subject_id}/episodes",
+            {"episode_type": episode_type},
+            _EP_COLLECTIONS_PAGE_LIMIT,
+            "get_subject_ep_collections",
+        )
+
+    async def _seed_episode_ledger(self, account: str, subject_id) -> None:
+        """账本中没有该条目的章节状态时读取一次条目章节收藏写入账本"""
+        if await asyncio.to_thread(self._ledger_missing_episodes, account, subject_id):
+            collections = await self.get_subject_ep_collections(subject_id)
+            await asyncio.to_thread(
+                self._ledger_seed_episodes, account, subject_id, collections
+            )
+
+    async def get_user_collections(self, subject_type: Optional[int] = None) -> list:
+        """分页读取当前用户的全部条目收藏"""
+        params = {} if subject_type is None else {"subject_type": subject_type}
+        return await self._get_paged(
+            f"users/{self.username}/collections",
+            params,
+            _USER_COLLECTIONS_PAGE_LIMIT,
+            "get_user_collections",
+        )
+
+    async def _refresh_collection_ledger(self) -> Optional[str]:
+        """返回账本账号（未启用账本时为 None）；需要对账时在事件循环中后台进行，
+        本次标记按账本现有内容继续，不等待对账完成"""
+        account = self._ledger_account()
+        if account is not None and await asyncio.to_thread(
+            self._collection_ledger.begin_reconcile, account
+        ):
+            task = asyncio.get_running_loop().create_task(
+                self.reconcile_collection_ledger(account)
+            )
+            _reconcile_tasks.add(task)
+            task.add_done_callback(_reconcile_tasks.discard)
+        return account
+
+    async def reconcile_collection_ledger(self, account: str) -> None:
+        """分页拉取账号收藏并与账本对账；失败时记录并退避"""
+        ledger = self._collection_ledger
+        started_at = time.time()
+        try:
+            collections = await self.get_user_collections(
+                subject_type=LEDGER_SUBJECT_TYPE
+            )
+            await asyncio.to_thread(
+                functools.partial(
+                    ledger.reconcile, account, collections, started_at=started_at
+                )
+            )
+        except asyncio.CancelledError as e:
+            ledger.reconcile_failed(account, e)
+            raise
+        except Exception as e:
+            ledger.reconcile_failed(account, e)
+
+    async def add_collection_subject(self, subject_id, private=None, state=3):
+        private = self.private if private is None else private
+        res = await self.post(
+            f"users/-/collections/{subject_id}",
+            _json={"type": state, "private": bool(private)},
+        )
+        await asyncio.to_thread(
+            functools.partial(self._ledger_record_subject, subject_id, state, res=res)
+        )
+
+    async def change_collection_state(self, subject_id, private=None, state=3):
+        private = self.private if private is None else private
+        res = await self.post(
+            f"users/-/collections/{subject_id}",
+            _json={"type": state, "private": bool(private)},
+        )
+        await asyncio.to_thread(
+            functools.partial(self._ledger_record_subject, subject_id, state, res=res)
+        )
+
+    async def change_episode_state(self, ep_id, state=2):
+        res = await self.put(
+            f"users/-/collections/-/episodes/{ep_id}", _json={"type": state}
+        )
+        if 333 < res.status_code < 444:
+            raise ValueError(f"{res.status_code=} {res.text}")
+        return res
+
+    async def change_episodes_state(self, subject_id, ep_ids, state=2):
+        res = await self.patch(
+            f"users/-/collections/{subject_id}/episodes",
+            _json={"episode_id": [int(ep_id) for ep_id in ep_ids], "type": state},
+        )
+        if 333 < res.status_code < 444:
+            raise ValueError(f"{res.status_code=} {res.text}")
+        await asyncio.to_thread(self._ledger_record_episodes, subject_id, ep_ids, state)
+        return res
+
+    async def bgm_search(self, title, ori_title, premiere_date: str, is_movie=False):
+        """并发执行各搜索策略，按原串行优先级确定结果（见 bgm_search_plan）"""
+        plan = SearchPlan(
+            title, ori_title, premiere_date, is_movie, self.title_diff_ratio
+        )
+        if not plan.tasks:
+            return None
+
+        pending = {
+            asyncio.ensure_future(self._run_search_task(task)): task.key
+            for task in plan.tasks
+        }
+        decided, task, bgm_data = False, None, None
+        try:
+            while pending and not decided:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    key = pending.pop(future)
+                    try:
+                        plan.add_result(key, future.result())
+                    except asyncio.CancelledError:
+                        # 不是本函数取消的（调用方被取消时在 wait 处抛出）：
+                        # 按该搜索失败处理，不当作调用方被取消
+                        plan.add_error(key, RuntimeError(f"搜索请求被中途取消: {key}"))
+                    except Exception as e:
+                        plan.add_error(key, e)
+                decided, task, bgm_data = plan.decide()
+        finally:
+            # 已确定结果时取消其余请求；请求经 single-flight 合并，
+            # 只是本次不再等待，其他同标题的同步仍会拿到结果
+            for future in pending:
+                future.cancel()
+
+        return self._search_result(task, bgm_data)
+
+    async def _run_search_task(self, task: SearchTask):
+        return await self._drive_walk_async(self._search_task_walk(task), self._call_op)
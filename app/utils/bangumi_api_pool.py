@@ -0,0 +1,288 @@
+"""进程级 BangumiApi 客户端池：按账号复用实例，跨同步共享 HTTP 会话与元数据缓存。"""
+
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Optional
+
+from ..core.logging import logger
+from .bangumi_api import BangumiApi
+from .bangumi_api_async import AsyncBangumiApi
+from .bgm_collection_ledger import bgm_collection_ledger
+from .bgm_metadata_cache import bgm_metadata_cache
+from .bgm_sequel_graph import bgm_sequel_graph
+
+# 池内实例长期存活，缓存需要过期：章节列表随连载更新，条目/关联/搜索结果变化较慢
+POOLED_CACHE_TTL_SECONDS: dict[str, float] = {
+    "search": 6 * 60 * 60,
+    "search_old": 6 * 60 * 60,
+    "get_subject": 6 * 60 * 60,
+    "get_related_subjects": 6 * 60 * 60,
+    "get_episodes": 30 * 60,
+    "episode_index": 30 * 60,
+}
+
+ClientKey = tuple[str, str, bool, str, bool, str, str]
+
+# 被替换或移除的客户端延迟关闭：之前已取得该实例、仍在进行的同步可以用完其会话
+RETIRED_CLIENT_GRACE_SECONDS = 300.0
+
+
+# 已调度、尚未完成的异步关闭任务（保留引用，避免任务被回收）
+_pending_closes: set = set()
+
+
+def _close_quietly(api: Any, is_async: bool = False) -> None:
+    """关闭被移除的客户端；异步客户端优先调用 aclose()，协程在当前事件循环中调度"""
+    close = getattr(api, "aclose", None) if is_async else None
+    if not callable(close):
+        close = getattr(api, "close", None)
+    if not callable(close):
+        return
+    try:
+        result = close()
+    except Exception:
+        return
+    if inspect.isawaitable(result):
+        _schedule_close(result)
+
+
+def _close_later(api: Any, is_async: bool, delay: float) -> None:
+    """宽限期后关闭客户端；异步客户端在当前事件循环中定时，否则用后台定时线程"""
+    if delay <= 0:
+        _close_quietly(api, is_async)
+        return
+    if is_async:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            loop.call_later(delay, _close_quietly, api, True)
+            return
+    timer = threading.Timer(delay, _close_quietly, (api, is_async))
+    timer.daemon = True
+    timer.start()
+
+
+def _schedule_close(awaitable) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # 不在事件循环内（如同步线程中重建）：在临时事件循环中运行到结束，
+        # 不改动当前线程的事件循环（asyncio.run 结束时会将其置空）
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(_await_quietly(awaitable))
+        finally:
+            loop.close()
+        return
+    task = loop.create_task(_await_quietly(awaitable))
+    _pending_closes.add(task)
+    task.add_done_callback(_pending_closes.discard)
+
+
+async def _await_quietly(awaitable) -> None:
+    try:
+        await awaitable
+    except Exception as e:
+        logger.debug(f"关闭异步客户端失败: {e}")
+
+
+class BangumiApiPool:
+    """按 Bangumi 账号维护长期存活的 BangumiApi。
+
+    每个账号（匿名客户端账号为空串）只保留一个实例；token、私有设置或代理配置
+    变化时才重建，否则所有同步共用同一实例的会话与 LRU 缓存。池内实例共用
+    SQLite 元数据二级缓存、续集链关系图与收藏账本。
+
+    被替换或移除的旧实例不立即关闭，而是在 retire_grace 秒后关闭，
+    避免正在使用它的同步因会话已关闭而失败。
+    """
+
+    def __init__(self, retire_grace: float = RETIRED_CLIENT_GRACE_SECONDS):
+        self._retire_grace = retire_grace
+        self._lock = threading.Lock()
+        self._clients: dict[str, tuple[ClientKey, BangumiApi]] = {}
+        self._async_clients: dict[str, tuple[ClientKey, AsyncBangumiApi]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._rebuilds = 0
+
+    @staticmethod
+    def build_key(
+        username: Optional[str] = None,
+        access_token: Optional[str] = None,
+        private: Any = True,
+        http_proxy: Optional[str] = None,
+        ssl_verify: Any = True,
+        bgm_api_proxy: Optional[str] = None,
+        bgm_next_proxy: Optional[str] = None,
+    ) -> ClientKey:
+        """将账号与代理配置规范化为池的键"""
+        return (
+            str(username or ""),
+            str(access_token or ""),
+            bool(private),
+            str(http_proxy or ""),
+            bool(ssl_verify),
+            str(bgm_api_proxy or ""),
+            str(bgm_next_proxy or ""),
+        )
+
+    def get(
+        self,
+        username: Optional[str] = None,
+        access_token: Optional[str] = None,
+        private: Any = True,
+        http_proxy: Optional[str] = None,
+        ssl_verify: Any = True,
+        bgm_api_proxy: Optional[str] = None,
+        bgm_next_proxy: Optional[str] = None,
+        factory: Callable[..., BangumiApi] = BangumiApi,
+    ) -> BangumiApi:
+        """获取账号对应的 BangumiApi；不存在或配置已变化时用 factory 创建。"""
+        return self._get_or_create(
+            self._clients,
+            factory,
+            False,
+            username=username,
+            access_token=access_token,
+            private=private,
+            http_proxy=http_proxy,
+            ssl_verify=ssl_verify,
+            bgm_api_proxy=bgm_api_proxy,
+            bgm_next_proxy=bgm_next_proxy,
+        )
+
+    def get_async(
+        self,
+        username: Optional[str] = None,
+        access_token: Optional[str] = None,
+        private: Any = True,
+        http_proxy: Optional[str] = None,
+        ssl_verify: Any = True,
+        bgm_api_proxy: Optional[str] = None,
+        bgm_next_proxy: Optional[str] = None,
+        factory: Callable[..., AsyncBangumiApi] = AsyncBangumiApi,
+    ) -> AsyncBangumiApi:
+        """获取账号对应的 AsyncBangumiApi（与同步客户端分开维护）。"""
+        return self._get_or_create(
+            self._async_clients,
+            factory,
+            True,
+            username=username,
+            access_token=access_token,
+            private=private,
+            http_proxy=http_proxy,
+            ssl_verify=ssl_verify,
+            bgm_api_proxy=bgm_api_proxy,
+            bgm_next_proxy=bgm_next_proxy,
+        )
+
+    def _get_or_create(
+        self,
+        clients: dict[str, tuple[ClientKey, Any]],
+        factory,
+        is_async: bool,
+        **config,
+    ) -> Any:
+        key = self.build_key(**config)
+        account = key[0]
+        with self._lock:
+            entry = clients.get(account)
+            if entry is not None and entry[0] == key:
+                self._hits += 1
+                return entry[1]
+
+            self._misses += 1
+            if entry is not None:
+                self._rebuilds += 1
+                logger.info(
+                    f"Bangumi 账号 {account or '(匿名)'} 配置已变化，重建客户端"
+                )
+
+            api = factory(
+                **config,
+                cache_ttl=POOLED_CACHE_TTL_SECONDS,
+                metadata_cache=bgm_metadata_cache,
+                sequel_graph=bgm_sequel_graph,
+                collection_ledger=bgm_collection_ledger,
+            )
+            clients[account] = (key, api)
+
+        # 被替换下来的旧客户端可能仍被进行中的同步使用，宽限期后再关闭
+        if entry is not None:
+            _close_later(entry[1], is_async, self._retire_grace)
+        return api
+
+    def get_stats(self) -> dict[str, Any]:
+        """客户端池命中统计与各账号实例缓存统计（不含 token）"""
+        with self._lock:
+            clients = list(self._clients.items())
+            stats: dict[str, Any] = {
+                "clients": len(clients),
+                "async_clients": len(self._async_clients),
+                "hits": self._hits,
+                "misses": self._misses,
+                "rebuilds": self._rebuilds,
+            }
+
+        accounts = []
+        for account, (_, api) in clients:
+            cache_stats = {}
+            get_cache_stats = getattr(api, "get_cache_stats", None)
+            if callable(get_cache_stats):
+                try:
+                    cache_stats = get_cache_stats()
+                except Exception as e:
+                    logger.debug(f"读取客户端缓存统计失败: {e}")
+            accounts.append({"account": account, "cache": cache_stats})
+        stats["accounts"] = accounts
+        return stats
+
+    def purge_subject(self, subject_id) -> int:
+        """从所有客户端的实例缓存中移除某条目的数据，返回移除数量"""
+        with self._lock:
+            clients = [
+                api
+                for store in (self._clients, self._async_clients)
+                for _, api in store.values()
+            ]
+        removed = 0
+        for api in clients:
+            purge = getattr(api, "purge_subject_cache", None)
+            if callable(purge):
+                try:
+                    removed += int(purge(subject_id) or 0)
+                except Exception as e:
+                    logger.debug(f"清除客户端条目缓存失败: {e}")
+        return removed
+
+    def discard(self, username: Optional[str] = None) -> None:
+        """移除指定账号的客户端（下次获取时重建，旧实例宽限期后关闭）"""
+        with self._lock:
+            entries = [
+                store.pop(str(username or ""), None)
+                for store in (self._clients, self._async_clients)
+            ]
+        for entry, is_async in zip(entries, (False, True)):
+            if entry is not None:
+                _close_later(entry[1], is_async, self._retire_grace)
+
+    def clear(self) -> None:
+        """关闭并移除所有客户端（配置整体重载或测试时使用）"""
+        with self._lock:
+            clients = [(api, False) for _, api in self._clients.values()]
+            clients.extend((api, True) for _, api in self._async_clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+            self._hits = 0
+            self._misses = 0
+            self._rebuilds = 0
+        for api, is_async in clients:
+            _close_quietly(api, is_async)
+
+
+# 全局 BangumiApi 客户端池
+bangumi_api_pool = BangumiApiPool()
@@ -1,10 +1,13 @@
+import json
 import os
 import re
+import threading
 import time
 import warnings
-from collections.abc import Generator
+from collections import OrderedDict
+from collections.abc import Generator, Iterable
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import ijson
 import requests
@@ -12,12 +15,47 @@ from rapidfuzz import fuzz
 
 from ..core.config import config_manager
 from ..core.logging import logger
+from .bangumi_data_dates import BangumiDateIndex, date_ordinal
+from .bangumi_data_item import BangumiDataItem
+from .bangumi_data_ngram import TitleNgramIndex, item_titles
+from .bangumi_data_sites import BangumiSiteIndex, external_site_ids
+from .bangumi_data_snapshot import (
+    load_snapshot,
+    save_snapshot,
+    snapshot_path,
+    source_digest,
+)
+from .bgm_unmatched_cache import bgm_unmatched_cache
+from .title_normalizer import normalize_title, strip_season_suffix
 
 # 使用全局logger实例
 
+# 加载状态
+STATE_IDLE = "idle"  # 后台模式下尚未开始加载
+STATE_LOADING = "loading"  # 正在加载，尚无可用数据
+STATE_READY = "ready"
+STATE_STALE = "stale"  # 数据可用，缓存文件已过期，后台刷新中或等待重试
+STATE_FAILED = "failed"  # 加载失败，没有可用数据
+
+# 两次检查缓存文件是否过期的最短间隔（秒）
+_FRESHNESS_CHECK_INTERVAL = 60
+# 加载或刷新失败后再次尝试的间隔（秒）
+_RELOAD_RETRY_INTERVAL = 10 * 60
+# find_bangumi_id 结果缓存的条目数上限
+_MATCH_CACHE_SIZE = 4096
+# 匹配结果缓存未命中的标记（None 是缓存的未匹配结果）
+_MATCH_MISSING = object()
+# 模糊匹配从二元组索引取的候选条目数
+_FUZZY_CANDIDATES = 50
+# 候选标题相似度下限（0-100）：各标题相似度都低于此值且无包含关系的条目，
+# 在 _calculate_match_info 中得分不会超过部分匹配阈值 0.4
+_FUZZY_SCORE_CUTOFF = 25
+# 按外部 ID 查找时优先尝试的站点，其余站点按传入顺序
+_EXTERNAL_ID_PRIORITY = ("bangumi", "tmdb")
+
 
 def _request_with_retry(
-    url, proxies=None, stream=False, max_retries=3, ssl_verify=True
+    url, proxies=None, stream=False, max_retries=3, ssl_verify=True, headers=None
 ):
     """带重试机制的HTTP请求方法"""
     # 如果禁用SSL验证，抑制urllib3的警告
@@ -30,7 +68,12 @@ def _request_with_retry(
     for attempt in range(max_retries + 1):
         try:
             response = requests.get(
-                url, proxies=proxies, stream=stream, verify=ssl_verify, timeout=30
+                url,
+                proxies=proxies,
+                stream=stream,
+                verify=ssl_verify,
+                timeout=30,
+                headers=headers,
             )
 
             # 先检查是否需要重试的状态码，再决定是否抛异常
@@ -69,10 +112,37 @@ def _request_with_retry(
     return response
 
 
+class _DataState(NamedTuple):
+    """一次载入的 bangumi-data：条目及由其构建的全部索引。
+
+    载入或刷新时先构建完整的新状态，再以一次赋值替换，查询线程不会看到
+    条目已替换而索引尚未重建的中间状态。
+    """
+
+    items: Optional[list[BangumiDataItem]]
+    loaded_at: Optional[float]
+    # 精确匹配索引：规范化标题 → [item]（与 items 共享条目对象）
+    title_index: dict[str, list[BangumiDataItem]]
+    # TMDB id → 番剧名，用于 trakt 同步时快速查找
+    tmdb_mapping: dict[str, str]
+    # 模糊匹配候选、开播日期与站点 id（TMDB 等）索引，与构建时的 items 绑定
+    ngram_index: Optional[TitleNgramIndex]
+    date_index: Optional[BangumiDateIndex]
+    site_index: Optional[BangumiSiteIndex]
+
+
+def _empty_state() -> _DataState:
+    return _DataState(None, None, {}, {}, None, None, None)
+
+
 class BangumiData:
-    """处理 bangumi-data 数据的类"""
+    """处理 bangumi-data 数据的类
+
+    background=True 时构造函数不做任何 I/O：由 start() 或首次查询在后台线程下载、解析
+    并构建索引，缓存文件过期后同样在后台刷新，查询线程不会触发下载。
+    """
 
-    def __init__(self):
+    def __init__(self, background: bool = False):
         self.data_url = config_manager.get(
             "bangumi-data",
             "data_url",
@@ -94,28 +164,187 @@ class BangumiData:
         )
         self._cached_data = None
         self._cache_items = None
-        # 内存缓存，避免重复解析文件
-        self._data_cache = None
-        self._cache_timestamp = None
+        # 内存缓存，避免重复解析文件；条目为只保留匹配字段的 BangumiDataItem，
+        # 与全部索引一起整体替换
+        self._current = _empty_state()
         self._cache_hit_count = 0  # 缓存命中次数
         self._cache_miss_count = 0  # 缓存未命中次数
         # 是否启用更详细的日志，用于调试匹配问题
         self.verbose_logging = config_manager.get("dev", "debug", fallback=False)
-        self._cache_tmdb_mapping: dict[str, str] = {}
-        # 精确匹配索引：title → [item]，加速常用查询
-        self._title_index: dict[str, list[dict]] = {}
-
-        # 启动时检查缓存，如果缺少则下载
+        # find_bangumi_id 结果缓存（含未命中），数据整体替换或自定义映射变化时清空
+        self._match_cache: OrderedDict[tuple, Optional[tuple[str, str, bool]]] = (
+            OrderedDict()
+        )
+        self._match_cache_lock = threading.Lock()
+        # 缓存结果对应的 _data_cache
+        self._match_cache_source: Optional[list[BangumiDataItem]] = None
+        self._match_hits = 0
+        self._match_misses = 0
+        # 已知首播日期时模糊匹配的开播日期窗口（天），0 表示不限制
+        self.date_window_days = config_manager.get(
+            "bangumi-data", "date_window_days", fallback=400
+        )
+        # 数据尚未载入时查询最多等待的秒数，超时后由调用方改用 API 搜索
+        self.ready_timeout = config_manager.get(
+            "bangumi-data", "ready_timeout", fallback=5
+        )
+        self._state = STATE_IDLE
+        self._state_lock = threading.Lock()
+        # 加载结束（成功或失败）时置位
+        self._loaded = threading.Event()
+        self._loader: Optional[threading.Thread] = None
+        self._last_error: Optional[str] = None
+        self._next_reload_at = 0.0
+        self._next_freshness_check = 0.0
+        self._background = background
+        # 最近一次下载是否得到 304（上游数据未变化）
+        self._not_modified = False
+
+        if not background:
+            self._load()
+            self._finish_load(refresh=False)
+
+    @property
+    def _data_cache(self) -> Optional[list[BangumiDataItem]]:
+        return self._current.items
+
+    @property
+    def _cache_timestamp(self) -> Optional[float]:
+        return self._current.loaded_at
+
+    @property
+    def _title_index(self) -> dict[str, list[BangumiDataItem]]:
+        return self._current.title_index
+
+    @property
+    def _cache_tmdb_mapping(self) -> dict[str, str]:
+        return self._current.tmdb_mapping
+
+    @property
+    def _ngram_index(self) -> Optional[TitleNgramIndex]:
+        return self._current.ngram_index
+
+    @property
+    def _date_index(self) -> Optional[BangumiDateIndex]:
+        return self._current.date_index
+
+    @property
+    def _site_index(self) -> Optional[BangumiSiteIndex]:
+        return self._current.site_index
+
+    def _load(self) -> None:
+        """下载（如需要）、解析并构建索引"""
+        # 检查缓存，如果缺少则下载
         self._check_and_download_cache_on_startup()
 
-        # 启动时预加载数据到内存
+        # 预加载数据到内存（条目与全部索引一起发布）
+        self._preload_data_to_memory()
+
+    def _refresh(self) -> None:
+        """缓存文件过期后重新下载并载入；失败时保留现有数据，上游未变化（304）时不重建"""
+        if not self._download_data():
+            raise RuntimeError("下载 bangumi-data 失败")
+        if self._not_modified and self._data_cache is not None:
+            return
         self._preload_data_to_memory()
 
-        # 启动时构建 TMDB 映射番剧名, 用于 trakt 同步时快速查找
-        self._build_tmdb_mapping()
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def start(self, refresh: bool = False) -> bool:
+        """在后台线程加载（refresh=True 时重新下载）；已在加载中或未到重试时间时返回 False"""
+        with self._state_lock:
+            if self._loader is not None and self._loader.is_alive():
+                return False
+            if self._state == STATE_READY and not refresh:
+                return False
+            if self._state in (STATE_FAILED, STATE_STALE) and (
+                time.time() < self._next_reload_at
+            ):
+                return False
+            if self._data_cache is None:
+                self._state = STATE_LOADING
+                self._loaded.clear()
+            self._loader = threading.Thread(
+                target=self._run_loader,
+                args=(refresh,),
+                name="bangumi-data-loader",
+                daemon=True,
+            )
+            self._loader.start()
+        return True
+
+    def _run_loader(self, refresh: bool) -> None:
+        started = time.time()
+        try:
+            if refresh:
+                self._refresh()
+            else:
+                self._load()
+            error = None
+        except Exception as e:
+            error = e
+            logger.error(f"后台加载 bangumi-data 失败: {e}")
+        self._finish_load(refresh, error)
+        logger.info(
+            f"bangumi-data 后台{'刷新' if refresh else '加载'}结束: 状态 {self._state}，"
+            f"耗时 {time.time() - started:.2f} 秒"
+        )
+
+    def _finish_load(
+        self, refresh: bool, error: Optional[BaseException] = None
+    ) -> None:
+        with self._state_lock:
+            if error is None and self._data_cache is not None:
+                self._state = STATE_READY
+                self._last_error = None
+            else:
+                self._last_error = str(error) if error else "没有可用的 bangumi-data"
+                self._next_reload_at = time.time() + _RELOAD_RETRY_INTERVAL
+                if self._data_cache is not None:
+                    # 刷新失败：继续使用现有数据，稍后重试
+                    self._state = STATE_STALE
+                else:
+                    self._state = STATE_FAILED
+            self._loaded.set()
+
+    def _check_freshness(self) -> None:
+        """查询时检查缓存文件是否过期（限频），过期则标记 stale 并在后台刷新"""
+        now = time.time()
+        if not self.use_cache or now < self._next_freshness_check:
+            return
+        self._next_freshness_check = now + _FRESHNESS_CHECK_INTERVAL
+        if self._state not in (STATE_READY, STATE_STALE) or self._is_cache_valid():
+            return
+        if self._state == STATE_READY:
+            logger.info("bangumi-data 缓存文件已过期，后台刷新")
+            self._state = STATE_STALE
+        self.start(refresh=True)
 
-        # 启动时构建标题精确匹配索引
-        self._build_title_index()
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """有可用数据时返回 True；数据尚未载入时开始后台加载并最多等待 timeout 秒
+
+        同步模式下数据在构造时已载入（或由 _parse_data 按需解析），总是返回 True。
+        """
+        if not self._background:
+            return True
+        if self._data_cache is not None:
+            self._check_freshness()
+            return True
+        self.start()
+        if self._state == STATE_LOADING:
+            self._loaded.wait(self.ready_timeout if timeout is None else timeout)
+        return self._data_cache is not None
+
+    def get_status(self) -> dict:
+        """加载状态"""
+        return {
+            "state": self._state,
+            "items": len(self._data_cache) if self._data_cache else 0,
+            "last_error": self._last_error,
+            "loading": self._loader is not None and self._loader.is_alive(),
+        }
 
     def _is_cache_valid(self) -> bool:
         """检查缓存是否有效（未过期）"""
@@ -134,23 +363,80 @@ class BangumiData:
             logger.error(f"检查缓存有效期时出错: {e}")
             return False
 
-    def _download_data(self) -> bool:
+    def _validators_path(self) -> str:
+        """缓存文件对应的 ETag / Last-Modified 记录文件路径"""
+        return os.path.splitext(self.local_cache_path)[0] + ".validators.json"
+
+    def _load_validators(self) -> dict:
+        """读取上次下载时的 ETag / Last-Modified；缓存文件不存在或数据源已更换时返回空"""
+        if not os.path.exists(self.local_cache_path):
+            return {}
+        try:
+            with open(self._validators_path(), encoding="utf-8") as f:
+                validators = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(validators, dict) or validators.get("url") != self.data_url:
+            return {}
+        return validators
+
+    def _save_validators(self, response) -> None:
+        validators = {"url": self.data_url}
+        for header, key in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+            value = response.headers.get(header)
+            if isinstance(value, str):
+                validators[key] = value
+        try:
+            with open(self._validators_path(), "w", encoding="utf-8") as f:
+                json.dump(validators, f)
+        except (OSError, TypeError) as e:
+            logger.debug(f"保存 bangumi-data ETag 失败: {e}")
+
+    def _download_data(self, conditional: bool = True) -> bool:
         """从远程下载 bangumi-data 数据
 
+        使用缓存文件时带上次的 ETag / Last-Modified 发起条件请求，上游未变化（304）时
+        只刷新缓存文件的修改时间，不重新下载；新数据先写入临时文件再替换缓存文件。
+
+        参数:
+            conditional: 为 False 时总是完整下载
+
         返回:
-            bool: 下载是否成功
+            bool: 下载是否成功（304 也视为成功）
         """
         logger.debug(f"正在从 {self.data_url} 下载 bangumi-data...")
+        self._not_modified = False
 
         proxies = {}
         if self.http_proxy:
             proxies = {"http": self.http_proxy, "https": self.http_proxy}
 
+        headers = {}
+        if conditional and self.use_cache:
+            validators = self._load_validators()
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        tmp_path = f"{self.local_cache_path}.tmp"
         try:
             response = _request_with_retry(
-                self.data_url, proxies=proxies, stream=True, ssl_verify=self.ssl_verify
+                self.data_url,
+                proxies=proxies,
+                stream=True,
+                ssl_verify=self.ssl_verify,
+                headers=headers or None,
             )
 
+            if headers and response.status_code == 304:
+                response.close()
+                # 重新计算缓存有效期
+                os.utime(self.local_cache_path)
+                self._not_modified = True
+                logger.info("bangumi-data 上游未变化，继续使用本地缓存")
+                return True
+
             # 确保缓存目录存在
             cache_dir = os.path.dirname(self.local_cache_path)
             if cache_dir and not os.path.exists(cache_dir):
@@ -158,14 +444,21 @@ class BangumiData:
 
             # 如果设置了使用缓存，则保存到本地
             if self.use_cache:
-                with open(self.local_cache_path, "wb") as f:
+                with open(tmp_path, "wb") as f:
                     for chunk in response.iter_content(chunk_size=8192):
                         f.write(chunk)
+                os.replace(tmp_path, self.local_cache_path)
+                self._save_validators(response)
                 logger.debug(f"bangumi-data 已缓存到 {self.local_cache_path}")
 
             return True
         except Exception as e:
             logger.error(f"下载 bangumi-data 失败: {e}")
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
             return False
 
     def _ensure_fresh_data(self) -> bool:
@@ -186,9 +479,13 @@ class BangumiData:
         return True
 
     def _parse_data(self) -> Generator[dict, None, None]:
-        """解析数据，以生成器方式返回，使用内存缓存避免重复解析"""
-        # 首先确保数据是最新的
-        self._ensure_fresh_data()
+        """解析数据，以生成器方式返回，使用内存缓存避免重复解析
+
+        后台模式下不检查缓存文件是否过期（下载只在后台加载 / 刷新时进行）。
+        """
+        if not self._background:
+            # 同步模式：确保数据是最新的
+            self._ensure_fresh_data()
 
         # 检查内存缓存是否有效
         if self._data_cache is not None:
@@ -203,57 +500,101 @@ class BangumiData:
 
         # 如果没有缓存，先解析数据到内存
         logger.debug("解析数据到内存缓存")
-        items = []
+        items = self._read_items()
+        if items is None:
+            items = []
 
-        if self.use_cache and os.path.exists(self.local_cache_path):
-            # 从缓存文件中解析
-            try:
-                with open(self.local_cache_path, "rb") as f:
-                    for item in ijson.items(f, "items.item"):
-                        items.append(item)
-            except Exception as e:
-                logger.error(f"从缓存解析 bangumi-data 失败: {e}")
-
-                # 如果缓存文件解析失败，尝试重新下载
-                if self._download_data():
-                    with open(self.local_cache_path, "rb") as f:
-                        for item in ijson.items(f, "items.item"):
-                            items.append(item)
-        else:
-            # 从网络直接解析
-            try:
-                proxies = {}
-                if self.http_proxy:
-                    proxies = {"http": self.http_proxy, "https": self.http_proxy}
-
-                with _request_with_retry(
-                    self.data_url,
-                    proxies=proxies,
-                    stream=True,
-                    ssl_verify=self.ssl_verify,
-                ) as response:
-                    for item in ijson.items(response.raw, "items.item", use_float=True):
-                        items.append(item)
-            except Exception as e:
-                logger.error(f"流式解析 bangumi-data 失败: {e}")
-                # 如果网络请求失败，但有缓存文件，尝试使用缓存
-                if os.path.exists(self.local_cache_path):
-                    logger.debug(f"尝试使用缓存文件 {self.local_cache_path}")
-                    with open(self.local_cache_path, "rb") as f:
-                        for item in ijson.items(f, "items.item"):
-                            items.append(item)
-
-        # 更新内存缓存
-        self._data_cache = items
-        self._cache_timestamp = time.time()
-
-        # 数据已刷新，重建标题索引
-        self._build_title_index()
+        # 更新内存缓存并重建索引
+        self._publish(items)
 
         # 从内存缓存中yield数据
         for item in items:
             yield item
 
+    def _read_items(self) -> Optional[list[BangumiDataItem]]:
+        """从快照、缓存文件或网络解析条目；均失败时返回 None"""
+        if self.use_cache and os.path.exists(self.local_cache_path):
+            items = self._load_snapshot()
+            if items is not None:
+                return items
+            items = self._parse_cache_file()
+            if items is None:
+                items = self._redownload_corrupt_cache()
+            if items is not None:
+                self._save_snapshot(items)
+            return items
+
+        # 从网络直接解析
+        try:
+            proxies = {}
+            if self.http_proxy:
+                proxies = {"http": self.http_proxy, "https": self.http_proxy}
+
+            items = []
+            with _request_with_retry(
+                self.data_url,
+                proxies=proxies,
+                stream=True,
+                ssl_verify=self.ssl_verify,
+            ) as response:
+                for item in ijson.items(response.raw, "items.item", use_float=True):
+                    items.append(BangumiDataItem.from_raw(item))
+            return items
+        except Exception as e:
+            logger.error(f"流式解析 bangumi-data 失败: {e}")
+
+        # 如果网络请求失败，但有缓存文件，尝试使用缓存
+        if os.path.exists(self.local_cache_path):
+            logger.debug(f"尝试使用缓存文件 {self.local_cache_path}")
+            return self._parse_cache_file()
+        return None
+
+    def _parse_cache_file(self) -> Optional[list[BangumiDataItem]]:
+        """解析本地缓存文件；文件损坏或不完整时返回 None"""
+        try:
+            with open(self.local_cache_path, "rb") as f:
+                return [
+                    BangumiDataItem.from_raw(item)
+                    for item in ijson.items(f, "items.item")
+                ]
+        except Exception as e:
+            logger.error(f"从缓存解析 bangumi-data 失败: {e}")
+            return None
+
+    def _redownload_corrupt_cache(self) -> Optional[list[BangumiDataItem]]:
+        """缓存文件无法解析时完整重新下载并再解析一次，仍失败时返回 None
+
+        先删除 ETag 记录：条件请求会得到 304 而保留损坏的文件。
+        """
+        try:
+            os.remove(self._validators_path())
+        except OSError:
+            pass
+        if not self._download_data(conditional=False):
+            return None
+        items = self._parse_cache_file()
+        if items is None:
+            logger.error("重新下载后 bangumi-data 缓存文件仍无法解析")
+        return items
+
+    def _load_snapshot(self) -> Optional[list[BangumiDataItem]]:
+        """缓存文件未变化时直接载入上次解析结果的快照"""
+        digest = source_digest(self.local_cache_path)
+        if digest is None:
+            return None
+        items = load_snapshot(snapshot_path(self.local_cache_path), digest)
+        if items is not None:
+            logger.debug(f"已从快照载入 bangumi-data，共 {len(items)} 个项目")
+        return items
+
+    def _save_snapshot(self, items: list[BangumiDataItem]) -> None:
+        """保存解析结果快照，供下次启动直接载入"""
+        if not items:
+            return
+        digest = source_digest(self.local_cache_path)
+        if digest is not None:
+            save_snapshot(snapshot_path(self.local_cache_path), digest, items)
+
     def find_bangumi_id(
         self,
         title: str,
@@ -277,23 +618,35 @@ class BangumiData:
         logger.debug(
             f"正在查找番剧 ID: {title=}, {ori_title=}, {release_date=}, {season=}"
         )
+        if not self.wait_until_ready():
+            logger.debug(f"bangumi-data 尚未就绪（{self._state}），跳过本地匹配")
+            return None
 
+        # 同一季的每一集（多用户模式下每个用户）都会以相同参数重复查找。
+        # 匹配结果取决于标题原文（规范化后同键的条目按原文区分），缓存键用原文
+        title = (title or "").strip()
+        ori_title = (ori_title or "").strip() or None
+        key = (title, ori_title or "", (release_date or "")[:10], season)
+        cached = self._match_cache_get(key)
+        if cached is not _MATCH_MISSING:
+            logger.debug(f"命中匹配结果缓存: {title=}, 结果 {cached}")
+            return cached
+        result = self._find_bangumi_id_uncached(title, ori_title, release_date, season)
+        self._match_cache_put(key, result)
+        return result
+
+    def _find_bangumi_id_uncached(
+        self,
+        title: str,
+        ori_title: str = None,
+        release_date: str = None,
+        season: int = 1,
+    ) -> Optional[tuple[str, str, bool]]:
         # 如果是非第一季，尝试从标题中识别第一季的标题
         original_title = title
         if season > 1:
             # 尝试移除标题中可能包含的季度信息
-            title_without_season = re.sub(r"\s*[第]?\s*\d+\s*期?[話话集]?$", "", title)
-            title_without_season = re.sub(
-                r"\s*Season\s*\d+$", "", title_without_season, flags=re.IGNORECASE
-            )
-            title_without_season = re.sub(
-                r"\s*S\d+$", "", title_without_season, flags=re.IGNORECASE
-            )
-            title_without_season = re.sub(r"\s*\d+$", "", title_without_season)
-            title_without_season = re.sub(r"\s*II+$", "", title_without_season)
-            title_without_season = re.sub(
-                r"\s*[第]?\s*\d+\s*[期季]$", "", title_without_season
-            )
+            title_without_season = strip_season_suffix(title)
 
             if title_without_season != title:
                 logger.debug(f"移除季度信息后的标题: {title_without_season}")
@@ -307,6 +660,93 @@ class BangumiData:
             return result
         return None
 
+    def find_bangumi_id_by_external_ids(
+        self,
+        provider_ids: Optional[dict[str, str]],
+        is_movie: bool = False,
+        season: int = 1,
+        release_date: str = None,
+    ) -> Optional[tuple[str, str, bool]]:
+        """
+        根据外部 ID（TMDB、TVDB、IMDb 等）直接查找 bangumi id
+
+        Args:
+            provider_ids: 站点名 → id，如 {"tmdb": "209867"}；TMDB 可只给数字 id
+            is_movie: 是否为电影（决定 TMDB id 补全为 movie/ 还是 tv/）
+            season: 季度，默认为 1（第一季）
+            release_date: 发布日期，多个条目共用同一外部 ID 时用于选择季度
+
+        Returns:
+            找到匹配的 (bangumi_id, matched_title, season_matched) 或 None
+            season_matched: 是否可确定为该季度的条目
+        """
+        if not provider_ids:
+            return None
+        if not self.wait_until_ready():
+            logger.debug(f"bangumi-data 尚未就绪（{self._state}），跳过外部 ID 匹配")
+            return None
+        state = self._current
+        index = state.site_index
+        if index is None or index.items is not state.items:
+            return None
+
+        providers = sorted(
+            provider_ids.items(),
+            key=lambda kv: (
+                _EXTERNAL_ID_PRIORITY.index(kv[0].lower())
+                if kv[0].lower() in _EXTERNAL_ID_PRIORITY
+                else len(_EXTERNAL_ID_PRIORITY)
+            ),
+        )
+        for provider, value in providers:
+            site_ids = external_site_ids(provider, value, is_movie, season)
+            for site, site_id in site_ids:
+                items = index.lookup(site, site_id)
+                if not items:
+                    continue
+                # 带季度的 TMDB id（tv/123/season/2）本身即确定了季度
+                season_specific = "/season/" in site_id
+                item, season_matched = self._pick_site_match(
+                    items, season_specific or is_movie, season, release_date
+                )
+                logger.debug(
+                    f"外部 ID {site}:{site_id} 命中 {len(items)} 个条目，"
+                    f"选择 {item.bangumi_id}（季度确定: {season_matched}）"
+                )
+                return (
+                    item.bangumi_id,
+                    self._get_best_matched_title(item),
+                    season_matched,
+                )
+        return None
+
+    @staticmethod
+    def _pick_site_match(
+        items: tuple[BangumiDataItem, ...],
+        season_specific: bool,
+        season: int,
+        release_date: Optional[str],
+    ) -> tuple[BangumiDataItem, bool]:
+        """从共用同一外部 ID 的条目中选出一个，并判断是否确定为所求季度"""
+        if len(items) == 1:
+            return items[0], season_specific or season <= 1
+        # 分季、分批播出的 TV 动画常共用一个 TMDB 剧集 id：按开播日期排序，
+        # 取开播日期不晚于播出日期的最后一个条目（允许 1 天时差）
+        dated = []
+        for pos, item in enumerate(items):
+            ordinal = date_ordinal(item.begin) if item.begin else None
+            if ordinal is not None:
+                dated.append((ordinal, pos))
+        dated.sort()
+        target = date_ordinal(release_date) if release_date else None
+        if target is not None and dated:
+            aired = [pos for ordinal, pos in dated if ordinal <= target + 1]
+            if aired:
+                return items[aired[-1]], True
+        # 无法按日期确定时取最早的条目；非第一季由调用方从该条目遍历续集
+        first = items[dated[0][1]] if dated else items[0]
+        return first, season_specific or season <= 1
+
     def _find_bangumi_id_optimized(
         self,
         title: str,
@@ -326,7 +766,7 @@ class BangumiData:
         exact_candidates = []
         lookup_keys = [k for k in (title, ori_title) if k]
         for key in lookup_keys:
-            items = self._title_index.get(key)
+            items = self._title_index.get(normalize_title(key) or key)
             if items:
                 for item in items:
                     bangumi_id = self._extract_bangumi_id(item)
@@ -334,6 +774,15 @@ class BangumiData:
                         exact_candidates.append((item, bangumi_id, key))
 
         if exact_candidates:
+            # 规范化去掉了标点（「けいおん!」与「けいおん!!」同键），有原文相同的候选时只取这些
+            verbatim = [
+                candidate
+                for candidate in exact_candidates
+                if candidate[2].strip()
+                in (t.strip() for t in item_titles(candidate[0]))
+            ]
+            if verbatim:
+                exact_candidates = verbatim
             matched_key = exact_candidates[0][2]
             logger.debug(
                 f"标题索引命中: key='{matched_key}', 候选数={len(exact_candidates)}"
@@ -341,18 +790,17 @@ class BangumiData:
             if release_date:
                 min_diff = float("inf")
                 best = None
+                d1 = date_ordinal(release_date)
                 for item, bangumi_id, matched_key in exact_candidates:
                     item_date = item.get("begin", "")
-                    if item_date:
-                        try:
-                            d1 = datetime.strptime(release_date[:10], "%Y-%m-%d")
-                            d2 = datetime.strptime(item_date[:10], "%Y-%m-%d")
-                            diff = abs((d1 - d2).days)
-                            if diff < min_diff:
-                                min_diff = diff
-                                best = (bangumi_id, matched_key, True)
-                        except ValueError:
+                    if item_date and d1 is not None:
+                        d2 = date_ordinal(item_date)
+                        if d2 is None:
                             continue
+                        diff = abs(d1 - d2)
+                        if diff < min_diff:
+                            min_diff = diff
+                            best = (bangumi_id, matched_key, True)
                 if best:
                     if min_diff <= 180:
                         return best
@@ -360,55 +808,27 @@ class BangumiData:
                     logger.debug(
                         f"标题索引命中但日期差 {min_diff} 天 > 180，回退线性扫描检查部分匹配"
                     )
-            else:
-                # 无日期时返回第一个精确匹配
+            elif len({bangumi_id for _, bangumi_id, _ in exact_candidates}) == 1:
+                # 无日期且只有一个条目时直接返回
                 first = exact_candidates[0]
                 return (first[1], first[2], False)
-
-        # 精确索引未命中，回退到线性扫描模糊匹配
-        logger.debug("开始尝试完全匹配...")
-        exact_matches = []
-        partial_matches = []
-
-        # 优化：先进行快速预筛选
-        processed_count = 0
-
-        for item in self._parse_data():
-            processed_count += 1
-
-            # 快速预筛选：默认要求有简中翻译；若提供了 ori_title，仍可对无 zh-Hans 的条目做日文原标题匹配
-            missing_zh = (
-                "titleTranslate" not in item or "zh-Hans" not in item["titleTranslate"]
+            else:
+                # 无日期且多个条目同键：回退到按原文评分的匹配
+                logger.debug("标题索引命中多个条目且无日期，回退模糊匹配")
+
+        # 精确索引未命中：由二元组索引取候选条目做模糊匹配，索引不可用时线性扫描
+        candidates = self._fuzzy_candidates(title, ori_title, release_date)
+        if candidates is None:
+            logger.debug("开始尝试完全匹配...")
+            exact_matches, partial_matches, processed_count = self._collect_matches(
+                self._parse_data(), title, ori_title, release_date, early_exit=True
             )
-            if title and missing_zh:
-                ori_ok = ori_title and str(ori_title).strip() and item.get("title")
-                if not ori_ok:
-                    continue
-
-            # 一次性计算所有相似度，避免重复计算
-            match_info = self._calculate_match_info(
-                item, title, ori_title, release_date
+        else:
+            logger.debug(f"二元组索引候选 {len(candidates)} 个，开始尝试完全匹配...")
+            exact_matches, partial_matches, processed_count = self._collect_matches(
+                candidates, title, ori_title, release_date, early_exit=False
             )
 
-            if match_info["exact_match"]:
-                # 完全匹配
-                bangumi_id = self._extract_bangumi_id(item)
-                if bangumi_id:
-                    exact_matches.append((item, bangumi_id, match_info["match_type"]))
-
-                    # 如果找到完全匹配，可以提前退出（除非需要检查日期）
-                    if not release_date or len(exact_matches) >= 3:
-                        break
-            elif match_info["score"] > 0.4:
-                # 部分匹配
-                bangumi_id = self._extract_bangumi_id(item)
-                if bangumi_id:
-                    partial_matches.append((item, match_info["score"], bangumi_id))
-
-                    # 限制部分匹配的数量以提高性能
-                    if len(partial_matches) >= 10:
-                        break
-
         if self.verbose_logging:
             logger.debug(
                 f"处理了 {processed_count} 个项目，找到 {len(exact_matches)} 个完全匹配，{len(partial_matches)} 个部分匹配"
@@ -538,6 +958,119 @@ class BangumiData:
         logger.debug("未找到匹配的番剧 ID")
         return None
 
+    def _match_cache_get(self, key: tuple):
+        """读取匹配结果缓存；数据不在内存中时不缓存，返回 _MATCH_MISSING"""
+        with self._match_cache_lock:
+            if self._data_cache is None:
+                return _MATCH_MISSING
+            if self._match_cache_source is not self._data_cache:
+                # 数据已整体替换
+                self._match_cache.clear()
+                self._match_cache_source = self._data_cache
+            if key in self._match_cache:
+                self._match_cache.move_to_end(key)
+                self._match_hits += 1
+                return self._match_cache[key]
+            self._match_misses += 1
+            return _MATCH_MISSING
+
+    def _match_cache_put(
+        self, key: tuple, result: Optional[tuple[str, str, bool]]
+    ) -> None:
+        with self._match_cache_lock:
+            if self._data_cache is None or (
+                self._match_cache_source is not self._data_cache
+            ):
+                return
+            self._match_cache[key] = result
+            if len(self._match_cache) > _MATCH_CACHE_SIZE:
+                self._match_cache.popitem(last=False)
+
+    def clear_match_cache(self) -> None:
+        """清空匹配结果缓存（bangumi-data 或自定义映射变化时调用）"""
+        with self._match_cache_lock:
+            self._match_cache.clear()
+            self._match_cache_source = None
+
+    def _fuzzy_candidates(
+        self, title: str, ori_title: str = None, release_date: str = None
+    ) -> Optional[list[BangumiDataItem]]:
+        """从二元组索引取模糊匹配候选；索引未对当前数据构建时返回 None
+
+        已知首播日期时只在开播日期 ± date_window_days 天内的条目中选取。
+        """
+        state = self._current
+        index = state.ngram_index
+        if index is None or index.items is not state.items:
+            return None
+        allowed = None
+        center = date_ordinal(release_date) if release_date else None
+        dates = state.date_index
+        if (
+            center is not None
+            and self.date_window_days > 0
+            and dates is not None
+            and dates.items is state.items
+        ):
+            allowed = dates.window(center, self.date_window_days)
+        return index.similar(
+            (title, ori_title), _FUZZY_CANDIDATES, _FUZZY_SCORE_CUTOFF, allowed
+        )
+
+    def _collect_matches(
+        self,
+        items: Iterable[dict],
+        title: str,
+        ori_title: str = None,
+        release_date: str = None,
+        early_exit: bool = True,
+    ) -> tuple[list, list, int]:
+        """计算条目的匹配信息，返回 (完全匹配, 部分匹配, 处理条目数)
+
+        early_exit 为 True 时（线性扫描全部条目）找到足够的匹配即提前退出。
+        """
+        exact_matches = []
+        partial_matches = []
+        processed_count = 0
+
+        for item in items:
+            processed_count += 1
+
+            # 快速预筛选：默认要求有简中翻译；若提供了 ori_title，仍可对无 zh-Hans 的条目做日文原标题匹配
+            missing_zh = (
+                "titleTranslate" not in item or "zh-Hans" not in item["titleTranslate"]
+            )
+            if title and missing_zh:
+                ori_ok = ori_title and str(ori_title).strip() and item.get("title")
+                if not ori_ok:
+                    continue
+
+            # 一次性计算所有相似度，避免重复计算
+            match_info = self._calculate_match_info(
+                item, title, ori_title, release_date
+            )
+
+            if match_info["exact_match"]:
+                # 完全匹配
+                bangumi_id = self._extract_bangumi_id(item)
+                if bangumi_id:
+                    exact_matches.append((item, bangumi_id, match_info["match_type"]))
+
+                    # 如果找到完全匹配，可以提前退出（除非需要检查日期）
+                    if early_exit and (not release_date or len(exact_matches) >= 3):
+                        break
+            elif match_info["score"] > 0.4:
+                # 部分匹配
+                bangumi_id = self._extract_bangumi_id(item)
+                if bangumi_id:
+                    partial_matches.append((item, match_info["score"], bangumi_id))
+
+                    # 限制部分匹配的数量以提高性能
+                    if early_exit and len(partial_matches) >= 10:
+                        break
+
+        return exact_matches, partial_matches, processed_count
+
     def get_cache_stats(self) -> dict:
         """获取缓存统计信息
 
@@ -555,16 +1088,42 @@ class BangumiData:
             "total_requests": total_requests,
             "hit_rate": hit_rate,
             "cache_size": len(self._data_cache) if self._data_cache else 0,
+            "state": self._state,
+            "match_cache_hits": self._match_hits,
+            "match_cache_misses": self._match_misses,
+            "match_cache_hit_rate": (
+                self._match_hits / (self._match_hits + self._match_misses) * 100
+                if self._match_hits + self._match_misses
+                else 0
+            ),
+            "match_cache_size": len(self._match_cache),
             "cache_age_minutes": (time.time() - self._cache_timestamp) / 60
             if self._cache_timestamp
             else 0,
         }
 
+    def get_data_version(self) -> str:
+        """当前数据版本：缓存文件的修改时间（不使用缓存文件时为载入内存的时间）
+
+        数据尚未载入时返回加载状态，载入后版本随之变化（未匹配缓存随之失效）。
+        """
+        if self._background and self._data_cache is None:
+            return self._state
+        if self.use_cache and os.path.exists(self.local_cache_path):
+            return str(os.path.getmtime(self.local_cache_path))
+        return str(self._cache_timestamp or "")
+
     def clear_cache(self):
-        """清理内存缓存"""
-        self._data_cache = None
-        self._cache_timestamp = None
-        self._title_index.clear()
+        """清理内存缓存
+
+        后台模式下同时回到未加载状态，之后的 start() 或查询会重新加载。
+        """
+        with self._state_lock:
+            self._current = _empty_state()
+            if self._loader is None or not self._loader.is_alive():
+                self._state = STATE_IDLE
+                self._next_reload_at = 0.0
+        self.clear_match_cache()
         logger.debug("内存缓存已清理")
 
     def force_update(self) -> bool:
@@ -574,9 +1133,11 @@ class BangumiData:
             bool: 更新是否成功
         """
         logger.info("强制更新 bangumi-data 数据...")
-        success = self._download_data()
+        success = self._download_data(conditional=False)
         if success:
             self.clear_cache()
+            bgm_unmatched_cache.clear()
+            self.start()
         return success
 
     def _match_title_fuzzy(self, item: dict, title: str, ori_title: str = None) -> bool:
@@ -695,14 +1256,13 @@ class BangumiData:
         return False
 
     def _date_diff(self, date1: str, date2: str) -> int:
-        """计算两个日期之间的天数差"""
-        try:
-            d1 = datetime.strptime(date1[:10], "%Y-%m-%d")
-            d2 = datetime.strptime(date2[:10], "%Y-%m-%d")
-            return abs((d2 - d1).days)
-        except Exception as e:
-            logger.error(f"计算日期差异时出错: {e}")
+        """计算两个日期之间的天数差（日期序数带缓存，不重复解析）"""
+        d1 = date_ordinal(date1)
+        d2 = date_ordinal(date2)
+        if d1 is None or d2 is None:
+            logger.error(f"计算日期差异时出错: 无法解析日期 {date1!r} / {date2!r}")
             return 999999  # 返回一个非常大的数字表示不匹配
+        return abs(d2 - d1)
 
     def _calculate_match_info(
         self, item: dict, title: str, ori_title: str = None, release_date: str = None
@@ -912,40 +1472,13 @@ class BangumiData:
             self._ensure_fresh_data()
 
             # 解析数据到内存
-            items = []
-            if self.use_cache and os.path.exists(self.local_cache_path):
-                # 从缓存文件中解析
-                try:
-                    with open(self.local_cache_path, "rb") as f:
-                        for item in ijson.items(f, "items.item"):
-                            items.append(item)
-                except Exception as e:
-                    logger.error(f"预加载时从缓存解析 bangumi-data 失败: {e}")
-                    return
-            else:
-                # 从网络直接解析
-                try:
-                    proxies = {}
-                    if self.http_proxy:
-                        proxies = {"http": self.http_proxy, "https": self.http_proxy}
-
-                    with _request_with_retry(
-                        self.data_url,
-                        proxies=proxies,
-                        stream=True,
-                        ssl_verify=self.ssl_verify,
-                    ) as response:
-                        for item in ijson.items(
-                            response.raw, "items.item", use_float=True
-                        ):
-                            items.append(item)
-                except Exception as e:
-                    logger.error(f"预加载时流式解析 bangumi-data 失败: {e}")
-                    return
-
-            # 更新内存缓存
-            self._data_cache = items
-            self._cache_timestamp = time.time()
+            items = self._read_items()
+            if items is None:
+                logger.error("预加载 bangumi-data 失败：没有可解析的数据")
+                return
+
+            # 更新内存缓存并构建索引
+            self._publish(items)
 
             end_time = time.time()
             logger.info(
@@ -956,33 +1489,54 @@ class BangumiData:
             logger.error(f"预加载 bangumi-data 到内存失败: {e}")
             # 预加载失败不影响后续使用，会在第一次调用时重新加载
 
-    def _build_tmdb_mapping(self):
-        """构建 TMDB id 到番剧名的映射"""
+    def _publish(self, items: list[BangumiDataItem]) -> None:
+        """为条目构建全部索引，再以一次赋值替换当前数据"""
+        self._current = self._build_state(items)
+        self.clear_match_cache()
 
-        for item in self._parse_data():
-            tmdb_id = None
+    def _build_state(self, items: list[BangumiDataItem]) -> _DataState:
+        """构建标题精确匹配、TMDB 映射、二元组、开播日期与站点索引
 
-            # 提取 TMDB id
-            for site in item.get("sites", []):
-                if site.get("site") == "tmdb":
-                    tmdb_id = site.get("id")
-                    self._cache_tmdb_mapping[tmdb_id] = item.get("title", "")
-                    break
+        标题索引的键为 normalize_title 的结果（繁简、全半角、标点差异不影响命中），
+        规范化后为空的标题（纯标点等）以原文为键。
+        """
+        title_index: dict[str, list[BangumiDataItem]] = {}
+        tmdb_mapping: dict[str, str] = {}
 
-    def _build_title_index(self):
-        """构建标题→item 精确匹配索引，加速常用查找"""
-        self._title_index.clear()
-        for item in self._parse_data():
+        def add(key: str, item: BangumiDataItem) -> None:
+            entries = title_index.setdefault(normalize_title(key) or key, [])
+            # 原标题与译名规范化后可能相同，同一条目只记录一次
+            if not entries or entries[-1] is not item:
+                entries.append(item)
+
+        for item in items:
             # 原标题（通常是日文），过滤空白标题
             raw_title = item.get("title")
             if raw_title and raw_title.strip():
-                self._title_index.setdefault(raw_title, []).append(item)
+                add(raw_title, item)
             # 中文翻译标题，过滤空白标题
             if "titleTranslate" in item and "zh-Hans" in item["titleTranslate"]:
                 for zh_title in item["titleTranslate"]["zh-Hans"]:
                     if zh_title and zh_title.strip():
-                        self._title_index.setdefault(zh_title, []).append(item)
-        logger.info(f"标题索引构建完成，共 {len(self._title_index)} 个唯一标题")
+                        add(zh_title, item)
+            # 提取 TMDB id
+            for site in item.get("sites", []):
+                if site.get("site") == "tmdb":
+                    tmdb_mapping[site.get("id")] = item.get("title", "")
+                    break
+        logger.info(f"标题索引构建完成，共 {len(title_index)} 个唯一标题")
+
+        ngram_index = TitleNgramIndex(items)
+        logger.debug(f"二元组索引构建完成，共 {len(ngram_index)} 个二元组")
+        return _DataState(
+            items=items,
+            loaded_at=time.time(),
+            title_index=title_index,
+            tmdb_mapping=tmdb_mapping,
+            ngram_index=ngram_index,
+            date_index=BangumiDateIndex(items),
+            site_index=BangumiSiteIndex(items),
+        )
 
     def get_title_by_tmdb_id(self, tmdb_id: str) -> Optional[str]:
         """根据 TMDB id 获取番剧名
@@ -996,5 +1550,5 @@ class BangumiData:
         return self._cache_tmdb_mapping.get(tmdb_id, None)
 
 
-# 全局 bangumi_data 实例
-bangumi_data = BangumiData()
+# 全局 bangumi_data 实例（后台加载，导入时不阻塞）
+bangumi_data = BangumiData(background=True)
@@ -0,0 +1,56 @@
+"""bangumi-data 开播日期索引。
+
+大多数 Webhook 都带有首播日期，原先的模糊匹配却先对全部候选计算相似度，再逐个用
+datetime.strptime 解析开播日期比较。这里把条目的开播日期解析为序数（date.toordinal）
+并按序排列，查询时二分得到日期窗口内的条目，模糊匹配只在窗口内进行；日期比较同样
+使用缓存的序数，不再重复解析字符串。
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=65536)
+def date_ordinal(text: str) -> Optional[int]:
+    """YYYY-MM-DD（可带时间部分）→ 日期序数，无法解析时返回 None"""
+    try:
+        return datetime.strptime(text[:10], "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class BangumiDateIndex:
+    """按开播日期排序的条目位置，只在构建后读取（重建时整体替换）"""
+
+    __slots__ = ("items", "_ordinals", "_positions", "_undated")
+
+    def __init__(self, items: Sequence[Mapping]):
+        # 与构建时的条目列表绑定，条目列表被替换后索引随之失效
+        self.items = items
+        dated = []
+        undated = []
+        for pos, item in enumerate(items):
+            begin = item.get("begin")
+            ordinal = date_ordinal(begin) if begin else None
+            if ordinal is None:
+                undated.append(pos)
+            else:
+                dated.append((ordinal, pos))
+        dated.sort()
+        self._ordinals = array("l", (o for o, _ in dated))
+        self._positions = array("I", (p for _, p in dated))
+        # 没有开播日期的条目无法按日期排除，总是保留
+        self._undated = frozenset(undated)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def window(self, center: int, days: int) -> frozenset[int]:
+        """开播日期在 center ± days 天内的条目位置（含没有开播日期的条目）"""
+        lo = bisect_left(self._ordinals, center - days)
+        hi = bisect_right(self._ordinals, center + days)
+        return self._undated.union(self._positions[lo:hi])
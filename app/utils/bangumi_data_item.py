@@ -0,0 +1,121 @@
+"""bangumi-data 条目的紧凑内存表示。
+
+ijson 解析出的原始条目是多层嵌套的 dict（titleTranslate、sites、broadcast、type 等），
+上万个条目常驻内存是进程中最大的一块分配。匹配只用到原标题、简中译名、开播日期、
+bangumi id 与各站点 id（TMDB 等，用于按外部 ID 直接查找），这里只保留这些字段，使用
+__slots__ 对象存储，字符串统一驻留（重复的日期、译名、站点名只保存一份）。
+
+为兼容按 bangumi-data 原始结构读取条目的代码，条目实现只读 Mapping 接口，按需还原
+title / titleTranslate / begin / sites 四个键（begin 只保留日期部分）。
+"""
+
+import sys
+from collections.abc import Iterator, Mapping
+from typing import Any, Optional
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class BangumiDataItem(Mapping):
+    """只保留匹配所需字段的 bangumi-data 条目"""
+
+    __slots__ = ("title", "zh_hans", "begin", "bangumi_id", "tmdb_id", "site_ids")
+
+    def __init__(
+        self,
+        title: Optional[str] = None,
+        zh_hans: Optional[tuple[str, ...]] = None,
+        begin: Optional[str] = None,
+        bangumi_id: Optional[str] = None,
+        tmdb_id: Optional[str] = None,
+        site_ids: tuple[str, ...] = (),
+    ):
+        self.title = title
+        # None 表示原始条目没有 zh-Hans 译名（与空列表区分）
+        self.zh_hans = zh_hans
+        self.begin = begin
+        self.bangumi_id = bangumi_id
+        self.tmdb_id = tmdb_id
+        # bangumi 与 tmdb_id 以外的站点：站点名、id 交替排列的扁平元组（省去每个站点一个元组）
+        self.site_ids = site_ids
+
+    @classmethod
+    def from_raw(cls, raw: Mapping) -> "BangumiDataItem":
+        """由 bangumi-data 原始条目构造"""
+        if isinstance(raw, cls):
+            return raw
+        translate = raw.get("titleTranslate")
+        zh_hans = None
+        if isinstance(translate, Mapping) and "zh-Hans" in translate:
+            zh_hans = tuple(_intern(t) for t in translate["zh-Hans"] or ())
+        begin = raw.get("begin")
+        bangumi_id = tmdb_id = None
+        site_ids = []
+        for site in raw.get("sites") or ():
+            name = site.get("site")
+            if name == "bangumi":
+                if bangumi_id is None and site.get("id"):
+                    bangumi_id = site["id"]
+                continue
+            if name == "tmdb" and tmdb_id is None:
+                tmdb_id = site.get("id")
+            elif isinstance(name, str) and isinstance(site.get("id"), str):
+                site_ids.extend((_intern(name), _intern(site["id"])))
+        return cls(
+            _intern(raw.get("title")),
+            zh_hans,
+            _intern(begin[:10]) if isinstance(begin, str) else None,
+            _intern(bangumi_id),
+            _intern(tmdb_id),
+            tuple(site_ids),
+        )
+
+    @property
+    def sites(self) -> list[dict[str, str]]:
+        sites = []
+        if self.bangumi_id is not None:
+            sites.append({"site": "bangumi", "id": self.bangumi_id})
+        if self.tmdb_id is not None:
+            sites.append({"site": "tmdb", "id": self.tmdb_id})
+        pairs = iter(self.site_ids)
+        sites.extend({"site": name, "id": id_} for name, id_ in zip(pairs, pairs))
+        return sites
+
+    # 只读 Mapping 接口：按 bangumi-data 原始结构访问
+
+    def __contains__(self, key: object) -> bool:
+        if key == "title":
+            return self.title is not None
+        if key == "titleTranslate":
+            return self.zh_hans is not None
+        if key == "begin":
+            return self.begin is not None
+        if key == "sites":
+            return (
+                self.bangumi_id is not None
+                or self.tmdb_id is not None
+                or bool(self.site_ids)
+            )
+        return False
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        if key == "title":
+            return self.title
+        if key == "titleTranslate":
+            return {"zh-Hans": self.zh_hans}
+        if key == "begin":
+            return self.begin
+        return self.sites
+
+    def __iter__(self) -> Iterator[str]:
+        return (k for k in ("title", "titleTranslate", "begin", "sites") if k in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"BangumiDataItem({self.title!r}, bangumi_id={self.bangumi_id!r})"
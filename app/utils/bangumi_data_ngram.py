@@ -0,0 +1,117 @@
+"""bangumi-data 标题的字符二元组倒排索引。
+
+标题精确索引未命中时，原先的模糊匹配会线性扫描全部条目并逐个计算相似度，找到 3 个
+完全匹配或 10 个部分匹配就提前退出，结果取决于遍历顺序。这里为每个条目的原标题与
+简中译名（经 title_normalizer 规范化后）建立字符二元组 → 条目位置的倒排表：查询时按共享二元组数量取前
+若干个候选，再用 rapidfuzz 的 process.extract 一次性计算候选标题的相似度，过滤掉不可能
+达到部分匹配阈值的条目。候选集与遍历顺序无关，查找也不再扫描全部条目。
+"""
+
+import heapq
+from array import array
+from collections import Counter
+from collections.abc import Container, Iterable, Mapping, Sequence
+from typing import Optional
+
+from rapidfuzz import fuzz, process
+
+from .bangumi_data_item import BangumiDataItem
+from .title_normalizer import normalize_title
+
+
+def title_grams(text: str) -> set[str]:
+    """规范化标题的字符二元组（单字标题即为该字本身）"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def item_titles(item: Mapping) -> list[str]:
+    """参与模糊匹配的标题：原标题与简中译名"""
+    title = item.get("title")
+    titles = [title] if title else []
+    translate = item.get("titleTranslate") or {}
+    titles.extend(t for t in translate.get("zh-Hans") or () if t)
+    return titles
+
+
+class TitleNgramIndex:
+    """标题二元组倒排索引，只在构建后读取（重建时整体替换）"""
+
+    __slots__ = ("items", "_postings")
+
+    def __init__(self, items: Sequence[BangumiDataItem]):
+        # 与构建时的条目列表绑定，条目列表被替换后索引随之失效
+        self.items = items
+        postings: dict[str, list[int]] = {}
+        for pos, item in enumerate(items):
+            grams = set()
+            for title in item_titles(item):
+                grams |= title_grams(normalize_title(title))
+            for gram in grams:
+                postings.setdefault(gram, []).append(pos)
+        self._postings = {gram: array("I", p) for gram, p in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def candidates(
+        self,
+        queries: Iterable[str],
+        limit: int,
+        allowed: Optional[Container[int]] = None,
+    ) -> list[int]:
+        """按共享二元组数量取前 limit 个候选条目位置（数量相同按条目顺序）
+
+        allowed 不为 None 时只在其中的条目位置里选取（如开播日期窗口）。
+        """
+        grams = set()
+        for query in queries:
+            grams |= title_grams(normalize_title(query))
+        shared: Counter = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting:
+                shared.update(posting)
+        counts = shared.items()
+        if allowed is not None:
+            counts = [kv for kv in counts if kv[0] in allowed]
+        top = heapq.nsmallest(limit, counts, key=lambda kv: (-kv[1], kv[0]))
+        return [pos for pos, _ in top]
+
+    def similar(
+        self,
+        queries: Iterable[str],
+        limit: int,
+        score_cutoff: float,
+        allowed: Optional[Container[int]] = None,
+    ) -> list[BangumiDataItem]:
+        """候选条目中与任一查询标题相似度不低于 score_cutoff（0-100）或存在包含关系的条目
+
+        结果按条目在数据中的顺序排列。
+        """
+        queries = [q for q in queries if q]
+        positions = self.candidates(queries, limit, allowed)
+        if not positions:
+            return []
+        choices: list[str] = []
+        owners: list[int] = []
+        for pos in positions:
+            for title in item_titles(self.items[pos]):
+                choices.append(title)
+                owners.append(pos)
+        keep = set()
+        for query in queries:
+            for _, _, i in process.extract(
+                query,
+                choices,
+                scorer=fuzz.ratio,
+                score_cutoff=score_cutoff,
+                limit=None,
+            ):
+                keep.add(owners[i])
+            # 包含关系另有加分，短查询与长标题的相似度可能低于阈值
+            for i, title in enumerate(choices):
+                if query in title or title in query:
+                    keep.add(owners[i])
+        return [self.items[pos] for pos in sorted(keep)]
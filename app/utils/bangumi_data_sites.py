@@ -0,0 +1,72 @@
+"""bangumi-data 站点 ID 索引。
+
+Plex、Emby、Jellyfin 与 Trakt 的数据常带有 TMDB 等外部 ID，bangumi-data 的 sites 字段
+同样记录了条目在各站点的 id（tmdb 为 tv/123、movie/456 形式）。这里把每个条目的全部
+站点 id 建立为「站点:id」→ 条目的字典，按外部 ID 查找 bangumi 条目只需一次字典查询，
+不必先做标题匹配或 API 搜索。
+"""
+
+from collections.abc import Iterator, Sequence
+
+from .bangumi_data_item import BangumiDataItem
+
+
+def site_key(site: str, site_id: str) -> str:
+    """索引键：小写站点名与 id"""
+    return f"{site.lower()}:{site_id}"
+
+
+def item_site_ids(item: BangumiDataItem) -> Iterator[tuple[str, str]]:
+    """条目的全部 (站点, id)，含 bangumi 自身"""
+    if item.bangumi_id:
+        yield "bangumi", item.bangumi_id
+    if item.tmdb_id:
+        yield "tmdb", item.tmdb_id
+    pairs = iter(item.site_ids)
+    yield from zip(pairs, pairs)
+
+
+def external_site_ids(
+    provider: str, value: str, is_movie: bool = False, season: int = 1
+) -> list[tuple[str, str]]:
+    """外部 ID → 依次尝试的 (站点, bangumi-data 中的 id)
+
+    TMDB 只给出数字 id 时按媒体类型补全为 movie/123 或 tv/123（先尝试分季的
+    tv/123/season/2），其余站点原样使用。
+    """
+    provider = (provider or "").strip().lower()
+    value = str(value or "").strip()
+    if not provider or not value:
+        return []
+    if provider == "tmdb" and "/" not in value:
+        if is_movie:
+            return [("tmdb", f"movie/{value}")]
+        return [("tmdb", f"tv/{value}/season/{season}"), ("tmdb", f"tv/{value}")]
+    return [(provider, value)]
+
+
+class BangumiSiteIndex:
+    """站点 id → 条目索引，只在构建后读取（重建时整体替换）"""
+
+    __slots__ = ("items", "_index")
+
+    def __init__(self, items: Sequence[BangumiDataItem]):
+        # 与构建时的条目列表绑定，条目列表被替换后索引随之失效
+        self.items = items
+        index: dict[str, list[BangumiDataItem]] = {}
+        for item in items:
+            # 没有 bangumi id 的条目查到也无法同步
+            if not item.bangumi_id:
+                continue
+            for site, site_id in item_site_ids(item):
+                entries = index.setdefault(site_key(site, site_id), [])
+                if not entries or entries[-1] is not item:
+                    entries.append(item)
+        self._index = {key: tuple(entries) for key, entries in index.items()}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, site: str, site_id: str) -> tuple[BangumiDataItem, ...]:
+        """站点 id 对应的全部条目（分季、分批的 TV 动画可能共用一个 TMDB id）"""
+        return self._index.get(site_key(site, site_id), ())
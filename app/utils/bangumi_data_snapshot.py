@@ -0,0 +1,93 @@
+"""bangumi-data 解析结果的二进制快照。
+
+启动时用 ijson 解析完整的 bangumi-data JSON 需要数秒，期间无法处理 Webhook。解析后的
+紧凑条目按字段分列（每个字段一个列表），以 marshal 格式写入缓存 JSON 旁的快照文件；
+文件头记录快照格式版本、Python 版本与源 JSON 的 SHA-256。下次启动时源文件未变化即
+直接载入快照（毫秒级），上游数据更新（源文件哈希变化）或格式版本变化时重新解析并
+覆盖快照。
+"""
+
+import hashlib
+import marshal
+import os
+import struct
+import sys
+from typing import Optional
+
+from ..core.logging import logger
+from .bangumi_data_item import BangumiDataItem
+
+# 快照格式版本：BangumiDataItem 字段变化时递增
+SNAPSHOT_VERSION = 2
+
+_MAGIC = b"BGMDSNAP"
+# 魔数、格式版本、marshal 版本、Python 主次版本、源文件 SHA-256
+_HEADER = struct.Struct("<8sHHBB32s")
+_FIELDS = BangumiDataItem.__slots__
+
+
+def snapshot_path(source_path: str) -> str:
+    """快照文件路径：与缓存 JSON 同目录、同名，扩展名为 .snapshot"""
+    return os.path.splitext(source_path)[0] + ".snapshot"
+
+
+def source_digest(source_path: str) -> Optional[bytes]:
+    """源 JSON 的 SHA-256；文件不可读时返回 None"""
+    digest = hashlib.sha256()
+    try:
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except (OSError, TypeError) as e:
+        logger.debug(f"计算 bangumi-data 哈希失败: {e}")
+        return None
+    return digest.digest()
+
+
+def _header(digest: bytes) -> bytes:
+    return _HEADER.pack(
+        _MAGIC,
+        SNAPSHOT_VERSION,
+        marshal.version,
+        sys.version_info[0],
+        sys.version_info[1],
+        digest,
+    )
+
+
+def load_snapshot(path: str, digest: bytes) -> Optional[list[BangumiDataItem]]:
+    """载入与 digest 对应的快照；不存在、版本不符或已损坏时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(_HEADER.size) != _header(digest):
+                return None
+            columns = marshal.loads(f.read())
+        # marshal 保留字符串的驻留标记，载入后无需再次驻留
+        return [BangumiDataItem(*row) for row in zip(*columns)]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"bangumi-data 快照 {path} 无法读取，将重新解析: {e}")
+        return None
+
+
+def save_snapshot(path: str, digest: bytes, items: list[BangumiDataItem]) -> bool:
+    """写入快照（先写临时文件再替换，避免读到写了一半的文件）"""
+    tmp_path = f"{path}.tmp"
+    try:
+        payload = marshal.dumps(
+            tuple([getattr(item, field) for item in items] for field in _FIELDS)
+        )
+        with open(tmp_path, "wb") as f:
+            f.write(_header(digest))
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"写入 bangumi-data 快照失败: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    logger.debug(f"bangumi-data 快照已写入 {path}（{len(items)} 个条目）")
+    return True
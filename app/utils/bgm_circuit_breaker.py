@@ -0,0 +1,214 @@
+"""Bangumi API 熔断器：按主机统计连续失败，故障期间直接拒绝请求而不是逐个重试超时。
+
+连续 threshold 次 5xx / 网络错误后熔断（open），冷却期内该主机的请求立即抛出
+BangumiCircuitOpenError；同步路径据此把同步请求暂存到延迟重试队列。冷却结束后放行
+一个探测请求（half-open）：成功则恢复（closed），失败则加倍冷却时间后再次熔断。
+未显式传入参数时从 [dev] 配置读取。
+"""
+
+import threading
+import time
+from typing import Any, Optional
+
+from ..core.logging import logger
+from .bgm_rate_limiter import BangumiRateLimiter
+
+# 配置的重新读取间隔（秒）
+_CONFIG_REFRESH_SECONDS = 30.0
+# 冷却时间上限（探测连续失败时逐次加倍）
+MAX_COOLDOWN_SECONDS = 10 * 60
+# 探测请求进行中时，被拒绝的调用方建议的重试等待
+_PROBE_WAIT_SECONDS = 5.0
+# 探测请求超过该时长仍未回报结果时允许新的探测
+_PROBE_TIMEOUT_SECONDS = 60.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BangumiCircuitOpenError(Exception):
+    """目标主机处于熔断状态，请求未发出"""
+
+    def __init__(self, host: str, retry_at: float):
+        self.host = host
+        self.retry_at = retry_at
+        wait = max(0.0, retry_at - time.time())
+        super().__init__(
+            f"Bangumi API {host} 暂不可用（熔断中），{wait:.0f} 秒后探测恢复"
+        )
+
+
+class _HostCircuit:
+    """单个主机的熔断状态（由 BangumiCircuitBreaker 的锁保护）"""
+
+    def __init__(self, cooldown: float):
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.retry_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.opens = 0
+        self.rejected = 0
+
+    def open(self, now: float, cooldown: float) -> None:
+        self.state = OPEN
+        self.cooldown = cooldown
+        self.retry_at = now + cooldown
+        self.probe_started = None
+        self.opens += 1
+
+
+class BangumiCircuitBreaker:
+    """按主机（api.bgm.tv / 反向代理地址）划分的熔断器；threshold <= 0 表示关闭熔断"""
+
+    def __init__(
+        self,
+        threshold: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        drain_interval: Optional[float] = None,
+    ):
+        self._lock = threading.Lock()
+        self._circuits: dict[str, _HostCircuit] = {}
+        self._fixed = threshold is not None
+        self._threshold = int(threshold or 0)
+        self._cooldown = float(cooldown or 30.0)
+        self._drain_interval = float(drain_interval or 0.0)
+        self._config_loaded_at: Optional[float] = None
+
+    def _refresh_config(self, now: float) -> None:
+        if self._fixed:
+            return
+        if (
+            self._config_loaded_at is not None
+            and now - self._config_loaded_at < _CONFIG_REFRESH_SECONDS
+        ):
+            return
+        self._config_loaded_at = now
+        try:
+            from ..core.config import config_manager
+
+            cfg = config_manager.get_bgm_circuit_breaker_config()
+            self._threshold = int(cfg["threshold"])
+            self._cooldown = max(1.0, float(cfg["cooldown"]))
+            self._drain_interval = max(0.0, float(cfg["drain_interval"]))
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 熔断配置失败，沿用当前设置: {e}")
+
+    def configure(
+        self, threshold: int, cooldown: float, drain_interval: float = 0.0
+    ) -> None:
+        """显式设置熔断参数（不再从配置读取）"""
+        with self._lock:
+            self._fixed = True
+            self._threshold = int(threshold)
+            self._cooldown = float(cooldown)
+            self._drain_interval = float(drain_interval)
+            self._circuits.clear()
+
+    @property
+    def drain_interval(self) -> float:
+        """恢复后延迟重试队列相邻两条任务之间的间隔（秒）"""
+        with self._lock:
+            self._refresh_config(time.time())
+            return self._drain_interval
+
+    def _circuit(self, host: str) -> _HostCircuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = _HostCircuit(self._cooldown)
+            self._circuits[host] = circuit
+        return circuit
+
+    def before_request(self, url: str) -> None:
+        """请求发出前调用：主机熔断中时抛出 BangumiCircuitOpenError"""
+        now = time.time()
+        host = BangumiRateLimiter.host_of(url)
+        with self._lock:
+            self._refresh_config(now)
+            circuit = self._circuits.get(host)
+            if self._threshold <= 0 or circuit is None or circuit.state == CLOSED:
+                return
+            if circuit.state == OPEN and now >= circuit.retry_at:
+                circuit.state = HALF_OPEN
+            if circuit.state == HALF_OPEN:
+                probe_started = circuit.probe_started
+                if probe_started is None or now - probe_started > (
+                    _PROBE_TIMEOUT_SECONDS
+                ):
+                    circuit.probe_started = now
+                    logger.info(f"Bangumi API {host} 熔断冷却结束，发送探测请求")
+                    return
+                retry_at = now + _PROBE_WAIT_SECONDS
+            else:
+                retry_at = circuit.retry_at
+            circuit.rejected += 1
+        raise BangumiCircuitOpenError(host, retry_at)
+
+    def record_success(self, url: str) -> None:
+        """主机返回了非 5xx 响应"""
+        host = BangumiRateLimiter.host_of(url)
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                return
+            recovered = circuit.state != CLOSED
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.cooldown = self._cooldown
+            circuit.probe_started = None
+        if recovered:
+            logger.info(f"Bangumi API {host} 已恢复，熔断关闭")
+
+    def record_failure(self, url: str) -> None:
+        """主机返回 5xx 或网络错误"""
+        now = time.time()
+        host = BangumiRateLimiter.host_of(url)
+        with self._lock:
+            self._refresh_config(now)
+            if self._threshold <= 0:
+                return
+            circuit = self._circuit(host)
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN:
+                cooldown = min(circuit.cooldown * 2, MAX_COOLDOWN_SECONDS)
+            elif circuit.state == CLOSED and circuit.failures >= self._threshold:
+                cooldown = self._cooldown
+            else:
+                return
+            circuit.open(now, cooldown)
+        logger.warning(
+            f"Bangumi API {host} 连续失败 {circuit.failures} 次，熔断 {cooldown:.0f} 秒"
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        """各主机的熔断状态、连续失败数与拒绝次数"""
+        now = time.time()
+        with self._lock:
+            self._refresh_config(now)
+            hosts = {
+                host: {
+                    "state": circuit.state,
+                    "consecutive_failures": circuit.failures,
+                    "opens": circuit.opens,
+                    "rejected": circuit.rejected,
+                    "retry_in_seconds": round(max(0.0, circuit.retry_at - now), 1)
+                    if circuit.state == OPEN
+                    else 0.0,
+                }
+                for host, circuit in self._circuits.items()
+            }
+            return {
+                "enabled": self._threshold > 0,
+                "threshold": self._threshold,
+                "cooldown_seconds": self._cooldown,
+                "drain_interval_seconds": self._drain_interval,
+                "hosts": hosts,
+            }
+
+    def reset(self) -> None:
+        """清空各主机的熔断状态"""
+        with self._lock:
+            self._circuits.clear()
+
+
+# 全局 Bangumi API 熔断器
+bgm_circuit_breaker = BangumiCircuitBreaker()
@@ -0,0 +1,202 @@
+"""Bangumi 账号收藏状态本地账本：标记前不再每次查询条目/章节收藏状态。
+
+账本按 Bangumi 用户名记录条目收藏类型与已看章节。分页读取
+/v0/users/{username}/collections 完成对账（首次使用及每 RECONCILE_INTERVAL_SECONDS），
+对账在后台进行，不阻塞触发它的标记请求；每次成功标记后写入结果。条目状态只在最近
+SUBJECT_TRUST_SECONDS 内写入或对账过时才被信任，否则仍回退到 Bangumi 查询。
+
+对账只拉取条目级收藏（类型与进度），不含单集状态：某条目首次标记时读取一次
+该条目全部章节的收藏状态写入账本，之后章节记录来自本进程的标记。
+在网页端或其他客户端做的修改，条目状态在下次对账（或信任期过后）才被看到；
+对账时条目进度（ep_status）与账本中看过的章节数不一致，说明章节在外部改过，
+删除该条目的章节记录，下次标记时重新读取。对账之前外部标记过的单集本地不可知，
+会再次提交一次看过（幂等）。
+"""
+
+import threading
+import time
+from typing import Any, Optional
+
+from ..core.database import DatabaseManager, database_manager
+from ..core.logging import logger
+
+HOUR = 60 * 60
+
+# 与 Bangumi 完整对账的间隔
+RECONCILE_INTERVAL_SECONDS = 6 * HOUR
+# 对账失败后的重试间隔，避免每次标记都重新分页拉取
+RECONCILE_RETRY_SECONDS = 10 * 60
+# 条目收藏状态可直接采信的时长（网页端的修改最迟在下次对账后生效）
+SUBJECT_TRUST_SECONDS = 12 * HOUR
+# 对账拉取的条目类型（2 = 动画）；其余类型的条目按需查询
+LEDGER_SUBJECT_TYPE = 2
+# 收藏类型：想看 / 看过 / 在看 / 搁置 / 抛弃
+WISH, DONE, DOING, ON_HOLD, DROPPED = 1, 2, 3, 4, 5
+
+
+class BangumiCollectionLedger:
+    """SQLite 持久化的按账号收藏状态账本"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        self._db = db or database_manager
+        self._lock = threading.Lock()
+        # 对账失败的账号 -> 允许再次对账的时间
+        self._retry_after: dict[str, float] = {}
+        # 正在后台对账的账号
+        self._reconciling: set[str] = set()
+        self._subject_hits = 0
+        self._episode_hits = 0
+        self._misses = 0
+        self._reconciles = 0
+        self._reconcile_errors = 0
+
+    def needs_reconcile(self, account: str) -> bool:
+        """账号从未对账或上次对账已超过 RECONCILE_INTERVAL_SECONDS"""
+        now = time.time()
+        with self._lock:
+            if now < self._retry_after.get(account, 0):
+                return False
+        reconciled_at = self._db.get_bgm_collection_reconciled_at(account)
+        return reconciled_at is None or now - reconciled_at > RECONCILE_INTERVAL_SECONDS
+
+    def begin_reconcile(self, account: str) -> bool:
+        """需要对账且没有进行中的对账时占用该账号并返回 True；之后须调用
+        reconcile 或 reconcile_failed 结束"""
+        if not self.needs_reconcile(account):
+            return False
+        with self._lock:
+            if account in self._reconciling:
+                return False
+            self._reconciling.add(account)
+        return True
+
+    def reconcile(
+        self, account: str, collections: list, started_at: Optional[float] = None
+    ) -> int:
+        """用分页拉取的完整收藏列表替换账号的条目状态，返回记录的条目数。
+
+        started_at 为开始拉取的时间，此后标记写入的条目状态不会被覆盖。
+        """
+        rows = []
+        for row in collections:
+            if not isinstance(row, dict) or row.get("subject_id") is None:
+                continue
+            try:
+                collection_type = int(row.get("type"))
+            except (TypeError, ValueError):
+                continue
+            rows.append((str(row["subject_id"]), collection_type, row.get("ep_status")))
+        written = self._db.replace_bgm_collection_subjects(
+            account, rows, time.time(), since=started_at, watched_type=DONE
+        )
+        with self._lock:
+            self._reconciles += 1
+            self._retry_after.pop(account, None)
+            self._reconciling.discard(account)
+        logger.info(f"Bangumi 收藏账本已对账: 账号 {account}，共 {written} 个条目")
+        return written
+
+    def reconcile_failed(self, account: str, error: Exception) -> None:
+        """记录对账失败，RECONCILE_RETRY_SECONDS 内不再尝试"""
+        with self._lock:
+            self._reconcile_errors += 1
+            self._retry_after[account] = time.time() + RECONCILE_RETRY_SECONDS
+            self._reconciling.discard(account)
+        logger.warning(f"Bangumi 收藏账本对账失败: 账号 {account} {error}")
+
+    def subject_type(self, account: str, subject_id) -> Optional[int]:
+        """可信的条目收藏类型；未记录或已不可信时返回 None（需查询 Bangumi）"""
+        row = self._db.get_bgm_collection_subject(account, str(subject_id))
+        if row is None or time.time() - row["updated_at"] > SUBJECT_TRUST_SECONDS:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._subject_hits += 1
+        return row["type"]
+
+    def watched_episodes(self, account: str, ep_ids: list) -> set[str]:
+        """返回账本中已记录为看过的章节 ID（字符串）"""
+        types = self._db.get_bgm_collection_episode_types(
+            account, [str(ep_id) for ep_id in ep_ids]
+        )
+        watched = {ep_id for ep_id, t in types.items() if t == DONE}
+        if watched:
+            with self._lock:
+                self._episode_hits += len(watched)
+        return watched
+
+    def has_episodes(self, account: str, subject_id) -> bool:
+        """账本中是否已有该条目的章节状态（没有时需先从 Bangumi 读取一次）"""
+        return self._db.has_bgm_collection_episodes(account, str(subject_id))
+
+    def seed_episodes(self, account: str, subject_id, collections: list) -> None:
+        """用条目章节收藏列表（/users/-/collections/{id}/episodes）写入章节状态"""
+        by_type: dict[int, list] = {}
+        for row in collections:
+            if not isinstance(row, dict):
+                continue
+            episode = row.get("episode") or {}
+            if episode.get("id") is None:
+                continue
+            try:
+                collection_type = int(row.get("type") or 0)
+            except (TypeError, ValueError):
+                continue
+            by_type.setdefault(collection_type, []).append(episode["id"])
+        for collection_type, ep_ids in by_type.items():
+            self.record_episodes(account, subject_id, ep_ids, collection_type)
+
+    def record_subject(
+        self,
+        account: str,
+        subject_id,
+        collection_type: Optional[int],
+        ep_status: Optional[int] = None,
+    ) -> None:
+        """写入条目收藏状态（来自查询结果或本次写操作）"""
+        if collection_type is None:
+            return
+        self._db.set_bgm_collection_subject(
+            account, str(subject_id), int(collection_type), ep_status, time.time()
+        )
+
+    def record_episodes(
+        self, account: str, subject_id, ep_ids: list, collection_type: int = DONE
+    ) -> None:
+        """写入章节收藏类型（默认看过）"""
+        if not ep_ids:
+            return
+        self._db.set_bgm_collection_episodes(
+            account,
+            str(subject_id),
+            [str(ep_id) for ep_id in ep_ids],
+            collection_type,
+            time.time(),
+        )
+
+    def clear(self, account: Optional[str] = None) -> int:
+        """清空账本（或某账号），下次标记时重新对账"""
+        with self._lock:
+            if account is None:
+                self._retry_after.clear()
+            else:
+                self._retry_after.pop(account, None)
+        return self._db.clear_bgm_collection_ledger(account)
+
+    def get_stats(self) -> dict[str, Any]:
+        """本地命中统计与各账号的账本规模"""
+        with self._lock:
+            stats: dict[str, Any] = {
+                "subject_hits": self._subject_hits,
+                "episode_hits": self._episode_hits,
+                "misses": self._misses,
+                "reconciles": self._reconciles,
+                "reconcile_errors": self._reconcile_errors,
+            }
+        stats["accounts"] = self._db.get_bgm_collection_ledger_counts()
+        return stats
+
+
+# 全局 Bangumi 收藏账本
+bgm_collection_ledger = BangumiCollectionLedger()
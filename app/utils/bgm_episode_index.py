@@ -0,0 +1,243 @@
+"""长篇番剧章节索引：按条目保存 sort / ep / airdate → 章节 ID 的紧凑数组。
+
+柯南、海贼王等上千集的条目若缓存完整章节 JSON，每部要占用数 MB 内存。索引只保留
+章节 ID、sort、ep 与播出日（按序数存储），各字段为 array 数组，另外为 sort、ep、
+播出日分别保存一份排好序的键与位置，按 sort / ep / 播出日的查找均为二分查找。
+1000 集的条目约占 60 KB。
+"""
+
+import datetime
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Optional
+
+# 超过该集数的章节查找使用章节索引（第一页之外的章节）
+EPISODE_INDEX_MIN_SORT = 99
+
+_MISSING = float("-inf")
+_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+
+
+def _airday(value: Any) -> int:
+    """章节 airdate 转为日期序数；无效时为 0"""
+    if not isinstance(value, str):
+        return 0
+    m = _DATE_RE.match(value.strip())
+    if not m:
+        return 0
+    try:
+        return datetime.date(
+            int(m.group(1)), int(m.group(2)), int(m.group(3))
+        ).toordinal()
+    except ValueError:
+        return 0
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return _MISSING
+    return float(value)
+
+
+def _plain(value: float) -> Any:
+    """还原 JSON 中的数值：缺失为 None，整数值去掉小数部分"""
+    if value == _MISSING:
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def _sorted_keys(values: array, typecode: str, skip) -> tuple[array, array]:
+    """按值稳定排序的 (键, 原位置) 数组；skip 为需要排除的缺失值"""
+    order = sorted(
+        (i for i in range(len(values)) if values[i] != skip), key=values.__getitem__
+    )
+    return array(typecode, (values[i] for i in order)), array("i", order)
+
+
+class EpisodeIndex:
+    """单个条目（某一章节类型）的章节索引；位置顺序与 Bangumi 返回的章节顺序一致"""
+
+    __slots__ = (
+        "total",
+        "type",
+        "_ids",
+        "_sorts",
+        "_eps",
+        "_airdays",
+        "_sort_keys",
+        "_sort_pos",
+        "_ep_keys",
+        "_ep_pos",
+        "_air_keys",
+        "_air_pos",
+    )
+
+    def __init__(
+        self,
+        ids: array,
+        sorts: array,
+        eps: array,
+        airdays: array,
+        total: int,
+        _type: int = 0,
+    ):
+        self.total = int(total)
+        self.type = int(_type)
+        self._ids = ids
+        self._sorts = sorts
+        self._eps = eps
+        self._airdays = airdays
+        self._sort_keys, self._sort_pos = _sorted_keys(sorts, "d", _MISSING)
+        self._ep_keys, self._ep_pos = _sorted_keys(eps, "d", _MISSING)
+        self._air_keys, self._air_pos = _sorted_keys(airdays, "i", 0)
+
+    @classmethod
+    def from_episodes(
+        cls, rows: list, total: Optional[int] = None, _type: int = 0
+    ) -> "EpisodeIndex":
+        """由 /v0/episodes 返回的章节列表构造（忽略缺少 id 的行）"""
+        rows = [r for r in rows if isinstance(r, dict) and r.get("id") is not None]
+        return cls(
+            array("q", (int(r["id"]) for r in rows)),
+            array("d", (_number(r.get("sort")) for r in rows)),
+            array("d", (_number(r.get("ep")) for r in rows)),
+            array("i", (_airday(r.get("airdate")) for r in rows)),
+            total if total is not None else len(rows),
+            _type,
+        )
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "EpisodeIndex":
+        """由 to_payload() 的结果还原"""
+
+        def _numbers(key):
+            return array(
+                "d", (_MISSING if v is None else float(v) for v in payload[key])
+            )
+
+        return cls(
+            array("q", payload["ids"]),
+            _numbers("sorts"),
+            _numbers("eps"),
+            array("i", payload["airdays"]),
+            payload.get("total", len(payload["ids"])),
+            payload.get("type", 0),
+        )
+
+    def to_payload(self) -> dict[str, Any]:
+        """可 JSON 序列化的形式（用于持久化）"""
+        return {
+            "total": self.total,
+            "type": self.type,
+            "ids": list(self._ids),
+            "sorts": [_plain(v) for v in self._sorts],
+            "eps": [_plain(v) for v in self._eps],
+            "airdays": list(self._airdays),
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def complete(self) -> bool:
+        """是否已包含条目的全部章节"""
+        return len(self._ids) > 0 and len(self._ids) >= self.total
+
+    @property
+    def nbytes(self) -> int:
+        """索引数组占用的字节数"""
+        return sum(
+            a.itemsize * len(a)
+            for a in (
+                self._ids,
+                self._sorts,
+                self._eps,
+                self._airdays,
+                self._sort_keys,
+                self._sort_pos,
+                self._ep_keys,
+                self._ep_pos,
+                self._air_keys,
+                self._air_pos,
+            )
+        )
+
+    def last_airday(self) -> Optional[datetime.date]:
+        """最晚播出日；存在未定播出日的章节时返回 None（视为连载中）"""
+        if not self._ids or len(self._air_keys) < len(self._ids):
+            return None
+        return datetime.date.fromordinal(self._air_keys[-1])
+
+    def first_airday(self) -> Optional[datetime.date]:
+        if not self._air_keys:
+            return None
+        return datetime.date.fromordinal(self._air_keys[0])
+
+    def row(self, pos: int) -> dict[str, Any]:
+        """按位置还原为与 Bangumi 章节相同字段的字典"""
+        airday = self._airdays[pos]
+        row = {
+            "id": self._ids[pos],
+            "type": self.type,
+            "sort": _plain(self._sorts[pos]),
+            "airdate": datetime.date.fromordinal(airday).isoformat() if airday else "",
+        }
+        ep = _plain(self._eps[pos])
+        if ep is not None:
+            row["ep"] = ep
+        return row
+
+    @staticmethod
+    def _first(keys: array, positions: array, value) -> Optional[int]:
+        """键等于 value 的最靠前位置（排序稳定，相同键按原位置升序）"""
+        i = bisect_left(keys, value)
+        if i < len(keys) and keys[i] == value:
+            return positions[i]
+        return None
+
+    def find_by_sort(self, target: float) -> Optional[dict[str, Any]]:
+        """与 _match_target_ep_rows 相同的规则：先按 sort 匹配，再按 ep（且 ep <= sort）"""
+        pos = self._first(self._sort_keys, self._sort_pos, target)
+        if pos is None:
+            pos = self._find_by_ep(target)
+        return None if pos is None else self.row(pos)
+
+    def _find_by_ep(self, target: float) -> Optional[int]:
+        lo = bisect_left(self._ep_keys, target)
+        hi = bisect_right(self._ep_keys, target, lo)
+        for i in range(lo, hi):
+            pos = self._ep_pos[i]
+            sort = self._sorts[pos]
+            if target <= (0.0 if sort == _MISSING else sort):
+                return pos
+        return None
+
+    def find_by_ep(self, target: float) -> Optional[dict[str, Any]]:
+        pos = self._find_by_ep(target)
+        return None if pos is None else self.row(pos)
+
+    def nearest_by_airdate(
+        self, day: datetime.date, max_days_diff: float = math.inf
+    ) -> Optional[tuple[dict[str, Any], int]]:
+        """播出日最接近 day 的章节与相差天数；相差相同时取靠前的章节"""
+        keys = self._air_keys
+        if not keys:
+            return None
+        target = day.toordinal()
+        i = bisect_left(keys, target)
+        diffs = []
+        if i < len(keys):
+            diffs.append(keys[i] - target)
+        if i > 0:
+            diffs.append(target - keys[i - 1])
+        best = min(diffs)
+        if best > max_days_diff:
+            return None
+        candidates = []
+        for value in {target - best, target + best}:
+            lo = bisect_left(keys, value)
+            if lo < len(keys) and keys[lo] == value:
+                candidates.append(self._air_pos[lo])
+        return self.row(min(candidates)), best
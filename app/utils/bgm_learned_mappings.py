@@ -0,0 +1,211 @@
+"""Bangumi 学习映射：记录同步成功时 (标题, 原标题, 媒体类型, 季度, 年份) 对应的番剧ID。
+
+同一季的每一集都以相同的标题同步，每次都要重新做 bangumi-data 匹配或 Bangumi 搜索。
+同步成功后把找到的番剧ID（及是否为该季度的条目、最终标记的季度条目）写入 SQLite，
+下次同步同一标题时直接使用，不再做任何匹配。键中带有播出年份，同名的重制版或
+不同年份的作品不会共用一条记录（跨年播出的一季在两个年份各记录一次）。
+
+与手工维护的 bangumi_mapping.json 分开保存：每条记录带有来源、可信度、命中次数与最近
+使用时间。可信度按来源给出初始值（Bangumi 搜索结果最低），之后每次以相同结果同步成功
+都会提高；低于 bgm_learned_min_confidence 的记录不会被使用，仍走正常匹配流程。
+在「自定义映射」页面可以查看、修改、删除记录，或将其提升为自定义映射。
+"""
+
+import threading
+import time
+from typing import Any, Optional
+
+from ..core.database import DatabaseManager, database_manager
+from .title_normalizer import normalize_title
+
+# 各来源的初始可信度
+INITIAL_CONFIDENCE = {
+    "external_id": 0.9,
+    "bangumi_data": 0.8,
+    "search": 0.5,
+}
+# 手动修改或确认的记录
+MANUAL_CONFIDENCE = 1.0
+
+
+def learned_key(
+    title: str,
+    ori_title: Optional[str],
+    media_type: str,
+    season: int,
+    release_date: Optional[str] = None,
+) -> str:
+    """学习映射键：规范化后的 (标题, 原标题, 媒体类型, 季度, 播出年份)"""
+    return "\x1f".join(
+        (
+            normalize_title(title) or (title or ""),
+            normalize_title(ori_title) or (ori_title or "").strip(),
+            (media_type or "").lower(),
+            str(season or 1),
+            (release_date or "")[:4],
+        )
+    )
+
+
+def _confirmed(confidence: float) -> float:
+    """再次以相同结果同步成功后的可信度：与 1 的差距减半"""
+    return round(1 - (1 - confidence) / 2, 4)
+
+
+class BangumiLearnedMappings:
+    """SQLite 持久化、内存常驻的学习映射"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        self._db = db or database_manager
+        self._lock = threading.Lock()
+        self._entries: Optional[dict[str, dict[str, Any]]] = None
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {
+                row["cache_key"]: row for row in self._db.get_bgm_learned_mappings()
+            }
+        return self._entries
+
+    def lookup(
+        self,
+        title: str,
+        ori_title: Optional[str],
+        media_type: str,
+        season: int,
+        min_confidence: float,
+        release_date: Optional[str] = None,
+    ) -> Optional[dict[str, Any]]:
+        """返回可信度不低于 min_confidence 的记录；未命中返回 None"""
+        key = learned_key(title, ori_title, media_type, season, release_date)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or entry["confidence"] < min_confidence:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return dict(entry)
+
+    def record(
+        self,
+        title: str,
+        ori_title: Optional[str],
+        media_type: str,
+        season: int,
+        subject_id: str,
+        season_matched: bool,
+        season_subject_id: str,
+        method: str,
+        release_date: Optional[str] = None,
+    ) -> Optional[dict[str, Any]]:
+        """记录一次同步成功的匹配结果，返回写入后的记录
+
+        结果与已有记录相同时提高可信度并更新最近使用时间；不同时按来源重新记录
+        （手动记录不会被自动结果覆盖）。method 为 "learned"（本次即由学习映射得出）
+        而记录已被删除时不再写回。
+        """
+        key = learned_key(title, ori_title, media_type, season, release_date)
+        now = time.time()
+        subject_id = str(subject_id)
+        season_subject_id = str(season_subject_id or subject_id)
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is not None and (
+                entry["subject_id"] == subject_id
+                and entry["season_matched"] == bool(season_matched)
+            ):
+                entry = dict(
+                    entry,
+                    season_subject_id=season_subject_id,
+                    confidence=_confirmed(entry["confidence"]),
+                    hits=entry["hits"] + 1,
+                    last_used_at=now,
+                )
+            elif entry is not None and entry["method"] == "manual":
+                return None
+            elif method in INITIAL_CONFIDENCE:
+                entry = {
+                    "cache_key": key,
+                    "title": title or "",
+                    "ori_title": ori_title or "",
+                    "media_type": media_type or "",
+                    "season": int(season or 1),
+                    "subject_id": subject_id,
+                    "season_matched": bool(season_matched),
+                    "season_subject_id": season_subject_id,
+                    "method": method,
+                    "confidence": INITIAL_CONFIDENCE[method],
+                    "hits": 1,
+                    "created_at": now,
+                    "last_used_at": now,
+                }
+            else:
+                return None
+            entries[key] = entry
+            self._writes += 1
+        self._db.set_bgm_learned_mapping(entry)
+        return dict(entry)
+
+    def update(
+        self, cache_key: str, subject_id: str, season_matched: bool
+    ) -> Optional[dict[str, Any]]:
+        """手动修改一条记录的番剧ID（视为已确认）；记录不存在时返回 None"""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(cache_key)
+            if entry is None:
+                return None
+            entry = dict(
+                entry,
+                subject_id=str(subject_id),
+                season_matched=bool(season_matched),
+                # 最终标记的季度条目在下次同步成功时更新
+                season_subject_id=str(subject_id),
+                method="manual",
+                confidence=MANUAL_CONFIDENCE,
+            )
+            entries[cache_key] = entry
+        self._db.set_bgm_learned_mapping(entry)
+        return dict(entry)
+
+    def get(self, cache_key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._load().get(cache_key)
+            return dict(entry) if entry is not None else None
+
+    def list_entries(self) -> list[dict[str, Any]]:
+        """全部记录（最近使用在前）"""
+        with self._lock:
+            rows = [dict(e) for e in self._load().values()]
+        rows.sort(key=lambda e: e["last_used_at"], reverse=True)
+        return rows
+
+    def delete(self, cache_key: str) -> int:
+        """删除一条记录，下次同步该标题时重新匹配"""
+        with self._lock:
+            self._load().pop(cache_key, None)
+        return self._db.delete_bgm_learned_mapping(cache_key)
+
+    def clear(self) -> int:
+        """清空全部记录"""
+        with self._lock:
+            self._load().clear()
+        return self._db.clear_bgm_learned_mappings()
+
+    def get_stats(self) -> dict[str, Any]:
+        """命中统计与当前条目数"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "entries": len(self._load()),
+            }
+
+
+# 全局 Bangumi 学习映射
+bgm_learned_mappings = BangumiLearnedMappings()
@@ -0,0 +1,328 @@
+"""Bangumi 元数据二级缓存：条目 / 章节 / 关联条目持久化到 SQLite，跨重启复用。
+
+有效期按放送状态决定：已完结的番剧长期缓存，连载中的短期缓存。过期后在宽限期内
+仍返回旧值，同时在后台刷新（stale-while-revalidate）。
+"""
+
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from ..core.database import DatabaseManager, database_manager
+from ..core.logging import logger
+from .bgm_episode_index import EpisodeIndex
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+
+# 各类别按放送状态的有效期（秒）
+METADATA_TTL_SECONDS: dict[str, dict[str, float]] = {
+    "get_subject": {"finished": 30 * DAY, "airing": 12 * HOUR, "upcoming": DAY},
+    "get_episodes": {"finished": 30 * DAY, "airing": 6 * HOUR, "upcoming": 12 * HOUR},
+    "episode_index": {"finished": 30 * DAY, "airing": 6 * HOUR, "upcoming": 12 * HOUR},
+    # 完结番也可能公布续作，关联条目不宜缓存过久
+    "get_related_subjects": {"finished": 7 * DAY, "airing": DAY, "upcoming": DAY},
+}
+# 过期后仍可返回旧值（并后台刷新）的宽限期
+STALE_GRACE_SECONDS = 7 * DAY
+# 每写入多少次顺带清理一次超出宽限期的行
+_PRUNE_EVERY_WRITES = 500
+# 按每集一周估算放送周期之外，再留出的完结判定余量
+_FINISHED_MARGIN_DAYS = 30
+
+
+def _parse_date(value: Any) -> Optional[datetime.date]:
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.date.fromisoformat(value.strip()[:10])
+    except ValueError:
+        return None
+
+
+def classify_subject(subject: Any, today: Optional[datetime.date] = None) -> str:
+    """根据条目 date / eps 推断放送状态：finished / airing / upcoming"""
+    if not isinstance(subject, dict):
+        return "airing"
+    today = today or datetime.date.today()
+    start = _parse_date(subject.get("date"))
+    if start is None or start > today:
+        return "upcoming"
+    try:
+        eps = int(subject.get("eps") or subject.get("total_episodes") or 0)
+    except (TypeError, ValueError):
+        eps = 0
+    # 剧场版等单集条目上映后即视为完结；集数未知时以一年为界
+    span_days = eps * 7 if eps > 0 else 365
+    if (today - start).days > span_days + _FINISHED_MARGIN_DAYS:
+        return "finished"
+    return "airing"
+
+
+def classify_episodes(payload: Any, today: Optional[datetime.date] = None) -> str:
+    """根据章节 airdate 推断放送状态：全部章节已播出两周以上视为完结"""
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if not data:
+        return "airing"
+    today = today or datetime.date.today()
+    airdates = []
+    for ep in data:
+        airdate = _parse_date(ep.get("airdate") if isinstance(ep, dict) else None)
+        if airdate is None:
+            return "airing"
+        airdates.append(airdate)
+    if min(airdates) > today:
+        return "upcoming"
+    if (today - max(airdates)).days > 14:
+        return "finished"
+    return "airing"
+
+
+def classify_episode_index(
+    index: EpisodeIndex, today: Optional[datetime.date] = None
+) -> str:
+    """与 classify_episodes 规则相同，作用于章节索引"""
+    today = today or datetime.date.today()
+    first = index.first_airday()
+    if first is not None and first > today:
+        return "upcoming"
+    last = index.last_airday()
+    if last is not None and (today - last).days > 14:
+        return "finished"
+    return "airing"
+
+
+def is_persistable(category: str, value: Any) -> bool:
+    """只持久化有效响应，避免把请求失败时的空结果长期缓存"""
+    if category == "get_subject":
+        return isinstance(value, dict) and bool(value.get("id"))
+    if category == "get_episodes":
+        return isinstance(value, dict) and bool(value.get("data"))
+    if category == "get_related_subjects":
+        return isinstance(value, list) and bool(value)
+    if category == "episode_index":
+        # 分页未取全时不持久化
+        return isinstance(value, EpisodeIndex) and value.complete
+    return False
+
+
+class BangumiMetadataCache:
+    """SQLite 持久化的 Bangumi 元数据缓存"""
+
+    def __init__(
+        self,
+        db: Optional[DatabaseManager] = None,
+        max_refresh_workers: int = 2,
+    ):
+        self._db = db or database_manager
+        self._lock = threading.Lock()
+        self._refreshing: set[tuple[str, str]] = set()
+        self._max_refresh_workers = max_refresh_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writes = 0
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_errors = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_refresh_workers,
+                    thread_name_prefix="bgm-meta-refresh",
+                )
+            return self._executor
+
+    @staticmethod
+    def _scoped_key(cache_key: str, scope: Optional[str]) -> str:
+        return cache_key if scope is None else f"{scope}:{cache_key}"
+
+    def ttl_for(
+        self, category: str, subject_id: str, value: Any, scope: Optional[str] = None
+    ) -> float:
+        """按类别与放送状态计算有效期"""
+        ttls = METADATA_TTL_SECONDS.get(category, {})
+        if category == "get_subject":
+            status = classify_subject(value)
+        elif category == "get_episodes":
+            status = classify_episodes(value)
+        elif category == "episode_index":
+            status = classify_episode_index(value)
+        else:
+            subject = self._load_payload(
+                "get_subject", self._scoped_key(subject_id, scope)
+            )
+            status = classify_subject(subject) if subject is not None else "airing"
+        return float(ttls.get(status, ttls.get("airing", HOUR)))
+
+    def _load_payload(self, category: str, cache_key: str) -> Any:
+        row = self._db.get_bgm_metadata_cache(category, cache_key)
+        if row is None:
+            return None
+        try:
+            return json.loads(row["payload"])
+        except (TypeError, ValueError):
+            return None
+
+    def get(
+        self,
+        category: str,
+        cache_key: str,
+        refresh: Optional[Callable[[], None]] = None,
+        scope: Optional[str] = None,
+    ) -> Any:
+        """读取缓存；未命中返回 None。过期但在宽限期内时返回旧值并调度 refresh。
+
+        scope 区分取得数据的账号范围（见 BangumiApiBase._persist_scope），
+        不同范围的缓存互不可见。
+        """
+        value, stale = self.lookup(category, cache_key, scope)
+        if stale and refresh is not None:
+            self._schedule_refresh(
+                category, self._scoped_key(cache_key, scope), refresh
+            )
+        return value
+
+    def lookup(
+        self, category: str, cache_key: str, scope: Optional[str] = None
+    ) -> tuple[Any, bool]:
+        """读取缓存，返回 (值, 是否已过期)，不调度刷新；未命中返回 (None, False)。
+
+        供自行安排刷新的调用方使用（异步客户端在事件循环中刷新），刷新结束后
+        以 record_refresh 计入统计。
+        """
+        row = self._db.get_bgm_metadata_cache(
+            category, self._scoped_key(cache_key, scope)
+        )
+        now = time.time()
+        if row is None or now >= row["expires_at"] + STALE_GRACE_SECONDS:
+            with self._lock:
+                self._misses += 1
+            return None, False
+        try:
+            value = json.loads(row["payload"])
+            if category == "episode_index":
+                value = EpisodeIndex.from_payload(value)
+        except (TypeError, ValueError, KeyError):
+            with self._lock:
+                self._misses += 1
+            return None, False
+
+        if now < row["expires_at"]:
+            with self._lock:
+                self._hits += 1
+            return value, False
+
+        with self._lock:
+            self._stale_hits += 1
+        return value, True
+
+    def record_refresh(self, ok: bool) -> None:
+        """计入一次后台刷新结果"""
+        with self._lock:
+            if ok:
+                self._refreshes += 1
+            else:
+                self._refresh_errors += 1
+
+    def _schedule_refresh(
+        self, category: str, cache_key: str, refresh: Callable[[], None]
+    ) -> None:
+        token = (category, cache_key)
+        with self._lock:
+            if token in self._refreshing:
+                return
+            self._refreshing.add(token)
+
+        def _run():
+            try:
+                refresh()
+                self.record_refresh(True)
+            except Exception as e:
+                self.record_refresh(False)
+                logger.debug(f"后台刷新 Bangumi 元数据失败 {category}/{cache_key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(token)
+
+        try:
+            self._get_executor().submit(_run)
+        except RuntimeError as e:
+            with self._lock:
+                self._refreshing.discard(token)
+            logger.debug(f"无法调度 Bangumi 元数据刷新: {e}")
+
+    def put(
+        self,
+        category: str,
+        cache_key: str,
+        subject_id: str,
+        value: Any,
+        scope: Optional[str] = None,
+    ) -> bool:
+        """写入缓存；无效响应（空结果）直接忽略。scope 含义同 get"""
+        if not is_persistable(category, value):
+            return False
+        try:
+            payload = json.dumps(
+                value.to_payload() if isinstance(value, EpisodeIndex) else value,
+                ensure_ascii=False,
+            )
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Bangumi 元数据无法序列化 {category}/{cache_key}: {e}")
+            return False
+        now = time.time()
+        ttl = self.ttl_for(category, subject_id, value, scope)
+        ok = self._db.set_bgm_metadata_cache(
+            category,
+            self._scoped_key(cache_key, scope),
+            subject_id,
+            payload,
+            now,
+            now + ttl,
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY_WRITES == 1
+        if prune:
+            self.prune()
+        return ok
+
+    def prune(self) -> int:
+        """删除已超出宽限期的行"""
+        return self._db.clear_bgm_metadata_cache(
+            older_than=time.time() - STALE_GRACE_SECONDS
+        )
+
+    def purge_subject(self, subject_id: str) -> int:
+        """删除某条目的全部缓存（条目、章节、关联条目）"""
+        removed = self._db.delete_bgm_metadata_cache_by_subject(str(subject_id))
+        logger.info(f"已清除条目 {subject_id} 的 Bangumi 元数据缓存 {removed} 条")
+        return removed
+
+    def clear(self) -> int:
+        """清空全部元数据缓存"""
+        return self._db.clear_bgm_metadata_cache()
+
+    def get_stats(self) -> dict[str, Any]:
+        """命中统计与按类别的持久化条目数"""
+        with self._lock:
+            stats: dict[str, Any] = {
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "refreshes": self._refreshes,
+                "refresh_errors": self._refresh_errors,
+                "refreshing": len(self._refreshing),
+            }
+        stats["entries"] = self._db.get_bgm_metadata_cache_counts()
+        return stats
+
+
+# 全局 Bangumi 元数据二级缓存
+bgm_metadata_cache = BangumiMetadataCache()
@@ -9,6 +9,7 @@ from typing import Any
 from ..core.config import config_manager
 from ..core.logging import logger
 from ..utils.bangumi_api import BangumiApi
+from .bangumi_api_pool import bangumi_api_pool
 from .bgm_image_url import (
     build_poster_cache_namespace,
     extract_poster_url,
@@ -18,7 +19,6 @@ from .bgm_image_url import (
 
 _POSTER_URL_TTL_SECONDS = 24 * 60 * 60
 
-_bgm_api_instances: dict[tuple[str, bool, str], BangumiApi] = {}
 _poster_url_cache: dict[tuple[str, int], tuple[str, float]] = {}
 
 
@@ -26,14 +26,6 @@ def _dev_config(key: str, fallback: Any = "") -> Any:
     return config_manager.get("dev", key, fallback=fallback)
 
 
-def _bangumi_api_config_key() -> tuple[str, bool, str]:
-    return (
-        str(_dev_config("script_proxy", "") or ""),
-        bool(_dev_config("ssl_verify", True)),
-        str(_dev_config("bgm_api_proxy", "") or ""),
-    )
-
-
 def _poster_cache_namespace() -> str:
     return build_poster_cache_namespace(
         str(_dev_config("bgm_api_proxy", "") or ""),
@@ -42,24 +34,18 @@ def _poster_cache_namespace() -> str:
 
 
 def get_shared_bangumi_api() -> BangumiApi:
-    """按 dev 代理配置复用 BangumiApi 实例，使 get_subject LRU 跨请求命中。"""
-    key = _bangumi_api_config_key()
-    api = _bgm_api_instances.get(key)
-    if api is None:
-        http_proxy, ssl_verify, bgm_api_proxy = key
-        api = BangumiApi(
-            http_proxy=http_proxy,
-            ssl_verify=ssl_verify,
-            bgm_api_proxy=bgm_api_proxy,
-        )
-        _bgm_api_instances[key] = api
-    return api
+    """从客户端池取匿名 BangumiApi（按 dev 代理配置复用），使 get_subject LRU 跨请求命中。"""
+    return bangumi_api_pool.get(
+        http_proxy=str(_dev_config("script_proxy", "") or ""),
+        ssl_verify=bool(_dev_config("ssl_verify", True)),
+        bgm_api_proxy=str(_dev_config("bgm_api_proxy", "") or ""),
+    )
 
 
 def clear_poster_service_caches() -> None:
-    """清空进程级 poster URL 缓存（主要用于测试）。"""
+    """清空进程级 poster URL 缓存与匿名客户端（主要用于测试）。"""
     _poster_url_cache.clear()
-    _bgm_api_instances.clear()
+    bangumi_api_pool.discard("")
 
 
 def normalize_subject_id(value: Any) -> int | None:
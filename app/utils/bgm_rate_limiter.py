@@ -0,0 +1,237 @@
+"""Bangumi API 进程级限速器：按主机的令牌桶，所有账号、调度器与异步客户端共享。
+
+调用方按到达顺序预约令牌：令牌不足时桶余额记为负数，后来者依次排在前者之后，
+因此多个调用方会按固定间隔依次放行，而不是同时退避、同时重试。收到 429 / 503 时
+按 Retry-After（没有则按退避时间）暂停该主机，期间到达的请求同样排队等待。
+"""
+
+import asyncio
+import email.utils
+import threading
+import time
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from ..core.logging import logger
+
+# 配置的重新读取间隔（秒），修改配置后无需重启即可生效
+_CONFIG_REFRESH_SECONDS = 30.0
+# Retry-After 的上限，避免异常响应让请求无限期挂起
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+
+class _HostBucket:
+    """单个主机的令牌桶（由 BangumiRateLimiter 的锁保护）"""
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        # 令牌开始累积的时间点；被 Retry-After 暂停时位于将来
+        self.updated = now
+        self.queued = 0
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.penalties = 0
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(
+                float(self.burst), self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def next_wait(self, now: float) -> float:
+        """下一个到达的请求需要等待的秒数"""
+        self.refill(now)
+        debt = max(0.0, 1.0 - self.tokens)
+        return max(0.0, self.updated - now) + debt / self.rate
+
+    def reserve(self, now: float) -> float:
+        wait = self.next_wait(now)
+        self.tokens -= 1.0
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def pause(self, now: float, seconds: float) -> None:
+        """暂停发放令牌 seconds 秒，之后的请求从暂停结束起按速率依次放行"""
+        self.refill(now)
+        self.tokens = min(self.tokens, 1.0)
+        self.updated = max(self.updated, now + seconds)
+        self.penalties += 1
+
+
+class BangumiRateLimiter:
+    """按主机（api.bgm.tv / next.bgm.tv / 反向代理地址）划分的全局令牌桶限速器。
+
+    rate 为每个主机每秒允许的请求数，burst 为空闲时允许的突发请求数；
+    rate <= 0 表示不限速。未显式传入时从 [dev] 配置读取。
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, _HostBucket] = {}
+        self._fixed = rate is not None
+        self._rate = float(rate or 0)
+        self._burst = max(1, int(burst or 1))
+        self._config_loaded_at: Optional[float] = None
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        parts = urlsplit(url)
+        return (parts.netloc or parts.path.split("/", 1)[0]).lower()
+
+    @staticmethod
+    def parse_retry_after(value: Any) -> Optional[float]:
+        """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None"""
+        if not isinstance(value, str) or not value.strip():
+            return None
+        value = value.strip()
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at is None:
+                return None
+            seconds = retry_at.timestamp() - time.time()
+        return min(max(0.0, seconds), MAX_RETRY_AFTER_SECONDS)
+
+    def _refresh_config(self, now: float) -> None:
+        if self._fixed:
+            return
+        if (
+            self._config_loaded_at is not None
+            and now - self._config_loaded_at < _CONFIG_REFRESH_SECONDS
+        ):
+            return
+        self._config_loaded_at = now
+        try:
+            from ..core.config import config_manager
+
+            cfg = config_manager.get_bgm_rate_limit_config()
+            rate = float(cfg["rate"])
+            burst = max(1, int(cfg["burst"]))
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 限速配置失败，沿用当前设置: {e}")
+            return
+        if rate != self._rate or burst != self._burst:
+            logger.info(f"Bangumi API 限速: 每主机 {rate}/s，突发 {burst}")
+            self._rate, self._burst = rate, burst
+            for bucket in self._buckets.values():
+                bucket.rate, bucket.burst = rate, burst
+                bucket.tokens = min(bucket.tokens, float(burst))
+
+    def configure(self, rate: float, burst: int) -> None:
+        """显式设置限速参数（不再从配置读取）"""
+        with self._lock:
+            self._fixed = True
+            self._rate = float(rate)
+            self._burst = max(1, int(burst))
+            self._buckets.clear()
+
+    @property
+    def enabled(self) -> bool:
+        with self._lock:
+            self._refresh_config(time.monotonic())
+            return self._rate > 0
+
+    def _bucket(self, host: str, now: float) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = _HostBucket(self._rate, self._burst, now)
+            self._buckets[host] = bucket
+        return bucket
+
+    def _reserve(self, url: str) -> tuple[Optional[_HostBucket], float]:
+        now = time.monotonic()
+        with self._lock:
+            self._refresh_config(now)
+            if self._rate <= 0:
+                return None, 0.0
+            bucket = self._bucket(self.host_of(url), now)
+            wait = bucket.reserve(now)
+            bucket.queued += 1
+            return bucket, wait
+
+    def _release(self, bucket: Optional[_HostBucket]) -> None:
+        if bucket is not None:
+            with self._lock:
+                bucket.queued -= 1
+
+    def acquire(self, url: str) -> float:
+        """阻塞直到该主机的令牌可用，返回实际等待秒数"""
+        bucket, wait = self._reserve(url)
+        try:
+            if wait > 0:
+                time.sleep(wait)
+            return wait
+        finally:
+            self._release(bucket)
+
+    async def acquire_async(self, url: str) -> float:
+        """acquire 的协程版本，等待期间不阻塞事件循环"""
+        bucket, wait = self._reserve(url)
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            return wait
+        finally:
+            self._release(bucket)
+
+    def penalize(self, url: str, seconds: float) -> bool:
+        """服务端要求退避时暂停该主机；未启用限速时返回 False，由调用方自行等待"""
+        now = time.monotonic()
+        with self._lock:
+            self._refresh_config(now)
+            if self._rate <= 0:
+                return False
+            seconds = min(max(0.0, float(seconds)), MAX_RETRY_AFTER_SECONDS)
+            host = self.host_of(url)
+            self._bucket(host, now).pause(now, seconds)
+        logger.warning(f"Bangumi API {host} 要求退避，{seconds:.1f} 秒内的请求将排队")
+        return True
+
+    def get_stats(self) -> dict[str, Any]:
+        """各主机的排队数、等待时间等统计，用于评估限速参数"""
+        now = time.monotonic()
+        with self._lock:
+            self._refresh_config(now)
+            hosts = {}
+            for host, bucket in self._buckets.items():
+                hosts[host] = {
+                    "queued": bucket.queued,
+                    "current_wait_seconds": round(bucket.next_wait(now), 3),
+                    "tokens": round(max(0.0, bucket.tokens), 3),
+                    "acquired": bucket.acquired,
+                    "waited": bucket.waited,
+                    "avg_wait_seconds": round(
+                        bucket.total_wait / bucket.waited if bucket.waited else 0.0,
+                        3,
+                    ),
+                    "max_wait_seconds": round(bucket.max_wait, 3),
+                    "retry_after_pauses": bucket.penalties,
+                }
+            return {
+                "enabled": self._rate > 0,
+                "rate": self._rate,
+                "burst": self._burst,
+                "hosts": hosts,
+            }
+
+    def reset(self) -> None:
+        """清空各主机的令牌桶与统计"""
+        with self._lock:
+            self._buckets.clear()
+
+
+# 全局 Bangumi API 限速器
+bgm_rate_limiter = BangumiRateLimiter()
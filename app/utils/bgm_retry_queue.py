@@ -0,0 +1,337 @@
+"""Bangumi 延迟重试队列：网络失败的同步不在工作线程内 sleep 重试，而是持久化后按退避重跑。
+
+同步路径在 defer_retries() 上下文中执行：HTTP 层遇到 429/5xx/网络错误时不再原地
+sleep 重试，而是立即抛出，由调用方把后续工作写入队列（SQLite，重启后继续）并立刻
+释放工作线程。单个后台线程在任务到期后执行对应处理函数，失败则按指数退避重新排期
+（服务端返回 Retry-After 时按其要求的时间），超过 MAX_RETRY_ATTEMPTS 或遇到不可重试
+的错误时放弃。
+
+Bangumi API 熔断期间入队的任务暂存到熔断器的探测时间，且不计入重试次数；恢复后
+相邻任务之间间隔 drain_interval 秒依次执行，避免积压的同步一次性涌向刚恢复的服务。
+"""
+
+import contextvars
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from ..core.database import DatabaseManager, database_manager
+from ..core.logging import logger
+from .bgm_circuit_breaker import BangumiCircuitOpenError, bgm_circuit_breaker
+
+# 首次延迟重试的等待时间，之后每次翻倍
+RETRY_BASE_DELAY_SECONDS = 15
+# 单次退避的上限
+RETRY_MAX_DELAY_SECONDS = 60 * 60
+# 延迟重试的最大次数（超过后放弃并回调 on_give_up）
+MAX_RETRY_ATTEMPTS = 8
+# 队列为空时后台线程的最长休眠时间（新任务入队会立即唤醒）
+_IDLE_WAIT_SECONDS = 5 * 60
+# 每轮最多取出的到期任务数
+_DUE_BATCH_SIZE = 20
+
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+
+# 当前上下文是否允许 HTTP 层原地 sleep 重试
+_inplace_retry: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "bgm_inplace_retry", default=True
+)
+# 当前上下文正在执行的延迟重试任务（供处理函数判断是否已处于重试中）
+_current_task: contextvars.ContextVar[Optional[dict[str, Any]]] = (
+    contextvars.ContextVar("bgm_retry_task", default=None)
+)
+
+
+@contextmanager
+def defer_retries():
+    """在此上下文内 HTTP 请求失败时不原地重试，交给延迟重试队列"""
+    token = _inplace_retry.set(False)
+    try:
+        yield
+    finally:
+        _inplace_retry.reset(token)
+
+
+def retries_deferred() -> bool:
+    """当前上下文是否处于延迟重试模式"""
+    return not _inplace_retry.get()
+
+
+def retry_budget(max_retries: int) -> int:
+    """当前上下文允许的原地重试次数；延迟重试模式下为 0"""
+    return 0 if retries_deferred() else max_retries
+
+
+def with_retry_after(error: Exception, seconds: Optional[float]) -> Exception:
+    """为交给延迟重试队列的异常附带服务端要求的等待时间（Retry-After，秒）"""
+    error.retry_after = seconds
+    return error
+
+
+def retry_after_of(error: Optional[BaseException]) -> Optional[float]:
+    """异常附带的 Retry-After 秒数；没有时返回 None"""
+    value = getattr(error, "retry_after", None)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return max(0.0, float(value))
+
+
+def current_retry_task() -> Optional[dict[str, Any]]:
+    """正在执行的延迟重试任务；不在重试队列中执行时返回 None"""
+    return _current_task.get()
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """限流、服务端错误、网络异常与熔断可延迟重试；认证失败、解析失败等不重试"""
+    if isinstance(error, requests.exceptions.InvalidJSONError):
+        return False
+    return isinstance(
+        error,
+        (
+            requests.exceptions.RequestException,
+            httpx.HTTPError,
+            BangumiCircuitOpenError,
+        ),
+    )
+
+
+def endpoint_of(url: str) -> str:
+    """把请求 URL 归一化为接口路径（数字 ID 替换为 {id}），用于按接口统计"""
+    path = urlsplit(url).path or url
+    segments = [
+        "{id}" if _NUMERIC_SEGMENT.match(segment) else segment
+        for segment in path.strip("/").split("/")
+    ]
+    return "/" + "/".join(segments)
+
+
+class BangumiRetryQueue:
+    """SQLite 持久化的延迟重试队列，由单个后台线程按到期时间执行"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        self._db = db or database_manager
+        self._lock = threading.Lock()
+        self._handlers: dict[str, tuple[Callable, Optional[Callable]]] = {}
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._scheduled = 0
+        self._succeeded = 0
+        self._rescheduled = 0
+        self._given_up = 0
+        self._parked = 0
+        # 接口路径 -> {"retries": 原地重试次数, "deferred": 转入队列次数}
+        self._endpoints: dict[str, dict[str, int]] = {}
+
+    def register(
+        self,
+        kind: str,
+        handler: Callable[[dict[str, Any]], Any],
+        on_give_up: Optional[Callable[[dict[str, Any], Exception], Any]] = None,
+    ) -> None:
+        """注册任务类型的处理函数；处理函数抛出可重试错误时按退避重新排期"""
+        with self._lock:
+            self._handlers[kind] = (handler, on_give_up)
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """第 attempts 次失败后的等待时间：15s, 30s, 60s ... 最长 1 小时"""
+        return min(RETRY_BASE_DELAY_SECONDS * 2**attempts, RETRY_MAX_DELAY_SECONDS)
+
+    def retry_delay(self, attempts: int, error: Optional[BaseException]) -> float:
+        """下次执行前的等待：服务端给出 Retry-After 时遵循它，否则按退避时间"""
+        retry_after = retry_after_of(error)
+        return self.backoff(attempts) if retry_after is None else retry_after
+
+    def schedule(
+        self, kind: str, payload: dict[str, Any], error: Optional[Exception] = None
+    ) -> Optional[int]:
+        """持久化一条延迟重试任务并唤醒后台线程，返回任务 id（写入失败时 None）
+
+        因熔断被拒绝的任务排到熔断器允许探测的时间，否则按 Retry-After 或首次退避时间。
+        """
+        try:
+            data = json.dumps(payload, ensure_ascii=False, default=str)
+        except (TypeError, ValueError) as e:
+            logger.error(f"延迟重试任务无法序列化 {kind}: {e}")
+            return None
+        now = time.time()
+        if isinstance(error, BangumiCircuitOpenError):
+            run_at = max(error.retry_at, now)
+        else:
+            run_at = now + self.retry_delay(0, error)
+        task_id = self._db.add_bgm_retry_task(
+            kind, data, run_at, str(error) if error is not None else None
+        )
+        if task_id is None:
+            return None
+        with self._lock:
+            self._scheduled += 1
+        logger.info(
+            f"已加入 Bangumi 延迟重试队列: {kind} #{task_id}，"
+            f"{run_at - now:.0f} 秒后重试"
+        )
+        self._wake.set()
+        return task_id
+
+    def record_retry(self, url: str, deferred: bool = False) -> None:
+        """统计某接口的一次原地重试（或一次因延迟重试模式而跳过的重试）"""
+        endpoint = endpoint_of(url)
+        with self._lock:
+            counts = self._endpoints.setdefault(endpoint, {"retries": 0, "deferred": 0})
+            counts["deferred" if deferred else "retries"] += 1
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """执行所有已到期的任务，返回本轮处理的任务数"""
+        now = time.time() if now is None else now
+        tasks = self._db.get_due_bgm_retry_tasks(now, _DUE_BATCH_SIZE)
+        processed = 0
+        for index, task in enumerate(tasks):
+            if self._stopping.is_set():
+                break
+            if processed:
+                # 按固定间隔排空积压，不让恢复中的服务瞬间承受全部补同步
+                interval = bgm_circuit_breaker.drain_interval
+                if interval > 0 and self._stopping.wait(interval):
+                    break
+            open_error = self._run_task(task)
+            processed += 1
+            if open_error is not None:
+                # 仍在熔断：本批其余任务无需逐个尝试，一并顺延到探测时间
+                for parked in tasks[index + 1 :]:
+                    self._park(parked, open_error)
+                break
+        return processed
+
+    def _park(self, task: dict[str, Any], error: BangumiCircuitOpenError) -> None:
+        """熔断期间顺延任务，不计入重试次数"""
+        self._db.reschedule_bgm_retry_task(
+            task["id"], task["attempts"], error.retry_at, str(error)
+        )
+        with self._lock:
+            self._parked += 1
+
+    def _run_task(self, task: dict[str, Any]) -> Optional[BangumiCircuitOpenError]:
+        """执行单个任务；因熔断被拒绝时返回该异常"""
+        with self._lock:
+            entry = self._handlers.get(task["kind"])
+        if entry is None:
+            logger.warning(f"延迟重试任务类型未注册: {task['kind']} #{task['id']}")
+            self._db.reschedule_bgm_retry_task(
+                task["id"],
+                task["attempts"],
+                time.time() + RETRY_MAX_DELAY_SECONDS,
+                task["last_error"] or "",
+            )
+            return None
+        handler, on_give_up = entry
+        try:
+            payload = json.loads(task["payload"])
+        except (TypeError, ValueError) as e:
+            logger.error(f"延迟重试任务数据损坏，已丢弃 #{task['id']}: {e}")
+            self._db.delete_bgm_retry_task(task["id"])
+            return None
+
+        attempts = task["attempts"] + 1
+        token = _current_task.set(task)
+        try:
+            with defer_retries():
+                handler(payload)
+        except BangumiCircuitOpenError as e:
+            self._park(task, e)
+            logger.info(f"Bangumi API 熔断中，延迟重试任务 #{task['id']} 顺延: {e}")
+            return e
+        except Exception as e:
+            if attempts < MAX_RETRY_ATTEMPTS and is_retryable_error(e):
+                delay = self.retry_delay(attempts, e)
+                self._db.reschedule_bgm_retry_task(
+                    task["id"], attempts, time.time() + delay, str(e)
+                )
+                with self._lock:
+                    self._rescheduled += 1
+                logger.warning(
+                    f"延迟重试失败 {task['kind']} #{task['id']}（第 {attempts} 次）: "
+                    f"{e}，{delay} 秒后再试"
+                )
+                return None
+            self._db.delete_bgm_retry_task(task["id"])
+            with self._lock:
+                self._given_up += 1
+            logger.error(
+                f"延迟重试放弃 {task['kind']} #{task['id']}（共 {attempts} 次）: {e}"
+            )
+            if on_give_up is not None:
+                try:
+                    on_give_up(payload, e)
+                except Exception as callback_error:
+                    logger.error(f"延迟重试放弃回调失败: {callback_error}")
+            return None
+        finally:
+            _current_task.reset(token)
+
+        self._db.delete_bgm_retry_task(task["id"])
+        with self._lock:
+            self._succeeded += 1
+        logger.info(f"延迟重试成功 {task['kind']} #{task['id']}（第 {attempts} 次）")
+        return None
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"Bangumi 延迟重试队列执行异常: {e}")
+            next_run_at = self._db.get_next_bgm_retry_at()
+            if next_run_at is None:
+                timeout = _IDLE_WAIT_SECONDS
+            else:
+                timeout = min(max(next_run_at - time.time(), 0.5), _IDLE_WAIT_SECONDS)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """启动后台线程（重启前未完成的任务随之继续执行）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._loop, name="bgm_retry_queue", daemon=True
+            )
+            self._thread.start()
+        logger.info("Bangumi 延迟重试队列已启动")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止后台线程；未执行的任务保留在数据库中"""
+        self._stopping.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """排队任务数、执行结果与按接口统计的重试次数"""
+        with self._lock:
+            stats: dict[str, Any] = {
+                "scheduled": self._scheduled,
+                "succeeded": self._succeeded,
+                "rescheduled": self._rescheduled,
+                "given_up": self._given_up,
+                "parked": self._parked,
+                "endpoints": {k: dict(v) for k, v in self._endpoints.items()},
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+        stats["pending"] = self._db.count_bgm_retry_tasks()
+        return stats
+
+
+# 全局 Bangumi 延迟重试队列
+bgm_retry_queue = BangumiRetryQueue()
@@ -0,0 +1,421 @@
+"""Bangumi API 线路管理：在 API 反向代理、HTTP 代理与直连之间按实测延迟和错误率选路。
+
+每条线路维护滚动的延迟样本与错误率（EWMA），请求按得分从优到劣依次尝试，网络错误时
+立即换下一条线路。连续失败的线路标记为不可用，后台按间隔重新探测，恢复后重新参与选路；
+健康线路同样按探测间隔测速，使排序反映当前网络状况。开启对冲（hedge）时，GET 请求在
+首选线路超过其 p95 延迟仍未返回时向次优线路再发一次，取先返回的结果。
+未显式传入参数时从 [dev] 配置读取。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from ..core.logging import logger
+from .bgm_rate_limiter import bgm_rate_limiter
+from .http_transport import shared_session
+
+OFFICIAL_API_BASE = "https://api.bgm.tv"
+
+ROUTE_API_PROXY = "api_proxy"
+ROUTE_HTTP_PROXY = "http_proxy"
+ROUTE_DIRECT = "direct"
+
+# 配置的重新读取间隔（秒）
+_CONFIG_REFRESH_SECONDS = 30.0
+# 每条线路保留的最近延迟样本数（用于 p95）
+_LATENCY_WINDOW = 50
+# 延迟与错误率的 EWMA 平滑系数
+_EWMA_ALPHA = 0.2
+# 错误率对得分的放大系数：错误率 50% 的线路得分为实测延迟的 3 倍
+_ERROR_PENALTY = 4.0
+# 连续失败多少次后标记线路不可用
+_DOWN_AFTER_FAILURES = 2
+# 不可用线路的重新探测间隔（秒）
+_DOWN_PROBE_SECONDS = 30.0
+# 探测请求的路径与超时
+_PROBE_PATH = "/v0/subjects/1"
+_PROBE_TIMEOUT_SECONDS = 10.0
+# 计算对冲延迟所需的最少样本数，以及对冲延迟的下限（秒）
+_HEDGE_MIN_SAMPLES = 5
+_HEDGE_MIN_DELAY_SECONDS = 0.05
+_USER_AGENT = "SanaeMio/Bangumi-syncer (https://github.com/SanaeMio/Bangumi-syncer)"
+
+T = TypeVar("T")
+
+
+class BangumiRoute:
+    """一条候选线路：API 基地址 + 出口代理（None 为直连）"""
+
+    __slots__ = ("name", "base", "proxy", "verify")
+
+    def __init__(
+        self, name: str, base: str, proxy: Optional[str] = None, verify: bool = True
+    ):
+        self.name = name
+        self.base = base.rstrip("/")
+        self.proxy = proxy or None
+        self.verify = verify
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}|{self.base}|{self.proxy or ''}"
+
+    @property
+    def label(self) -> str:
+        """用于日志与统计的名称（代理地址去掉认证信息）"""
+        if not self.proxy:
+            return f"{self.name} {self.base}"
+        parts = urlsplit(self.proxy)
+        host = parts.hostname or self.proxy
+        if parts.port:
+            host = f"{host}:{parts.port}"
+        return f"{self.name} {self.base} via {host}"
+
+    @property
+    def requests_proxies(self) -> dict[str, Optional[str]]:
+        """requests 的 proxies 参数；值为 None 时覆盖掉会话上配置的代理"""
+        return {"http": self.proxy, "https": self.proxy}
+
+    def __repr__(self) -> str:
+        return f"BangumiRoute({self.label})"
+
+
+def build_routes(
+    api_base: str, http_proxy: Optional[str] = None, verify: bool = True
+) -> list[BangumiRoute]:
+    """按配置生成候选线路，顺序即没有实测数据时的默认优先级"""
+    routes = []
+    api_base = api_base.rstrip("/")
+    if api_base != OFFICIAL_API_BASE:
+        routes.append(BangumiRoute(ROUTE_API_PROXY, api_base, http_proxy, verify))
+    if http_proxy:
+        routes.append(
+            BangumiRoute(ROUTE_HTTP_PROXY, OFFICIAL_API_BASE, http_proxy, verify)
+        )
+    routes.append(BangumiRoute(ROUTE_DIRECT, OFFICIAL_API_BASE, None, verify))
+    return routes
+
+
+def route_candidates(
+    routes: list[BangumiRoute], url: str
+) -> list[tuple[BangumiRoute, str]]:
+    """把请求 URL 映射到各线路，返回 [(线路, 实际 URL)]
+
+    URL 不属于任何线路的基地址时（如 next.bgm.tv）保持不变，仅按代理区分线路；
+    映射结果相同（URL 与代理都一样）的线路只保留优先级最高的一条。
+    """
+    rest = None
+    for route in routes:
+        if url == route.base or url.startswith(route.base + "/"):
+            rest = url[len(route.base) :]
+            break
+    seen = set()
+    candidates = []
+    for route in routes:
+        routed = url if rest is None else route.base + rest
+        if (routed, route.proxy) in seen:
+            continue
+        seen.add((routed, route.proxy))
+        candidates.append((route, routed))
+    return candidates
+
+
+class _RouteStats:
+    """单条线路的滚动统计（由 BangumiRouteManager 的锁保护）"""
+
+    def __init__(self, route: BangumiRoute):
+        self.route = route
+        self.latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.down = False
+        self.next_probe_at = 0.0
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+        self.probes = 0
+        self.hedged = 0
+
+    def record(self, ok: bool, latency: Optional[float]) -> None:
+        self.requests += 1
+        self.error_rate += _EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.failures = 0
+            self.down = False
+            if latency is not None:
+                self.latencies.append(latency)
+                self.ewma = (
+                    latency
+                    if self.ewma is None
+                    else self.ewma + _EWMA_ALPHA * (latency - self.ewma)
+                )
+            return
+        self.errors += 1
+        self.failures += 1
+        if self.failures >= _DOWN_AFTER_FAILURES:
+            self.down = True
+
+    def score(self) -> Optional[float]:
+        """得分越低越好；没有成功样本时为 None"""
+        if self.ewma is None:
+            return None
+        return self.ewma * (1.0 + _ERROR_PENALTY * self.error_rate)
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class BangumiRouteManager:
+    """进程级线路选择器，所有账号共享各线路的实测数据；probe_interval <= 0 表示不探测"""
+
+    def __init__(
+        self, probe_interval: Optional[float] = None, hedge: Optional[bool] = None
+    ):
+        self._lock = threading.Lock()
+        self._stats: dict[str, _RouteStats] = {}
+        self._fixed = probe_interval is not None
+        self._probe_interval = float(probe_interval or 0.0)
+        self._hedge = bool(hedge)
+        self._config_loaded_at: Optional[float] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def _refresh_config(self, now: float) -> None:
+        if self._fixed:
+            return
+        if (
+            self._config_loaded_at is not None
+            and now - self._config_loaded_at < _CONFIG_REFRESH_SECONDS
+        ):
+            return
+        self._config_loaded_at = now
+        try:
+            from ..core.config import config_manager
+
+            cfg = config_manager.get_bgm_route_config()
+            self._probe_interval = max(0.0, float(cfg["probe_interval"]))
+            self._hedge = bool(cfg["hedge"])
+        except Exception as e:
+            logger.debug(f"读取 Bangumi 线路配置失败，沿用当前设置: {e}")
+
+    def configure(self, probe_interval: float, hedge: bool = False) -> None:
+        """显式设置探测间隔与对冲开关（不再从配置读取）"""
+        with self._lock:
+            self._fixed = True
+            self._probe_interval = float(probe_interval)
+            self._hedge = bool(hedge)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=8, thread_name_prefix="bgm_route"
+            )
+        return self._executor
+
+    def _entry(self, route: BangumiRoute) -> _RouteStats:
+        stats = self._stats.get(route.key)
+        if stats is None:
+            stats = _RouteStats(route)
+            self._stats[route.key] = stats
+        return stats
+
+    def rank(self, routes: list[BangumiRoute]) -> list[BangumiRoute]:
+        """按得分排序候选线路：可用优先，其次有实测数据的按得分，最后按默认优先级
+
+        同时为到期的线路安排后台探测。全部不可用时仍按相同顺序返回，由调用方逐条尝试。
+        """
+        now = time.time()
+        due = []
+        with self._lock:
+            self._refresh_config(now)
+            entries = [self._entry(route) for route in routes]
+            if len(routes) > 1 and self._probe_interval > 0:
+                for entry in entries:
+                    if not entry.probing and now >= entry.next_probe_at:
+                        entry.probing = True
+                        due.append(entry.route)
+            order = sorted(
+                range(len(routes)),
+                key=lambda i: (
+                    entries[i].down,
+                    entries[i].score() is None,
+                    entries[i].score() or 0.0,
+                    i,
+                ),
+            )
+        for route in due:
+            self._pool().submit(self._probe, route)
+        return [routes[i] for i in order]
+
+    def _record(self, route: BangumiRoute, ok: bool, latency: Optional[float]) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._entry(route)
+            was_down = entry.down
+            entry.record(ok, latency)
+            down = entry.down
+            # 有了新样本就推迟探测：不可用线路较快重探，健康线路按探测间隔测速
+            entry.next_probe_at = now + (
+                _DOWN_PROBE_SECONDS if down else self._probe_interval
+            )
+        if down and not was_down:
+            logger.warning(f"Bangumi 线路 {route.label} 连续失败，暂停使用并后台探测")
+        elif was_down and not down:
+            logger.info(f"Bangumi 线路 {route.label} 已恢复")
+
+    def record_response(
+        self, route: BangumiRoute, status_code: int, latency: float
+    ) -> None:
+        """线路返回了响应：5xx 计为错误，其余计入延迟样本"""
+        self._record(route, status_code < 500, latency)
+
+    def record_failure(self, route: BangumiRoute) -> None:
+        """线路网络错误（连接失败、超时、代理错误等）"""
+        self._record(route, False, None)
+
+    def _probe(self, route: BangumiRoute) -> None:
+        """后台探测一条线路的可用性与延迟"""
+        url = route.base + _PROBE_PATH
+        try:
+            bgm_rate_limiter.acquire(url)
+            started = time.monotonic()
+            res = shared_session.get(
+                url,
+                proxies=route.requests_proxies,
+                timeout=_PROBE_TIMEOUT_SECONDS,
+                verify=route.verify,
+                headers={"Accept": "application/json", "User-Agent": _USER_AGENT},
+            )
+            res.close()
+            self.record_response(route, res.status_code, time.monotonic() - started)
+        except Exception as e:
+            logger.debug(f"Bangumi 线路探测失败 {route.label}: {e}")
+            self.record_failure(route)
+        finally:
+            with self._lock:
+                entry = self._entry(route)
+                entry.probing = False
+                entry.probes += 1
+
+    def hedge_delay(self, route: BangumiRoute) -> Optional[float]:
+        """对冲等待时间：首选线路的 p95 延迟；未开启对冲或样本不足时为 None"""
+        with self._lock:
+            self._refresh_config(time.time())
+            if not self._hedge:
+                return None
+            p95 = self._entry(route).p95()
+        if p95 is None:
+            return None
+        return max(p95, _HEDGE_MIN_DELAY_SECONDS)
+
+    def _count_hedge(self, backup: BangumiRoute, won: bool) -> None:
+        with self._lock:
+            self._hedges += 1
+            self._entry(backup).hedged += 1
+            if won:
+                self._hedge_wins += 1
+
+    def run_hedged(
+        self,
+        primary: Callable[[], T],
+        backup: Callable[[], T],
+        delay: float,
+        backup_route: BangumiRoute,
+    ) -> T:
+        """先执行 primary，delay 秒内未完成再并行执行 backup，返回先成功的结果
+
+        两者都失败时抛出 primary 的异常。未被采用的请求无法中断，在后台完成后
+        仅用于更新线路统计。
+        """
+        first = self._pool().submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        second = self._pool().submit(backup)
+        pending: set[Future] = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in (first, second):
+                if future in done and future.exception() is None:
+                    self._count_hedge(backup_route, future is second)
+                    return future.result()
+        self._count_hedge(backup_route, False)
+        return first.result()
+
+    async def run_hedged_async(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        backup: Callable[[], Awaitable[T]],
+        delay: float,
+        backup_route: BangumiRoute,
+    ) -> T:
+        """run_hedged 的协程版本；先返回结果后取消另一个请求"""
+        first = asyncio.ensure_future(primary())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        second = asyncio.ensure_future(backup())
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in (first, second):
+                    if task in done and task.exception() is None:
+                        self._count_hedge(backup_route, task is second)
+                        return task.result()
+            self._count_hedge(backup_route, False)
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self) -> dict[str, Any]:
+        """各线路的实测延迟、错误率、可用状态与对冲次数"""
+        with self._lock:
+            self._refresh_config(time.time())
+            routes = {}
+            for entry in self._stats.values():
+                p95 = entry.p95()
+                routes[entry.route.label] = {
+                    "healthy": not entry.down,
+                    "latency_ms": round(entry.ewma * 1000, 1)
+                    if entry.ewma is not None
+                    else None,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "error_rate": round(entry.error_rate, 3),
+                    "requests": entry.requests,
+                    "errors": entry.errors,
+                    "probes": entry.probes,
+                    "hedged": entry.hedged,
+                }
+            return {
+                "probe_interval_seconds": self._probe_interval,
+                "hedge": self._hedge,
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "routes": routes,
+            }
+
+    def reset(self) -> None:
+        """清空各线路的统计"""
+        with self._lock:
+            self._stats.clear()
+            self._hedges = 0
+            self._hedge_wins = 0
+
+
+# 全局 Bangumi 线路管理器
+bgm_route_manager = BangumiRouteManager()
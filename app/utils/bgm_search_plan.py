@@ -0,0 +1,140 @@
+"""bgm_search 并发搜索计划：各搜索策略同时发出，结果到达即评分并尽早确定匹配。
+
+原流程依次执行 v0 搜索（原标题 → 标题 → 剧场版放宽日期）与旧版搜索（每个标题各一次
+search_old + get_subject），未命中时要串行等待 6 次以上往返。计划把这些互不依赖的
+请求一次性列出，由同步 / 异步客户端并发执行（请求仍受全局限速约束），结果按原串行
+流程的优先级判定：高优先级策略的结果已知且足以确定最终结果时立即返回，其余请求取消。
+返回值与串行执行完全一致。
+"""
+
+import datetime
+from typing import Any, Callable, NamedTuple, Optional
+
+from ..core.logging import logger
+
+# v0 搜索结果相似度达到该值即采用（低于时转入旧版搜索）
+V0_ACCEPT_RATIO = 0.5
+# 旧版搜索结果相似度须高于该值
+OLD_ACCEPT_RATIO = 0.5
+# 剧场版放宽的日期窗口（首播日期之后的天数）
+MOVIE_WINDOW_DAYS = 200
+
+
+class SearchTask(NamedTuple):
+    """单个搜索请求：kind 为 "v0"（search）或 "old"（search_old + get_subject）"""
+
+    key: str
+    kind: str
+    title: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+
+class SearchPlan:
+    """按原串行优先级汇总并发搜索结果"""
+
+    def __init__(
+        self,
+        title: str,
+        ori_title: Optional[str],
+        premiere_date: Optional[str],
+        is_movie: bool,
+        ratio: Callable[..., float],
+    ):
+        self.title = title
+        self.ori_title = ori_title
+        self._ratio = ratio
+        self.tasks: list[SearchTask] = []
+        self._v0_keys: list[str] = []
+        self._old_keys: list[str] = []
+        self._results: dict[str, tuple[Any, bool]] = {}
+        self._errors: dict[str, BaseException] = {}
+        self._build(title, ori_title, premiere_date, is_movie)
+
+    def _build(self, title, ori_title, premiere_date, is_movie) -> None:
+        if premiere_date and len(premiere_date) >= 10:
+            try:
+                air_date = datetime.datetime.fromisoformat(premiere_date[:10])
+            except ValueError:
+                logger.warning(
+                    f"首播日期格式解析失败: {premiere_date}，降级至无日期模式搜索"
+                )
+            else:
+                start = (air_date - datetime.timedelta(days=2)).strftime("%Y-%m-%d")
+                end = (air_date + datetime.timedelta(days=2)).strftime("%Y-%m-%d")
+                v0_titles = [ori_title] if ori_title else []
+                if title not in v0_titles:
+                    v0_titles.append(title)
+                for i, t in enumerate(v0_titles):
+                    self._add("v0", f"v0:{i}", t, start, end)
+                if is_movie:
+                    movie_end = air_date + datetime.timedelta(days=MOVIE_WINDOW_DAYS)
+                    self._add(
+                        "v0",
+                        "v0:movie",
+                        ori_title or title,
+                        start,
+                        movie_end.strftime("%Y-%m-%d"),
+                    )
+
+        # 过滤无效的空标题，相同标题只搜索一次
+        old_titles = []
+        for t in (ori_title, title):
+            if t and t.strip() and t not in old_titles:
+                old_titles.append(t)
+        for i, t in enumerate(old_titles):
+            self._add("old", f"old:{i}", t)
+
+    def _add(self, kind, key, title, start_date=None, end_date=None) -> None:
+        self.tasks.append(SearchTask(key, kind, title, start_date, end_date))
+        (self._v0_keys if kind == "v0" else self._old_keys).append(key)
+
+    def task(self, key: str) -> SearchTask:
+        return next(t for t in self.tasks if t.key == key)
+
+    def add_result(self, key: str, value: Any) -> None:
+        """记录一个搜索结果并立即评分（v0 为结果列表，旧版为完整条目）"""
+        if self.task(key).kind == "v0":
+            accepted = bool(value) and (
+                self._ratio(
+                    title=self.title, ori_title=self.ori_title, bgm_data=value[0]
+                )
+                >= V0_ACCEPT_RATIO
+            )
+        else:
+            accepted = bool(value) and (
+                self._ratio(self.title, self.ori_title, bgm_data=value)
+                > OLD_ACCEPT_RATIO
+            )
+        self._results[key] = (value, accepted)
+
+    def add_error(self, key: str, error: BaseException) -> None:
+        """记录请求异常；仅当串行流程会用到该结果时才抛出"""
+        self._errors[key] = error
+
+    def _get(self, key: str) -> Optional[tuple[Any, bool]]:
+        if key in self._errors:
+            raise self._errors[key]
+        return self._results.get(key)
+
+    def decide(self) -> tuple[bool, Optional[SearchTask], Optional[list]]:
+        """(是否已确定, 采用的搜索, 结果)；高优先级结果未到齐时返回 (False, None, None)"""
+        for key in self._v0_keys:
+            entry = self._get(key)
+            if entry is None:
+                return False, None, None
+            value, accepted = entry
+            if value:
+                # 串行流程只评估第一个非空的 v0 结果
+                if accepted:
+                    return True, self.task(key), value
+                break
+
+        for key in self._old_keys:
+            entry = self._get(key)
+            if entry is None:
+                return False, None, None
+            value, accepted = entry
+            if accepted:
+                return True, self.task(key), [value]
+        return True, None, None
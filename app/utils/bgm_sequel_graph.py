@@ -0,0 +1,310 @@
+"""Bangumi 续集链关系图：持久化每个条目的续集边、条目类型与章节，离线解析季度/集数。
+
+get_target_season_episode_id 沿「续集」链解析某部作品时，把本次实际访问过的条目
+（及取得的续集边、章节首页、长篇章节索引）写入关系图；之后「根条目 X、第 N 季、
+第 E 集 → (subject_id, ep_id)」由关系图应答同一套解析规则（BangumiApiBase._season_walk）
+的数据请求得出，无需网络请求。所需数据缺失、链尾条目（可能新增续作）超过
+SEQUEL_EDGE_TTL_SECONDS 或任一条目超过 SEQUEL_NODE_TTL_SECONDS 时视为未命中，
+由客户端重新走网络并补全关系图。
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from ..core.database import DatabaseManager, database_manager
+from ..core.logging import logger
+from .bgm_episode_index import EPISODE_INDEX_MIN_SORT, EpisodeIndex
+
+DAY = 24 * 60 * 60
+
+# 链尾条目的续集边有效期：完结作品也可能公布续作
+SEQUEL_EDGE_TTL_SECONDS = DAY
+# 链中条目（已有续集）的有效期
+SEQUEL_NODE_TTL_SECONDS = 30 * DAY
+# 解析时沿续集链最多前进的条目数（防止环形关系导致死循环）
+MAX_GRAPH_HOPS = 40
+# 内存中保留的节点数
+_MAX_MEMORY_NODES = 2000
+# 章节行仅保留季度解析用到的字段
+_EPISODE_FIELDS = ("id", "sort", "ep", "airdate", "type")
+
+# 关系图无法给出确定结果（需回退网络解析）的哨兵
+SEQUEL_GRAPH_MISS = object()
+
+
+class _GraphMiss(Exception):
+    """离线解析遇到缺失/过期节点、节点缺少所需数据或需要网络回退的分支"""
+
+
+def sequel_ids(related: Any) -> list:
+    """从关联条目响应中按顺序提取「续集」条目 ID"""
+    if isinstance(related, dict):
+        related = related.get("data", [])
+    if not isinstance(related, list):
+        return []
+    return [
+        i["id"]
+        for i in related
+        if isinstance(i, dict) and i.get("relation") == "续集" and "id" in i
+    ]
+
+
+def _episode_rows(episodes: dict) -> list:
+    return [
+        {k: ep[k] for k in _EPISODE_FIELDS if k in ep}
+        for ep in episodes.get("data") or []
+        if isinstance(ep, dict)
+    ]
+
+
+def build_node(subject: Any, related: Any, episodes: Any) -> Optional[dict[str, Any]]:
+    """由条目、关联条目与首页章节响应构造关系图节点；数据无效时返回 None"""
+    if not isinstance(related, (dict, list)) or not isinstance(episodes, dict):
+        return None
+    return build_walk_node(
+        {"subject": subject, "sequels": sequel_ids(related), "episodes": episodes}
+    )
+
+
+def build_walk_node(parts: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    由一次解析中某条目已取得的数据构造节点：subject 必需；sequels（续集 ID 列表）、
+    episodes（章节首页响应）与 index（完整的 EpisodeIndex）未取得时对应字段为 None
+    """
+    subject = parts.get("subject")
+    if not isinstance(subject, dict) or not subject.get("id"):
+        return None
+    sequels = parts.get("sequels")
+    episodes = parts.get("episodes")
+    if not isinstance(episodes, dict):
+        episodes = None
+    index = parts.get("index")
+    return {
+        "id": subject["id"],
+        "type": subject.get("type"),
+        "name": subject.get("name", ""),
+        "name_cn": subject.get("name_cn", ""),
+        "sequels": list(sequels) if isinstance(sequels, list) else None,
+        "total": episodes.get("total", 0) if episodes is not None else None,
+        "episodes": _episode_rows(episodes) if episodes is not None else None,
+        "index": index.to_payload() if isinstance(index, EpisodeIndex) else None,
+    }
+
+
+def _node_ttl(node: dict[str, Any]) -> float:
+    return SEQUEL_NODE_TTL_SECONDS if node.get("sequels") else SEQUEL_EDGE_TTL_SECONDS
+
+
+class BangumiSequelGraph:
+    """SQLite 持久化的续集链关系图"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        self._db = db or database_manager
+        self._lock = threading.Lock()
+        self._nodes: OrderedDict[str, tuple[dict[str, Any], float]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._writes = 0
+
+    def get_node(self, subject_id) -> Optional[tuple[dict[str, Any], float]]:
+        """返回 (节点, 记录时间)；不存在返回 None"""
+        key = str(subject_id)
+        with self._lock:
+            entry = self._nodes.get(key)
+            if entry is not None:
+                self._nodes.move_to_end(key)
+                return entry
+        row = self._db.get_bgm_sequel_node(key)
+        if row is None:
+            return None
+        try:
+            node = json.loads(row["payload"])
+        except (TypeError, ValueError):
+            return None
+        entry = (node, row["fetched_at"])
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: tuple[dict[str, Any], float]) -> None:
+        with self._lock:
+            self._nodes[key] = entry
+            self._nodes.move_to_end(key)
+            while len(self._nodes) > _MAX_MEMORY_NODES:
+                self._nodes.popitem(last=False)
+
+    def put_node(
+        self, node: dict[str, Any], fetched_at: Optional[float] = None
+    ) -> bool:
+        """写入（或刷新）一个节点；fetched_at 为节点中最旧数据的取得时间，默认当前时间"""
+        key = str(node["id"])
+        try:
+            payload = json.dumps(node, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"续集关系图节点无法序列化 {key}: {e}")
+            return False
+        if fetched_at is None:
+            fetched_at = time.time()
+        self._remember(key, (node, fetched_at))
+        with self._lock:
+            self._writes += 1
+        return self._db.set_bgm_sequel_node(key, payload, fetched_at)
+
+    def record(self, subject: Any, related: Any, episodes: Any) -> Optional[dict]:
+        """由接口响应构造并写入节点，返回节点；数据无效时不写入"""
+        node = build_node(subject, related, episodes)
+        if node is not None:
+            self.put_node(node)
+        return node
+
+    def record_walk(self, seen: dict[str, dict[str, Any]]) -> int:
+        """
+        写入一次网络解析中访问过的条目（seen 由 BangumiApiBase._observe_walk 收集），
+        返回写入的节点数。本次未取得的字段沿用仍在有效期内的旧节点，此时节点
+        保留旧的记录时间，过期判断以最旧的数据为准。
+        """
+        now = time.time()
+        written = 0
+        for parts in seen.values():
+            node = build_walk_node(parts)
+            if node is None:
+                continue
+            fetched_at = now
+            entry = self.get_node(node["id"])
+            if entry is not None and now - entry[1] <= _node_ttl(entry[0]):
+                old, old_fetched_at = entry
+                for field in ("sequels", "episodes", "index"):
+                    if node[field] is None and old.get(field) is not None:
+                        node[field] = old[field]
+                        if field == "episodes":
+                            node["total"] = old.get("total", 0)
+                        fetched_at = old_fetched_at
+            if self.put_node(node, fetched_at):
+                written += 1
+        return written
+
+    def _fresh_node(self, subject_id, now: float) -> dict[str, Any]:
+        entry = self.get_node(subject_id)
+        if entry is None:
+            raise _GraphMiss()
+        node, fetched_at = entry
+        if now - fetched_at > _node_ttl(node):
+            with self._lock:
+                self._stale += 1
+            raise _GraphMiss()
+        return node
+
+    def resolve(
+        self,
+        api,
+        subject_id,
+        target_season: int,
+        target_ep: int,
+        is_season_subject_id: bool = False,
+        release_date: Optional[str] = None,
+    ) -> Any:
+        """按 get_target_season_episode_id 的规则离线解析；无法确定时返回 SEQUEL_GRAPH_MISS"""
+        resolver = _GraphResolver(self, api, time.time())
+        walk = api._season_walk(
+            subject_id, target_season, target_ep, is_season_subject_id, release_date
+        )
+        try:
+            result = api._drive_walk(walk, resolver.answer)
+        except _GraphMiss:
+            with self._lock:
+                self._misses += 1
+            return SEQUEL_GRAPH_MISS
+        with self._lock:
+            self._hits += 1
+        logger.debug(
+            f"续集关系图命中: subject_id={subject_id} 第{target_season}季 "
+            f"第{target_ep}集 -> {result}"
+        )
+        return result
+
+    def delete_subject(self, subject_id) -> int:
+        """删除某条目的节点（下次解析时重新记录）"""
+        key = str(subject_id)
+        with self._lock:
+            self._nodes.pop(key, None)
+        return self._db.delete_bgm_sequel_node(key)
+
+    def clear(self) -> int:
+        """清空关系图"""
+        with self._lock:
+            self._nodes.clear()
+        return self._db.clear_bgm_sequel_graph()
+
+    def get_stats(self) -> dict[str, Any]:
+        """离线解析命中统计与持久化节点数"""
+        with self._lock:
+            stats: dict[str, Any] = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "writes": self._writes,
+                "memory_nodes": len(self._nodes),
+            }
+        stats["nodes"] = self._db.count_bgm_sequel_nodes()
+        return stats
+
+
+class _GraphResolver:
+    """以关系图节点应答 BangumiApiBase._season_walk 的数据请求；数据不足时抛出 _GraphMiss"""
+
+    def __init__(self, graph: BangumiSequelGraph, api, now: float):
+        self._graph = graph
+        self._api = api
+        self._now = now
+
+    def answer(self, request: tuple) -> Any:
+        op, sid = request[0], request[1]
+        if op == "fallback":
+            # 回退分支（单条目 airdate 择优）需要完整章节列表，交给网络路径
+            raise _GraphMiss()
+        node = self._graph._fresh_node(sid, self._now)
+        if op == "subject":
+            return {
+                "id": node["id"],
+                "type": node["type"],
+                "name": node["name"],
+                "name_cn": node["name_cn"],
+            }
+        if op == "next":
+            if node["sequels"] is None:
+                raise _GraphMiss()
+            return node["sequels"][0] if node["sequels"] else None
+        if op == "episodes":
+            if node["episodes"] is None:
+                raise _GraphMiss()
+            return {"data": node["episodes"], "total": node["total"]}
+        return self._find_episode_by_sort(node, request[2])
+
+    def _find_episode_by_sort(self, node: dict[str, Any], target_sort: int):
+        """对应客户端的 _find_episode_by_sort；长篇使用节点中的章节索引"""
+        rows = node["episodes"]
+        if target_sort > EPISODE_INDEX_MIN_SORT:
+            if node.get("index") is not None:
+                return EpisodeIndex.from_payload(node["index"]).find_by_sort(
+                    target_sort
+                )
+            if rows is None:
+                raise _GraphMiss()
+            # 首页恰好按 sort 连续排列时可直接定位
+            if len(rows) >= target_sort and rows[target_sort - 1].get("sort") == (
+                target_sort
+            ):
+                return rows[target_sort - 1]
+            if int(node["total"] or 0) > len(rows):
+                raise _GraphMiss()
+        if rows is None:
+            raise _GraphMiss()
+        matched = self._api._match_target_ep_rows(rows, target_sort)
+        return matched[0] if matched else None
+
+
+# 全局 Bangumi 续集链关系图
+bgm_sequel_graph = BangumiSequelGraph()
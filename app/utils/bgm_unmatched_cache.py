@@ -0,0 +1,163 @@
+"""Bangumi 未匹配缓存：记录自定义映射、bangumi-data 与 Bangumi 搜索均未命中的标题。
+
+不在 Bangumi 上的作品或标题有误的媒体每次播放都会重复 bangumi-data 扫描与多次搜索
+请求（fongmi 每 3 分钟轮询一次）。按规范化后的 (标题, 原标题, 媒体类型, 首播日期)
+记录未命中结果，有效期内直接返回，不再访问网络。每条记录带有匹配数据版本（自定义
+映射文件与 bangumi-data 的修改时间），版本变化时自动清空，新增映射立即生效。
+"""
+
+import threading
+import time
+from typing import Any, Optional
+
+from ..core.database import DatabaseManager, database_manager
+from .title_normalizer import normalize_title
+
+# 内存中保留的条目数上限（超出时淘汰最早写入的条目）
+_MAX_MEMORY_ENTRIES = 5000
+
+
+def unmatched_key(
+    title: str, ori_title: Optional[str], media_type: str, premiere_date: Optional[str]
+) -> str:
+    """未匹配缓存键：规范化后的 (标题, 原标题, 媒体类型, 首播日期)"""
+    return "\x1f".join(
+        (
+            normalize_title(title) or (title or ""),
+            normalize_title(ori_title) or (ori_title or "").strip(),
+            (media_type or "").lower(),
+            (premiere_date or "")[:10],
+        )
+    )
+
+
+class BangumiUnmatchedCache:
+    """SQLite 持久化、内存常驻的未匹配标题缓存"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        self._db = db or database_manager
+        self._lock = threading.Lock()
+        self._entries: Optional[dict[str, dict[str, Any]]] = None
+        self._version: Optional[str] = None
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._invalidations = 0
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            now = time.time()
+            self._entries = {
+                row["cache_key"]: row
+                for row in self._db.get_bgm_unmatched_titles()
+                if row["expires_at"] > now
+            }
+        return self._entries
+
+    def _sync_version(self, version: str) -> None:
+        """匹配数据版本变化（映射文件修改、bangumi-data 刷新）时清除旧版本的条目"""
+        if version == self._version:
+            return
+        self._version = version
+        entries = self._load()
+        stale = [k for k, e in entries.items() if e["version"] != version]
+        if stale:
+            for key in stale:
+                del entries[key]
+            self._invalidations += 1
+        self._db.clear_bgm_unmatched_titles(except_version=version)
+
+    def lookup(
+        self,
+        title: str,
+        ori_title: Optional[str],
+        media_type: str,
+        premiere_date: Optional[str],
+        version: str,
+    ) -> Optional[dict[str, Any]]:
+        """返回未过期的未匹配记录；未命中返回 None"""
+        key = unmatched_key(title, ori_title, media_type, premiere_date)
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return dict(entry)
+
+    def remember(
+        self,
+        title: str,
+        ori_title: Optional[str],
+        media_type: str,
+        premiere_date: Optional[str],
+        detail: str,
+        version: str,
+        ttl: float,
+    ) -> bool:
+        """记录一次确定的未匹配结果；ttl <= 0 时不记录"""
+        if ttl <= 0:
+            return False
+        now = time.time()
+        entry = {
+            "cache_key": unmatched_key(title, ori_title, media_type, premiere_date),
+            "title": title or "",
+            "ori_title": ori_title or "",
+            "media_type": media_type or "",
+            "premiere_date": (premiere_date or "")[:10],
+            "detail": detail,
+            "version": version,
+            "created_at": now,
+            "expires_at": now + ttl,
+        }
+        with self._lock:
+            self._sync_version(version)
+            entries = self._entries
+            if len(entries) >= _MAX_MEMORY_ENTRIES:
+                oldest = min(entries, key=lambda k: entries[k]["created_at"])
+                del entries[oldest]
+            entries[entry["cache_key"]] = entry
+            self._writes += 1
+        return self._db.set_bgm_unmatched_title(entry)
+
+    def list_entries(self) -> list[dict[str, Any]]:
+        """未过期的条目（最近写入在前）"""
+        now = time.time()
+        with self._lock:
+            rows = [dict(e) for e in self._load().values() if e["expires_at"] > now]
+        rows.sort(key=lambda e: e["created_at"], reverse=True)
+        return rows
+
+    def delete(self, cache_key: str) -> int:
+        """删除一条记录，下次同步该标题时重新搜索"""
+        with self._lock:
+            self._load().pop(cache_key, None)
+        return self._db.delete_bgm_unmatched_title(cache_key)
+
+    def clear(self) -> int:
+        """清空全部记录"""
+        with self._lock:
+            self._load().clear()
+        return self._db.clear_bgm_unmatched_titles()
+
+    def get_stats(self) -> dict[str, Any]:
+        """命中统计与当前条目数"""
+        now = time.time()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "invalidations": self._invalidations,
+                "entries": sum(
+                    1 for e in self._load().values() if e["expires_at"] > now
+                ),
+            }
+
+
+# 全局 Bangumi 未匹配缓存
+bgm_unmatched_cache = BangumiUnmatchedCache()
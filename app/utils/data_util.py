@@ -2,6 +2,8 @@
 数据提取工具模块
 """
 
+from typing import Optional
+
 from ..core.logging import logger
 from ..models.sync import CustomItem
 
@@ -30,6 +32,30 @@ def extract_plex_json(s):
     return json_str
 
 
+def normalize_provider_ids(ids) -> Optional[dict[str, str]]:
+    """外部 ID 统一为 小写站点名 → 字符串 id，去掉空值；没有可用 ID 时返回 None"""
+    if not isinstance(ids, dict):
+        return None
+    normalized = {}
+    for key, value in ids.items():
+        if value is None or not isinstance(key, str):
+            continue
+        value = str(value).strip()
+        if key.strip() and value:
+            normalized[key.strip().lower()] = value
+    return normalized or None
+
+
+def extract_plex_provider_ids(metadata) -> Optional[dict[str, str]]:
+    """从 Plex Metadata.Guid（如 tmdb://603、imdb://tt0133093）提取外部 ID"""
+    ids = {}
+    for guid in metadata.get("Guid") or ():
+        scheme, sep, value = str((guid or {}).get("id") or "").partition("://")
+        if sep:
+            ids.setdefault(scheme, value)
+    return normalize_provider_ids(ids)
+
+
 def extract_plex_data(plex_data):
     """从Plex数据中提取CustomItem所需的字段"""
 
@@ -55,8 +81,10 @@ def extract_plex_data(plex_data):
             release_date=release_date,
             user_name=plex_data["Account"]["title"],
             source="plex",
+            provider_ids=extract_plex_provider_ids(md),
         )
 
+    # 剧集的 Guid 是单集的外部 ID，无法对应整部剧，不提取
     # 获取发行日期，如果不存在则设置为空字符串
     release_date = ""
     if md.get("originallyAvailableAt"):
@@ -103,8 +131,10 @@ def extract_emby_data(emby_data):
             release_date=release_date,
             user_name=emby_data["User"]["Name"],
             source="emby",
+            provider_ids=normalize_provider_ids(item.get("ProviderIds")),
         )
 
+    # 剧集的 ProviderIds 是单集的外部 ID，无法对应整部剧，不提取
     release_date = ""
     if item.get("PremiereDate"):
         release_date = item["PremiereDate"][:10]
@@ -132,6 +162,13 @@ def extract_jellyfin_data(jellyfin_data):
     else:
         logger.debug("未找到release_date字段，将尝试从bangumi-data获取日期信息")
 
+    # 模板中可提供 provider_ids 对象，或 tmdb_id / tvdb_id / imdb_id 字段
+    provider_ids = dict(jellyfin_data.get("provider_ids") or {})
+    for provider in ("tmdb", "tvdb", "imdb"):
+        if jellyfin_data.get(f"{provider}_id"):
+            provider_ids.setdefault(provider, jellyfin_data[f"{provider}_id"])
+    provider_ids = normalize_provider_ids(provider_ids)
+
     mtype = (jellyfin_data.get("media_type") or "episode").lower()
     if mtype == "movie":
         return CustomItem(
@@ -143,6 +180,7 @@ def extract_jellyfin_data(jellyfin_data):
             release_date=release_date,
             user_name=jellyfin_data["user_name"],
             source="jellyfin",
+            provider_ids=provider_ids,
         )
 
     return CustomItem(
@@ -154,4 +192,5 @@ def extract_jellyfin_data(jellyfin_data):
         release_date=release_date,
         user_name=jellyfin_data["user_name"],
         source="jellyfin",
+        provider_ids=provider_ids,
     )
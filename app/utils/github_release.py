@@ -11,6 +11,7 @@ from typing import Any
 import httpx
 
 from ..core.logging import logger
+from .http_transport import get_async_client
 from .semver_util import (
     is_strictly_newer,
     minor_version_line,
@@ -95,8 +96,10 @@ async def fetch_latest_release() -> LatestReleaseResult:
         headers["If-None-Match"] = _cache_etag
 
     try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            r = await client.get(GITHUB_LATEST_URL, headers=headers)
+        client = get_async_client()
+        r = await client.get(
+            GITHUB_LATEST_URL, headers=headers, timeout=REQUEST_TIMEOUT
+        )
     except httpx.TimeoutException:
         logger.warning("GitHub releases/latest 请求超时")
         return LatestReleaseResult(ok=False, error="请求 GitHub 超时")
@@ -239,40 +242,41 @@ async def fetch_newer_releases_than(
     }
     collected: list[ReleaseListItem] = []
     try:
-        async with httpx.AsyncClient(timeout=RELEASES_LIST_TIMEOUT) as client:
-            for page in range(1, max_pages + 1):
-                r = await client.get(
-                    GITHUB_RELEASES_URL,
-                    headers=headers,
-                    params={"page": page, "per_page": per_page},
+        client = get_async_client()
+        for page in range(1, max_pages + 1):
+            r = await client.get(
+                GITHUB_RELEASES_URL,
+                headers=headers,
+                params={"page": page, "per_page": per_page},
+                timeout=RELEASES_LIST_TIMEOUT,
+            )
+            if r.status_code == 403:
+                return (
+                    collected,
+                    "无法拉取发行列表（可能触发 GitHub API 限流）",
+                )
+            if r.status_code != 200:
+                return (
+                    collected,
+                    f"发行列表请求失败（HTTP {r.status_code}）",
                 )
-                if r.status_code == 403:
-                    return (
-                        collected,
-                        "无法拉取发行列表（可能触发 GitHub API 限流）",
-                    )
-                if r.status_code != 200:
-                    return (
-                        collected,
-                        f"发行列表请求失败（HTTP {r.status_code}）",
-                    )
+            try:
+                arr = r.json()
+            except ValueError:
+                return collected, "发行列表响应不是合法 JSON"
+            if not isinstance(arr, list) or not arr:
+                break
+            for row in arr:
+                item = _parse_release_row(row)
+                if item is None:
+                    continue
                 try:
-                    arr = r.json()
-                except ValueError:
-                    return collected, "发行列表响应不是合法 JSON"
-                if not isinstance(arr, list) or not arr:
-                    break
-                for row in arr:
-                    item = _parse_release_row(row)
-                    if item is None:
-                        continue
-                    try:
-                        if is_strictly_newer(item.semver, current_semver):
-                            collected.append(item)
-                    except Exception:
-                        continue
-                if len(arr) < per_page:
-                    break
+                    if is_strictly_newer(item.semver, current_semver):
+                        collected.append(item)
+                except Exception:
+                    continue
+            if len(arr) < per_page:
+                break
     except httpx.TimeoutException:
         return collected, "拉取发行列表超时"
     except httpx.RequestError as e:
@@ -332,40 +336,41 @@ async def fetch_releases_in_minor_line(
     }
     collected: list[ReleaseListItem] = []
     try:
-        async with httpx.AsyncClient(timeout=RELEASES_LIST_TIMEOUT) as client:
-            for page in range(1, max_pages + 1):
-                r = await client.get(
-                    GITHUB_RELEASES_URL,
-                    headers=headers,
-                    params={"page": page, "per_page": per_page},
+        client = get_async_client()
+        for page in range(1, max_pages + 1):
+            r = await client.get(
+                GITHUB_RELEASES_URL,
+                headers=headers,
+                params={"page": page, "per_page": per_page},
+                timeout=RELEASES_LIST_TIMEOUT,
+            )
+            if r.status_code == 403:
+                return (
+                    collected,
+                    "无法拉取发行列表（可能触发 GitHub API 限流）",
+                )
+            if r.status_code != 200:
+                return (
+                    collected,
+                    f"发行列表请求失败（HTTP {r.status_code}）",
                 )
-                if r.status_code == 403:
-                    return (
-                        collected,
-                        "无法拉取发行列表（可能触发 GitHub API 限流）",
-                    )
-                if r.status_code != 200:
-                    return (
-                        collected,
-                        f"发行列表请求失败（HTTP {r.status_code}）",
-                    )
+            try:
+                arr = r.json()
+            except ValueError:
+                return collected, "发行列表响应不是合法 JSON"
+            if not isinstance(arr, list) or not arr:
+                break
+            for row in arr:
+                item = _parse_release_row(row)
+                if item is None:
+                    continue
                 try:
-                    arr = r.json()
-                except ValueError:
-                    return collected, "发行列表响应不是合法 JSON"
-                if not isinstance(arr, list) or not arr:
-                    break
-                for row in arr:
-                    item = _parse_release_row(row)
-                    if item is None:
-                        continue
-                    try:
-                        if same_minor_line(item.semver, reference_semver):
-                            collected.append(item)
-                    except Exception:
-                        continue
-                if len(arr) < per_page:
-                    break
+                    if same_minor_line(item.semver, reference_semver):
+                        collected.append(item)
+                except Exception:
+                    continue
+            if len(arr) < per_page:
+                break
     except httpx.TimeoutException:
         return collected, "拉取发行列表超时"
     except httpx.RequestError as e:
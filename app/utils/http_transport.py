@@ -0,0 +1,510 @@
+"""进程级共享 HTTP 传输层：所有对外请求复用连接池，避免每次请求重新建连与 TLS 握手。
+
+同步请求（requests）共用一个 PooledHTTPAdapter：urllib3 按 (协议, 主机, 端口, TLS 设置)
+与代理分别维护连接池，各会话挂载同一个适配器即可共享连接，无需共享会话本身（认证头
+等会话状态仍各自独立）。异步请求（httpx）按 (事件循环, 代理, SSL 验证) 共享
+AsyncClient，安装了 http2 可选依赖时启用 HTTP/2。这些共享连接新建连接时经由 dns_cache 按 TTL
+缓存 DNS 解析结果（不替换进程内的 socket.getaddrinfo，其余代码的解析不受影响）；
+新建连接数与请求数分别计数，二者之差即连接复用次数。未指定超时的请求统一使用
+DEFAULT_TIMEOUT。
+"""
+
+import asyncio
+import contextlib
+import functools
+import importlib.util
+import socket
+import threading
+import time
+from typing import Any, Optional
+
+import httpcore
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from ..core.logging import logger
+
+# 建立连接的超时与读取超时（秒），调用方未指定超时时使用
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 15.0
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+# 同步连接池：缓存的主机连接池数量、每个主机保持的最大连接数
+POOL_HOSTS = 32
+POOL_MAXSIZE = 16
+# 异步连接池上限与空闲连接的保活时间
+ASYNC_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+# DNS 解析结果的缓存时间（秒）与最大条目数
+DNS_CACHE_TTL = 300.0
+_DNS_CACHE_MAX_ENTRIES = 1024
+
+# 安装了 http2 可选依赖（h2）时启用 HTTP/2（服务端不支持时自动回退 HTTP/1.1）
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _TransportStats:
+    """请求数与新建连接数（按同步 / 异步分别统计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {"sync": 0, "async": 0}
+        self._connections = {"sync": 0, "async": 0}
+
+    def request(self, kind: str) -> None:
+        with self._lock:
+            self._requests[kind] += 1
+
+    def connection(self, kind: str) -> None:
+        with self._lock:
+            self._connections[kind] += 1
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for kind, requests_sent in self._requests.items():
+                opened = self._connections[kind]
+                reused = max(0, requests_sent - opened)
+                result[kind] = {
+                    "requests": requests_sent,
+                    "connections_opened": opened,
+                    "reused": reused,
+                    "reuse_ratio": round(reused / requests_sent, 3)
+                    if requests_sent
+                    else 0.0,
+                }
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests = dict.fromkeys(self._requests, 0)
+            self._connections = dict.fromkeys(self._connections, 0)
+
+
+transport_stats = _TransportStats()
+
+
+class _DnsCache:
+    """共享连接使用的 getaddrinfo TTL 缓存；解析失败不缓存"""
+
+    def __init__(self, ttl: float):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, list]] = {}
+        self._ttl = ttl
+        self._resolve = socket.getaddrinfo
+        self.hits = 0
+        self.misses = 0
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if self._ttl <= 0:
+            return self._resolve(host, port, family, type, proto, flags)
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        cached = self._cached(key, now)
+        if cached is not None:
+            return cached
+        result = self._resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            if len(self._entries) >= _DNS_CACHE_MAX_ENTRIES:
+                self._entries.clear()
+            self._entries[key] = (now + self._ttl, list(result))
+            self.misses += 1
+        return result
+
+    async def getaddrinfo_async(self, host, port, family=0, type=0):
+        """命中缓存时直接返回，否则在线程池中解析，不阻塞事件循环"""
+        if self._ttl > 0:
+            cached = self._cached((host, port, family, type, 0, 0), time.monotonic())
+            if cached is not None:
+                return cached
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.getaddrinfo, host, port, family, type)
+        )
+
+    def _cached(self, key: tuple, now: float) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+        return None
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl_seconds": self._ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+dns_cache = _DnsCache(DNS_CACHE_TTL)
+
+
+class _DnsCachedConnectionMixin:
+    """urllib3 连接：经由 dns_cache 解析主机名后依次尝试各个地址"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            infos = dns_cache.getaddrinfo(
+                host, self.port, allowed_gai_family(), socket.SOCK_STREAM
+            )
+        except OSError:
+            # 解析失败按 urllib3 原流程处理（抛出 NameResolutionError）
+            return super()._new_conn()
+        error: Optional[Exception] = None
+        try:
+            for *_, sockaddr in infos:
+                # 仅替换建立 TCP 连接的地址，TLS 的 SNI 与证书校验仍使用原主机名
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+        finally:
+            self._dns_host = host
+        if error is None:
+            return super()._new_conn()
+        raise error
+
+
+class _DnsCachedHTTPConnection(_DnsCachedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _DnsCachedHTTPSConnection(_DnsCachedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _DnsCachedHTTPConnection
+
+    def _new_conn(self):
+        transport_stats.connection("sync")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _DnsCachedHTTPSConnection
+
+    def _new_conn(self):
+        transport_stats.connection("sync")
+        return super()._new_conn()
+
+
+_COUNTING_POOL_CLASSES = {
+    "http": _CountingHTTPConnectionPool,
+    "https": _CountingHTTPSConnectionPool,
+}
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """进程内共享的 requests 适配器：有界连接池、默认超时与连接复用统计。
+
+    由多个会话共同挂载，因此 close() 不关闭连接池，进程退出时由 close_pooled_adapter() 关闭。
+    """
+
+    def __init__(self):
+        super().__init__(
+            pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=0
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _COUNTING_POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS 代理使用 urllib3 自带的连接池类，不参与新建连接计数
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = _COUNTING_POOL_CLASSES
+        return manager
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = DEFAULT_TIMEOUT
+        transport_stats.request("sync")
+        return super().send(request, **kwargs)
+
+    def close(self) -> None:
+        """会话关闭时不关闭共享连接池"""
+
+    def close_pools(self) -> None:
+        super().close()
+
+
+_pooled_adapter = PooledHTTPAdapter()
+
+
+def mount_pooled_adapter(session: requests.Session) -> requests.Session:
+    """让会话使用共享连接池（会话自身的请求头、代理等设置不受影响）"""
+    session.mount("http://", _pooled_adapter)
+    session.mount("https://", _pooled_adapter)
+    return session
+
+
+# 无需会话状态的一次性请求（通知 Webhook、线路探测等）共用的会话
+shared_session = mount_pooled_adapter(requests.Session())
+
+
+def close_pooled_adapter() -> None:
+    """关闭共享的同步连接池（应用关闭时调用）"""
+    _pooled_adapter.close_pools()
+
+
+class _DnsCachedNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore 网络后端：经由 dns_cache 解析主机名后依次尝试各个地址"""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self._backend = backend
+
+    async def connect_tcp(
+        self, host, port, timeout=None, local_address=None, socket_options=None
+    ):
+        try:
+            infos = await dns_cache.getaddrinfo_async(
+                host, port, type=socket.SOCK_STREAM
+            )
+        except OSError:
+            infos = []
+        error: Optional[Exception] = None
+        for *_, sockaddr in infos:
+            try:
+                return await self._backend.connect_tcp(
+                    sockaddr[0], port, timeout, local_address, socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        if error is not None:
+            raise error
+        # 解析失败时交由原后端解析并报告错误
+        return await self._backend.connect_tcp(
+            host, port, timeout, local_address, socket_options
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore 异常 → httpx 异常（与 httpx 自带传输的对应关系一致，取最具体的一个）
+_HTTPCORE_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+)
+
+
+@contextlib.contextmanager
+def _httpx_errors():
+    try:
+        yield
+    except Exception as e:
+        for core_error, httpx_error in _HTTPCORE_ERRORS:
+            if isinstance(e, core_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _DnsCachedTransport(httpx.AsyncBaseTransport):
+    """httpx 传输：httpcore 连接池（直连或经由代理）经由 dns_cache 解析主机名
+
+    httpx.AsyncHTTPTransport 不接受网络后端参数，这里用 httpcore 的公开接口自建连接池，
+    请求与响应的转换与 httpx 自带传输相同。
+    """
+
+    def __init__(
+        self,
+        proxy: Optional[str] = None,
+        verify: bool = True,
+        http2: bool = False,
+        limits: httpx.Limits = ASYNC_LIMITS,
+    ):
+        options: dict[str, Any] = {
+            "ssl_context": httpx.create_ssl_context(verify=verify),
+            "max_connections": limits.max_connections,
+            "max_keepalive_connections": limits.max_keepalive_connections,
+            "keepalive_expiry": limits.keepalive_expiry,
+            "http2": http2,
+            "network_backend": _DnsCachedNetworkBackend(httpcore.AnyIOBackend()),
+        }
+        if not proxy:
+            self._pool = httpcore.AsyncConnectionPool(**options)
+            return
+        proxy_config = httpx.Proxy(proxy)
+        proxy_url = httpcore.URL(
+            scheme=proxy_config.url.raw_scheme,
+            host=proxy_config.url.raw_host,
+            port=proxy_config.url.port,
+            target=proxy_config.url.raw_path,
+        )
+        if proxy_config.url.scheme in ("socks5", "socks5h"):
+            self._pool = httpcore.AsyncSOCKSProxy(
+                proxy_url=proxy_url, proxy_auth=proxy_config.raw_auth, **options
+            )
+        else:
+            self._pool = httpcore.AsyncHTTPProxy(
+                proxy_url=proxy_url,
+                proxy_auth=proxy_config.raw_auth,
+                proxy_headers=proxy_config.headers.raw,
+                **options,
+            )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+async def _count_async_request(request: httpx.Request) -> None:
+    transport_stats.request("async")
+    request.extensions.setdefault("trace", _trace_async_connection)
+
+
+async def _trace_async_connection(event_name: str, info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        transport_stats.connection("async")
+
+
+# (事件循环 id, 代理, SSL 验证) -> (事件循环, 共享客户端)
+_async_clients: dict[
+    tuple[int, str, bool], tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]
+] = {}
+# 多个线程各自的事件循环可能同时获取客户端
+_async_clients_lock = threading.Lock()
+# 正在关闭的遗留客户端（保留任务引用直到完成）
+_closing_tasks: set[asyncio.Task] = set()
+
+
+async def _close_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug(f"关闭共享 HTTP 客户端失败: {e}")
+
+
+def get_async_client(
+    proxy: Optional[str] = None, verify: bool = True
+) -> httpx.AsyncClient:
+    """获取当前事件循环内按 (代理, SSL 验证) 共享的 httpx.AsyncClient
+
+    客户端不带默认请求头，调用方按请求传入；不要对其调用 aclose()。
+    """
+    loop = asyncio.get_running_loop()
+    key = (id(loop), proxy or "", bool(verify))
+    with _async_clients_lock:
+        entry = _async_clients.get(key)
+        if entry is not None and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+
+        # 已关闭事件循环遗留的客户端：移出后在当前事件循环中关闭，释放其连接池
+        stale = [
+            _async_clients.pop(stale_key)[1]
+            for stale_key, (stale_loop, _) in list(_async_clients.items())
+            if stale_loop.is_closed()
+        ]
+
+        client = httpx.AsyncClient(
+            # 直连与指定的代理都经由 dns_cache 解析；未指定代理时环境变量中的
+            # 代理（及 NO_PROXY）仍由 httpx 处理
+            mounts={
+                "all://": _DnsCachedTransport(proxy or None, verify, HTTP2_AVAILABLE)
+            },
+            trust_env=not proxy,
+            verify=verify,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=ASYNC_LIMITS,
+            event_hooks={"request": [_count_async_request]},
+        )
+        _async_clients[key] = (loop, client)
+
+    for stale_client in stale:
+        task = loop.create_task(_close_quietly(stale_client))
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+    return client
+
+
+async def close_async_clients() -> None:
+    """关闭当前事件循环内的共享客户端（应用关闭时调用）"""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        owned = [
+            _async_clients.pop(key)[1]
+            for key, (owner, _) in list(_async_clients.items())
+            if owner is loop
+        ]
+    for client in owned:
+        await _close_quietly(client)
+
+
+def get_stats() -> dict[str, Any]:
+    """连接复用、DNS 缓存与连接池配置"""
+    return {
+        **transport_stats.snapshot(),
+        "dns_cache": dns_cache.get_stats(),
+        "http2": HTTP2_AVAILABLE,
+        "async_clients": len(_async_clients),
+        "pool": {"hosts": POOL_HOSTS, "per_host": POOL_MAXSIZE},
+    }
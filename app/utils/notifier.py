@@ -12,9 +12,8 @@ from email.mime.text import MIMEText
 from email.utils import formatdate
 from typing import Any, Optional
 
-import requests
-
 from ..core.logging import logger
+from .http_transport import shared_session
 
 
 class Notifier:
@@ -357,9 +356,11 @@ class Notifier:
             logger.info(f"📤 发送 {notification_type} 通知到: {url}")
 
             if method == "POST":
-                response = requests.post(url, json=payload, headers=headers, timeout=10)
+                response = shared_session.post(
+                    url, json=payload, headers=headers, timeout=10
+                )
             else:  # GET
-                response = requests.get(
+                response = shared_session.get(
                     url,
                     params=payload if isinstance(payload, dict) else None,
                     headers=headers,
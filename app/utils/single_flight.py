@@ -0,0 +1,147 @@
+"""请求合并（single-flight）：相同键的并发调用只执行一次，其余调用等待并共享结果。
+
+线程（BangumiApi）与协程（AsyncBangumiApi）分别登记在途请求；协程按事件循环隔离，
+避免跨循环等待 Future。
+"""
+
+import asyncio
+import functools
+import threading
+from collections.abc import Awaitable, Hashable
+from typing import Any, Callable, Optional
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并在途调用，并按键的第一段（类别）统计执行与合并次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._futures: dict[tuple[int, Hashable], _AsyncCall] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def _kind(key: Hashable) -> str:
+        return str(key[0]) if isinstance(key, tuple) and key else "default"
+
+    def _count(self, key: Hashable, field: str) -> None:
+        stats = self._stats.setdefault(self._kind(key), {"executed": 0, "coalesced": 0})
+        stats[field] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """执行 fn；若相同键的调用正在进行，则等待其结果（异常同样共享）"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            self._count(key, "executed" if leader else "coalesced")
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """do 的协程版本：相同事件循环内相同键的协程共享一次 await factory() 的结果
+
+        factory() 在独立任务中执行，所有调用方（包括发起者）各自 shield 等待：
+        任一调用方被取消不影响其他调用方；全部调用方都被取消时才取消该任务。
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            flight = self._futures.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _AsyncCall(loop.create_task(factory()))
+                self._futures[flight_key] = flight
+                flight.task.add_done_callback(
+                    functools.partial(self._finish_async, flight_key, flight)
+                )
+            flight.waiters += 1
+            self._count(key, "executed" if leader else "coalesced")
+
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.task.done()
+                if abandoned and self._futures.get(flight_key) is flight:
+                    # 之后的调用重新执行，不加入正在取消的任务
+                    del self._futures[flight_key]
+            if abandoned:
+                flight.task.cancel()
+            raise
+        except BaseException:
+            with self._lock:
+                flight.waiters -= 1
+            raise
+        else:
+            with self._lock:
+                flight.waiters -= 1
+
+    def _finish_async(
+        self, flight_key: tuple[int, Hashable], flight: "_AsyncCall", task
+    ) -> None:
+        with self._lock:
+            if self._futures.get(flight_key) is flight:
+                del self._futures[flight_key]
+        if not task.cancelled():
+            # 标记异常已被读取，没有等待者时不输出 "never retrieved" 警告
+            task.exception()
+
+    def get_stats(self) -> dict[str, Any]:
+        """执行/合并次数与当前在途请求数"""
+        with self._lock:
+            by_kind = {kind: dict(v) for kind, v in self._stats.items()}
+            in_flight = len(self._calls) + len(self._futures)
+        executed = sum(v["executed"] for v in by_kind.values())
+        coalesced = sum(v["coalesced"] for v in by_kind.values())
+        return {
+            "executed": executed,
+            "coalesced": coalesced,
+            "in_flight": in_flight,
+            "by_kind": by_kind,
+        }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Bangumi API 全局请求合并器，所有账号与同步入口共享
+bgm_single_flight = SingleFlight()
@@ -0,0 +1,145 @@
+"""番剧标题规范化。
+
+媒体服务器、bangumi-data 与自定义映射中的同一部番剧，标题写法常常不同：繁体与简体
+（「鬼滅の刃」/「鬼灭之刃」）、全角与半角、括号（「【推しの子】」/「推しの子」）、多余的
+空格与标点。normalize_title 把这些写法折叠为同一个键：
+
+1. NFKC（全角字母数字、半角片假名等统一）；
+2. 统一大小写；
+3. 查表折叠：常用繁体字 / 日文新字体 → 简体字，平假名「の」→「之」，片假名 → 平假名；
+4. 去除括号、标点与空白。
+
+去除标点会让少数不同作品同键（「けいおん!」/「けいおん!!」），按键查到多个条目时由
+调用方按原文或日期区分。
+
+结果带缓存，bangumi-data 的全部标题在构建索引时即已规范化。季度后缀的去除改变了标题
+所指的条目，不在 normalize_title 中进行，由 strip_season_suffix 单独提供。
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# 常用繁体字 / 日文新字体 → 简体字（每项两个字符：原字、简体字）
+_TRAD_SIMP_PAIRS = """
+萬万 與与 專专 業业 東东 絲丝 兩两 嚴严 喪丧 個个 豐丰 臨临 為为 麗丽 舉举 義义
+烏乌 樂乐 喬乔 習习 鄉乡 書书 買买 亂乱 爭争 於于 虧亏 雲云 亞亚 產产 親亲 億亿
+僅仅 從从 倉仓 儀仪 們们 價价 眾众 優优 夥伙 會会 傘伞 偉伟 傳传 傷伤 倫伦 偽伪
+體体 餘余 俠侠 侶侣 偵侦 側侧 係系 儉俭 債债 傾倾 償偿 儲储 兒儿 黨党 蘭兰 關关
+興兴 養养 獸兽 岡冈 冊册 寫写 軍军 農农 衝冲 決决 況况 凍冻 淨净 涼凉 減减 幾几
+鳳凤 憑凭 凱凯 擊击 劃划 劉刘 則则 剛刚 創创 刪删 別别 劍剑 劑剂 劇剧 勸劝 辦办
+務务 動动 勵励 勁劲 勞劳 勢势 勛勋 勝胜 區区 醫医 華华 協协 單单 賣卖 盧卢 衛卫
+卻却 廠厂 廳厅 歷历 曆历 厲厉 壓压 厭厌 縣县 參参 雙双 發发 髮发 變变 敘叙 疊叠
+號号 嘆叹 嗎吗 啟启 吳吴 員员 聽听 鳴鸣 響响 問问 喚唤 圖图 團团 園园 圍围 國国
+聖圣 場场 壞坏 塊块 堅坚 壇坛 墜坠 執执 壺壶 夢梦 頭头 夾夹 奪夺 奮奋 獎奖 婦妇
+媽妈 嬌娇 孫孙 學学 寶宝 實实 寵宠 審审 憲宪 寬宽 賓宾 對对 尋寻 導导 將将 爾尔
+塵尘 嘗尝 層层 屬属 歲岁 島岛 嶺岭 幣币 帥帅 師师 帳帐 帶带 幫帮 廣广 莊庄 慶庆
+庫库 應应 廟庙 廢废 開开 異异 棄弃 張张 彈弹 強强 歸归 當当 錄录 徹彻 徑径 後后
+復复 憶忆 懷怀 態态 總总 戀恋 惡恶 驚惊 慘惨 慣惯 懶懒 願愿 戰战 戲戏 戶户 撲扑
+擴扩 掃扫 揚扬 擾扰 護护 報报 擔担 擬拟 擁拥 擇择 掛挂 擋挡 擠挤 揮挥 損损 換换
+據据 攜携 搖摇 攝摄 擺摆 數数 斷断 無无 舊旧 時时 晝昼 顯显 晉晋 曉晓 暫暂 朧胧
+術术 機机 殺杀 雜杂 權权 條条 來来 楊杨 極极 構构 槍枪 楓枫 櫻樱 橋桥 檢检 樓楼
+標标 樹树 樣样 歡欢 歐欧 殘残 殼壳 氣气 漢汉 湯汤 溝沟 淚泪 潔洁 灑洒 濃浓 濤涛
+渦涡 澤泽 濟济 潛潜 滿满 漁渔 滅灭 燈灯 靈灵 災灾 爐炉 點点 煉炼 煙烟 熱热 燒烧
+營营 愛爱 爺爷 牆墙 獨独 獵猎 貓猫 獻献 現现 環环 瑪玛 畫画 療疗 癡痴 盜盗 監监
+盤盘 睜睁 礦矿 碼码 確确 禮礼 禍祸 禪禅 離离 種种 積积 稱称 穩稳 窮穷 竊窃 競竞
+筆笔 築筑 節节 範范 簡简 類类 糧粮 緊紧 紅红 約约 級级 紀纪 純纯 紙纸 線线 練练
+組组 細细 終终 結结 給给 絕绝 統统 絡络 經经 綠绿 維维 網网 緣缘 編编 縱纵 織织
+繩绳 繪绘 繼继 續续 羅罗 聯联 聲声 職职 聞闻 腦脑 腳脚 臉脸 膽胆 艦舰 藝艺 蘇苏
+藥药 獲获 蓋盖 蓮莲 薩萨 虛虚 處处 蟲虫 補补 裝装 襲袭 見见 規规 視视 覺觉 覽览
+觀观 觸触 計计 訂订 認认 討讨 讓让 訓训 議议 記记 講讲 許许 論论 設设 訪访 證证
+評评 識识 詞词 試试 詩诗 話话 誕诞 語语 說说 誰谁 課课 調调 談谈 請请 諸诸 讀读
+謎谜 謝谢 譜谱 豎竖 貝贝 負负 財财 責责 貨货 質质 販贩 貧贫 購购 貫贯 貴贵 費费
+賀贺 資资 賊贼 賞赏 賢贤 賴赖 贈赠 贏赢 趕赶 趙赵 躍跃 跡迹 蹟迹 軌轨 軟软 輕轻
+載载 輝辉 輪轮 輸输 轉转 辭辞 邊边 達达 遷迁 過过 運运 還还 這这 進进 遠远 違违
+連连 遲迟 遙遥 適适 選选 遺遗 鄰邻 醜丑 釋释 針针 鈴铃 鐵铁 銀银 銃铳 鋼钢 錢钱
+錯错 鏈链 鍋锅 鏡镜 鐘钟 鑰钥 長长 門门 閃闪 閉闭 間间 閒闲 閣阁 鬥斗 鬧闹 隊队
+陽阳 陰阴 陣阵 階阶 際际 陸陆 險险 隱隐 隨随 難难 雞鸡 雖虽 電电 霧雾 靜静 韓韩
+頁页 頂顶 項项 順顺 須须 預预 領领 頻频 題题 額额 顏颜 顧顾 風风 飛飞 飯饭 飲饮
+飾饰 館馆 馬马 駐驻 騎骑 騙骗 驅驱 驗验 鬆松 魚鱼 鮮鲜 鯨鲸 鳥鸟 鴉鸦 鷹鹰 鹽盐
+麥麦 黃黄 齊齐 齒齿 龍龙 龜龟 絆绊 傑杰 紗纱 縛缚 貳贰 壽寿 彎弯 燭烛 狀状 獄狱
+猶犹 奧奥 憐怜 鎮镇 鑑鉴 銳锐 鋒锋 臺台 檯台 颱台 隻只 麼么 裡里 裏里 製制 準准
+捨舍 遊游 週周 僕仆 纔才 鬱郁 獅狮 戀恋 雜杂 惱恼 紋纹 絨绒 綾绫 錦锦
+鈎钩 鎖锁 鍵键 騰腾 驕骄 鵬鹏 鶴鹤 麗丽 韻韵 響响 團团 飄飘 餓饿 擬拟 衛卫 戦战
+剣剑 竜龙 斉齐 亜亚 駆驱 伝传 転转 険险 検检 験验 歴历 帰归 広广 楽乐 薬药 様样
+桜樱 関关 図图 団团 売卖 読读 続续 覚觉 蔵藏 実实 弾弹 変变 気气 円圆 黒黑 悪恶
+姫姬 滝泷 髪发 獣兽 縁缘 銭钱 鋭锐 労劳 営营 単单 仏佛 沢泽 択择 両两 乗乘 仮假
+価价 児儿 処处 剤剂 厳严 圧压 囲围 壊坏 奨奖 専专 対对 徳德 恵惠 拡扩 挙举 斎斋
+栄荣 浄净 涙泪 満满 焼烧 猟猎 県县 砕碎 窓窗 絵绘 緑绿 縄绳 総总 聴听 脳脑 芸艺
+荘庄 蛍萤 衆众 観观 訳译 譲让 豊丰 賛赞 軽轻 辺边 遅迟 郷乡 酔醉 鉄铁 録录 隠隐
+雑杂 霊灵 顔颜 駅驿 騒骚 鶏鸡 黙默 齢龄 亀龟 弐贰 戯戏 従从 撃击 暁晓 歩步 錬炼
+闘斗 発发 様样 氷冰 巻卷 渓溪 粋粹 砲炮 経经 継继 統统 絶绝 転转
+"""
+
+# 片假名 → 平假名（含 ヴ ヵ ヶ），小写的 ゕ ゖ 折叠为 か け
+_KANA_FOLD = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+_KANA_FOLD.update({0x30F5: ord("か"), 0x30F6: ord("け")})
+
+
+def _build_fold_table() -> dict[int, int]:
+    table = dict(_KANA_FOLD)
+    for pair in _TRAD_SIMP_PAIRS.split():
+        trad, simp = pair
+        table[ord(trad)] = ord(simp)
+    # 日文标题中的「の」在中文译名中通常写作「之」（鬼滅の刃 / 鬼灭之刃）
+    table[ord("の")] = ord("之")
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+# NFKC 后仍保留的标点、符号、括号与空白
+_STRIP_RE = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_title(title: str) -> str:
+    """规范化标题，用作精确匹配的键；输入为空时返回空字符串"""
+    if not title:
+        return ""
+    folded = unicodedata.normalize("NFKC", title).casefold().translate(_FOLD_TABLE)
+    return _STRIP_RE.sub("", folded)
+
+
+# 季度后缀：第2期 / 第2话 / Season 2 / S2 / 末尾数字 / II / 第2季
+_SEASON_SUFFIX_RES = (
+    re.compile(r"\s*[第]?\s*\d+\s*期?[話话集]?$"),
+    re.compile(r"\s*Season\s*\d+$", re.IGNORECASE),
+    re.compile(r"\s*S\d+$", re.IGNORECASE),
+    re.compile(r"\s*\d+$"),
+    re.compile(r"\s*II+$"),
+    re.compile(r"\s*[第]?\s*\d+\s*[期季]$"),
+)
+
+
+@lru_cache(maxsize=4096)
+def strip_season_suffix(title: str) -> str:
+    """去除标题末尾的季度信息（如「第2期」「Season 2」「S2」「II」），保留原有写法"""
+    for pattern in _SEASON_SUFFIX_RES:
+        title = pattern.sub("", title)
+    return title
+
+
+def lookup_title(mapping: dict[str, str], *titles: str) -> str:
+    """按标题查找映射值：先按原始写法精确查找，再按规范化后的标题查找，未命中返回空字符串"""
+    for title in titles:
+        if title and mapping.get(title):
+            return mapping[title]
+    normalized = {}
+    for key, value in mapping.items():
+        if value and isinstance(key, str):
+            normalized.setdefault(normalize_title(key), value)
+    for title in titles:
+        key = normalize_title(title) if title else ""
+        if key and key in normalized:
+            return normalized[key]
+    return ""
+
+
+def contains_keyword(text: str, keyword: str) -> bool:
+    """text 是否包含关键词：按规范化后的写法比较，关键词规范化后为空时按原文比较"""
+    if not text or not keyword:
+        return False
+    key = normalize_title(keyword)
+    if not key:
+        return keyword.lower() in text.lower()
+    return key in normalize_title(text)
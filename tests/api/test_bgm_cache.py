@@ -0,0 +1,276 @@
+"""Bangumi 缓存管理 API 测试。"""
+
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api import deps
+from app.api.bgm_cache import router as bgm_cache_router
+
+
+@pytest.fixture
+def app_bgm_cache():
+    app = FastAPI()
+    app.include_router(bgm_cache_router)
+
+    async def mock_user():
+        return {"username": "admin"}
+
+    app.dependency_overrides[deps.get_current_user_flexible] = mock_user
+    yield app
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_cache_stats(app_bgm_cache):
+    stats = {"clients": 1, "hits": 3, "misses": 1, "rebuilds": 0, "accounts": []}
+    meta = {"hits": 2, "stale_hits": 0, "misses": 1, "entries": {}}
+    limiter = {"enabled": True, "rate": 4.0, "burst": 8, "hosts": {}}
+    flight = {"executed": 5, "coalesced": 2, "in_flight": 0, "by_kind": {}}
+    breaker = {"enabled": True, "threshold": 5, "hosts": {}}
+    routes = {"hedge": False, "hedges": 0, "routes": {}}
+    http_stats = {"sync": {"requests": 3, "reused": 2}, "http2": False}
+    retry = {"scheduled": 1, "succeeded": 1, "pending": {}, "endpoints": {}}
+    graph = {"hits": 4, "misses": 1, "stale": 0, "writes": 3, "nodes": 3}
+    unmatched = {"hits": 1, "misses": 2, "writes": 1, "entries": 1}
+    learned = {"hits": 5, "misses": 1, "writes": 2, "entries": 2}
+    ledger = {"subject_hits": 2, "episode_hits": 1, "misses": 0, "accounts": {}}
+    with (
+        patch("app.api.bgm_cache.bangumi_api_pool.get_stats", return_value=stats),
+        patch("app.api.bgm_cache.bgm_metadata_cache.get_stats", return_value=meta),
+        patch("app.api.bgm_cache.bgm_rate_limiter.get_stats", return_value=limiter),
+        patch("app.api.bgm_cache.bgm_single_flight.get_stats", return_value=flight),
+        patch("app.api.bgm_cache.bgm_retry_queue.get_stats", return_value=retry),
+        patch("app.api.bgm_cache.bgm_circuit_breaker.get_stats", return_value=breaker),
+        patch("app.api.bgm_cache.bgm_route_manager.get_stats", return_value=routes),
+        patch("app.api.bgm_cache.http_transport.get_stats", return_value=http_stats),
+        patch("app.api.bgm_cache.bgm_sequel_graph.get_stats", return_value=graph),
+        patch("app.api.bgm_cache.bgm_collection_ledger.get_stats", return_value=ledger),
+        patch(
+            "app.api.bgm_cache.bgm_unmatched_cache.get_stats", return_value=unmatched
+        ),
+        patch("app.api.bgm_cache.bgm_learned_mappings.get_stats", return_value=learned),
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.get("/api/bgm/cache/stats")
+
+    assert r.status_code == 200
+    assert r.json() == {
+        "status": "success",
+        "data": {
+            "client_pool": stats,
+            "metadata": meta,
+            "sequel_graph": graph,
+            "collection_ledger": ledger,
+            "unmatched": unmatched,
+            "learned": learned,
+            "rate_limiter": limiter,
+            "single_flight": flight,
+            "retry_queue": retry,
+            "circuit_breaker": breaker,
+            "routes": routes,
+            "transport": http_stats,
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_cache_stats_error(app_bgm_cache):
+    with patch(
+        "app.api.bgm_cache.bangumi_api_pool.get_stats",
+        side_effect=RuntimeError("boom"),
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.get("/api/bgm/cache/stats")
+
+    assert r.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_purge_subject_cache(app_bgm_cache):
+    with (
+        patch(
+            "app.api.bgm_cache.bgm_metadata_cache.purge_subject", return_value=3
+        ) as purge_persisted,
+        patch(
+            "app.api.bgm_cache.bangumi_api_pool.purge_subject", return_value=2
+        ) as purge_memory,
+        patch(
+            "app.api.bgm_cache.bgm_sequel_graph.delete_subject", return_value=1
+        ) as purge_graph,
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.delete("/api/bgm/cache/subjects/12345")
+
+    assert r.status_code == 200
+    assert r.json()["data"] == {
+        "subject_id": 12345,
+        "persisted_removed": 3,
+        "memory_removed": 2,
+        "graph_removed": 1,
+    }
+    purge_persisted.assert_called_once_with("12345")
+    purge_memory.assert_called_once_with(12345)
+    purge_graph.assert_called_once_with(12345)
+
+
+@pytest.mark.asyncio
+async def test_clear_metadata_cache(app_bgm_cache):
+    with patch("app.api.bgm_cache.bgm_metadata_cache.clear", return_value=7):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.delete("/api/bgm/cache/metadata")
+
+    assert r.status_code == 200
+    assert r.json()["data"] == {"persisted_removed": 7}
+
+
+@pytest.mark.asyncio
+async def test_clear_collection_ledger_for_account(app_bgm_cache):
+    with patch(
+        "app.api.bgm_cache.bgm_collection_ledger.clear", return_value=12
+    ) as clear:
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.delete("/api/bgm/cache/ledger", params={"account": "alice"})
+
+    assert r.status_code == 200
+    assert r.json()["data"] == {"subjects_removed": 12}
+    clear.assert_called_once_with("alice")
+
+
+@pytest.mark.asyncio
+async def test_list_and_purge_unmatched_titles(app_bgm_cache):
+    entries = [
+        {"cache_key": "k", "title": "不存在的番", "detail": "Bangumi 搜索无结果"}
+    ]
+    with (
+        patch(
+            "app.api.bgm_cache.bgm_unmatched_cache.list_entries", return_value=entries
+        ),
+        patch("app.api.bgm_cache.bgm_unmatched_cache.delete", return_value=1) as delete,
+        patch("app.api.bgm_cache.bgm_unmatched_cache.clear", return_value=4) as clear,
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            listed = await ac.get("/api/bgm/cache/unmatched")
+            one = await ac.delete("/api/bgm/cache/unmatched", params={"cache_key": "k"})
+            everything = await ac.delete("/api/bgm/cache/unmatched")
+
+    assert listed.json()["data"] == {"entries": entries}
+    assert one.json()["data"] == {"removed": 1}
+    assert everything.json()["data"] == {"removed": 4}
+    delete.assert_called_once_with("k")
+    clear.assert_called_once_with()
+
+
+def _learned_entry(**kwargs):
+    entry = {
+        "cache_key": "k",
+        "title": "葬送的芙莉莲",
+        "season": 1,
+        "subject_id": "400602",
+        "season_matched": True,
+        "method": "search",
+    }
+    entry.update(kwargs)
+    return entry
+
+
+@pytest.mark.asyncio
+async def test_list_update_and_purge_learned_mappings(app_bgm_cache):
+    entries = [_learned_entry()]
+    updated = _learned_entry(subject_id="400603", method="manual")
+    with (
+        patch(
+            "app.api.bgm_cache.bgm_learned_mappings.list_entries", return_value=entries
+        ),
+        patch(
+            "app.api.bgm_cache.bgm_learned_mappings.update",
+            side_effect=[updated, None],
+        ) as update,
+        patch(
+            "app.api.bgm_cache.bgm_learned_mappings.delete", return_value=1
+        ) as delete,
+        patch("app.api.bgm_cache.bgm_learned_mappings.clear", return_value=3) as clear,
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            listed = await ac.get("/api/bgm/cache/learned")
+            body = {"cache_key": "k", "subject_id": " 400603 "}
+            edited = await ac.put("/api/bgm/cache/learned", json=body)
+            missing = await ac.put("/api/bgm/cache/learned", json=body)
+            invalid = await ac.put(
+                "/api/bgm/cache/learned", json={"cache_key": "k", "subject_id": "x"}
+            )
+            one = await ac.delete("/api/bgm/cache/learned", params={"cache_key": "k"})
+            everything = await ac.delete("/api/bgm/cache/learned")
+
+    assert listed.json()["data"] == {"entries": entries}
+    assert edited.json()["data"] == {"entry": updated}
+    assert (missing.status_code, invalid.status_code) == (404, 400)
+    assert update.call_count == 2
+    update.assert_called_with("k", "400603", False)
+    assert one.json()["data"] == {"removed": 1}
+    assert everything.json()["data"] == {"removed": 3}
+    delete.assert_called_once_with("k")
+    clear.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_promote_learned_mapping(app_bgm_cache):
+    with (
+        patch(
+            "app.api.bgm_cache.bgm_learned_mappings.get",
+            return_value=_learned_entry(),
+        ),
+        patch(
+            "app.api.bgm_cache.bgm_learned_mappings.delete", return_value=1
+        ) as delete,
+        patch(
+            "app.api.bgm_cache.mapping_service.get_all_mappings",
+            return_value={"其他": "1"},
+        ),
+        patch(
+            "app.api.bgm_cache.mapping_service.update_mappings", return_value=True
+        ) as update_mappings,
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.post("/api/bgm/cache/learned/promote", json={"cache_key": "k"})
+
+    assert r.status_code == 200
+    assert r.json()["data"] == {"title": "葬送的芙莉莲", "subject_id": "400602"}
+    update_mappings.assert_called_once_with({"其他": "1", "葬送的芙莉莲": "400602"})
+    delete.assert_called_once_with("k")
+
+
+@pytest.mark.asyncio
+async def test_promote_season_entry_needs_first_season_id(app_bgm_cache):
+    entry = _learned_entry(season=2, subject_id="500602")
+    with (
+        patch("app.api.bgm_cache.bgm_learned_mappings.get", side_effect=[entry, entry]),
+        patch("app.api.bgm_cache.bgm_learned_mappings.delete", return_value=1),
+        patch("app.api.bgm_cache.mapping_service.get_all_mappings", return_value={}),
+        patch(
+            "app.api.bgm_cache.mapping_service.update_mappings", return_value=True
+        ) as update_mappings,
+    ):
+        transport = ASGITransport(app=app_bgm_cache)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            rejected = await ac.post(
+                "/api/bgm/cache/learned/promote", json={"cache_key": "k"}
+            )
+            promoted = await ac.post(
+                "/api/bgm/cache/learned/promote",
+                json={"cache_key": "k", "subject_id": "400602"},
+            )
+
+    assert rejected.status_code == 400
+    assert promoted.json()["data"]["subject_id"] == "400602"
+    update_mappings.assert_called_once_with({"葬送的芙莉莲": "400602"})
@@ -41,7 +41,10 @@ def mock_sync_service():
             "status": "success",
             "message": "同步成功",
         }
-        mock_service.sync_custom_item.return_value = mock_result
+        mock_service.sync_custom_item_native = AsyncMock(return_value=mock_result)
+        mock_service.sync_plex_item = AsyncMock(return_value=mock_result)
+        mock_service.sync_emby_item = AsyncMock(return_value=mock_result)
+        mock_service.sync_jellyfin_item = AsyncMock(return_value=mock_result)
 
         mock_service.get_sync_task_status.return_value = {
             "task_id": "test_task_123",
@@ -593,7 +596,7 @@ async def test_emby_webhook_fallback_failure():
         mock_svc.sync_emby_item_async = AsyncMock(
             side_effect=RuntimeError("async fail")
         )
-        mock_svc.sync_emby_item.side_effect = RuntimeError("sync fail")
+        mock_svc.sync_emby_item = AsyncMock(side_effect=RuntimeError("sync fail"))
 
         async with AsyncClient(
             transport=ASGITransport(app=app), base_url="http://test"
@@ -721,7 +724,7 @@ async def test_jellyfin_webhook_fallback_failure():
         mock_svc.sync_jellyfin_item_async = AsyncMock(
             side_effect=RuntimeError("async fail")
         )
-        mock_svc.sync_jellyfin_item.side_effect = RuntimeError("sync fail")
+        mock_svc.sync_jellyfin_item = AsyncMock(side_effect=RuntimeError("sync fail"))
 
         async with AsyncClient(
             transport=ASGITransport(app=app), base_url="http://test"
@@ -771,7 +774,7 @@ async def test_custom_sync_ignored_status(app_with_auth, mock_sync_service):
     mock_result = MagicMock()
     mock_result.status = "ignored"
     mock_result.dict.return_value = {"status": "ignored", "message": "已忽略"}
-    mock_sync_service.sync_custom_item.return_value = mock_result
+    mock_sync_service.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
     async with AsyncClient(
         transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -796,7 +799,7 @@ async def test_custom_sync_error_status(app_with_auth, mock_sync_service):
     mock_result = MagicMock()
     mock_result.status = "error"
     mock_result.dict.return_value = {"status": "error", "message": "失败"}
-    mock_sync_service.sync_custom_item.return_value = mock_result
+    mock_sync_service.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
     async with AsyncClient(
         transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -868,7 +871,7 @@ async def test_retry_sync_record_success(
     mock_result = MagicMock()
     mock_result.status = "success"
     mock_result.dict.return_value = {"status": "success"}
-    mock_sync_service.sync_custom_item.return_value = mock_result
+    mock_sync_service.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
     async with AsyncClient(
         transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -897,7 +900,7 @@ async def test_retry_sync_record_ignored(
     mock_result.status = "ignored"
     mock_result.message = "已看过"
     mock_result.dict.return_value = {"status": "ignored", "message": "已看过"}
-    mock_sync_service.sync_custom_item.return_value = mock_result
+    mock_sync_service.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
     async with AsyncClient(
         transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -940,7 +943,7 @@ async def test_retry_sync_record_invalid_media_type(
     mock_result = MagicMock()
     mock_result.status = "success"
     mock_result.dict.return_value = {"status": "success"}
-    mock_sync_service.sync_custom_item.return_value = mock_result
+    mock_sync_service.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
     async with AsyncClient(
         transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -972,7 +975,7 @@ async def test_test_sync_invalid_media_type(app_with_auth, mock_database_manager
         mock_result = MagicMock()
         mock_result.status = "success"
         mock_result.dict.return_value = {"status": "success", "message": "ok"}
-        mock_svc.sync_custom_item.return_value = mock_result
+        mock_svc.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
         async with AsyncClient(
             transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -982,7 +985,7 @@ async def test_test_sync_invalid_media_type(app_with_auth, mock_database_manager
                 json={"title": "Test", "media_type": "invalid"},
             )
         assert response.status_code == 200
-        item = mock_svc.sync_custom_item.call_args[0][0]
+        item = mock_svc.sync_custom_item_native.call_args[0][0]
         assert item.media_type == "episode"
 
 
@@ -1015,7 +1018,7 @@ async def test_test_sync_movie_payload(app_with_auth, mock_database_manager):
             "message": "已标记为看过",
             "data": {"subject_id": "1", "episode_id": "2"},
         }
-        mock_svc.sync_custom_item.return_value = mock_result
+        mock_svc.sync_custom_item_native = AsyncMock(return_value=mock_result)
 
         async with AsyncClient(
             transport=ASGITransport(app=app_with_auth), base_url="http://test"
@@ -1034,6 +1037,6 @@ async def test_test_sync_movie_payload(app_with_auth, mock_database_manager):
         assert response.status_code == 200
         body = response.json()
         assert body["test_info"]["media_type"] == "movie"
-        item = mock_svc.sync_custom_item.call_args[0][0]
+        item = mock_svc.sync_custom_item_native.call_args[0][0]
         assert item.media_type == "movie"
         assert item.release_date == ""
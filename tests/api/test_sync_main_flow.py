@@ -59,7 +59,9 @@ async def test_custom_sync_sync_mode_returns_result(app_root_and_api, verify_ok)
         user_name="u",
     )
     result = SyncResponse(status="success", message="ok", data={})
-    with patch("app.api.sync.sync_service.sync_custom_item", return_value=result) as sc:
+    with patch(
+        "app.api.sync.sync_service.sync_custom_item_native", return_value=result
+    ) as sc:
         transport = ASGITransport(app=app_root_and_api)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             r = await ac.post(
@@ -85,7 +87,7 @@ async def test_custom_sync_sync_mode_error_sets_500(app_root_and_api, verify_ok)
         user_name="u",
     )
     err = SyncResponse(status="error", message="bad", data=None)
-    with patch("app.api.sync.sync_service.sync_custom_item", return_value=err):
+    with patch("app.api.sync.sync_service.sync_custom_item_native", return_value=err):
         transport = ASGITransport(app=app_root_and_api)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             r = await ac.post(
@@ -238,9 +240,9 @@ async def test_test_sync_empty_title_400(app_root_and_api):
 
 @pytest.mark.asyncio
 async def test_test_sync_browser_uses_sync_mode(app_root_and_api):
-    """浏览器 UA 时 async_mode 默认为同步，直接调 sync_custom_item。"""
+    """浏览器 UA 时 async_mode 默认为同步，直接调 sync_custom_item_native。"""
     with patch(
-        "app.api.sync.sync_service.sync_custom_item",
+        "app.api.sync.sync_service.sync_custom_item_native",
         return_value=SyncResponse(status="success", message="done"),
     ) as sc:
         transport = ASGITransport(app=app_root_and_api)
@@ -286,7 +288,9 @@ async def test_retry_sync_record_success_updates_db(app_root_and_api):
             "source": "plex",
         }
         ok = SyncResponse(status="success", message="marked", data={})
-        with patch("app.api.sync.sync_service.sync_custom_item", return_value=ok):
+        with patch(
+            "app.api.sync.sync_service.sync_custom_item_native", return_value=ok
+        ):
             transport = ASGITransport(app=app_root_and_api)
             async with AsyncClient(transport=transport, base_url="http://test") as ac:
                 r = await ac.post("/api/records/7/retry")
@@ -298,7 +302,7 @@ async def test_retry_sync_record_success_updates_db(app_root_and_api):
 
 @pytest.mark.asyncio
 async def test_retry_sync_record_movie_media_type_on_custom_item(app_root_and_api):
-    """重试失败记录时 DB 的 media_type=movie 应传入 sync_custom_item"""
+    """重试失败记录时 DB 的 media_type=movie 应传入 sync_custom_item_native"""
     with patch("app.api.sync.database_manager") as dbm:
         dbm.get_sync_record_by_id.return_value = {
             "id": 8,
@@ -312,7 +316,9 @@ async def test_retry_sync_record_movie_media_type_on_custom_item(app_root_and_ap
             "media_type": "movie",
         }
         ok = SyncResponse(status="success", message="ok", data={})
-        with patch("app.api.sync.sync_service.sync_custom_item", return_value=ok) as sc:
+        with patch(
+            "app.api.sync.sync_service.sync_custom_item_native", return_value=ok
+        ) as sc:
             transport = ASGITransport(app=app_root_and_api)
             async with AsyncClient(transport=transport, base_url="http://test") as ac:
                 r = await ac.post("/api/records/8/retry")
@@ -7,7 +7,7 @@ import os
 import sqlite3
 import tempfile
 import time
-from unittest.mock import AsyncMock, Mock, patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
@@ -335,7 +335,6 @@ def mock_sync_service():
     """模拟同步服务"""
     mock_service = AsyncMock()
     mock_service.sync_custom_item_async = AsyncMock(return_value="test_task_id")
-    mock_service.sync_custom_item = Mock()
 
     with patch("app.services.trakt.sync_service.sync_service", mock_service):
         yield mock_service
@@ -367,6 +366,73 @@ def reset_singletons():
     security_manager._instance = None
 
 
+@pytest.fixture(autouse=True)
+def reset_bangumi_api_pool():
+    """每个用例前后清空进程级 BangumiApi 客户端池，避免 mock 实例跨用例复用"""
+    from app.utils.bangumi_api_pool import bangumi_api_pool
+
+    bangumi_api_pool.clear()
+    yield
+    bangumi_api_pool.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_dns_cache():
+    """共享连接的 DNS 缓存不跨用例保留解析结果"""
+    from app.utils.http_transport import dns_cache
+
+    yield
+    dns_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolate_bgm_client_stores(tmp_path):
+    """池内客户端的续集关系图、收藏账本、延迟重试队列、未匹配缓存与学习映射使用临时库，避免用例间互相影响"""
+    from app.core.database import DatabaseManager
+    from app.utils.bgm_collection_ledger import (
+        BangumiCollectionLedger,
+        bgm_collection_ledger,
+    )
+    from app.utils.bgm_learned_mappings import bgm_learned_mappings
+    from app.utils.bgm_retry_queue import bgm_retry_queue
+    from app.utils.bgm_sequel_graph import BangumiSequelGraph
+    from app.utils.bgm_unmatched_cache import bgm_unmatched_cache
+
+    db = DatabaseManager(str(tmp_path / "bgm_client_stores.db"))
+    with (
+        patch("app.utils.bangumi_api_pool.bgm_sequel_graph", BangumiSequelGraph(db)),
+        patch(
+            "app.utils.bangumi_api_pool.bgm_collection_ledger",
+            BangumiCollectionLedger(db),
+        ),
+        patch.object(bgm_collection_ledger, "_db", db),
+        patch.object(bgm_collection_ledger, "_retry_after", {}),
+        patch.object(bgm_collection_ledger, "_reconciling", set()),
+        patch.object(bgm_retry_queue, "_db", db),
+        patch.object(bgm_unmatched_cache, "_db", db),
+        patch.object(bgm_unmatched_cache, "_entries", None),
+        patch.object(bgm_unmatched_cache, "_version", None),
+        patch.object(bgm_learned_mappings, "_db", db),
+        patch.object(bgm_learned_mappings, "_entries", None),
+    ):
+        yield
+    db.close()
+
+
+@pytest.fixture(autouse=True)
+def disable_bgm_rate_limiter():
+    """关闭全局 Bangumi 限速，避免 mock 请求在用例之间互相排队"""
+    from app.utils.bgm_rate_limiter import bgm_rate_limiter
+
+    with (
+        patch.object(bgm_rate_limiter, "_fixed", True),
+        patch.object(bgm_rate_limiter, "_rate", 0.0),
+    ):
+        bgm_rate_limiter.reset()
+        yield
+    bgm_rate_limiter.reset()
+
+
 # 只有在没有安装 pytest-playwright 时才定义 event_loop
 # pytest-playwright 会自动提供 event_loop fixture
 try:
@@ -506,3 +572,45 @@ if HAS_PYTEST_PLAYWRIGHT:
             process.wait(timeout=5)
         except subprocess.TimeoutExpired:
             process.kill()
+
+
+@pytest.fixture(autouse=True)
+def disable_bgm_circuit_breaker():
+    """关闭全局 Bangumi 熔断，避免模拟的失败请求让后续用例被熔断拒绝"""
+    from app.utils.bgm_circuit_breaker import bgm_circuit_breaker
+
+    with (
+        patch.object(bgm_circuit_breaker, "_fixed", True),
+        patch.object(bgm_circuit_breaker, "_threshold", 0),
+        patch.object(bgm_circuit_breaker, "_drain_interval", 0.0),
+    ):
+        bgm_circuit_breaker.reset()
+        yield
+    bgm_circuit_breaker.reset()
+
+
+@pytest.fixture(autouse=True)
+def disable_bgm_route_probes():
+    """关闭全局 Bangumi 线路的后台探测与对冲，避免测试中发出真实探测请求"""
+    from app.utils.bgm_route_manager import bgm_route_manager
+
+    with (
+        patch.object(bgm_route_manager, "_fixed", True),
+        patch.object(bgm_route_manager, "_probe_interval", 0.0),
+        patch.object(bgm_route_manager, "_hedge", False),
+    ):
+        bgm_route_manager.reset()
+        yield
+    bgm_route_manager.reset()
+
+
+@pytest.fixture(autouse=True)
+def disable_bangumi_data_loader():
+    """不在后台下载 / 加载全局 bangumi-data，未载入时查询直接返回"""
+    from app.utils.bangumi_data import bangumi_data
+
+    with (
+        patch.object(bangumi_data, "start", return_value=False),
+        patch.object(bangumi_data, "ready_timeout", 0),
+    ):
+        yield
@@ -257,6 +257,44 @@ class TestDatabaseManager:
             success = db.update_sync_record_status(999, "success")
             assert success is False
 
+    def test_update_sync_record_status_fills_subject(self, temp_dir, reset_singletons):
+        """Test updating a queued record with the subject found on retry"""
+        db_path = temp_dir / "test.db"
+
+        with patch("app.core.database.logger"):
+            from app.core.database import DatabaseManager
+
+            db = DatabaseManager(str(db_path))
+
+            record_id = db.log_sync_record(
+                user_name="test_user",
+                title="测试动画",
+                ori_title=None,
+                season=1,
+                episode=1,
+                status="queued",
+            )
+
+            success = db.update_sync_record_status(
+                record_id,
+                "retried",
+                "Retried",
+                subject_id="100",
+                episode_id="1001",
+                bgm_title="测试",
+            )
+            assert success is True
+
+            result = db.get_sync_record_by_id(record_id)
+            assert result["status"] == "retried"
+            assert result["subject_id"] == "100"
+            assert result["episode_id"] == "1001"
+            assert result["bgm_title"] == "测试"
+
+            # Columns not given keep their values
+            db.update_sync_record_status(record_id, "error", "Failed")
+            assert db.get_sync_record_by_id(record_id)["subject_id"] == "100"
+
     def test_get_sync_stats(self, temp_dir, reset_singletons):
         """Test getting sync statistics"""
         db_path = temp_dir / "test.db"
@@ -179,7 +179,7 @@ async def test_run_sync_success_saves_history(tmp_path):
     dbf.write_bytes(b"")
     rec = _sample_record()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="success", message="已标记为看过")
 
     with patch("app.services.feiniu.sync_service.config_manager") as cm:
@@ -192,11 +192,11 @@ async def test_run_sync_success_saves_history(tmp_path):
                 dbm.get_or_create_feiniu_min_update_watermark_ms.return_value = 0
                 dbm.get_feiniu_synced_set.return_value = set()
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         r = await feiniu_sync_service.run_sync()
@@ -210,7 +210,7 @@ async def test_run_sync_success_saves_history(tmp_path):
 
 
 @pytest.mark.asyncio
-async def test_run_sync_to_thread_exception_counts_error(tmp_path):
+async def test_run_sync_exception_counts_error(tmp_path):
     dbf = tmp_path / "trim_exc.db"
     dbf.write_bytes(b"")
     rec = _sample_record()
@@ -228,11 +228,11 @@ async def test_run_sync_to_thread_exception_counts_error(tmp_path):
                 dbm.get_or_create_feiniu_min_update_watermark_ms.return_value = 0
                 dbm.get_feiniu_synced_set.return_value = set()
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
                     side_effect=boom,
                 ):
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         with patch("app.services.feiniu.sync_service.logger") as log:
@@ -249,7 +249,7 @@ async def test_run_sync_error_does_not_save_history(tmp_path):
     dbf.write_bytes(b"")
     rec = _sample_record()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="error", message="未找到匹配的番剧")
 
     with patch("app.services.feiniu.sync_service.config_manager") as cm:
@@ -262,11 +262,11 @@ async def test_run_sync_error_does_not_save_history(tmp_path):
                 dbm.get_or_create_feiniu_min_update_watermark_ms.return_value = 0
                 dbm.get_feiniu_synced_set.return_value = set()
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         r = await feiniu_sync_service.run_sync()
@@ -281,7 +281,7 @@ async def test_run_sync_ignored_counts_skipped(tmp_path):
     dbf.write_bytes(b"")
     rec = _sample_record()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="ignored", message="屏蔽关键词")
 
     with patch("app.services.feiniu.sync_service.config_manager") as cm:
@@ -294,11 +294,11 @@ async def test_run_sync_ignored_counts_skipped(tmp_path):
                 dbm.get_or_create_feiniu_min_update_watermark_ms.return_value = 0
                 dbm.get_feiniu_synced_set.return_value = set()
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         r = await feiniu_sync_service.run_sync()
@@ -314,7 +314,7 @@ async def test_run_sync_skips_video_placeholder_title(tmp_path):
     dbf.write_bytes(b"")
     rec = _sample_record(display_title="视频-deadbeef", item_guid="vid1")
 
-    async def fail_to_thread(*_a, **_kw):
+    async def fail_sync(*_a, **_kw):
         raise AssertionError("不应调用 Bangumi 同步")
 
     with patch("app.services.feiniu.sync_service.config_manager") as cm:
@@ -327,11 +327,11 @@ async def test_run_sync_skips_video_placeholder_title(tmp_path):
                 dbm.get_or_create_feiniu_min_update_watermark_ms.return_value = 0
                 dbm.get_feiniu_synced_set.return_value = set()
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
-                    side_effect=fail_to_thread,
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fail_sync,
                 ):
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         r = await feiniu_sync_service.run_sync()
@@ -357,10 +357,10 @@ async def test_run_sync_skip_already_in_history(tmp_path):
                     (rec.user_guid, rec.item_guid)
                 }
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
                 ) as tt:
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         r = await feiniu_sync_service.run_sync()
@@ -377,7 +377,7 @@ async def test_run_sync_ignore_enabled_when_switch_off(tmp_path):
     dbf.write_bytes(b"")
     rec = _sample_record()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="success", message="ok")
 
     with patch("app.services.feiniu.sync_service.config_manager") as cm:
@@ -397,11 +397,11 @@ async def test_run_sync_ignore_enabled_when_switch_off(tmp_path):
                 dbm.get_or_create_feiniu_min_update_watermark_ms.return_value = 0
                 dbm.get_feiniu_synced_set.return_value = set()
                 with patch(
-                    "app.services.feiniu.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.feiniu.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
-                        "app.services.feiniu.sync_service.asyncio.sleep",
+                        "app.services.sync_service.asyncio.sleep",
                         new_callable=AsyncMock,
                     ):
                         r = await feiniu_sync_service.run_sync(ignore_enabled=True)
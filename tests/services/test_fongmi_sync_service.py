@@ -80,7 +80,7 @@ async def test_run_sync_success(tmp_path):
     rec = _sample_record()
     fongmi_sync_service._synced_keys.clear()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="success", message="已标记为看过")
 
     with patch("app.services.fongmi.sync_service.config_manager") as cm:
@@ -93,8 +93,8 @@ async def test_run_sync_success(tmp_path):
                 return_value=[rec],
             ):
                 with patch(
-                    "app.services.fongmi.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.fongmi.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
                         "app.services.fongmi.sync_service.asyncio.sleep",
@@ -115,7 +115,7 @@ async def test_run_sync_skip_already_synced():
     fongmi_sync_service._synced_keys.clear()
     fongmi_sync_service._synced_keys.add(("192.168.1.100", "http://x/S01E001.mp4"))
 
-    async def fail_to_thread(*_a, **_kw):
+    async def fail_sync(*_a, **_kw):
         raise AssertionError("不应调用 Bangumi 同步")
 
     with patch("app.services.fongmi.sync_service.config_manager") as cm:
@@ -128,8 +128,8 @@ async def test_run_sync_skip_already_synced():
                 return_value=[rec],
             ):
                 with patch(
-                    "app.services.fongmi.sync_service.asyncio.to_thread",
-                    side_effect=fail_to_thread,
+                    "app.services.fongmi.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fail_sync,
                 ):
                     with patch(
                         "app.services.fongmi.sync_service.asyncio.sleep",
@@ -159,7 +159,7 @@ async def test_run_sync_error_counts():
                 return_value=[rec],
             ):
                 with patch(
-                    "app.services.fongmi.sync_service.asyncio.to_thread",
+                    "app.services.fongmi.sync_service.sync_service.sync_custom_item_native",
                     side_effect=boom,
                 ):
                     with patch(
@@ -178,7 +178,7 @@ async def test_run_sync_ignored_counts_skipped():
     rec = _sample_record()
     fongmi_sync_service._synced_keys.clear()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="ignored", message="屏蔽关键词")
 
     with patch("app.services.fongmi.sync_service.config_manager") as cm:
@@ -191,8 +191,8 @@ async def test_run_sync_ignored_counts_skipped():
                 return_value=[rec],
             ):
                 with patch(
-                    "app.services.fongmi.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.fongmi.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
                         "app.services.fongmi.sync_service.asyncio.sleep",
@@ -210,7 +210,7 @@ async def test_run_sync_ignore_enabled_when_switch_off():
     rec = _sample_record()
     fongmi_sync_service._synced_keys.clear()
 
-    async def fake_to_thread(*_a, **_kw):
+    async def fake_sync(*_a, **_kw):
         return SyncResponse(status="success", message="ok")
 
     with patch("app.services.fongmi.sync_service.config_manager") as cm:
@@ -223,8 +223,8 @@ async def test_run_sync_ignore_enabled_when_switch_off():
                 return_value=[rec],
             ):
                 with patch(
-                    "app.services.fongmi.sync_service.asyncio.to_thread",
-                    side_effect=fake_to_thread,
+                    "app.services.fongmi.sync_service.sync_service.sync_custom_item_native",
+                    side_effect=fake_sync,
                 ):
                     with patch(
                         "app.services.fongmi.sync_service.asyncio.sleep",
@@ -2,7 +2,9 @@
 更多 sync_service 测试
 """
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
+
+import pytest
 
 from app.models.sync import CustomItem
 
@@ -10,17 +12,18 @@ from app.models.sync import CustomItem
 class TestSyncServiceFind:
     """sync_service 查找方法测试"""
 
-    def test_find_subject_id(self):
+    @pytest.mark.asyncio
+    async def test_find_subject_id(self):
         """测试查找 subject ID"""
         with (
             patch("app.services.sync_service.config_manager") as mock_cm,
             patch("app.services.sync_service.database_manager"),
             patch("app.services.sync_service.send_notify"),
             patch("app.services.sync_service.mapping_service"),
-            patch("app.services.sync_service.BangumiApi") as mock_bgm,
+            patch("app.services.sync_service.AsyncBangumiApi") as mock_bgm,
             patch("app.services.sync_service.BangumiData"),
         ):
-            mock_bgm_instance = MagicMock()
+            mock_bgm_instance = AsyncMock()
             mock_bgm_instance.search_subject.return_value = {
                 "id": 12345,
                 "name": "Test Show",
@@ -47,7 +50,7 @@ class TestSyncServiceFind:
                 user_name="admin",
             )
 
-            sid, _flag, fail = service._find_subject_id(item)
+            sid, _flag, fail = await service._find_subject_id_async(item)
             assert sid is not None
             assert fail == ""
 
@@ -4,7 +4,7 @@ SyncService 单元测试
 
 import os
 import sys
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
@@ -30,7 +30,7 @@ class TestSyncServiceInit:
             service = SyncService()
 
             # 验证初始化属性
-            assert hasattr(service, "_executor")
+            assert hasattr(service, "_background_tasks")
             assert hasattr(service, "_sync_tasks")
             assert hasattr(service, "_task_counter")
             assert service._task_counter == 0
@@ -49,12 +49,11 @@ class TestSyncServiceInit:
             service = SyncService()
 
             # 验证关键方法存在
-            assert hasattr(service, "sync_custom_item")
+            assert hasattr(service, "sync_custom_item_native")
             assert hasattr(service, "sync_custom_item_async")
             assert hasattr(service, "sync_plex_item")
             assert hasattr(service, "sync_emby_item")
             assert hasattr(service, "sync_jellyfin_item")
-            assert hasattr(service, "sync_movie_watching")
             assert hasattr(service, "get_sync_task_status")
             assert hasattr(service, "cleanup_old_tasks")
 
@@ -70,7 +69,7 @@ class TestSyncCustomItem:
             patch("app.services.sync_service.database_manager") as mock_db,
             patch("app.services.sync_service.send_notify") as mock_notify,
             patch("app.services.sync_service.mapping_service") as mock_mapping,
-            patch("app.services.sync_service.BangumiApi") as MockBgmApi,
+            patch("app.services.sync_service.AsyncBangumiApi") as MockBgmApi,
         ):
             # Mock config
             mock_config.get.side_effect = lambda section, key, fallback=None: {
@@ -85,8 +84,8 @@ class TestSyncCustomItem:
             mock_config.get_user_mappings.return_value = {}
             mock_config.get_bangumi_configs.return_value = {}
 
-            # Mock BangumiApi
-            mock_api = MagicMock()
+            # Mock AsyncBangumiApi
+            mock_api = AsyncMock()
             MockBgmApi.return_value = mock_api
 
             # Mock get_target_season_episode_id - returns (subject_id, episode_id)
@@ -107,7 +106,8 @@ class TestSyncCustomItem:
 
             yield service, mock_config, mock_db, mock_notify
 
-    def test_sync_custom_item_invalid_media_type(self):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_invalid_media_type(self):
         """测试不支持的媒体类型"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -130,12 +130,13 @@ class TestSyncCustomItem:
                 user_name="test_user",
             )
 
-            result = service.sync_custom_item(item, source="custom")
+            result = await service.sync_custom_item_native(item, source="custom")
 
             assert result.status == "error"
             assert "不支持" in result.message
 
-    def test_sync_custom_item_blocked(self):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_blocked(self):
         """测试屏蔽词跳过场景"""
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
@@ -167,18 +168,21 @@ class TestSyncCustomItem:
                 user_name="test_user",
             )
 
-            result = service.sync_custom_item(item, source="custom")
+            result = await service.sync_custom_item_native(item, source="custom")
 
             assert result.status == "ignored"
             assert "屏蔽关键词" in result.message
 
-    def test_sync_custom_item_movie_success_with_fixture(self, mock_sync_service):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_movie_success_with_fixture(self, mock_sync_service):
         """电影同步成功（短路径 + 条目标看过）"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
 
         from app.models.sync import CustomItem
 
-        with patch.object(service, "_find_subject_id", return_value=("999", False, "")):
+        with patch.object(
+            service, "_find_subject_id_async", return_value=("999", False, "")
+        ):
             with patch.object(
                 service,
                 "_get_bangumi_config_for_user",
@@ -197,25 +201,28 @@ class TestSyncCustomItem:
                     release_date="",
                     user_name="test_user",
                 )
-                result = service.sync_custom_item(item, source="custom")
+                result = await service.sync_custom_item_native(item, source="custom")
 
         assert result.status == "success"
         mock_db.log_sync_record.assert_called()
         _args, call_kw = mock_db.log_sync_record.call_args
         assert call_kw.get("media_type") == "movie"
 
-    def test_sync_custom_item_mark_watching_skips_episode_resolution(
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_mark_watching_skips_episode_resolution(
         self, mock_sync_service
     ):
         """mark_watching + 电影只调 ensure_subject_watching，不解析章节、不点已看"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
         from app.models.sync import CustomItem
 
-        local_bgm = MagicMock()
+        local_bgm = AsyncMock()
         local_bgm.ensure_subject_watching.return_value = 1
-        with patch.object(service, "_find_subject_id", return_value=("777", False, "")):
+        with patch.object(
+            service, "_find_subject_id_async", return_value=("777", False, "")
+        ):
             with patch.object(
-                service, "_get_bangumi_api_for_user", return_value=local_bgm
+                service, "_get_async_bangumi_api_for_user", return_value=local_bgm
             ):
                 item = CustomItem(
                     media_type="movie",
@@ -227,15 +234,18 @@ class TestSyncCustomItem:
                     user_name="test_user",
                     sync_action="mark_watching",
                 )
-                result = service.sync_custom_item(item, source="custom")
+                result = await service.sync_custom_item_native(item, source="custom")
 
         assert result.status == "success"
         local_bgm.ensure_subject_watching.assert_called_once_with("777")
         local_bgm.get_movie_main_episode_id.assert_not_called()
         local_bgm.mark_episode_watched.assert_not_called()
 
-    def test_sync_custom_item_mark_watching_episode_ignored(self, mock_sync_service):
-        """mark_watching + 剧集不走 sync_movie_watching"""
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_mark_watching_episode_ignored(
+        self, mock_sync_service
+    ):
+        """mark_watching + 剧集不走剧场版标记在看"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
         from app.models.sync import CustomItem
 
@@ -249,13 +259,14 @@ class TestSyncCustomItem:
             user_name="test_user",
             sync_action="mark_watching",
         )
-        with patch.object(service, "sync_movie_watching") as mock_watch:
-            r = service.sync_custom_item(item, source="custom")
+        with patch.object(service, "_sync_movie_watching_native") as mock_watch:
+            r = await service.sync_custom_item_native(item, source="custom")
         assert r.status == "ignored"
         assert "剧场版" in r.message
         mock_watch.assert_not_called()
 
-    def test_sync_custom_item_empty_title(self, mock_sync_service):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_empty_title(self, mock_sync_service):
         """测试空标题"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
 
@@ -271,12 +282,13 @@ class TestSyncCustomItem:
             user_name="test_user",
         )
 
-        result = service.sync_custom_item(item, source="custom")
+        result = await service.sync_custom_item_native(item, source="custom")
 
         assert result.status == "error"
         assert "为空" in result.message
 
-    def test_sync_custom_item_sp_not_supported(self, mock_sync_service):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_sp_not_supported(self, mock_sync_service):
         """测试 SP 标记不支持"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
 
@@ -292,12 +304,13 @@ class TestSyncCustomItem:
             user_name="test_user",
         )
 
-        result = service.sync_custom_item(item, source="custom")
+        result = await service.sync_custom_item_native(item, source="custom")
 
         assert result.status == "error"
         assert "SP" in result.message or "不支持" in result.message
 
-    def test_sync_custom_item_zero_episode(self, mock_sync_service):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_zero_episode(self, mock_sync_service):
         """测试集数为0"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
 
@@ -313,12 +326,13 @@ class TestSyncCustomItem:
             user_name="test_user",
         )
 
-        result = service.sync_custom_item(item, source="custom")
+        result = await service.sync_custom_item_native(item, source="custom")
 
         assert result.status == "error"
         assert "0" in result.message
 
-    def test_sync_custom_item_no_permission(self, mock_sync_service):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_no_permission(self, mock_sync_service):
         """测试用户无权限"""
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
@@ -350,12 +364,15 @@ class TestSyncCustomItem:
 
             service = SyncService()
 
-            result = service.sync_custom_item(item, source="custom")
+            result = await service.sync_custom_item_native(item, source="custom")
 
             assert result.status == "error"
             assert "无权限" in result.message
 
-    def test_sync_custom_item_subject_not_found_logs_record(self, mock_sync_service):
+    @pytest.mark.asyncio
+    async def test_sync_custom_item_subject_not_found_logs_record(
+        self, mock_sync_service
+    ):
         """未找到番剧时写入同步记录"""
         service, mock_config, mock_db, mock_notify = mock_sync_service
         from app.models.sync import CustomItem
@@ -372,10 +389,10 @@ class TestSyncCustomItem:
         )
         with patch.object(
             service,
-            "_find_subject_id",
+            "_find_subject_id_async",
             return_value=(None, False, "Bangumi 搜索无结果"),
         ):
-            r = service.sync_custom_item(item, source="custom")
+            r = await service.sync_custom_item_native(item, source="custom")
         assert r.status == "error"
         assert "未找到" in r.message
         mock_db.log_sync_record.assert_called_once()
@@ -479,7 +496,7 @@ class TestCleanupOldTasks:
 
 
 class TestSyncMovieWatching:
-    """sync_movie_watching 全分支（配置 / 权限 / 匹配 / Bangumi）"""
+    """剧场版标记在看全分支（配置 / 权限 / 匹配 / Bangumi）"""
 
     @staticmethod
     def _cfg_get(*, mark_watching_enabled: bool = True, blocked_keywords: str = ""):
@@ -505,11 +522,13 @@ class TestSyncMovieWatching:
             "episode": 1,
             "release_date": "2024-01-01",
             "user_name": "test_user",
+            "sync_action": "mark_watching",
         }
         base.update(kwargs)
         return CustomItem(**base)
 
-    def test_sync_movie_watching_config_disabled(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_config_disabled(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -520,11 +539,12 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            r = await svc.sync_custom_item_native(self._movie_item(), source="custom")
         assert r.status == "ignored"
         assert "关闭" in r.message
 
-    def test_sync_movie_watching_not_movie(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_not_movie(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -546,11 +566,12 @@ class TestSyncMovieWatching:
                 release_date="2024-01-01",
                 user_name="test_user",
             )
-            r = svc.sync_movie_watching(item, source="custom")
+            r = await svc._sync_movie_watching_native(item, "custom")
         assert r.status == "ignored"
         assert "仅剧场版" in r.message
 
-    def test_sync_movie_watching_empty_title(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_empty_title(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -561,11 +582,14 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            r = svc.sync_movie_watching(self._movie_item(title=""), source="custom")
+            r = await svc.sync_custom_item_native(
+                self._movie_item(title=""), source="custom"
+            )
         assert r.status == "error"
         assert "名称为空" in r.message
 
-    def test_sync_movie_watching_no_permission(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_no_permission(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -577,11 +601,12 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            r = await svc.sync_custom_item_native(self._movie_item(), source="custom")
         assert r.status == "error"
         assert "无权限" in r.message
 
-    def test_sync_movie_watching_blocked(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_blocked(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -593,14 +618,15 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            r = svc.sync_movie_watching(
+            r = await svc.sync_custom_item_native(
                 self._movie_item(title="内含广告词的剧场版"),
                 source="custom",
             )
         assert r.status == "ignored"
         assert "屏蔽" in r.message
 
-    def test_sync_movie_watching_subject_not_found(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_subject_not_found(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager") as mock_db,
@@ -614,10 +640,12 @@ class TestSyncMovieWatching:
             svc = SyncService()
             with patch.object(
                 svc,
-                "_find_subject_id",
+                "_find_subject_id_async",
                 return_value=(None, False, "Bangumi 搜索无结果"),
             ):
-                r = svc.sync_movie_watching(self._movie_item(), source="custom")
+                r = await svc.sync_custom_item_native(
+                    self._movie_item(), source="custom"
+                )
         assert r.status == "error"
         assert "未找到" in r.message
         mock_db.log_sync_record.assert_called_once()
@@ -626,7 +654,8 @@ class TestSyncMovieWatching:
         assert "未查询到番剧信息，跳过" in (_kw.get("message") or "")
         assert "Bangumi 搜索无结果" in (_kw.get("message") or "")
 
-    def test_sync_movie_watching_no_bgm_api(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_no_bgm_api(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -638,13 +667,20 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            with patch.object(svc, "_find_subject_id", return_value=("888", False, "")):
-                with patch.object(svc, "_get_bangumi_api_for_user", return_value=None):
-                    r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            with patch.object(
+                svc, "_find_subject_id_async", return_value=("888", False, "")
+            ):
+                with patch.object(
+                    svc, "_get_async_bangumi_api_for_user", return_value=None
+                ):
+                    r = await svc.sync_custom_item_native(
+                        self._movie_item(), source="custom"
+                    )
         assert r.status == "error"
         assert "bangumi" in r.message.lower()
 
-    def test_sync_movie_watching_ensure_auth_value_error(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_ensure_auth_value_error(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager"),
@@ -656,17 +692,24 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            bgm = MagicMock()
+            bgm = AsyncMock()
             bgm.ensure_subject_watching.side_effect = ValueError(
                 "认证失败: access_token 无效"
             )
-            with patch.object(svc, "_find_subject_id", return_value=("888", False, "")):
-                with patch.object(svc, "_get_bangumi_api_for_user", return_value=bgm):
-                    r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            with patch.object(
+                svc, "_find_subject_id_async", return_value=("888", False, "")
+            ):
+                with patch.object(
+                    svc, "_get_async_bangumi_api_for_user", return_value=bgm
+                ):
+                    r = await svc.sync_custom_item_native(
+                        self._movie_item(), source="custom"
+                    )
         assert r.status == "error"
         assert "认证" in r.message
 
-    def test_sync_movie_watching_ensure_other_value_error_wrapped(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_ensure_other_value_error_wrapped(self):
         """非认证类 ValueError 重新抛出后由外层捕获为处理失败"""
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
@@ -679,16 +722,23 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            bgm = MagicMock()
+            bgm = AsyncMock()
             bgm.ensure_subject_watching.side_effect = ValueError("other reason")
-            with patch.object(svc, "_find_subject_id", return_value=("888", False, "")):
-                with patch.object(svc, "_get_bangumi_api_for_user", return_value=bgm):
-                    r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            with patch.object(
+                svc, "_find_subject_id_async", return_value=("888", False, "")
+            ):
+                with patch.object(
+                    svc, "_get_async_bangumi_api_for_user", return_value=bgm
+                ):
+                    r = await svc.sync_custom_item_native(
+                        self._movie_item(), source="custom"
+                    )
         assert r.status == "error"
         assert "处理失败" in r.message
         assert "other reason" in r.message
 
-    def test_sync_movie_watching_ensure_returns_zero_success(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_ensure_returns_zero_success(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager") as mock_db,
@@ -700,16 +750,23 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            bgm = MagicMock()
+            bgm = AsyncMock()
             bgm.ensure_subject_watching.return_value = 0
-            with patch.object(svc, "_find_subject_id", return_value=("888", False, "")):
-                with patch.object(svc, "_get_bangumi_api_for_user", return_value=bgm):
-                    r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            with patch.object(
+                svc, "_find_subject_id_async", return_value=("888", False, "")
+            ):
+                with patch.object(
+                    svc, "_get_async_bangumi_api_for_user", return_value=bgm
+                ):
+                    r = await svc.sync_custom_item_native(
+                        self._movie_item(), source="custom"
+                    )
         assert r.status == "success"
         assert "已在看" in r.message or "已看过" in r.message
         mock_db.log_sync_record.assert_called()
 
-    def test_sync_movie_watching_ensure_unexpected_error(self):
+    @pytest.mark.asyncio
+    async def test_sync_movie_watching_ensure_unexpected_error(self):
         with (
             patch("app.services.sync_service.config_manager") as mock_config,
             patch("app.services.sync_service.database_manager") as mock_db,
@@ -721,11 +778,17 @@ class TestSyncMovieWatching:
             from app.services.sync_service import SyncService
 
             svc = SyncService()
-            bgm = MagicMock()
+            bgm = AsyncMock()
             bgm.ensure_subject_watching.side_effect = RuntimeError("network")
-            with patch.object(svc, "_find_subject_id", return_value=("888", False, "")):
-                with patch.object(svc, "_get_bangumi_api_for_user", return_value=bgm):
-                    r = svc.sync_movie_watching(self._movie_item(), source="custom")
+            with patch.object(
+                svc, "_find_subject_id_async", return_value=("888", False, "")
+            ):
+                with patch.object(
+                    svc, "_get_async_bangumi_api_for_user", return_value=bgm
+                ):
+                    r = await svc.sync_custom_item_native(
+                        self._movie_item(), source="custom"
+                    )
         assert r.status == "error"
         assert "处理失败" in r.message
         mock_db.log_sync_record.assert_called()
@@ -734,7 +797,8 @@ class TestSyncMovieWatching:
 class TestPlexSync:
     """测试 Plex 同步"""
 
-    def test_sync_plex_item_ignored_event(self):
+    @pytest.mark.asyncio
+    async def test_sync_plex_item_ignored_event(self):
         """测试忽略非 scrobble 事件"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -753,11 +817,12 @@ class TestPlexSync:
                 "Metadata": {},
             }
 
-            result = service.sync_plex_item(plex_data)
+            result = await service.sync_plex_item(plex_data)
 
             assert result.status == "ignored"
 
-    def test_sync_plex_media_play_movie_delegates(self):
+    @pytest.mark.asyncio
+    async def test_sync_plex_media_play_movie_delegates(self):
         with (
             patch("app.services.sync_service.config_manager"),
             patch("app.services.sync_service.database_manager"),
@@ -777,20 +842,22 @@ class TestPlexSync:
                     "originallyAvailableAt": "2024-06-01",
                 },
             }
-            with patch.object(service, "sync_movie_watching") as mock_watch:
+            with patch.object(service, "sync_custom_item_native") as mock_watch:
                 mock_watch.return_value = SyncResponse(
                     status="success", message="ok", data={}
                 )
-                result = service.sync_plex_item(plex_data)
+                result = await service.sync_plex_item(plex_data)
             assert result.status == "success"
             mock_watch.assert_called_once()
             assert mock_watch.call_args[0][0].media_type == "movie"
+            assert mock_watch.call_args[0][0].sync_action == "mark_watching"
 
 
 class TestEmbySync:
     """测试 Emby 同步"""
 
-    def test_sync_emby_item_missing_field(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_missing_field(self):
         """测试缺少必需字段"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -808,11 +875,12 @@ class TestEmbySync:
                 "Item": {},
             }
 
-            result = service.sync_emby_item(emby_data)
+            result = await service.sync_emby_item(emby_data)
 
             assert result.status == "error"
 
-    def test_sync_emby_item_ignored_event(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_ignored_event(self):
         """测试忽略非标记播放事件"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -835,11 +903,12 @@ class TestEmbySync:
                 },
             }
 
-            result = service.sync_emby_item(emby_data)
+            result = await service.sync_emby_item(emby_data)
 
             assert result.status == "ignored"
 
-    def test_sync_emby_playback_start_movie_delegates(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_playback_start_movie_delegates(self):
         with (
             patch("app.services.sync_service.config_manager"),
             patch("app.services.sync_service.database_manager"),
@@ -859,16 +928,18 @@ class TestEmbySync:
                     "PremiereDate": "2024-06-01T00:00:00.0000000Z",
                 },
             }
-            with patch.object(service, "sync_movie_watching") as mock_watch:
+            with patch.object(service, "sync_custom_item_native") as mock_watch:
                 mock_watch.return_value = SyncResponse(
                     status="success", message="ok", data={}
                 )
-                result = service.sync_emby_item(emby_data)
+                result = await service.sync_emby_item(emby_data)
             assert result.status == "success"
             mock_watch.assert_called_once()
             assert mock_watch.call_args[0][0].media_type == "movie"
+            assert mock_watch.call_args[0][0].sync_action == "mark_watching"
 
-    def test_sync_emby_playback_start_pascal_case_ignored(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_playback_start_pascal_case_ignored(self):
         """Emby 仅认 playback.start，不认 PlaybackStart"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -887,8 +958,8 @@ class TestEmbySync:
                     "Name": "Film",
                 },
             }
-            with patch.object(service, "sync_movie_watching") as mock_watch:
-                r = service.sync_emby_item(emby_data)
+            with patch.object(service, "sync_custom_item_native") as mock_watch:
+                r = await service.sync_emby_item(emby_data)
             assert r.status == "ignored"
             mock_watch.assert_not_called()
 
@@ -896,7 +967,8 @@ class TestEmbySync:
 class TestJellyfinSync:
     """测试 Jellyfin 同步"""
 
-    def test_sync_jellyfin_item_ignored_event(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_item_ignored_event(self):
         """测试忽略非播放停止事件"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -913,11 +985,12 @@ class TestJellyfinSync:
                 "PlayedToCompletion": "True",
             }
 
-            result = service.sync_jellyfin_item(jellyfin_data)
+            result = await service.sync_jellyfin_item(jellyfin_data)
 
             assert result.status == "ignored"
 
-    def test_sync_jellyfin_missing_notification_type_ignored(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_missing_notification_type_ignored(self):
         """无 NotificationType 时视为非 Stop / 非播放开始电影，忽略"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -928,10 +1001,11 @@ class TestJellyfinSync:
             from app.services.sync_service import SyncService
 
             service = SyncService()
-            r = service.sync_jellyfin_item({"media_type": "Movie"})
+            r = await service.sync_jellyfin_item({"media_type": "Movie"})
             assert r.status == "ignored"
 
-    def test_sync_jellyfin_playback_stop_missing_played_to_completion_error(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_playback_stop_missing_played_to_completion_error(self):
         """PlaybackStop 缺少 PlayedToCompletion 时进入异常处理"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -942,11 +1016,12 @@ class TestJellyfinSync:
             from app.services.sync_service import SyncService
 
             service = SyncService()
-            r = service.sync_jellyfin_item({"NotificationType": "PlaybackStop"})
+            r = await service.sync_jellyfin_item({"NotificationType": "PlaybackStop"})
             assert r.status == "error"
             assert "处理失败" in r.message
 
-    def test_sync_jellyfin_playback_start_movie_delegates(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_playback_start_movie_delegates(self):
         with (
             patch("app.services.sync_service.config_manager"),
             patch("app.services.sync_service.database_manager"),
@@ -967,18 +1042,20 @@ class TestJellyfinSync:
                 "release_date": "2024-01-01",
                 "user_name": "test_user",
             }
-            with patch.object(service, "sync_movie_watching") as mock_watch:
+            with patch.object(service, "sync_custom_item_native") as mock_watch:
                 mock_watch.return_value = SyncResponse(
                     status="success", message="ok", data={}
                 )
-                result = service.sync_jellyfin_item(jellyfin_data)
+                result = await service.sync_jellyfin_item(jellyfin_data)
             assert result.status == "success"
             mock_watch.assert_called_once()
             call_item = mock_watch.call_args[0][0]
             assert call_item.media_type == "movie"
+            assert call_item.sync_action == "mark_watching"
             assert call_item.title == "Film"
 
-    def test_sync_jellyfin_item_not_completed(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_item_not_completed(self):
         """测试未播放完成"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -995,6 +1072,6 @@ class TestJellyfinSync:
                 "PlayedToCompletion": "False",  # 未播放完成
             }
 
-            result = service.sync_jellyfin_item(jellyfin_data)
+            result = await service.sync_jellyfin_item(jellyfin_data)
 
             assert result.status == "ignored"
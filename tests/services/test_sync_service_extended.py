@@ -2,10 +2,11 @@
 SyncService 更多测试
 """
 
+import asyncio
 import os
 import sys
 from contextlib import contextmanager
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -246,7 +247,7 @@ class TestSyncServiceHelperMethods:
                 "_get_bangumi_config_for_user",
                 return_value={"username": "", "access_token": "t", "private": False},
             ):
-                assert svc._get_bangumi_api_for_user("u") is None
+                assert svc._get_async_bangumi_api_for_user("u") is None
 
     def test_get_bangumi_data_uses_singleton_cache(self):
         with patched_sync_deps():
@@ -263,7 +264,8 @@ class TestSyncServiceHelperMethods:
 class TestPlexSync:
     """测试 Plex 同步功能"""
 
-    def test_sync_plex_item_not_scrobble(self):
+    @pytest.mark.asyncio
+    async def test_sync_plex_item_not_scrobble(self):
         """测试非 scrobble 事件跳过"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -281,33 +283,13 @@ class TestPlexSync:
                 "Account": {"title": "test_user"},
             }
 
-            result = service.sync_plex_item(plex_data)
+            result = await service.sync_plex_item(plex_data)
 
             assert result.status == "ignored"
             assert "无需同步" in result.message
 
-    def test_sync_plex_item_sync_failure_records_task_failed(self):
-        with patched_sync_deps():
-            from app.services.sync_service import SyncService
-
-            svc = SyncService()
-            tid = "plex_x"
-            svc._sync_tasks[tid] = {
-                "status": "pending",
-                "item": {},
-                "source": "plex",
-                "created_at": 0.0,
-                "result": None,
-                "error": None,
-            }
-            with patch.object(
-                svc, "sync_plex_item", side_effect=ValueError("plex bad")
-            ):
-                out = svc._sync_plex_item_sync({"event": "media.scrobble"}, tid)
-            assert out.status == "error"
-            assert svc._sync_tasks[tid]["status"] == "failed"
-
-    def test_sync_plex_item_extract_raises_returns_error(self):
+    @pytest.mark.asyncio
+    async def test_sync_plex_item_extract_raises_returns_error(self):
         with patched_sync_deps():
             with patch(
                 "app.services.sync_service.extract_plex_data",
@@ -325,10 +307,11 @@ class TestPlexSync:
                         "grandparentTitle": "G",
                     },
                 }
-                r = svc.sync_plex_item(plex_data=plex)
+                r = await svc.sync_plex_item(plex_data=plex)
             assert r.status == "error"
 
-    def test_sync_plex_item_movie_reaches_extract_and_sync(self):
+    @pytest.mark.asyncio
+    async def test_sync_plex_item_movie_reaches_extract_and_sync(self):
         """电影 scrobble 不应因日志访问 grandparentTitle 等剧集字段而崩溃"""
         movie_item = CustomItem(
             media_type="movie",
@@ -350,7 +333,7 @@ class TestPlexSync:
                 svc = SyncService()
                 with patch.object(
                     svc,
-                    "sync_custom_item",
+                    "sync_custom_item_native",
                     return_value=SyncResponse(status="success", message="ok"),
                 ) as sc:
                     plex = {
@@ -361,7 +344,7 @@ class TestPlexSync:
                             "title": "剧场版 XYZ",
                         },
                     }
-                    r = svc.sync_plex_item(plex_data=plex)
+                    r = await svc.sync_plex_item(plex_data=plex)
         assert ex.called
         assert sc.called
         assert r.status == "success"
@@ -371,7 +354,8 @@ class TestPlexSync:
 class TestEmbySync:
     """测试 Emby 同步功能"""
 
-    def test_sync_emby_item_missing_field(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_missing_field(self):
         """测试缺少字段"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -388,12 +372,13 @@ class TestEmbySync:
                 # 缺少 Item 字段
             }
 
-            result = service.sync_emby_item(emby_data)
+            result = await service.sync_emby_item(emby_data)
 
             assert result.status == "error"
             assert "缺少" in result.message
 
-    def test_sync_emby_item_wrong_event(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_wrong_event(self):
         """测试错误事件类型"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -416,11 +401,12 @@ class TestEmbySync:
                 "User": {"Id": "123"},
             }
 
-            result = service.sync_emby_item(emby_data)
+            result = await service.sync_emby_item(emby_data)
 
             assert result.status == "ignored"
 
-    def test_sync_emby_item_missing_item_field(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_missing_item_field(self):
         """测试 Item 缺少字段"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -440,11 +426,12 @@ class TestEmbySync:
                 },
             }
 
-            result = service.sync_emby_item(emby_data)
+            result = await service.sync_emby_item(emby_data)
 
             assert result.status == "error"
 
-    def test_sync_emby_playback_stop_incomplete_playback_info_ignored(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_playback_stop_incomplete_playback_info_ignored(self):
         with patched_sync_deps():
             from app.services.sync_service import SyncService
 
@@ -459,11 +446,12 @@ class TestEmbySync:
                 },
                 "User": {"Id": "1"},
             }
-            r = svc.sync_emby_item(payload)
+            r = await svc.sync_emby_item(payload)
             assert r.status == "ignored"
             assert "不完整" in r.message
 
-    def test_sync_emby_playback_stop_not_completed_ignored(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_playback_stop_not_completed_ignored(self):
         with patched_sync_deps():
             from app.services.sync_service import SyncService
 
@@ -479,11 +467,12 @@ class TestEmbySync:
                 "User": {"Id": "1"},
                 "PlaybackInfo": {"PlayedToCompletion": False},
             }
-            r = svc.sync_emby_item(payload)
+            r = await svc.sync_emby_item(payload)
             assert r.status == "ignored"
             assert "未播放完成" in r.message
 
-    def test_sync_emby_item_extract_raises_returns_error(self):
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_extract_raises_returns_error(self):
         with patched_sync_deps():
             with patch(
                 "app.services.sync_service.extract_emby_data",
@@ -502,33 +491,15 @@ class TestEmbySync:
                     },
                     "User": {"Id": "1"},
                 }
-                r = svc.sync_emby_item(payload)
+                r = await svc.sync_emby_item(payload)
             assert r.status == "error"
 
-    def test_sync_emby_item_sync_failure_records_task_failed(self):
-        with patched_sync_deps():
-            from app.services.sync_service import SyncService
-
-            svc = SyncService()
-            tid = "emby_t"
-            svc._sync_tasks[tid] = {
-                "status": "pending",
-                "item": {},
-                "source": "emby",
-                "created_at": 0.0,
-                "result": None,
-                "error": None,
-            }
-            with patch.object(svc, "sync_emby_item", side_effect=KeyError("k")):
-                out = svc._sync_emby_item_sync({}, tid)
-            assert out.status == "error"
-            assert svc._sync_tasks[tid]["status"] == "failed"
-
 
 class TestJellyfinSync:
     """测试 Jellyfin 同步功能"""
 
-    def test_sync_jellyfin_item_not_stop(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_item_not_stop(self):
         """测试非停止事件跳过"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -545,11 +516,12 @@ class TestJellyfinSync:
                 "NotificationType": "PlaybackStart",  # 不是停止
             }
 
-            result = service.sync_jellyfin_item(jellyfin_data)
+            result = await service.sync_jellyfin_item(jellyfin_data)
 
             assert result.status == "ignored"
 
-    def test_sync_jellyfin_item_not_completed(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_item_not_completed(self):
         """测试未播放完成跳过"""
         with (
             patch("app.services.sync_service.config_manager"),
@@ -567,11 +539,12 @@ class TestJellyfinSync:
                 "PlayedToCompletion": "False",  # 未播放完成
             }
 
-            result = service.sync_jellyfin_item(jellyfin_data)
+            result = await service.sync_jellyfin_item(jellyfin_data)
 
             assert result.status == "ignored"
 
-    def test_sync_jellyfin_item_extract_raises_returns_error(self):
+    @pytest.mark.asyncio
+    async def test_sync_jellyfin_item_extract_raises_returns_error(self):
         with patched_sync_deps():
             with patch(
                 "app.services.sync_service.extract_jellyfin_data",
@@ -584,28 +557,9 @@ class TestJellyfinSync:
                     "NotificationType": "PlaybackStop",
                     "PlayedToCompletion": "True",
                 }
-                r = svc.sync_jellyfin_item(jf)
+                r = await svc.sync_jellyfin_item(jf)
             assert r.status == "error"
 
-    def test_sync_jellyfin_item_sync_failure_records_task_failed(self):
-        with patched_sync_deps():
-            from app.services.sync_service import SyncService
-
-            svc = SyncService()
-            tid = "jf_t"
-            svc._sync_tasks[tid] = {
-                "status": "pending",
-                "item": {},
-                "source": "jellyfin",
-                "created_at": 0.0,
-                "result": None,
-                "error": None,
-            }
-            with patch.object(svc, "sync_jellyfin_item", side_effect=RuntimeError("x")):
-                out = svc._sync_jellyfin_item_sync({}, tid)
-            assert out.status == "error"
-            assert svc._sync_tasks[tid]["status"] == "failed"
-
 
 class TestAsyncMethods:
     """测试异步方法"""
@@ -619,7 +573,8 @@ class TestAsyncMethods:
             patch("app.services.sync_service.send_notify"),
             patch("app.services.sync_service.mapping_service"),
             patch(
-                "app.services.sync_service.SyncService.sync_custom_item"
+                "app.services.sync_service.SyncService.sync_custom_item_native",
+                new_callable=AsyncMock,
             ) as mock_sync,
         ):
             mock_sync.return_value = MagicMock(
@@ -647,6 +602,11 @@ class TestAsyncMethods:
             assert task_id is not None
             assert "_" in task_id
 
+            # 任务在事件循环中以原生协程执行
+            await asyncio.gather(*service._background_tasks)
+            mock_sync.assert_awaited_once_with(item, "custom")
+            assert service._sync_tasks[task_id]["status"] == "completed"
+
     @pytest.mark.asyncio
     async def test_sync_plex_item_async(self):
         """测试异步 Plex 同步"""
@@ -657,7 +617,8 @@ class TestAsyncMethods:
             patch("app.services.sync_service.mapping_service"),
             patch("app.services.sync_service.extract_plex_data") as mock_extract,
             patch(
-                "app.services.sync_service.SyncService.sync_custom_item"
+                "app.services.sync_service.SyncService.sync_custom_item_native",
+                new_callable=AsyncMock,
             ) as mock_sync,
         ):
             mock_extract.return_value = MagicMock(
@@ -676,30 +637,36 @@ class TestAsyncMethods:
 
             service = SyncService()
 
-            plex_data = {"event": "media.scrobble"}
+            plex_data = {
+                "event": "media.scrobble",
+                "Account": {"title": "test"},
+                "Metadata": {"type": "episode", "parentIndex": 1, "index": 1},
+            }
             task_id = await service.sync_plex_item_async(plex_data)
             assert task_id is not None
 
-    def test_sync_custom_item_sync_records_failure_on_inner_error(self):
-        with patched_sync_deps():
+            await asyncio.gather(*service._background_tasks)
+            mock_sync.assert_awaited_once_with(mock_extract.return_value, "plex")
+            assert service._sync_tasks[task_id]["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_sync_emby_item_async_ignored_event_completes(self):
+        """无需同步的事件不会进入原生同步流程"""
+        with (
+            patched_sync_deps(),
+            patch(
+                "app.services.sync_service.SyncService.sync_custom_item_native",
+                new_callable=AsyncMock,
+            ) as mock_sync,
+        ):
             from app.services.sync_service import SyncService
 
-            svc = SyncService()
-            item = _branch_custom_item()
-            tid = "manual_task"
-            svc._sync_tasks[tid] = {
-                "status": "pending",
-                "item": item.model_dump(mode="python"),
-                "source": "custom",
-                "created_at": 0.0,
-                "result": None,
-                "error": None,
-            }
-            with patch.object(
-                svc, "sync_custom_item", side_effect=RuntimeError("inner boom")
-            ):
-                out = svc._sync_custom_item_sync(item, "custom", tid)
-            assert out.status == "error"
-            assert "异步处理失败" in out.message
-            assert svc._sync_tasks[tid]["status"] == "failed"
-            assert "inner boom" in svc._sync_tasks[tid]["error"]
+            service = SyncService()
+            emby_data = {"Event": "playback.pause", "Item": {}, "User": {}}
+            task_id = await service.sync_emby_item_async(emby_data)
+
+            await asyncio.gather(*service._background_tasks)
+            mock_sync.assert_not_awaited()
+            task = service._sync_tasks[task_id]
+            assert task["status"] == "completed"
+            assert task["result"]["status"] == "ignored"
@@ -4,7 +4,7 @@
 """
 
 from contextlib import contextmanager
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -45,9 +45,9 @@ def mock_database():
 
 @pytest.fixture
 def mock_bangumi_api():
-    """创建模拟的 BangumiApi"""
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    """创建模拟的 AsyncBangumiApi"""
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
 
         # Mock search 方法
         mock_instance.search.return_value = [
@@ -89,7 +89,8 @@ def mock_bangumi_api():
         yield mock_api
 
 
-def test_sync_custom_item_success(mock_config, mock_database, mock_bangumi_api):
+@pytest.mark.asyncio
+async def test_sync_custom_item_success(mock_config, mock_database, mock_bangumi_api):
     """测试成功同步自定义项目"""
     service = SyncService()
 
@@ -114,19 +115,20 @@ def test_sync_custom_item_success(mock_config, mock_database, mock_bangumi_api):
             "private": True,
         },
     ):
-        result = service.sync_custom_item(item, "custom")
+        result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "success"
     assert result.message == "已标记为看过"
 
 
-def test_sync_custom_item_not_found(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_not_found(mock_config, mock_database):
     """测试同步 - 番剧未找到"""
     service = SyncService()
 
-    # Mock BangumiApi 搜索返回空
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    # Mock AsyncBangumiApi 搜索返回空
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = None
         mock_instance.get_target_season_episode_id.return_value = (None, None)
         mock_api.return_value = mock_instance
@@ -150,18 +152,19 @@ def test_sync_custom_item_not_found(mock_config, mock_database):
                 "private": True,
             },
         ):
-            result = service.sync_custom_item(item, "custom")
+            result = await service.sync_custom_item_native(item, "custom")
 
         assert result.status == "error"
         assert "未找到" in result.message
 
 
-def test_sync_custom_item_episode_not_found(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_episode_not_found(mock_config, mock_database):
     """测试同步 - 剧集未找到"""
     service = SyncService()
 
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = [{"id": 123, "name": "Test"}]
         mock_instance.get_target_season_episode_id.return_value = (None, None)
         mock_api.return_value = mock_instance
@@ -185,18 +188,19 @@ def test_sync_custom_item_episode_not_found(mock_config, mock_database):
                 "private": True,
             },
         ):
-            result = service.sync_custom_item(item, "custom")
+            result = await service.sync_custom_item_native(item, "custom")
 
         assert result.status == "error"
         assert "剧集" in result.message
 
 
-def test_sync_custom_item_already_watched(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_already_watched(mock_config, mock_database):
     """测试同步 - 已经看过"""
     service = SyncService()
 
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = [{"id": 123, "name": "Test"}]
         mock_instance.get_target_season_episode_id.return_value = (123, 1)
         mock_instance.mark_episode_watched.return_value = 0  # 已看过
@@ -221,18 +225,19 @@ def test_sync_custom_item_already_watched(mock_config, mock_database):
                 "private": True,
             },
         ):
-            result = service.sync_custom_item(item, "custom")
+            result = await service.sync_custom_item_native(item, "custom")
 
         assert result.status == "success"
         assert "已看过" in result.message
 
 
-def test_sync_custom_item_add_collection(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_add_collection(mock_config, mock_database):
     """测试同步 - 添加收藏"""
     service = SyncService()
 
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = [{"id": 123, "name": "Test"}]
         mock_instance.get_target_season_episode_id.return_value = (123, 1)
         mock_instance.mark_episode_watched.return_value = 2  # 添加收藏
@@ -257,13 +262,14 @@ def test_sync_custom_item_add_collection(mock_config, mock_database):
                 "private": True,
             },
         ):
-            result = service.sync_custom_item(item, "custom")
+            result = await service.sync_custom_item_native(item, "custom")
 
         assert result.status == "success"
         assert "添加" in result.message
 
 
-def test_sync_custom_item_invalid_type(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_invalid_type(mock_config, mock_database):
     """测试同步 - 不支持的类型"""
     service = SyncService()
 
@@ -277,13 +283,14 @@ def test_sync_custom_item_invalid_type(mock_config, mock_database):
         release_date="2024-01-01",
     )
 
-    result = service.sync_custom_item(item, "custom")
+    result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "error"
     assert "不支持" in result.message
 
 
-def test_sync_custom_item_movie_success_calls_movie_episode_path(
+@pytest.mark.asyncio
+async def test_sync_custom_item_movie_success_calls_movie_episode_path(
     mock_config, mock_database, mock_bangumi_api
 ):
     """电影走 get_movie_main_episode_id 并可条目标看过"""
@@ -300,7 +307,9 @@ def test_sync_custom_item_movie_success_calls_movie_episode_path(
         release_date="",
     )
 
-    with patch.object(service, "_find_subject_id", return_value=("456", False, "")):
+    with patch.object(
+        service, "_find_subject_id_async", return_value=("456", False, "")
+    ):
         with patch.object(
             service,
             "_get_bangumi_config_for_user",
@@ -310,7 +319,7 @@ def test_sync_custom_item_movie_success_calls_movie_episode_path(
                 "private": True,
             },
         ):
-            result = service.sync_custom_item(item, "custom")
+            result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "success"
     mock_instance.get_movie_main_episode_id.assert_called()
@@ -318,7 +327,8 @@ def test_sync_custom_item_movie_success_calls_movie_episode_path(
     mock_instance.change_collection_state.assert_called()
 
 
-def test_sync_custom_item_movie_skips_collection_when_subject_already_completed(
+@pytest.mark.asyncio
+async def test_sync_custom_item_movie_skips_collection_when_subject_already_completed(
     mock_config, mock_database, mock_bangumi_api
 ):
     """剧场版条目收藏已是「看过」时不再调用 change_collection_state"""
@@ -336,7 +346,9 @@ def test_sync_custom_item_movie_skips_collection_when_subject_already_completed(
         release_date="",
     )
 
-    with patch.object(service, "_find_subject_id", return_value=("456", False, "")):
+    with patch.object(
+        service, "_find_subject_id_async", return_value=("456", False, "")
+    ):
         with patch.object(
             service,
             "_get_bangumi_config_for_user",
@@ -346,13 +358,14 @@ def test_sync_custom_item_movie_skips_collection_when_subject_already_completed(
                 "private": True,
             },
         ):
-            result = service.sync_custom_item(item, "custom")
+            result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "success"
     mock_instance.change_collection_state.assert_not_called()
 
 
-def test_sync_custom_item_movie_no_subject_collection_when_mark_flag_off(
+@pytest.mark.asyncio
+async def test_sync_custom_item_movie_no_subject_collection_when_mark_flag_off(
     mock_database, mock_bangumi_api
 ):
     """movie_mark_subject_completed 关闭时不查询收藏、不调 change_collection_state"""
@@ -387,7 +400,9 @@ def test_sync_custom_item_movie_no_subject_collection_when_mark_flag_off(
             release_date="",
         )
 
-        with patch.object(service, "_find_subject_id", return_value=("456", False, "")):
+        with patch.object(
+            service, "_find_subject_id_async", return_value=("456", False, "")
+        ):
             with patch.object(
                 service,
                 "_get_bangumi_config_for_user",
@@ -397,14 +412,17 @@ def test_sync_custom_item_movie_no_subject_collection_when_mark_flag_off(
                     "private": True,
                 },
             ):
-                result = service.sync_custom_item(item, "custom")
+                result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "success"
     mock_instance.get_subject_collection.assert_not_called()
     mock_instance.change_collection_state.assert_not_called()
 
 
-def test_sync_custom_item_anime_completes_collection(mock_database, mock_bangumi_api):
+@pytest.mark.asyncio
+async def test_sync_custom_item_anime_completes_collection(
+    mock_database, mock_bangumi_api
+):
     """TV番剧所有剧集看完时自动归档为看过"""
     service = SyncService()
     mock_instance = mock_bangumi_api.return_value
@@ -439,7 +457,9 @@ def test_sync_custom_item_anime_completes_collection(mock_database, mock_bangumi
             release_date="",
         )
 
-        with patch.object(service, "_find_subject_id", return_value=("456", False, "")):
+        with patch.object(
+            service, "_find_subject_id_async", return_value=("456", False, "")
+        ):
             with patch.object(
                 service,
                 "_get_bangumi_config_for_user",
@@ -449,7 +469,7 @@ def test_sync_custom_item_anime_completes_collection(mock_database, mock_bangumi
                     "private": True,
                 },
             ):
-                result = service.sync_custom_item(item, "custom")
+                result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "success"
     mock_instance.change_collection_state.assert_called_once_with(
@@ -457,7 +477,8 @@ def test_sync_custom_item_anime_completes_collection(mock_database, mock_bangumi
     )
 
 
-def test_sync_custom_item_empty_title(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_empty_title(mock_config, mock_database):
     """测试同步 - 空标题"""
     service = SyncService()
 
@@ -471,13 +492,14 @@ def test_sync_custom_item_empty_title(mock_config, mock_database):
         release_date="2024-01-01",
     )
 
-    result = service.sync_custom_item(item, "custom")
+    result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "error"
     assert "为空" in result.message
 
 
-def test_sync_custom_item_sp_not_supported(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_sp_not_supported(mock_config, mock_database):
     """测试同步 - SP 标记不支持"""
     service = SyncService()
 
@@ -491,13 +513,14 @@ def test_sync_custom_item_sp_not_supported(mock_config, mock_database):
         release_date="2024-01-01",
     )
 
-    result = service.sync_custom_item(item, "custom")
+    result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "error"
     assert "SP" in result.message
 
 
-def test_sync_custom_item_zero_episode(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_zero_episode(mock_config, mock_database):
     """测试同步 - 集数为0"""
     service = SyncService()
 
@@ -511,13 +534,14 @@ def test_sync_custom_item_zero_episode(mock_config, mock_database):
         release_date="2024-01-01",
     )
 
-    result = service.sync_custom_item(item, "custom")
+    result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "error"
     assert "不能为0" in result.message
 
 
-def test_sync_custom_item_blocked_keyword(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_blocked_keyword(mock_config, mock_database):
     """测试同步 - 屏蔽关键词"""
     service = SyncService()
 
@@ -544,13 +568,14 @@ def test_sync_custom_item_blocked_keyword(mock_config, mock_database):
         cm.get_single_mode_media_usernames.return_value = ["testuser"]
         cm.get_user_mappings.return_value = {}
         cm.get_bangumi_configs.return_value = {}
-        result = service.sync_custom_item(item, "custom")
+        result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "ignored"
     assert "屏蔽" in result.message
 
 
-def test_sync_custom_item_no_permission(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_sync_custom_item_no_permission(mock_config, mock_database):
     """测试同步 - 无权限"""
     service = SyncService()
 
@@ -570,7 +595,7 @@ def test_sync_custom_item_no_permission(mock_config, mock_database):
             release_date="2024-01-01",
         )
 
-        result = service.sync_custom_item(item, "custom")
+        result = await service.sync_custom_item_native(item, "custom")
 
     assert result.status == "error"
     assert "无权限" in result.message
@@ -676,7 +701,7 @@ def _branch_custom_item_for_find(**kwargs):
     return CustomItem(**defaults)
 
 
-def _find_subject_via_bangumi_data(mock_cfg, find_return, season=2):
+async def _find_subject_via_bangumi_data(mock_cfg, find_return, season=2):
     def get_side_effect(section, key, fallback=None):
         if section == "bangumi_data" and key == "enabled":
             return True
@@ -688,12 +713,13 @@ def _find_subject_via_bangumi_data(mock_cfg, find_return, season=2):
     mock_data.find_bangumi_id.return_value = find_return
     with patch.object(service, "_load_custom_mappings", return_value={}):
         with patch.object(service, "_get_bangumi_data", return_value=mock_data):
-            return service._find_subject_id(
+            return await service._find_subject_id_async(
                 _branch_custom_item_for_find(season=season, title="T", ori_title="O")
             )
 
 
-def test_find_subject_id_from_mapping(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_find_subject_id_from_mapping(mock_config, mock_database):
     """测试从自定义映射查找 subject ID"""
     service = SyncService()
 
@@ -711,14 +737,15 @@ def test_find_subject_id_from_mapping(mock_config, mock_database):
             release_date="2024-01-01",
         )
 
-        result = service._find_subject_id(item)
+        result = await service._find_subject_id_async(item)
 
         assert result[0] == "12345"
         assert result[1] is False  # 自定义映射不视为特定季度ID
         assert result[2] == ""
 
 
-def test_find_subject_id_movie_passes_is_movie_to_bgm_search(mock_database):
+@pytest.mark.asyncio
+async def test_find_subject_id_movie_passes_is_movie_to_bgm_search(mock_database):
     """电影走 API 搜索时向 bgm_search 传入 is_movie=True"""
     service = SyncService()
 
@@ -736,7 +763,7 @@ def test_find_subject_id_movie_passes_is_movie_to_bgm_search(mock_database):
         mock_cfg.get_user_mappings.return_value = {}
         mock_cfg.get_bangumi_configs.return_value = {}
 
-        bgm = MagicMock()
+        bgm = AsyncMock()
         bgm.bgm_search.return_value = [{"id": 4242, "name_cn": "剧场版"}]
 
         item = CustomItem(
@@ -751,8 +778,10 @@ def test_find_subject_id_movie_passes_is_movie_to_bgm_search(mock_database):
         )
 
         with patch.object(service, "_load_custom_mappings", return_value={}):
-            with patch.object(service, "_get_bangumi_api_for_user", return_value=bgm):
-                sid, is_season, _ = service._find_subject_id(item)
+            with patch.object(
+                service, "_get_async_bangumi_api_for_user", return_value=bgm
+            ):
+                sid, is_season, _ = await service._find_subject_id_async(item)
 
     assert str(sid) == "4242"
     assert is_season is False
@@ -760,7 +789,8 @@ def test_find_subject_id_movie_passes_is_movie_to_bgm_search(mock_database):
     assert bgm.bgm_search.call_args.kwargs.get("is_movie") is True
 
 
-def test_plex_sync_item_success(mock_config, mock_database, mock_bangumi_api):
+@pytest.mark.asyncio
+async def test_plex_sync_item_success(mock_config, mock_database, mock_bangumi_api):
     """测试 Plex 同步 - 成功"""
     service = SyncService()
 
@@ -775,8 +805,8 @@ def test_plex_sync_item_success(mock_config, mock_database, mock_bangumi_api):
         },
     }
 
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = [{"id": 123, "name": "Test"}]
         mock_instance.get_target_season_episode_id.return_value = (123, 1)
         mock_instance.mark_episode_watched.return_value = 1
@@ -791,12 +821,13 @@ def test_plex_sync_item_success(mock_config, mock_database, mock_bangumi_api):
                 "private": True,
             },
         ):
-            result = service.sync_plex_item(plex_data)
+            result = await service.sync_plex_item(plex_data)
 
     assert result.status == "success"
 
 
-def test_plex_sync_item_ignored_event(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_plex_sync_item_ignored_event(mock_config, mock_database):
     """测试 Plex 同步 - 忽略非 scrobble 事件"""
     service = SyncService()
 
@@ -811,12 +842,13 @@ def test_plex_sync_item_ignored_event(mock_config, mock_database):
         },
     }
 
-    result = service.sync_plex_item(plex_data)
+    result = await service.sync_plex_item(plex_data)
 
     assert result.status == "ignored"
 
 
-def test_emby_sync_item_success(mock_config, mock_database, mock_bangumi_api):
+@pytest.mark.asyncio
+async def test_emby_sync_item_success(mock_config, mock_database, mock_bangumi_api):
     """测试 Emby 同步 - 成功"""
     service = SyncService()
 
@@ -831,8 +863,8 @@ def test_emby_sync_item_success(mock_config, mock_database, mock_bangumi_api):
         "User": {"Name": "testuser"},
     }
 
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = [{"id": 123, "name": "Test"}]
         mock_instance.get_target_season_episode_id.return_value = (123, 1)
         mock_instance.mark_episode_watched.return_value = 1
@@ -847,12 +879,13 @@ def test_emby_sync_item_success(mock_config, mock_database, mock_bangumi_api):
                 "private": True,
             },
         ):
-            result = service.sync_emby_item(emby_data)
+            result = await service.sync_emby_item(emby_data)
 
     assert result.status == "success"
 
 
-def test_emby_sync_item_missing_field(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_emby_sync_item_missing_field(mock_config, mock_database):
     """测试 Emby 同步 - 缺少字段"""
     service = SyncService()
 
@@ -865,13 +898,14 @@ def test_emby_sync_item_missing_field(mock_config, mock_database):
         "User": {"Name": "testuser"},
     }
 
-    result = service.sync_emby_item(emby_data)
+    result = await service.sync_emby_item(emby_data)
 
     assert result.status == "error"
     assert "缺少" in result.message
 
 
-def test_jellyfin_sync_item_success(mock_config, mock_database, mock_bangumi_api):
+@pytest.mark.asyncio
+async def test_jellyfin_sync_item_success(mock_config, mock_database, mock_bangumi_api):
     """测试 Jellyfin 同步 - 成功"""
     service = SyncService()
 
@@ -893,8 +927,8 @@ def test_jellyfin_sync_item_success(mock_config, mock_database, mock_bangumi_api
         "user_name": "testuser",
     }
 
-    with patch("app.services.sync_service.BangumiApi") as mock_api:
-        mock_instance = MagicMock()
+    with patch("app.services.sync_service.AsyncBangumiApi") as mock_api:
+        mock_instance = AsyncMock()
         mock_instance.bgm_search.return_value = [{"id": 123, "name": "Test"}]
         mock_instance.get_target_season_episode_id.return_value = (123, 1)
         mock_instance.mark_episode_watched.return_value = 1
@@ -909,12 +943,13 @@ def test_jellyfin_sync_item_success(mock_config, mock_database, mock_bangumi_api
                 "private": True,
             },
         ):
-            result = service.sync_jellyfin_item(jellyfin_data)
+            result = await service.sync_jellyfin_item(jellyfin_data)
 
     assert result.status == "success"
 
 
-def test_jellyfin_sync_item_ignored_event(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_jellyfin_sync_item_ignored_event(mock_config, mock_database):
     """测试 Jellyfin 同步 - 忽略非播放停止事件"""
     service = SyncService()
 
@@ -924,12 +959,13 @@ def test_jellyfin_sync_item_ignored_event(mock_config, mock_database):
         "ItemType": "Episode",
     }
 
-    result = service.sync_jellyfin_item(jellyfin_data)
+    result = await service.sync_jellyfin_item(jellyfin_data)
 
     assert result.status == "ignored"
 
 
-def test_jellyfin_sync_item_not_played_completion(mock_config, mock_database):
+@pytest.mark.asyncio
+async def test_jellyfin_sync_item_not_played_completion(mock_config, mock_database):
     """测试 Jellyfin 同步 - 未播放完成"""
     service = SyncService()
 
@@ -939,48 +975,107 @@ def test_jellyfin_sync_item_not_played_completion(mock_config, mock_database):
         "ItemType": "Episode",
     }
 
-    result = service.sync_jellyfin_item(jellyfin_data)
+    result = await service.sync_jellyfin_item(jellyfin_data)
 
     assert result.status == "ignored"
 
 
-def test_find_subject_id_season_gt1_date_matched_sets_season_flag():
+@pytest.mark.asyncio
+async def test_find_subject_id_season_gt1_date_matched_sets_season_flag():
     with _patched_sync_service_deps() as cfg:
-        sid, flag, _ = _find_subject_via_bangumi_data(
+        sid, flag, _ = await _find_subject_via_bangumi_data(
             cfg, ("99", "标题", True), season=2
         )
         assert sid == "99"
         assert flag is True
 
 
-def test_find_subject_id_season_gt1_title_has_season_info():
+@pytest.mark.asyncio
+async def test_find_subject_id_season_gt1_title_has_season_info():
     with _patched_sync_service_deps() as cfg:
-        sid, flag, _ = _find_subject_via_bangumi_data(
+        sid, flag, _ = await _find_subject_via_bangumi_data(
             cfg, ("88", "某番 第2季", False), season=2
         )
         assert sid == "88"
         assert flag is True
 
 
-def test_find_subject_id_season_gt1_no_date_no_season_keyword():
+@pytest.mark.asyncio
+async def test_find_subject_id_season_gt1_no_date_no_season_keyword():
     with _patched_sync_service_deps() as cfg:
-        sid, flag, _ = _find_subject_via_bangumi_data(
+        sid, flag, _ = await _find_subject_via_bangumi_data(
             cfg, ("77", "无季标", False), season=2
         )
         assert sid == "77"
         assert flag is False
 
 
-def test_find_subject_id_season1_sets_season_matched_true():
+@pytest.mark.asyncio
+async def test_find_subject_id_season1_sets_season_matched_true():
     with _patched_sync_service_deps() as cfg:
-        sid, flag, _ = _find_subject_via_bangumi_data(
+        sid, flag, _ = await _find_subject_via_bangumi_data(
             cfg, ("66", "第一季", False), season=1
         )
         assert sid == "66"
         assert flag is True
 
 
-def test_find_subject_id_find_bangumi_id_exception_falls_through_to_api():
+def _enable_bangumi_data(cfg):
+    cfg.get.side_effect = lambda section, key, fallback=None: (
+        True if (section, key) == ("bangumi_data", "enabled") else fallback
+    )
+
+
+@pytest.mark.asyncio
+async def test_find_subject_id_external_ids_skip_title_matching():
+    """携带外部 ID 且 bangumi-data 命中时不做标题匹配"""
+    with _patched_sync_service_deps() as cfg:
+        _enable_bangumi_data(cfg)
+        service = SyncService()
+        mock_data = MagicMock()
+        mock_data.find_bangumi_id_by_external_ids.return_value = ("55", "标题", False)
+        item = _branch_custom_item_for_find(season=2, provider_ids={"tmdb": "209867"})
+        with patch.object(service, "_load_custom_mappings", return_value={}):
+            with patch.object(service, "_get_bangumi_data", return_value=mock_data):
+                assert await service._find_subject_id_async(item) == ("55", False, "")
+        mock_data.find_bangumi_id_by_external_ids.assert_called_once_with(
+            {"tmdb": "209867"}, is_movie=False, season=2, release_date="2024-01-15"
+        )
+        mock_data.find_bangumi_id.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_find_subject_id_external_ids_miss_falls_back_to_title():
+    with _patched_sync_service_deps() as cfg:
+        _enable_bangumi_data(cfg)
+        service = SyncService()
+        mock_data = MagicMock()
+        mock_data.find_bangumi_id_by_external_ids.return_value = None
+        mock_data.find_bangumi_id.return_value = ("66", "标题", True)
+        item = _branch_custom_item_for_find(provider_ids={"tmdb": "1"})
+        with patch.object(service, "_load_custom_mappings", return_value={}):
+            with patch.object(service, "_get_bangumi_data", return_value=mock_data):
+                assert await service._find_subject_id_async(item) == ("66", True, "")
+
+
+@pytest.mark.asyncio
+async def test_find_subject_id_custom_mapping_beats_external_ids():
+    """自定义映射仍优先于外部 ID"""
+    with _patched_sync_service_deps() as cfg:
+        _enable_bangumi_data(cfg)
+        service = SyncService()
+        mock_data = MagicMock()
+        item = _branch_custom_item_for_find(provider_ids={"tmdb": "1"})
+        with patch.object(
+            service, "_load_custom_mappings", return_value={"番剧A": "9"}
+        ):
+            with patch.object(service, "_get_bangumi_data", return_value=mock_data):
+                assert await service._find_subject_id_async(item) == ("9", False, "")
+        mock_data.find_bangumi_id_by_external_ids.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_find_subject_id_find_bangumi_id_exception_falls_through_to_api():
     with _patched_sync_service_deps() as cfg:
 
         def get_side_effect(section, key, fallback=None):
@@ -992,21 +1087,22 @@ def test_find_subject_id_find_bangumi_id_exception_falls_through_to_api():
         service = SyncService()
         mock_data = MagicMock()
         mock_data.find_bangumi_id.side_effect = RuntimeError("parse fail")
-        bgm = MagicMock()
+        bgm = AsyncMock()
         bgm.bgm_search.return_value = [{"id": 42}]
         with patch.object(service, "_load_custom_mappings", return_value={}):
             with patch.object(service, "_get_bangumi_data", return_value=mock_data):
                 with patch.object(
-                    service, "_get_bangumi_api_for_user", return_value=bgm
+                    service, "_get_async_bangumi_api_for_user", return_value=bgm
                 ):
-                    sid, flag, _ = service._find_subject_id(
+                    sid, flag, _ = await service._find_subject_id_async(
                         _branch_custom_item_for_find()
                     )
         assert sid == 42 or sid == "42"
         assert flag is False
 
 
-def test_find_subject_id_api_disabled_no_bgm_instance():
+@pytest.mark.asyncio
+async def test_find_subject_id_api_disabled_no_bgm_instance():
     with _patched_sync_service_deps() as cfg:
 
         def get_side_effect(section, key, fallback=None):
@@ -1017,8 +1113,10 @@ def test_find_subject_id_api_disabled_no_bgm_instance():
         cfg.get.side_effect = get_side_effect
         service = SyncService()
         with patch.object(service, "_load_custom_mappings", return_value={}):
-            with patch.object(service, "_get_bangumi_api_for_user", return_value=None):
-                sid, flag, err = service._find_subject_id(
+            with patch.object(
+                service, "_get_async_bangumi_api_for_user", return_value=None
+            ):
+                sid, flag, err = await service._find_subject_id_async(
                     _branch_custom_item_for_find()
                 )
         assert sid is None
@@ -1026,7 +1124,8 @@ def test_find_subject_id_api_disabled_no_bgm_instance():
         assert err == "无法创建 Bangumi API 实例，无法搜索条目"
 
 
-def test_find_subject_id_api_search_exception_returns_none():
+@pytest.mark.asyncio
+async def test_find_subject_id_api_search_exception_returns_none():
     with _patched_sync_service_deps() as cfg:
 
         def get_side_effect(section, key, fallback=None):
@@ -1036,81 +1135,92 @@ def test_find_subject_id_api_search_exception_returns_none():
 
         cfg.get.side_effect = get_side_effect
         service = SyncService()
-        bgm = MagicMock()
+        bgm = AsyncMock()
         bgm.bgm_search.side_effect = OSError("net")
         with patch.object(service, "_load_custom_mappings", return_value={}):
-            with patch.object(service, "_get_bangumi_api_for_user", return_value=bgm):
-                sid, flag, err = service._find_subject_id(
+            with patch.object(
+                service, "_get_async_bangumi_api_for_user", return_value=bgm
+            ):
+                sid, flag, err = await service._find_subject_id_async(
                     _branch_custom_item_for_find()
                 )
         assert sid is None
         assert "Bangumi API 搜索出错" in err
 
 
-def test_sync_custom_item_no_bgm_api_after_find_subject():
+@pytest.mark.asyncio
+async def test_sync_custom_item_no_bgm_api_after_find_subject():
     with _patched_sync_service_deps():
         svc = SyncService()
         with patch.object(svc, "_check_user_permission", return_value=True):
             with patch.object(svc, "_is_title_blocked", return_value=False):
                 with patch.object(
-                    svc, "_find_subject_id", return_value=("123", False, "")
+                    svc, "_find_subject_id_async", return_value=("123", False, "")
                 ):
                     with patch.object(
-                        svc, "_get_bangumi_api_for_user", return_value=None
+                        svc, "_get_async_bangumi_api_for_user", return_value=None
                     ):
-                        r = svc.sync_custom_item(
+                        r = await svc.sync_custom_item_native(
                             _branch_custom_item_for_find(), "custom"
                         )
         assert r.status == "error"
         assert "bangumi" in r.message and "错误" in r.message
 
 
-def test_sync_custom_item_get_target_season_value_error_auth_message():
+@pytest.mark.asyncio
+async def test_sync_custom_item_get_target_season_value_error_auth_message():
     with _patched_sync_service_deps():
         svc = SyncService()
-        bgm = MagicMock()
+        bgm = AsyncMock()
         bgm.get_target_season_episode_id.side_effect = ValueError(
             "认证失败 access_token 过期"
         )
         with patch.object(svc, "_check_user_permission", return_value=True):
             with patch.object(svc, "_is_title_blocked", return_value=False):
                 with patch.object(
-                    svc, "_find_subject_id", return_value=("1", False, "")
+                    svc, "_find_subject_id_async", return_value=("1", False, "")
                 ):
                     with patch.object(
-                        svc, "_get_bangumi_api_for_user", return_value=bgm
+                        svc, "_get_async_bangumi_api_for_user", return_value=bgm
                     ):
-                        r = svc.sync_custom_item(
+                        r = await svc.sync_custom_item_native(
                             _branch_custom_item_for_find(), "custom"
                         )
         assert r.status == "error"
         assert "access_token" in r.message or "认证" in r.message
 
 
-def test_sync_custom_item_mark_value_error_auth_message():
+@pytest.mark.asyncio
+async def test_sync_custom_item_mark_value_error_auth_message():
     with _patched_sync_service_deps():
         svc = SyncService()
-        bgm = MagicMock()
+        bgm = AsyncMock()
         bgm.get_target_season_episode_id.return_value = ("1", "10")
         bgm.mark_episode_watched.side_effect = ValueError("access_token 无效")
-        with patch.object(svc, "_find_subject_id", return_value=("1", False, "")):
-            with patch.object(svc, "_get_bangumi_api_for_user", return_value=bgm):
-                r = svc.sync_custom_item(_branch_custom_item_for_find(), "custom")
+        with patch.object(svc, "_find_subject_id_async", return_value=("1", False, "")):
+            with patch.object(svc, "_get_async_bangumi_api_for_user", return_value=bgm):
+                r = await svc.sync_custom_item_native(
+                    _branch_custom_item_for_find(), "custom"
+                )
         assert r.status == "error"
 
 
-def test_sync_custom_item_outer_exception_returns_error():
+@pytest.mark.asyncio
+async def test_sync_custom_item_outer_exception_returns_error():
     with _patched_sync_service_deps():
         svc = SyncService()
         with patch.object(
             svc, "_check_user_permission", side_effect=RuntimeError("perm boom")
         ):
-            r = svc.sync_custom_item(_branch_custom_item_for_find(), "custom")
+            r = await svc.sync_custom_item_native(
+                _branch_custom_item_for_find(), "custom"
+            )
         assert r.status == "error"
         assert "处理失败" in r.message
 
 
-def test_find_subject_id_api_search_season_gt1_title_matched():
+@pytest.mark.asyncio
+async def test_find_subject_id_api_search_season_gt1_title_matched():
     """测试 API 搜索返回结果标题包含季度信息时，正确设置 is_season_matched_id = True"""
     with _patched_sync_service_deps() as cfg:
         # 强制禁用本地 bangumi-data，确保代码走进 API 搜索分支
@@ -1121,7 +1231,7 @@ def test_find_subject_id_api_search_season_gt1_title_matched():
 
         cfg.get.side_effect = get_side_effect
         service = SyncService()
-        bgm = MagicMock()
+        bgm = AsyncMock()
 
         # 模拟 API 搜索完美命中了包含季度信息的标题
         bgm.bgm_search.return_value = [
@@ -1133,8 +1243,10 @@ def test_find_subject_id_api_search_season_gt1_title_matched():
         ]
 
         with patch.object(service, "_load_custom_mappings", return_value={}):
-            with patch.object(service, "_get_bangumi_api_for_user", return_value=bgm):
-                sid, flag, err = service._find_subject_id(
+            with patch.object(
+                service, "_get_async_bangumi_api_for_user", return_value=bgm
+            ):
+                sid, flag, err = await service._find_subject_id_async(
                     _branch_custom_item_for_find(season=9, title="瑞克和莫蒂")
                 )
 
@@ -1143,7 +1255,8 @@ def test_find_subject_id_api_search_season_gt1_title_matched():
     assert err == ""
 
 
-def test_find_subject_id_api_search_season_gt1_title_not_matched():
+@pytest.mark.asyncio
+async def test_find_subject_id_api_search_season_gt1_title_not_matched():
     """测试 API 搜索返回结果标题不包含季度信息时，保留 is_season_matched_id = False"""
     with _patched_sync_service_deps() as cfg:
 
@@ -1154,7 +1267,7 @@ def test_find_subject_id_api_search_season_gt1_title_not_matched():
 
         cfg.get.side_effect = get_side_effect
         service = SyncService()
-        bgm = MagicMock()
+        bgm = AsyncMock()
 
         # 模拟 API 搜索由于模糊匹配，只返回了第一季的条目（标题中不含 Season 9）
         bgm.bgm_search.return_value = [
@@ -1162,8 +1275,10 @@ def test_find_subject_id_api_search_season_gt1_title_not_matched():
         ]
 
         with patch.object(service, "_load_custom_mappings", return_value={}):
-            with patch.object(service, "_get_bangumi_api_for_user", return_value=bgm):
-                sid, flag, err = service._find_subject_id(
+            with patch.object(
+                service, "_get_async_bangumi_api_for_user", return_value=bgm
+            ):
+                sid, flag, err = await service._find_subject_id_async(
                     _branch_custom_item_for_find(season=9, title="瑞克和莫蒂")
                 )
 
@@ -1,57 +1,224 @@
-"""sync_service：标记看过重试（主同步路径中的 _retry_mark_episode）。"""
+"""sync_service：网络失败的同步转入延迟重试队列，不在工作线程内 sleep 重试。"""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
+import requests
 
-from app.services.sync_service import SyncService
+from app.models.sync import CustomItem
+from app.services import sync_service as sync_mod
+from app.services.sync_service import RETRY_KIND_SYNC_ITEM, SyncService
+from app.utils.bgm_circuit_breaker import BangumiCircuitOpenError
+from app.utils.bgm_retry_queue import current_retry_task, retries_deferred
 
 
-def test_retry_mark_episode_succeeds_after_one_failure():
-    svc = SyncService()
-    bgm = MagicMock()
-    bgm.mark_episode_watched.side_effect = [ConnectionError("timeout"), 1]
+def _item():
+    return CustomItem(
+        user_name="u",
+        title="番剧A",
+        ori_title="A",
+        season=1,
+        episode=2,
+        media_type="episode",
+        release_date="2024-01-15",
+    )
+
+
+@pytest.fixture
+def svc():
+    with (
+        patch.object(sync_mod, "database_manager") as db,
+        patch.object(sync_mod, "send_notify"),
+        patch.object(sync_mod, "bgm_retry_queue") as queue,
+    ):
+        db.log_sync_record.return_value = 42
+        queue.schedule.return_value = 7
+        service = SyncService()
+        service.db = db
+        service.queue = queue
+        yield service
+
+
+@pytest.mark.asyncio
+async def test_sync_runs_with_deferred_retries(svc):
+    seen = []
+
+    def _body(item):
+        seen.append(retries_deferred())
+        raise requests.exceptions.ConnectionError("down")
+
+    with patch.object(svc, "_precheck_custom_item", side_effect=_body):
+        result = await svc.sync_custom_item_native(_item(), "custom")
+
+    assert seen == [True]
+    assert result.status == "queued"
+    assert result.data == {"retry_task_id": 7}
+    kind, payload, error = svc.queue.schedule.call_args.args
+    assert kind == RETRY_KIND_SYNC_ITEM
+    assert payload["record_id"] == 42
+    assert payload["item"]["title"] == "番剧A"
+    assert svc.db.log_sync_record.call_args.kwargs["status"] == "queued"
+    assert not retries_deferred()
 
-    with patch("app.services.sync_service.time.sleep"):
-        status = svc._retry_mark_episode(bgm, "subj", "ep1", max_retries=3)
 
-    assert status == 1
-    assert bgm.mark_episode_watched.call_count == 2
+@pytest.mark.asyncio
+async def test_open_circuit_is_queued_with_outage_message(svc):
+    error = BangumiCircuitOpenError("api.bgm.tv", 0.0)
+    with patch.object(svc, "_precheck_custom_item", side_effect=error):
+        result = await svc.sync_custom_item_native(_item(), "custom")
+    assert result.status == "queued"
+    assert "暂不可用" in result.message
+    assert svc.queue.schedule.call_args.args[2] is error
+
+
+@pytest.mark.asyncio
+async def test_non_network_error_is_not_queued(svc):
+    with patch.object(svc, "_precheck_custom_item", side_effect=RuntimeError("bug")):
+        result = await svc.sync_custom_item_native(_item(), "custom")
+    assert result.status == "error"
+    svc.queue.schedule.assert_not_called()
+
 
+@pytest.mark.asyncio
+async def test_schedule_failure_falls_back_to_error(svc):
+    svc.queue.schedule.return_value = None
+    error = requests.exceptions.Timeout("slow")
+    with patch.object(svc, "_precheck_custom_item", side_effect=error):
+        result = await svc.sync_custom_item_native(_item(), "custom")
+    assert result.status == "error"
+    svc.db.update_sync_record_status.assert_called_once_with(42, "error", "slow")
+
+
+@pytest.mark.asyncio
+async def test_queued_run_updates_original_record(svc):
+    payload = {"item": _item().dict(), "source": "plex", "record_id": 42}
+    success = sync_mod.SyncResponse(status="success", message="已标记为看过")
+    with patch.object(svc, "sync_custom_item_native", return_value=success) as run:
+        # 与延迟重试队列一样在独立线程中执行
+        assert await asyncio.to_thread(svc._run_queued_sync, payload) is success
+    assert run.call_args.args[1] == "plex"
+    svc.db.update_sync_record_status.assert_called_once_with(
+        42, "retried", "延迟重试完成: 已标记为看过"
+    )
 
-def test_retry_mark_episode_succeeds_after_runtime_error():
-    svc = SyncService()
+
+@pytest.mark.asyncio
+async def test_queued_run_writes_result_to_original_record(svc):
+    payload = {"item": _item().dict(), "source": "plex", "record_id": 42}
     bgm = MagicMock()
-    bgm.mark_episode_watched = MagicMock(side_effect=[RuntimeError("x"), 1])
-    with patch("app.services.sync_service.time.sleep"):
-        r = svc._retry_mark_episode(bgm, "1", "2", max_retries=3)
-    assert r == 1
+    bgm.get_target_season_episode_id = AsyncMock(return_value=(100, 1002))
+    bgm.get_subject = AsyncMock(return_value={"name": "A", "name_cn": "番剧A"})
+    bgm.mark_episode_watched = AsyncMock(return_value=1)
+    with (
+        patch.object(sync_mod, "current_retry_task", return_value={"id": 1}),
+        patch.object(svc, "_precheck_custom_item", return_value=None),
+        patch.object(svc, "_find_subject_id_async", return_value=("100", False, "")),
+        patch.object(svc, "_get_async_bangumi_api_for_user", return_value=bgm),
+        patch.object(svc, "_mark_subject_completed_async"),
+        patch.object(svc, "_learn_subject"),
+    ):
+        result = await asyncio.to_thread(svc._run_queued_sync, payload)
+
+    assert result.status == "success"
+    svc.db.log_sync_record.assert_not_called()
+    svc.db.update_sync_record_status.assert_called_once_with(
+        42,
+        "retried",
+        "延迟重试完成: 已标记为看过",
+        subject_id=100,
+        episode_id=1002,
+        bgm_title="番剧A",
+    )
+    # 收到请求、匹配成功的通知已在首次请求时发送
+    notified = [c.args[0] for c in sync_mod.send_notify.call_args_list]
+    assert notified == ["mark_success"]
 
 
-def test_retry_mark_episode_exhausted_raises_last_error():
-    svc = SyncService()
+@pytest.mark.asyncio
+async def test_network_error_inside_queue_is_raised_for_reschedule(svc):
+    error = requests.exceptions.ConnectionError("still down")
+    with (
+        patch.object(sync_mod, "current_retry_task", return_value={"id": 1}),
+        patch.object(svc, "_precheck_custom_item", side_effect=error),
+    ):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            await svc.sync_custom_item_native(_item(), "custom")
+    svc.queue.schedule.assert_not_called()
+    assert current_retry_task() is None
+
+
+def test_give_up_marks_record_failed(svc):
+    payload = {"item": _item().dict(), "source": "plex", "record_id": 42}
+    svc._give_up_queued_sync(payload, requests.exceptions.HTTPError("HTTP 503"))
+    record_id, status, message = svc.db.update_sync_record_status.call_args.args
+    assert (record_id, status) == (42, "error")
+    assert "HTTP 503" in message
+    sync_mod.send_notify.assert_called_once()
+
+
+def _search_fails(svc, error):
+    """本地映射未命中，Bangumi 搜索抛出 error"""
     bgm = MagicMock()
-    bgm.mark_episode_watched = MagicMock(side_effect=RuntimeError("always"))
-    with patch("app.services.sync_service.time.sleep"):
-        with pytest.raises(RuntimeError, match="always"):
-            svc._retry_mark_episode(bgm, "1", "2", max_retries=1)
+    bgm.bgm_search = AsyncMock(side_effect=error)
+    svc._lookup_unmatched = MagicMock(return_value=(None, "v1"))
+    svc._find_subject_id_local = MagicMock(return_value=None)
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+    svc._precheck_custom_item = MagicMock(return_value=None)
+    return bgm
+
+
+@pytest.mark.asyncio
+async def test_async_search_network_error_schedules_retry(svc):
+    error = httpx.ConnectError("down")
+    _search_fails(svc, error)
+    result = await svc.sync_custom_item_native(_item(), "custom")
+    assert result.status == "queued"
+    assert svc.queue.schedule.call_args.args[2] is error
+
+
+@pytest.mark.asyncio
+async def test_async_search_open_circuit_parks_sync(svc):
+    error = BangumiCircuitOpenError("api.bgm.tv", 30.0)
+    _search_fails(svc, error)
+    result = await svc.sync_custom_item_native(_item(), "custom")
+    assert result.status == "queued"
+    assert "暂不可用" in result.message
+    assert svc.queue.schedule.call_args.args[2] is error
+
+
+@pytest.mark.asyncio
+async def test_search_parse_error_is_reported_as_not_found(svc):
+    _search_fails(svc, ValueError("bad payload"))
+    with patch.object(svc, "_record_subject_not_found") as not_found:
+        await svc.sync_custom_item_native(_item(), "custom")
+    assert "Bangumi API 搜索出错" in not_found.call_args.args[2]
+    svc.queue.schedule.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_retry_mark_episode_async_succeeds_after_one_failure():
-    svc = SyncService()
+async def test_sync_mark_is_single_attempt(svc):
     bgm = MagicMock()
-    bgm.mark_episode_watched = MagicMock(side_effect=[OSError("a"), 0])
-    with patch("app.services.sync_service.asyncio.sleep", new_callable=AsyncMock):
-        r = await svc._retry_mark_episode_async(bgm, "9", "8", max_retries=2)
-    assert r == 0
+    bgm.mark_episode_watched = AsyncMock(side_effect=httpx.ConnectError("x"))
+    svc._find_subject_id_async = AsyncMock(return_value=("1", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+    bgm.get_target_season_episode_id = AsyncMock(return_value=("1", "2"))
+    bgm.get_subject = AsyncMock(return_value={"name": "A"})
+    with (
+        patch.object(svc, "_precheck_custom_item", return_value=None),
+        patch.object(sync_mod.time, "sleep") as sleep,
+    ):
+        result = await svc.sync_custom_item_native(_item(), "custom")
+    assert result.status == "queued"
+    bgm.mark_episode_watched.assert_awaited_once()
+    sleep.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_retry_mark_episode_async_exhausted_raises():
-    svc = SyncService()
+async def test_mark_episode_failure_propagates(svc):
     bgm = MagicMock()
-    bgm.mark_episode_watched = MagicMock(side_effect=OSError("bad"))
-    with patch("app.services.sync_service.asyncio.sleep", new_callable=AsyncMock):
-        with pytest.raises(OSError, match="bad"):
-            await svc._retry_mark_episode_async(bgm, "9", "8", max_retries=0)
+    bgm.mark_episode_watched = AsyncMock(side_effect=OSError("bad"))
+    with pytest.raises(OSError, match="bad"):
+        await svc._mark_episode_batched(bgm, "9", "8")
+    bgm.mark_episode_watched.assert_awaited_once()
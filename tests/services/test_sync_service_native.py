@@ -0,0 +1,389 @@
+"""
+SyncService 原生异步同步流程测试
+"""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.sync import CustomItem, SyncResponse
+from app.services import sync_service as sync_mod
+from app.services.sync_service import SyncService
+
+
+def _item(**kwargs):
+    defaults = dict(
+        user_name="testuser",
+        title="番剧A",
+        ori_title="A",
+        season=1,
+        episode=3,
+        media_type="episode",
+        release_date="2024-01-15",
+    )
+    defaults.update(kwargs)
+    return CustomItem(**defaults)
+
+
+def _async_bgm(mark_status=1):
+    bgm = MagicMock()
+    bgm.get_target_season_episode_id = AsyncMock(return_value=(100, 1003))
+    bgm.get_subject = AsyncMock(return_value={"name": "A", "name_cn": "番剧A"})
+    bgm.mark_episode_watched = AsyncMock(return_value=mark_status)
+    return bgm
+
+
+@pytest.fixture
+def svc():
+    with (
+        patch("app.services.sync_service.config_manager") as cfg,
+        patch("app.services.sync_service.database_manager") as db,
+        patch("app.services.sync_service.send_notify"),
+        patch("app.services.sync_service.mapping_service"),
+    ):
+        cfg.get.return_value = False
+        cfg.get_scheduler_config.return_value = {
+            "max_concurrent_native_syncs": 2,
+            "mark_batch_window_ms": 0,
+        }
+        service = SyncService()
+        service._precheck_custom_item = MagicMock(return_value=None)
+        service.db = db
+        yield service
+
+
+@pytest.mark.asyncio
+async def test_native_sync_awaits_async_client(svc):
+    bgm = _async_bgm()
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+
+    result = await svc.sync_custom_item_native(_item(), "custom")
+
+    assert result.status == "success"
+    assert result.data["episode_id"] == 1003
+    bgm.mark_episode_watched.assert_awaited_once_with(subject_id=100, ep_id=1003)
+    svc.db.log_sync_record.assert_called_once()
+    assert svc.db.log_sync_record.call_args.kwargs["status"] == "success"
+
+
+@pytest.mark.asyncio
+async def test_native_sync_subject_not_found(svc):
+    svc._find_subject_id_async = AsyncMock(return_value=(None, False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock()
+
+    result = await svc.sync_custom_item_native(_item(), "custom")
+
+    assert result.status == "error"
+    svc._get_async_bangumi_api_for_user.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_native_sync_unexpected_error_recorded(svc):
+    bgm = _async_bgm()
+    bgm.get_target_season_episode_id.side_effect = RuntimeError("boom")
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+
+    result = await svc.sync_custom_item_native(_item(), "custom")
+
+    assert result.status == "error"
+    assert "boom" in result.message
+    assert svc.db.log_sync_record.call_args.kwargs["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_native_slot_uses_scheduler_limit(svc):
+    slot = svc._native_sync_slot()
+    assert slot is svc._native_sync_slot()
+    assert slot._value == 2
+
+
+async def _slot_of(svc):
+    return svc._native_sync_slot()
+
+
+@pytest.mark.asyncio
+async def test_native_slot_is_per_event_loop(svc):
+    """延迟重试队列线程中的临时事件循环不替换应用主循环的信号量"""
+    slot = svc._native_sync_slot()
+    other = await asyncio.to_thread(asyncio.run, _slot_of(svc))
+    assert other is not slot
+    assert svc._native_sync_slot() is slot
+
+
+def _batch_window(window_ms):
+    """合并窗口与并发上限（同一条目的三集需同时进行）"""
+    sync_mod.config_manager.get_scheduler_config.return_value = {
+        "max_concurrent_native_syncs": 4,
+        "mark_batch_window_ms": window_ms,
+    }
+
+
+def _gated_single_mark(svc, bgm, queued=2):
+    """单集标记一直进行到 queued 个同条目章节加入等待批次（window 为 0 时不等待）"""
+
+    async def mark(**kwargs):
+        if svc._mark_batch_window() > 0:
+            for _ in range(1000):
+                if any(len(b) >= queued for b in svc._pending_marks.values()):
+                    break
+                await asyncio.sleep(0.001)
+        return 1
+
+    bgm.mark_episode_watched = AsyncMock(side_effect=mark)
+    bgm.get_target_season_episode_id.side_effect = lambda **kw: (
+        100,
+        1000 + kw["target_ep"],
+    )
+
+
+@pytest.mark.asyncio
+async def test_single_mark_is_not_delayed(svc):
+    bgm = _async_bgm()
+    # 即使合并窗口很长，没有进行中的标记时也不等待
+    with patch.object(svc, "_mark_batch_window", return_value=10.0):
+        status = await asyncio.wait_for(svc._mark_episode_batched(bgm, 100, 1003), 1)
+
+    assert status == 1
+    bgm.mark_episode_watched.assert_awaited_once_with(subject_id=100, ep_id=1003)
+
+
+@pytest.mark.asyncio
+async def test_episodes_queued_behind_in_flight_mark_are_batched(svc):
+    bgm = _async_bgm()
+    _gated_single_mark(svc, bgm)
+    bgm.mark_episodes_watched = AsyncMock(return_value={1004: 1, 1005: 0})
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+
+    _batch_window(1000)
+    results = await asyncio.gather(
+        *(svc.sync_custom_item_native(_item(episode=ep), "custom") for ep in (3, 4, 5))
+    )
+
+    assert [r.status for r in results] == ["success"] * 3
+    assert results[2].message.endswith("已看过，不再重复标记")
+    bgm.mark_episode_watched.assert_awaited_once_with(subject_id=100, ep_id=1003)
+    bgm.mark_episodes_watched.assert_awaited_once_with(
+        subject_id=100, ep_ids=[1004, 1005]
+    )
+
+
+@pytest.mark.asyncio
+async def test_zero_window_marks_each_episode(svc):
+    _batch_window(0)
+    bgm = _async_bgm()
+    _gated_single_mark(svc, bgm)
+    bgm.mark_episodes_watched = AsyncMock()
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+
+    results = await asyncio.gather(
+        *(svc.sync_custom_item_native(_item(episode=ep), "custom") for ep in (3, 4, 5))
+    )
+
+    assert [r.status for r in results] == ["success"] * 3
+    assert bgm.mark_episode_watched.await_count == 3
+    bgm.mark_episodes_watched.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batched_mark_failure_reaches_every_item(svc):
+    bgm = _async_bgm()
+    _gated_single_mark(svc, bgm)
+    bgm.mark_episodes_watched = AsyncMock(side_effect=ValueError("access_token 无效"))
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+
+    _batch_window(1000)
+    results = await asyncio.gather(
+        *(svc.sync_custom_item_native(_item(episode=ep), "custom") for ep in (3, 4, 5))
+    )
+
+    assert [r.status for r in results] == ["success", "error", "error"]
+    assert all("access_token" in r.message for r in results[1:])
+    bgm.mark_episodes_watched.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_leader_does_not_cancel_followers(svc):
+    bgm = _async_bgm()
+    _gated_single_mark(svc, bgm)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def mark_many(**kwargs):
+        started.set()
+        await release.wait()
+        return {1004: 1, 1005: 1}
+
+    bgm.mark_episodes_watched = AsyncMock(side_effect=mark_many)
+
+    _batch_window(1000)
+    first = asyncio.ensure_future(svc._mark_episode_batched(bgm, 100, 1003))
+    await asyncio.sleep(0)
+    leader = asyncio.ensure_future(svc._mark_episode_batched(bgm, 100, 1004))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(svc._mark_episode_batched(bgm, 100, 1005))
+    await asyncio.wait_for(started.wait(), 1)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.wait_for(follower, 1) == 1
+    assert await first == 1
+    assert leader.cancelled()
+    bgm.mark_episodes_watched.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batch_cancelled_while_waiting_lets_followers_mark_again(svc):
+    bgm = _async_bgm()
+    release = asyncio.Event()
+
+    async def mark(**kwargs):
+        if kwargs["ep_id"] == 1003:
+            await release.wait()
+        return 1
+
+    bgm.mark_episode_watched = AsyncMock(side_effect=mark)
+    bgm.mark_episodes_watched = AsyncMock()
+
+    _batch_window(1000)
+    first = asyncio.ensure_future(svc._mark_episode_batched(bgm, 100, 1003))
+    await asyncio.sleep(0)
+    leader = asyncio.ensure_future(svc._mark_episode_batched(bgm, 100, 1004))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(svc._mark_episode_batched(bgm, 100, 1005))
+    await asyncio.sleep(0)
+
+    # 发起者在等待进行中的标记时被取消：等待者自行重新标记，而不是随之取消
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.wait_for(follower, 1) == 1
+    assert await first == 1
+    assert leader.cancelled()
+    bgm.mark_episode_watched.assert_any_await(subject_id=100, ep_id=1005)
+    bgm.mark_episodes_watched.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_backfill_batches_episodes_of_same_subject(svc):
+    bgm = _async_bgm()
+    _gated_single_mark(svc, bgm)
+    bgm.mark_episodes_watched = AsyncMock(return_value={1004: 1, 1005: 1})
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+
+    _batch_window(1000)
+    items = [
+        _item(episode=3),
+        _item(title="番剧B", episode=1),
+        _item(episode=4),
+        _item(episode=5),
+    ]
+    results = await svc.sync_custom_items_native(items, "custom")
+
+    assert [r.status for r in results] == ["success"] * 4
+    assert [r.data["episode_id"] for r in results] == [1003, 1001, 1004, 1005]
+    bgm.mark_episodes_watched.assert_awaited_once_with(
+        subject_id=100, ep_ids=[1004, 1005]
+    )
+
+
+@pytest.mark.asyncio
+async def test_local_subject_lookup_does_not_block_loop(svc):
+    """bangumi-data 加载中时本地匹配会等待，不能阻塞事件循环"""
+    release = threading.Event()
+
+    def local(item):
+        assert release.wait(2), "事件循环被阻塞"
+        return "100", True, ""
+
+    svc._lookup_unmatched = MagicMock(return_value=(None, "v1"))
+    svc._find_subject_id_local = MagicMock(side_effect=local)
+
+    async def release_soon():
+        await asyncio.sleep(0)
+        release.set()
+
+    result, _ = await asyncio.gather(
+        svc._find_subject_id_async(_item()), release_soon()
+    )
+    assert result == ("100", True, "")
+
+
+@pytest.mark.asyncio
+async def test_local_subject_match_reaches_caller_context(svc):
+    def local(item):
+        return svc._note_match(("100", True, ""), "bangumi_data")
+
+    svc._lookup_unmatched = MagicMock(return_value=(None, "v1"))
+    svc._find_subject_id_local = MagicMock(side_effect=local)
+
+    await svc._find_subject_id_async(_item())
+    assert sync_mod._subject_match.get() == ("bangumi_data", "100", True)
+
+
+@pytest.mark.asyncio
+async def test_movie_mark_watching_runs_natively_in_slot(svc):
+    sync_mod.config_manager.get.return_value = True
+    svc._check_user_permission = MagicMock(return_value=True)
+    svc._is_title_blocked = MagicMock(return_value=False)
+    bgm = MagicMock()
+    svc._find_subject_id_async = AsyncMock(return_value=("100", False, None))
+    svc._get_async_bangumi_api_for_user = MagicMock(return_value=bgm)
+    slot = svc._native_sync_slot()
+
+    async def ensure(subject_id):
+        # 与普通同步共用并发上限
+        assert slot._value == 1
+        return 1
+
+    bgm.ensure_subject_watching = AsyncMock(side_effect=ensure)
+
+    item = _item(media_type="movie", episode=1, sync_action="mark_watching")
+    result = await svc.sync_custom_item_native(item, "custom")
+
+    assert result.status == "success"
+    assert result.message == "播放开始：条目标记为在看"
+    bgm.ensure_subject_watching.assert_awaited_once_with("100")
+    assert svc.db.log_sync_record.call_args.kwargs["status"] == "success"
+    assert slot._value == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_playback_start_uses_native_mark_watching(svc):
+    svc._sync_movie_watching_native = AsyncMock(
+        return_value=SyncResponse(status="success", message="ok")
+    )
+    svc._register_task("plex_1", {}, "plex")
+    item = _item(media_type="movie", episode=1)
+
+    result = await svc._run_native_task("plex_1", "Plex", "plex", lambda: (item, True))
+
+    assert result.status == "success"
+    called_item = svc._sync_movie_watching_native.await_args.args[0]
+    assert called_item.sync_action == "mark_watching"
+    assert svc.get_sync_task_status("plex_1")["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_native_task_failure_marks_task_failed(svc):
+    svc._register_task("emby_1", {}, "emby")
+    svc.sync_custom_item_native = AsyncMock(side_effect=RuntimeError("boom"))
+
+    result = await svc._run_native_task(
+        "emby_1", "Emby", "emby", lambda: (_item(), False)
+    )
+
+    assert result.status == "error"
+    assert "boom" in result.message
+    task = svc.get_sync_task_status("emby_1")
+    assert (task["status"], task["error"]) == ("failed", "boom")
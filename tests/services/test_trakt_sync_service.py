@@ -403,6 +403,16 @@ class TestConvertTraktHistoryToCustomItem:
             assert result is not None
             assert result.title == "Test Show"
 
+    def test_episode_carries_show_provider_ids(self):
+        """剧集携带整部剧的外部 ID（仅 TMDB / TVDB / IMDb）"""
+        service = _make_service()
+        item = _make_episode_item()
+        item.show["ids"].update({"trakt": 1, "slug": "s", "tvdb": 42, "imdb": None})
+        with patch("app.services.trakt.sync_service.bangumi_data") as mock_bd:
+            mock_bd.get_title_by_tmdb_id.return_value = "标题"
+            result = service._convert_trakt_history_to_custom_item("u", item)
+        assert result.provider_ids == {"tmdb": "123", "tvdb": "42"}
+
     def test_episode_with_first_aired(self):
         """覆盖 line 396: episode.first_aired"""
         service = _make_service()
@@ -469,6 +479,7 @@ class TestTraktMovieHistoryToCustomItem:
             assert result is not None
             assert result.title == "电影标题"
             assert result.media_type == "movie"
+            assert result.provider_ids == {"tmdb": "456"}
 
     def test_movie_tmdb_fallback_str(self):
         """movie/xxx 查不到，用 str(tmdb) 查"""
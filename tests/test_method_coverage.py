@@ -73,7 +73,7 @@ class TestSyncServiceReal:
             service = SyncService()
 
             # Check methods exist
-            assert hasattr(service, "sync_custom_item")
+            assert hasattr(service, "sync_custom_item_native")
             assert hasattr(service, "sync_plex_item")
             assert hasattr(service, "sync_emby_item")
             assert hasattr(service, "sync_jellyfin_item")
@@ -65,7 +65,7 @@ class TestTraktClientAsync:
         """测试确保客户端初始化"""
         with (
             patch("app.services.trakt.client.config_manager") as mock_config,
-            patch("app.services.trakt.client.httpx.AsyncClient") as mock_async_client,
+            patch("app.services.trakt.client.get_async_client") as mock_async_client,
         ):
             mock_config.get_trakt_config.return_value = {"client_id": "test_id"}
             mock_client = AsyncMock()
@@ -76,11 +76,11 @@ class TestTraktClientAsync:
             client = TraktClient(access_token="test_token")
             await client._ensure_client()
 
-            assert client._client is not None
+            assert client._client is mock_client
 
     @pytest.mark.asyncio
     async def test_close(self):
-        """测试关闭客户端"""
+        """测试关闭客户端：只释放引用，不关闭共享连接池"""
         with patch("app.services.trakt.client.config_manager") as mock_config:
             mock_config.get_trakt_config.return_value = {"client_id": "test_id"}
 
@@ -92,7 +92,7 @@ class TestTraktClientAsync:
 
             await client.close()
 
-            mock_client.aclose.assert_called_once()
+            mock_client.aclose.assert_not_called()
             assert client._client is None
 
 
@@ -110,7 +110,7 @@ class TestTraktClientMethods:
         """测试获取所有观看历史"""
         with (
             patch("app.services.trakt.client.config_manager") as mock_config,
-            patch("app.services.trakt.client.httpx.AsyncClient") as mock_async_client,
+            patch("app.services.trakt.client.get_async_client") as mock_async_client,
         ):
             mock_config.get_trakt_config.return_value = {"client_id": "test_id"}
 
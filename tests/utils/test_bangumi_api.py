@@ -2,12 +2,14 @@
 Bangumi API 工具测试
 """
 
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 import requests
 
 from app.utils.bangumi_api import BangumiApi
+from app.utils.bgm_episode_index import EpisodeIndex
 
 
 class TestBangumiApi:
@@ -50,9 +52,11 @@ class TestBangumiApi:
         assert "get_related_subjects" in api._cache
         assert "get_episodes" in api._cache
 
-    def test_init_proxy_failed_flag(self):
+    def test_init_routes(self):
         api = BangumiApi()
-        assert api._proxy_failed is False
+        assert [r.name for r in api._routes] == ["direct"]
+        api = BangumiApi(http_proxy="http://proxy:8080", bgm_api_proxy="https://p.tv")
+        assert [r.name for r in api._routes] == ["api_proxy", "http_proxy", "direct"]
 
     def test_init_sets_headers(self):
         api = BangumiApi(access_token="test_token")
@@ -85,6 +89,7 @@ class TestBangumiApi:
             "get_subject",
             "get_related_subjects",
             "get_episodes",
+            "episode_index",
         ]
         assert cache_keys == expected_keys
 
@@ -102,17 +107,6 @@ class TestBangumiApiMethods:
         api._cache["search"]["new_key"] = {"data": "new_value"}
         assert api._cache["search"]["new_key"] == {"data": "new_value"}
 
-    def test_proxy_failed_flag_set(self):
-        api = BangumiApi()
-        api._proxy_failed = True
-        assert api._proxy_failed is True
-
-    def test_proxy_failed_flag_reset(self):
-        api = BangumiApi()
-        api._proxy_failed = True
-        api._proxy_failed = False
-        assert api._proxy_failed is False
-
 
 class TestPutCache:
     """测试 LRU 缓存"""
@@ -133,95 +127,6 @@ class TestPutCache:
         assert api._cache["search"]["k1"] == "v2"
 
 
-class TestTryDirectConnection:
-    """测试 _try_direct_connection"""
-
-    def test_get_success(self):
-        api = BangumiApi()
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.get.return_value = mock_resp
-            MockSession.return_value = mock_session
-            result = api._try_direct_connection("GET", "https://example.com")
-            assert result == mock_resp
-
-    def test_post_success(self):
-        api = BangumiApi()
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.post.return_value = mock_resp
-            MockSession.return_value = mock_session
-            result = api._try_direct_connection("POST", "https://example.com", json={})
-            assert result == mock_resp
-
-    def test_put_success(self):
-        api = BangumiApi()
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.put.return_value = mock_resp
-            MockSession.return_value = mock_session
-            result = api._try_direct_connection("PUT", "https://example.com")
-            assert result == mock_resp
-
-    def test_patch_success(self):
-        api = BangumiApi()
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.patch.return_value = mock_resp
-            MockSession.return_value = mock_session
-            result = api._try_direct_connection("PATCH", "https://example.com")
-            assert result == mock_resp
-
-    def test_unsupported_method(self):
-        api = BangumiApi()
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            MockSession.return_value = mock_session
-            with pytest.raises(ValueError, match="不支持的HTTP方法"):
-                api._try_direct_connection("DELETE", "https://example.com")
-
-    def test_error_status_returns_none(self):
-        api = BangumiApi()
-        mock_resp = MagicMock()
-        mock_resp.status_code = 500
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.get.return_value = mock_resp
-            MockSession.return_value = mock_session
-            result = api._try_direct_connection("GET", "https://example.com")
-            assert result is None
-
-    def test_exception_reraises(self):
-        api = BangumiApi()
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.get.side_effect = ConnectionError("fail")
-            MockSession.return_value = mock_session
-            with pytest.raises(ConnectionError):
-                api._try_direct_connection("GET", "https://example.com")
-
-    def test_removes_proxies_from_kwargs(self):
-        api = BangumiApi()
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        with patch("app.utils.bangumi_api.requests.Session") as MockSession:
-            mock_session = MagicMock()
-            mock_session.get.return_value = mock_resp
-            MockSession.return_value = mock_session
-            result = api._try_direct_connection(
-                "GET", "https://example.com", proxies={"http": "p"}
-            )
-            assert result == mock_resp
-
-
 class TestDiagnoseNetworkIssue:
     """测试 _diagnose_network_issue"""
 
@@ -358,62 +263,34 @@ class TestRequestWithRetry:
                 "GET", mock_session, "https://example.com", max_retries=0
             )
 
-    def test_proxy_fallback_to_direct(self):
+    def test_proxy_failure_falls_over_to_direct(self):
         api = BangumiApi(http_proxy="http://proxy:8080")
         mock_session = self._mock_session()
-        mock_session.get.side_effect = requests.exceptions.ConnectionError("proxy fail")
         mock_direct = MagicMock()
         mock_direct.status_code = 200
-        with (
-            patch("app.utils.bangumi_api.time.sleep"),
-            patch.object(api, "_try_direct_connection", return_value=mock_direct),
-        ):
-            result = api._request_with_retry(
-                "GET", mock_session, "https://example.com", max_retries=0
-            )
+        mock_session.get.side_effect = [
+            requests.exceptions.ProxyError("proxy fail"),
+            mock_direct,
+        ]
+        result = api._request_with_retry(
+            "GET", mock_session, "https://example.com", max_retries=0
+        )
         assert result == mock_direct
-        assert api._proxy_failed is True
+        proxies = [c.kwargs["proxies"] for c in mock_session.get.call_args_list]
+        assert proxies == [
+            {"http": "http://proxy:8080", "https": "http://proxy:8080"},
+            {"http": None, "https": None},
+        ]
 
-    def test_proxy_fallback_direct_fails(self):
+    def test_all_routes_fail_raises(self):
         api = BangumiApi(http_proxy="http://proxy:8080")
         mock_session = self._mock_session()
-        mock_session.get.side_effect = requests.exceptions.ConnectionError("proxy fail")
-        with (
-            patch("app.utils.bangumi_api.time.sleep"),
-            patch.object(
-                api,
-                "_try_direct_connection",
-                side_effect=ConnectionError("direct fail"),
-            ),
-            pytest.raises(requests.exceptions.ConnectionError),
-        ):
+        mock_session.get.side_effect = requests.exceptions.ConnectionError("fail")
+        with pytest.raises(requests.exceptions.ConnectionError):
             api._request_with_retry(
                 "GET", mock_session, "https://example.com", max_retries=0
             )
-
-    def test_proxy_already_failed_uses_direct(self):
-        api = BangumiApi(http_proxy="http://proxy:8080")
-        api._proxy_failed = True
-        mock_session = self._mock_session()
-        mock_direct = MagicMock()
-        mock_direct.status_code = 200
-        with patch.object(api, "_try_direct_connection", return_value=mock_direct):
-            result = api._request_with_retry("GET", mock_session, "https://example.com")
-        assert result == mock_direct
-
-    def test_proxy_already_failed_direct_raises(self):
-        api = BangumiApi(http_proxy="http://proxy:8080")
-        api._proxy_failed = True
-        mock_session = self._mock_session()
-        with (
-            patch.object(
-                api,
-                "_try_direct_connection",
-                side_effect=ConnectionError("fail"),
-            ),
-            pytest.raises(ConnectionError),
-        ):
-            api._request_with_retry("GET", mock_session, "https://example.com")
+        assert mock_session.get.call_count == 2
 
     def test_dns_error_triggers_diagnosis(self):
         api = BangumiApi()
@@ -1136,27 +1013,29 @@ class TestBgmSearch:
         api = BangumiApi()
         with (
             patch.object(api, "search", return_value=[{"id": 1, "name": "番剧"}]),
+            patch.object(api, "search_old", return_value=[]),
             patch.object(api, "title_diff_ratio", return_value=0.9),
         ):
             result = api.bgm_search("番剧", "original", "2024-01-15")
             assert result is not None
 
     def test_precise_search_ori_title_first(self):
+        """并发搜索时原标题结果仍优先于标题结果"""
         api = BangumiApi()
-        calls = []
 
         def mock_search(title, **kwargs):
-            calls.append(title)
             if title == "original":
+                time.sleep(0.05)
                 return [{"id": 1, "name": "orig"}]
-            return []
+            return [{"id": 2, "name": "中文"}]
 
         with (
             patch.object(api, "search", side_effect=mock_search),
+            patch.object(api, "search_old", return_value=[]),
             patch.object(api, "title_diff_ratio", return_value=0.9),
         ):
-            api.bgm_search("中文", "original", "2024-01-15")
-            assert calls[0] == "original"
+            result = api.bgm_search("中文", "original", "2024-01-15")
+            assert result[0]["id"] == 1
 
     def test_movie_wider_date_range(self):
         """覆盖 is_movie=True 分支"""
@@ -1171,6 +1050,7 @@ class TestBgmSearch:
 
         with (
             patch.object(api, "search", side_effect=mock_search),
+            patch.object(api, "search_old", return_value=[]),
             patch.object(api, "title_diff_ratio", return_value=0.9),
         ):
             result = api.bgm_search("Movie", "ori", "2024-01-15", is_movie=True)
@@ -1325,49 +1205,46 @@ class TestTryResolveSequelByAirdate:
 class TestLongSeriesEpisodeSync:
     """超长连载番剧章节匹配"""
 
-    def test_find_episode_by_sort_offset_fast_path(self):
+    def test_find_episode_by_sort_uses_episode_index(self):
         api = BangumiApi()
-        page = {"data": [{"id": 20606, "sort": 500, "ep": 500}], "total": 1328}
-        with patch.object(api, "_fetch_episodes_page", return_value=page):
-            found = api._find_episode_by_sort("899", 500)
-        assert found is not None
-        assert found["id"] == 20606
+        page = {"data": [{"id": 20606, "sort": 500, "ep": 500}], "total": 1}
+        with patch.object(api, "_fetch_episodes_page", return_value=page) as fetch:
+            assert api._find_episode_by_sort("899", 500)["id"] == 20606
+            assert api._find_episode_by_sort("899", 500)["id"] == 20606
+        fetch.assert_called_once_with("899", 0)
 
-    def test_find_episode_by_sort_offset_mismatch_falls_back(self):
+    def test_find_episode_by_sort_falls_back_to_ep(self):
         api = BangumiApi()
-        bad_page = {"data": [{"id": 1, "sort": 12, "ep": 12}], "total": 1328}
-        full_eps = {
-            "data": [{"id": 999, "sort": 500, "ep": 500}],
-            "total": 1328,
-        }
-        with (
-            patch.object(api, "_fetch_episodes_page", return_value=bad_page),
-            patch.object(api, "get_episodes", return_value=full_eps),
-        ):
+        index = EpisodeIndex.from_episodes(
+            [
+                {"id": 1, "sort": 12, "ep": 12},
+                {"id": 999, "sort": 1020, "ep": 500},
+            ]
+        )
+        with patch.object(api, "get_episode_index", return_value=index):
             found = api._find_episode_by_sort("899", 500)
         assert found is not None
         assert found["id"] == 999
 
     def test_resolve_episode_by_airdate_in_subject(self):
         api = BangumiApi()
-        episodes = {
-            "total": 1328,
-            "data": [
+        index = EpisodeIndex.from_episodes(
+            [
                 {"id": 1, "sort": 1, "type": 0, "airdate": "1996-01-8"},
                 {"id": 350, "sort": 350, "type": 0, "airdate": "2008-3-17"},
             ],
-        }
-        with patch.object(api, "get_episodes", return_value=episodes):
+            total=1328,
+        )
+        with patch.object(api, "get_episode_index", return_value=index):
             result = api._resolve_episode_by_airdate_in_subject("899", "2008-03-17")
         assert result == ("899", 350)
 
     def test_resolve_episode_by_airdate_skips_short_series(self):
         api = BangumiApi()
-        episodes = {
-            "total": 12,
-            "data": [{"id": 1, "sort": 1, "airdate": "2024-01-01"}],
-        }
-        with patch.object(api, "get_episodes", return_value=episodes):
+        index = EpisodeIndex.from_episodes(
+            [{"id": 1, "sort": 1, "airdate": "2024-01-01"}], total=12
+        )
+        with patch.object(api, "get_episode_index", return_value=index):
             result = api._resolve_episode_by_airdate_in_subject("123", "2024-01-01")
         assert result is None
 
@@ -0,0 +1,181 @@
+"""原生异步 Bangumi 客户端单元测试。"""
+
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.utils import bangumi_api_async as async_mod
+from app.utils.bangumi_api_async import AsyncBangumiApi
+
+
+def _api_with(handler, **kwargs):
+    """构造使用 MockTransport 的客户端，返回 (api, 请求记录)"""
+    calls = []
+
+    def _record(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return handler(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_record))
+    api = AsyncBangumiApi(access_token="tok", **kwargs)
+    api._client = lambda proxy=None: client
+    return api, calls
+
+
+@pytest.mark.asyncio
+async def test_get_subject_cached_in_memory():
+    api, calls = _api_with(lambda req: httpx.Response(200, json={"id": 7}))
+    assert await api.get_subject(7) == {"id": 7}
+    assert await api.get_subject(7) == {"id": 7}
+    assert len(calls) == 1
+    assert calls[0].headers["Authorization"] == "Bearer tok"
+    assert api.get_cache_stats()["get_subject"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_on_server_error_then_success():
+    responses = iter([httpx.Response(503), httpx.Response(200, json={"id": 1})])
+    api, calls = _api_with(lambda req: next(responses))
+    with patch.object(async_mod.asyncio, "sleep", new_callable=AsyncMock) as sleep:
+        assert await api.get_subject(1) == {"id": 1}
+    assert len(calls) == 2
+    sleep.assert_awaited_once_with(1)
+
+
+@pytest.fixture
+def notify():
+    """替换 send_notify，记录发送通知的线程"""
+    sent = threading.Event()
+    threads = []
+
+    def _send(*args, **kwargs):
+        threads.append(threading.current_thread())
+        sent.set()
+
+    with patch("app.utils.notifier.send_notify", side_effect=_send) as mock:
+        mock.sent = sent
+        mock.threads = threads
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_retry_exhausted_raises_and_notifies(notify):
+    api, calls = _api_with(lambda req: httpx.Response(500))
+    with patch.object(async_mod.asyncio, "sleep", new_callable=AsyncMock):
+        with pytest.raises(httpx.HTTPStatusError):
+            await api.get("subjects/1")
+    assert len(calls) == 4
+    assert await asyncio.to_thread(notify.sent.wait, 2)
+    notify.assert_called_once()
+    assert notify.call_args.args[0] == "api_error"
+    # 通知为阻塞 I/O，在线程池中发送
+    assert notify.threads[0] is not threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_auth_error_raises_value_error(notify):
+    api, _ = _api_with(lambda req: httpx.Response(401))
+    with pytest.raises(ValueError):
+        await api.get("me")
+    assert await asyncio.to_thread(notify.sent.wait, 2)
+    assert notify.call_args.args[0] == "api_auth_error"
+    assert notify.threads[0] is not threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_search_is_anonymous():
+    api, calls = _api_with(lambda req: httpx.Response(200, json={"data": [{"id": 3}]}))
+    assert await api.search("x", "2024-01-01", "2024-01-05") == [{"id": 3}]
+    assert "Authorization" not in calls[0].headers
+    body = json.loads(calls[0].content)
+    assert body["keyword"] == "x"
+
+
+@pytest.mark.asyncio
+async def test_mark_episode_watched_uncollected_subject():
+    def handler(req: httpx.Request) -> httpx.Response:
+        if req.method == "GET":
+            return httpx.Response(404, json={})
+        return httpx.Response(204)
+
+    api, calls = _api_with(handler, username="alice")
+    assert await api.mark_episode_watched(10, 100) == 2
+    assert [(c.method, c.url.path) for c in calls] == [
+        ("GET", "/v0/users/alice/collections/10"),
+        ("POST", "/v0/users/-/collections/10"),
+        ("PUT", "/v0/users/-/collections/-/episodes/100"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_mark_episode_watched_already_watched():
+    def handler(req: httpx.Request) -> httpx.Response:
+        if req.url.path.endswith("/collections/10"):
+            return httpx.Response(200, json={"type": 3})
+        return httpx.Response(200, json={"type": 2})
+
+    api, calls = _api_with(handler)
+    assert await api.mark_episode_watched(10, 100) == 0
+    assert all(c.method == "GET" for c in calls)
+
+
+@pytest.mark.asyncio
+async def test_mark_episodes_watched_single_patch():
+    def handler(req: httpx.Request) -> httpx.Response:
+        if req.url.path.endswith("/collections/10"):
+            return httpx.Response(200, json={"type": 1})
+        if req.method == "GET":
+            data = [{"episode": {"id": 100}, "type": 2}]
+            return httpx.Response(200, json={"data": data, "total": 1})
+        return httpx.Response(204)
+
+    api, calls = _api_with(handler, username="alice")
+    assert await api.mark_episodes_watched(10, [100, 101, 102]) == {
+        100: 0,
+        101: 1,
+        102: 1,
+    }
+    assert [(c.method, c.url.path) for c in calls] == [
+        ("GET", "/v0/users/alice/collections/10"),
+        ("POST", "/v0/users/-/collections/10"),
+        ("GET", "/v0/users/-/collections/10/episodes"),
+        ("PATCH", "/v0/users/-/collections/10/episodes"),
+    ]
+    assert json.loads(calls[-1].content) == {"episode_id": [101, 102], "type": 2}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_stores_are_used_off_the_event_loop():
+    """元数据缓存与收藏账本（SQLite）的读写不在事件循环线程中执行"""
+    loop_thread = threading.current_thread()
+    threads = []
+
+    class _Recorder:
+        def __getattr__(self, name):
+            def _call(*args, **kwargs):
+                threads.append((name, threading.current_thread()))
+                return {"has_episodes": True, "begin_reconcile": False}.get(name)
+
+            return _call
+
+    def handler(req: httpx.Request) -> httpx.Response:
+        if req.method == "GET":
+            return httpx.Response(200, json={"id": 10, "type": 3})
+        return httpx.Response(204)
+
+    api, _ = _api_with(
+        handler,
+        username="alice",
+        metadata_cache=_Recorder(),
+        collection_ledger=_Recorder(),
+    )
+    await api.get_subject(10)
+    assert await api.mark_episode_watched(10, 100) == 1
+    names = {name for name, _ in threads}
+    assert {"lookup", "put", "begin_reconcile", "subject_type"} <= names
+    assert {"watched_episodes", "record_subject", "record_episodes"} <= names
+    assert all(thread is not loop_thread for _, thread in threads)
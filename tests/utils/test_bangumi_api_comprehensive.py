@@ -32,15 +32,13 @@ class TestBangumiApiFull:
         assert api2._cache["search"]["key"] == "value2"
 
     @patch("app.utils.bangumi_api.requests.Session")
-    def test_proxy_failed_flag_independent(self, mock_session):
-        """测试代理失败标志独立"""
+    def test_routes_independent(self, mock_session):
+        """测试各实例的候选线路按各自代理配置生成"""
         api1 = BangumiApi(http_proxy="http://proxy1:8080")
         api2 = BangumiApi(http_proxy="http://proxy2:8080")
 
-        api1._proxy_failed = True
-
-        assert api1._proxy_failed is True
-        assert api2._proxy_failed is False
+        assert api1._routes[0].proxy == "http://proxy1:8080"
+        assert api2._routes[0].proxy == "http://proxy2:8080"
 
 
 class TestBangumiApiCacheFull:
@@ -68,5 +68,6 @@ class TestBangumiApiCache:
         api._cache["get_subject"]["test"] = "value"
         api._cache["get_related_subjects"]["test"] = "value"
         api._cache["get_episodes"]["test"] = "value"
+        api._cache["episode_index"]["test"] = "value"
 
-        assert len(api._cache) == 5
+        assert len(api._cache) == 6
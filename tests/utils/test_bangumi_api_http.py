@@ -3,6 +3,8 @@ Bangumi API HTTP Mock 测试
 使用 responses 库模拟外部 API 调用
 """
 
+import json
+
 import pytest
 import responses
 
@@ -293,6 +295,83 @@ def test_get_subject_collection():
     assert result["type"] == 3
 
 
+@responses.activate
+def test_mark_episodes_watched_skips_watched_and_patches_rest():
+    """测试批量标记 - 一次读取章节收藏状态，一次 PATCH 标记未看过的章节"""
+    responses.add(
+        responses.GET,
+        "https://api.bgm.tv/v0/users/testuser/collections/123",
+        json={"type": 3, "subject_id": 123},
+        status=200,
+    )
+    responses.add(
+        responses.GET,
+        "https://api.bgm.tv/v0/users/-/collections/123/episodes",
+        json={
+            "data": [
+                {"episode": {"id": 1}, "type": 2},
+                {"episode": {"id": 2}, "type": 0},
+                {"episode": {"id": 3}, "type": 0},
+            ],
+            "total": 3,
+        },
+        status=200,
+    )
+    responses.add(
+        responses.PATCH,
+        "https://api.bgm.tv/v0/users/-/collections/123/episodes",
+        status=204,
+    )
+
+    api = BangumiApi(username="testuser", access_token="test_token")
+    result = api.mark_episodes_watched("123", ["1", "2", "3"])
+
+    assert result == {"1": 0, "2": 1, "3": 1}
+    assert len(responses.calls) == 3
+    patch_body = responses.calls[2].request.body
+    assert json.loads(patch_body) == {"episode_id": [2, 3], "type": 2}
+
+
+@responses.activate
+def test_mark_episodes_watched_uncollected_subject():
+    """测试批量标记 - 未收藏时先收藏为在看，不再读取章节状态"""
+    responses.add(
+        responses.GET,
+        "https://api.bgm.tv/v0/users/testuser/collections/123",
+        json={},
+        status=404,
+    )
+    responses.add(
+        responses.POST,
+        "https://api.bgm.tv/v0/users/-/collections/123",
+        status=204,
+    )
+    responses.add(
+        responses.PATCH,
+        "https://api.bgm.tv/v0/users/-/collections/123/episodes",
+        status=204,
+    )
+
+    api = BangumiApi(username="testuser", access_token="test_token")
+    assert api.mark_episodes_watched("123", [5, 6]) == {5: 2, 6: 2}
+    assert [c.request.method for c in responses.calls] == ["GET", "POST", "PATCH"]
+
+
+@responses.activate
+def test_mark_episodes_watched_subject_completed():
+    """测试批量标记 - 整部已看过时全部跳过"""
+    responses.add(
+        responses.GET,
+        "https://api.bgm.tv/v0/users/testuser/collections/123",
+        json={"type": 2},
+        status=200,
+    )
+
+    api = BangumiApi(username="testuser", access_token="test_token")
+    assert api.mark_episodes_watched("123", [5, 6]) == {5: 0, 6: 0}
+    assert len(responses.calls) == 1
+
+
 @responses.activate
 def test_get_ep_collection():
     """测试获取单集收藏状态"""
@@ -1,4 +1,4 @@
-"""BangumiApi 内部路径：直连、诊断、重试、JSON 容错、静态工具等（不依赖外网）。"""
+"""BangumiApi 内部路径：线路切换、诊断、重试、JSON 容错、静态工具等（不依赖外网）。"""
 
 import socket
 from unittest.mock import MagicMock, patch
@@ -19,67 +19,6 @@ def _session_resp(status=200, json_body=None, json_exc=None):
     return r
 
 
-class TestTryDirectConnection:
-    def test_get_success_adds_timeout_and_no_proxy(self):
-        mock_sess = MagicMock()
-        out = _session_resp(200, {})
-        mock_sess.get.return_value = out
-
-        with patch("app.utils.bangumi_api.requests.Session", return_value=mock_sess):
-            api = BangumiApi(access_token="tok")
-            res = api._try_direct_connection("GET", "https://example.test/api")
-
-        assert res is out
-        call_kw = mock_sess.get.call_args.kwargs
-        assert call_kw["timeout"] == 15
-        assert call_kw.get("proxies") is None
-        mock_sess.close.assert_called_once()
-
-    def test_post_put_patch_and_high_status_returns_none(self):
-        for method, attr in (("POST", "post"), ("PUT", "put"), ("PATCH", "patch")):
-            mock_sess = MagicMock()
-            bad = _session_resp(502)
-            getattr(mock_sess, attr).return_value = bad
-            with patch(
-                "app.utils.bangumi_api.requests.Session", return_value=mock_sess
-            ):
-                api = BangumiApi()
-                res = api._try_direct_connection(
-                    method, "https://example.test/x", verify=True
-                )
-            assert res is None
-
-    def test_unsupported_method_raises(self):
-        mock_sess = MagicMock()
-        with patch("app.utils.bangumi_api.requests.Session", return_value=mock_sess):
-            api = BangumiApi()
-            with pytest.raises(ValueError, match="不支持的HTTP方法"):
-                api._try_direct_connection("DELETE", "https://example.test/x")
-
-    def test_exception_reraises_after_close(self):
-        mock_sess = MagicMock()
-        mock_sess.get.side_effect = requests.exceptions.Timeout("t")
-        with patch("app.utils.bangumi_api.requests.Session", return_value=mock_sess):
-            api = BangumiApi()
-            with pytest.raises(requests.exceptions.Timeout):
-                api._try_direct_connection("GET", "https://example.test/x")
-        mock_sess.close.assert_called_once()
-
-    def test_strips_proxies_from_kwargs(self):
-        mock_sess = MagicMock()
-        mock_sess.get.return_value = _session_resp(200)
-        with patch("app.utils.bangumi_api.requests.Session", return_value=mock_sess):
-            api = BangumiApi()
-            api._try_direct_connection(
-                "GET",
-                "https://example.test/x",
-                proxies={"http": "bad"},
-                timeout=99,
-            )
-        assert "proxies" not in mock_sess.get.call_args.kwargs
-        assert mock_sess.get.call_args.kwargs["timeout"] == 99
-
-
 class TestDiagnoseNetworkIssue:
     def test_dns_gaierror_returns_early(self):
         api = BangumiApi()
@@ -113,21 +52,18 @@ class TestDiagnoseNetworkIssue:
 
 
 class TestRequestWithRetry:
-    def test_proxy_failed_uses_direct_connection(self):
-        api = BangumiApi(http_proxy="http://127.0.0.1:9")
-        api._proxy_failed = True
-        ok = _session_resp(200, {"ok": True})
-        with patch.object(api, "_try_direct_connection", return_value=ok) as td:
-            res = api._request_with_retry("GET", api.req, "https://bgm.test/me")
-        td.assert_called_once()
+    def test_reverse_proxy_url_rewritten_for_direct_route(self):
+        api = BangumiApi(bgm_api_proxy="https://mirror.test")
+        ok = _session_resp(200)
+        api.req.get = MagicMock(
+            side_effect=[requests.exceptions.ConnectionError("mirror down"), ok]
+        )
+        res = api._request_with_retry(
+            "GET", api.req, "https://mirror.test/v0/me", max_retries=0
+        )
         assert res is ok
-
-    def test_proxy_failed_direct_raises(self):
-        api = BangumiApi(http_proxy="http://127.0.0.1:9")
-        api._proxy_failed = True
-        with patch.object(api, "_try_direct_connection", side_effect=OSError("x")):
-            with pytest.raises(OSError):
-                api._request_with_retry("GET", api.req, "https://bgm.test/me")
+        urls = [c.args[0] for c in api.req.get.call_args_list]
+        assert urls == ["https://mirror.test/v0/me", "https://api.bgm.tv/v0/me"]
 
     def test_session_post_put_patch_paths(self):
         for method, name in (("POST", "post"), ("PUT", "put"), ("PATCH", "patch")):
@@ -177,9 +113,8 @@ class TestRequestWithRetry:
 
     @patch("app.utils.bangumi_api.time.sleep")
     @patch.object(BangumiApi, "_diagnose_network_issue")
-    @patch.object(BangumiApi, "_try_direct_connection", return_value=None)
     def test_dns_style_error_falls_through_to_diagnose_when_no_proxy(
-        self, _direct, diag, _sleep
+        self, diag, _sleep
     ):
         api = BangumiApi(http_proxy=None)
         api.req.get = MagicMock(
@@ -189,19 +124,36 @@ class TestRequestWithRetry:
             api._request_with_retry("GET", api.req, "https://bgm.test/r", max_retries=0)
         diag.assert_called_once()
 
-    @patch("app.utils.bangumi_api.time.sleep")
-    def test_proxy_retry_then_direct_success_sets_flag(self, _sleep):
-        api = BangumiApi(http_proxy="http://127.0.0.1:9")
+
+class TestRequestWalk:
+    """重试策略不涉及 I/O：逐步应答 _request_walk 的网络操作"""
+
+    def test_server_error_backs_off_then_returns_response(self):
+        api = BangumiApi()
+        url = "https://walk.test/v0/x"
+        walk = api._request_walk("GET", url, max_retries=2)
+        assert next(walk) == ("acquire", url)
+        assert walk.send(None)[0] == "send"
+        assert walk.send(_session_resp(500)) == ("sleep", 1)
+        assert next(walk) == ("acquire", url)
+        walk.send(None)
         ok = _session_resp(200)
-        api.req.get = MagicMock(
-            side_effect=requests.exceptions.ConnectionError("proxy dead")
-        )
-        with patch.object(api, "_try_direct_connection", return_value=ok):
-            res = api._request_with_retry(
-                "GET", api.req, "https://bgm.test/r", max_retries=0
-            )
-        assert res is ok
-        assert api._proxy_failed is True
+        with pytest.raises(StopIteration) as stop:
+            walk.send(ok)
+        assert stop.value.value is ok
+
+    def test_transport_error_thrown_in_is_retried(self):
+        api = BangumiApi()
+        url = "https://walk.test/v0/y"
+        walk = api._request_walk("GET", url, max_retries=1)
+        next(walk)
+        walk.send(None)
+        error = requests.exceptions.ConnectionError("reset")
+        assert walk.throw(error) == ("sleep", 1)
+        next(walk)
+        walk.send(None)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            walk.throw(error)
 
 
 class TestCheckAuthAndGetMe:
@@ -0,0 +1,198 @@
+"""BangumiApi 进程级客户端池单元测试。"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_pool import POOLED_CACHE_TTL_SECONDS, BangumiApiPool
+
+
+def _account(**overrides):
+    cfg = {
+        "username": "alice",
+        "access_token": "tok",
+        "private": False,
+        "http_proxy": "",
+        "ssl_verify": True,
+        "bgm_api_proxy": "",
+        "bgm_next_proxy": "",
+    }
+    cfg.update(overrides)
+    return cfg
+
+
+def test_same_account_reuses_instance_and_counts_hits():
+    pool = BangumiApiPool()
+    factory = MagicMock(side_effect=lambda **kw: MagicMock())
+
+    a = pool.get(**_account(), factory=factory)
+    b = pool.get(**_account(), factory=factory)
+
+    assert a is b
+    assert factory.call_count == 1
+    stats = pool.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["clients"] == 1
+
+
+def test_factory_receives_pooled_cache_ttl():
+    pool = BangumiApiPool()
+    factory = MagicMock(return_value=MagicMock())
+
+    pool.get(**_account(), factory=factory)
+
+    assert factory.call_args.kwargs["cache_ttl"] == POOLED_CACHE_TTL_SECONDS
+    assert factory.call_args.kwargs["username"] == "alice"
+
+
+def test_config_change_rebuilds_and_replaces_account_slot():
+    pool = BangumiApiPool()
+    factory = MagicMock(side_effect=lambda **kw: MagicMock())
+
+    old = pool.get(**_account(), factory=factory)
+    new = pool.get(**_account(access_token="tok2"), factory=factory)
+
+    assert old is not new
+    stats = pool.get_stats()
+    assert stats["rebuilds"] == 1
+    assert stats["clients"] == 1
+    assert pool.get(**_account(access_token="tok2"), factory=factory) is new
+
+
+def test_config_change_closes_replaced_client():
+    pool = BangumiApiPool(retire_grace=0)
+    factory = MagicMock(side_effect=lambda **kw: MagicMock())
+
+    old = pool.get(**_account(), factory=factory)
+    pool.get(**_account(), factory=factory)
+    old.close.assert_not_called()
+
+    new = pool.get(**_account(access_token="tok2"), factory=factory)
+    old.close.assert_called_once()
+    new.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_config_change_schedules_async_client_aclose():
+    pool = BangumiApiPool(retire_grace=0)
+    old = MagicMock(aclose=AsyncMock())
+    pool.get_async(**_account(), factory=lambda **kw: old)
+
+    pool.get_async(**_account(access_token="tok2"), factory=lambda **kw: MagicMock())
+    await asyncio.sleep(0)
+
+    old.aclose.assert_awaited_once()
+    old.close.assert_not_called()
+
+
+def test_async_client_closed_without_running_loop():
+    pool = BangumiApiPool(retire_grace=0)
+    old = MagicMock(aclose=AsyncMock())
+    pool.get_async(**_account(), factory=lambda **kw: old)
+
+    with patch("asyncio.events.set_event_loop") as set_loop:
+        pool.discard("alice")
+
+    old.aclose.assert_awaited_once()
+    # 不改动当前线程的事件循环
+    set_loop.assert_not_called()
+
+
+def test_replaced_client_stays_open_during_grace_period():
+    pool = BangumiApiPool(retire_grace=0.05)
+    factory = MagicMock(side_effect=lambda **kw: MagicMock())
+    old = pool.get(**_account(), factory=factory)
+
+    pool.get(**_account(access_token="tok2"), factory=factory)
+    # 之前取得旧实例的同步仍可继续使用其会话
+    old.close.assert_not_called()
+
+    for _ in range(100):
+        if old.close.called:
+            break
+        time.sleep(0.01)
+    old.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_replaced_async_client_closed_after_grace_period():
+    pool = BangumiApiPool(retire_grace=0.05)
+    old = MagicMock(aclose=AsyncMock())
+    pool.get_async(**_account(), factory=lambda **kw: old)
+
+    pool.get_async(**_account(access_token="tok2"), factory=lambda **kw: MagicMock())
+    await asyncio.sleep(0)
+    old.aclose.assert_not_called()
+
+    await asyncio.sleep(0.1)
+    old.aclose.assert_awaited_once()
+
+
+def test_distinct_accounts_get_distinct_clients():
+    pool = BangumiApiPool()
+    factory = MagicMock(side_effect=lambda **kw: MagicMock())
+
+    a = pool.get(**_account(username="alice"), factory=factory)
+    b = pool.get(**_account(username="bob"), factory=factory)
+
+    assert a is not b
+    assert pool.get_stats()["clients"] == 2
+
+
+def test_stats_include_instance_cache_without_token():
+    pool = BangumiApiPool()
+    api = pool.get(**_account())
+    api._put_cache("get_subject", 1, {"id": 1})
+    api.get_subject(1)
+
+    stats = pool.get_stats()
+    account = stats["accounts"][0]
+    assert account["account"] == "alice"
+    assert account["cache"]["get_subject"]["hits"] == 1
+    assert "tok" not in repr(stats)
+
+
+def test_discard_and_clear_close_clients():
+    pool = BangumiApiPool(retire_grace=0)
+    a = MagicMock()
+    b = MagicMock()
+    pool.get(**_account(username="a"), factory=lambda **kw: a)
+    pool.get(**_account(username="b"), factory=lambda **kw: b)
+
+    pool.discard("a")
+    a.close.assert_called_once()
+    assert pool.get_stats()["clients"] == 1
+
+    pool.clear()
+    b.close.assert_called_once()
+    assert pool.get_stats() == {
+        "clients": 0,
+        "async_clients": 0,
+        "hits": 0,
+        "misses": 0,
+        "rebuilds": 0,
+        "accounts": [],
+    }
+
+
+def test_pooled_instance_cache_expires_by_category(monkeypatch):
+    api = BangumiApi(cache_ttl={"get_episodes": 10})
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.bangumi_api.time.monotonic", lambda: now[0])
+
+    api._put_cache("get_episodes", ("1", 0, False), {"data": []})
+    api._put_cache("get_subject", "1", {"id": 1})
+    now[0] += 11
+
+    api.get = MagicMock()
+    api.get.return_value.json.return_value = {"data": [{"id": 5}], "total": 1}
+    assert api.get_episodes("1") == {"data": [{"id": 5}], "total": 1}
+    # 未配置 TTL 的类别不过期
+    assert api.get_subject("1") == {"id": 1}
+    stats = api.get_cache_stats()
+    assert stats["get_episodes"]["misses"] == 1
+    assert stats["get_subject"]["hits"] == 1
@@ -2,12 +2,15 @@
 Bangumi 数据工具测试
 """
 
+import os
 import time
 from unittest.mock import MagicMock, mock_open, patch
 
 import pytest
 
 from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+from app.utils.title_normalizer import normalize_title
 
 
 def _make_data():
@@ -15,8 +18,6 @@ def _make_data():
     with (
         patch.object(BangumiData, "_check_and_download_cache_on_startup"),
         patch.object(BangumiData, "_preload_data_to_memory"),
-        patch.object(BangumiData, "_build_tmdb_mapping"),
-        patch.object(BangumiData, "_build_title_index"),
     ):
         return BangumiData()
 
@@ -91,14 +92,16 @@ class TestBangumiDataDownload:
     """测试数据下载"""
 
     @patch("app.utils.bangumi_data._request_with_retry")
-    def test_download_data_success(self, mock_request):
+    def test_download_data_success(self, mock_request, tmp_path):
         mock_response = MagicMock()
         mock_response.iter_content.return_value = [b"test data"]
         mock_request.return_value = mock_response
         data = _make_data()
         data.use_cache = True
-        with patch("builtins.open", MagicMock()):
-            assert data._download_data() is True
+        data.local_cache_path = str(tmp_path / "cache.json")
+        assert data._download_data() is True
+        assert (tmp_path / "cache.json").read_bytes() == b"test data"
+        assert not (tmp_path / "cache.json.tmp").exists()
 
     @patch("app.utils.bangumi_data._request_with_retry")
     def test_download_data_failure(self, mock_request):
@@ -107,21 +110,21 @@ class TestBangumiDataDownload:
         assert data._download_data() is False
 
     @patch("app.utils.bangumi_data._request_with_retry")
-    def test_download_data_with_proxy(self, mock_request):
+    def test_download_data_with_proxy(self, mock_request, tmp_path):
         mock_response = MagicMock()
         mock_response.iter_content.return_value = [b"data"]
         mock_request.return_value = mock_response
         data = _make_data()
         data.use_cache = True
+        data.local_cache_path = str(tmp_path / "cache.json")
         data.http_proxy = "http://proxy:8080"
-        with patch("builtins.open", MagicMock()):
-            result = data._download_data()
-            assert result is True
-            call_kwargs = mock_request.call_args
-            assert call_kwargs[1]["proxies"] == {
-                "http": "http://proxy:8080",
-                "https": "http://proxy:8080",
-            }
+        result = data._download_data()
+        assert result is True
+        call_kwargs = mock_request.call_args
+        assert call_kwargs[1]["proxies"] == {
+            "http": "http://proxy:8080",
+            "https": "http://proxy:8080",
+        }
 
     @patch("app.utils.bangumi_data._request_with_retry")
     def test_download_data_no_cache(self, mock_request):
@@ -134,6 +137,126 @@ class TestBangumiDataDownload:
         assert result is True
 
 
+class TestBangumiDataConditionalDownload:
+    """测试 ETag / Last-Modified 条件请求"""
+
+    def _response(self, status=200, body=b'{"items": []}', headers=None):
+        response = MagicMock()
+        response.status_code = status
+        response.iter_content.return_value = [body]
+        response.headers = headers or {}
+        return response
+
+    def _data(self, tmp_path):
+        data = _make_data()
+        data.use_cache = True
+        data.data_url = "https://example.com/data.json"
+        data.local_cache_path = str(tmp_path / "cache.json")
+        return data
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_first_download_records_validators(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        )
+        data = self._data(tmp_path)
+        assert data._download_data() is True
+        assert mock_request.call_args[1]["headers"] is None
+        assert data._load_validators() == {
+            "url": "https://example.com/data.json",
+            "etag": '"v1"',
+            "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+        }
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_not_modified_keeps_cache(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(headers={"ETag": '"v1"'})
+        data = self._data(tmp_path)
+        data._download_data()
+        old_mtime = time.time() - 30 * 86400
+        os.utime(data.local_cache_path, (old_mtime, old_mtime))
+        assert not data._is_cache_valid()
+
+        mock_request.return_value = self._response(status=304, body=b"")
+        assert data._download_data() is True
+        assert mock_request.call_args[1]["headers"] == {"If-None-Match": '"v1"'}
+        assert data._not_modified
+        assert (tmp_path / "cache.json").read_bytes() == b'{"items": []}'
+        assert data._is_cache_valid()
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_data_url_change_downloads_unconditionally(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(headers={"ETag": '"v1"'})
+        data = self._data(tmp_path)
+        data._download_data()
+        data.data_url = "https://mirror.example.com/data.json"
+        data._download_data()
+        assert mock_request.call_args[1]["headers"] is None
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_corrupt_cache_redownloads_unconditionally(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(
+            body=b'{"items": [{"title"', headers={"ETag": '"v1"'}
+        )
+        data = self._data(tmp_path)
+        data._download_data()
+
+        # 带 ETag 的条件请求会得到 304 而保留损坏的文件
+        mock_request.return_value = self._response(
+            body=b'{"items": [{"title": "a"}]}', headers={"ETag": '"v2"'}
+        )
+        assert [item["title"] for item in data._parse_data()] == ["a"]
+        assert mock_request.call_args[1]["headers"] is None
+        assert data._load_validators()["etag"] == '"v2"'
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_corrupt_cache_after_redownload_is_logged(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(body=b'{"items": [{"title"')
+        data = self._data(tmp_path)
+        data._download_data()
+        with patch("app.utils.bangumi_data.logger") as mock_logger:
+            assert list(data._parse_data()) == []
+        assert mock_request.call_count == 2
+        assert data._data_cache == []
+        mock_logger.error.assert_any_call("重新下载后 bangumi-data 缓存文件仍无法解析")
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_force_update_is_unconditional(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(headers={"ETag": '"v1"'})
+        data = self._data(tmp_path)
+        data._download_data()
+        with patch.object(data, "start"):
+            assert data.force_update() is True
+        assert mock_request.call_args[1]["headers"] is None
+
+    @patch("app.utils.bangumi_data._request_with_retry")
+    def test_failed_download_keeps_previous_cache(self, mock_request, tmp_path):
+        mock_request.return_value = self._response(body=b"old")
+        data = self._data(tmp_path)
+        data._download_data()
+        broken = self._response()
+        broken.iter_content.side_effect = OSError("connection reset")
+        mock_request.return_value = broken
+        assert data._download_data() is False
+        assert (tmp_path / "cache.json").read_bytes() == b"old"
+        assert not (tmp_path / "cache.json.tmp").exists()
+
+    def test_refresh_skips_rebuild_when_not_modified(self, tmp_path):
+        data = self._data(tmp_path)
+        data._current = data._current._replace(items=[])
+
+        def not_modified(conditional=True):
+            data._not_modified = True
+            return True
+
+        with (
+            patch.object(data, "_download_data", side_effect=not_modified),
+            patch.object(data, "_preload_data_to_memory") as preload,
+        ):
+            data._refresh()
+        preload.assert_not_called()
+
+
 class TestBangumiDataEnsureFresh:
     """测试数据新鲜度确保"""
 
@@ -384,7 +507,7 @@ class TestBangumiDataCacheStats:
         data = _make_data()
         data._cache_hit_count = 0
         data._cache_miss_count = 0
-        data._data_cache = None
+        data._current = data._current._replace(items=None)
         stats = data.get_cache_stats()
         assert stats["cache_hits"] == 0
         assert stats["total_requests"] == 0
@@ -394,8 +517,8 @@ class TestBangumiDataCacheStats:
         data = _make_data()
         data._cache_hit_count = 8
         data._cache_miss_count = 2
-        data._data_cache = [1, 2, 3]
-        data._cache_timestamp = time.time()
+        data._current = data._current._replace(items=[1, 2, 3])
+        data._current = data._current._replace(loaded_at=time.time())
         stats = data.get_cache_stats()
         assert stats["cache_hits"] == 8
         assert stats["total_requests"] == 10
@@ -404,7 +527,7 @@ class TestBangumiDataCacheStats:
 
     def test_get_cache_stats_no_timestamp(self):
         data = _make_data()
-        data._cache_timestamp = None
+        data._current = data._current._replace(loaded_at=None)
         stats = data.get_cache_stats()
         assert stats["cache_age_minutes"] == 0
 
@@ -414,9 +537,9 @@ class TestBangumiDataClearCache:
 
     def test_clear_cache(self):
         data = _make_data()
-        data._data_cache = [1, 2, 3]
-        data._cache_timestamp = time.time()
-        data._title_index = {"test": []}
+        data._current = data._current._replace(items=[1, 2, 3])
+        data._current = data._current._replace(loaded_at=time.time())
+        data._current = data._current._replace(title_index={"test": []})
         data.clear_cache()
         assert data._data_cache is None
         assert data._cache_timestamp is None
@@ -590,12 +713,12 @@ class TestBangumiDataGetTitleByTmdbId:
 
     def test_get_title_by_tmdb_id_found(self):
         data = _make_data()
-        data._cache_tmdb_mapping = {"12345": "测试番剧"}
+        data._current = data._current._replace(tmdb_mapping={"12345": "测试番剧"})
         assert data.get_title_by_tmdb_id("12345") == "测试番剧"
 
     def test_get_title_by_tmdb_id_not_found(self):
         data = _make_data()
-        data._cache_tmdb_mapping = {}
+        data._current = data._current._replace(tmdb_mapping={})
         assert data.get_title_by_tmdb_id("99999") is None
 
 
@@ -604,15 +727,15 @@ class TestParseData:
 
     def test_cache_hit(self):
         data = _make_data()
-        data._data_cache = [{"title": "a"}, {"title": "b"}]
-        data._cache_timestamp = time.time()
+        data._current = data._current._replace(items=[{"title": "a"}, {"title": "b"}])
+        data._current = data._current._replace(loaded_at=time.time())
         items = list(data._parse_data())
         assert len(items) == 2
         assert data._cache_hit_count == 1
 
     def test_cache_miss_from_file(self):
         data = _make_data()
-        data._data_cache = None
+        data._current = data._current._replace(items=None)
         data.use_cache = True
         data.local_cache_path = "/tmp/test_cache.json"
         mock_items = [{"title": "test"}]
@@ -621,7 +744,6 @@ class TestParseData:
             patch("os.path.exists", return_value=True),
             patch("builtins.open", mock_open()),
             patch("app.utils.bangumi_data.ijson.items", return_value=iter(mock_items)),
-            patch.object(data, "_build_title_index"),
         ):
             items = list(data._parse_data())
             assert len(items) == 1
@@ -629,7 +751,7 @@ class TestParseData:
 
     def test_cache_miss_file_parse_fail_redownload(self):
         data = _make_data()
-        data._data_cache = None
+        data._current = data._current._replace(items=None)
         data.use_cache = True
         data.local_cache_path = "/tmp/test_cache.json"
         mock_items = [{"title": "test"}]
@@ -642,14 +764,13 @@ class TestParseData:
                 side_effect=[Exception("parse err"), iter(mock_items)],
             ),
             patch.object(data, "_download_data", return_value=True),
-            patch.object(data, "_build_title_index"),
         ):
             items = list(data._parse_data())
             assert len(items) == 1
 
     def test_cache_miss_network(self):
         data = _make_data()
-        data._data_cache = None
+        data._current = data._current._replace(items=None)
         data.use_cache = False
         data.local_cache_path = "/tmp/test_cache.json"
         with (
@@ -657,7 +778,6 @@ class TestParseData:
             patch("os.path.exists", return_value=False),
             patch("app.utils.bangumi_data._request_with_retry") as mock_req,
             patch("app.utils.bangumi_data.ijson.items", return_value=iter([])),
-            patch.object(data, "_build_title_index"),
         ):
             mock_resp = MagicMock()
             mock_resp.raw = MagicMock()
@@ -669,7 +789,7 @@ class TestParseData:
 
     def test_cache_miss_network_fail_fallback_cache(self):
         data = _make_data()
-        data._data_cache = None
+        data._current = data._current._replace(items=None)
         data.use_cache = False
         data.local_cache_path = "/tmp/test_cache.json"
         mock_items = [{"title": "fallback"}]
@@ -682,14 +802,13 @@ class TestParseData:
             ),
             patch("builtins.open", mock_open()),
             patch("app.utils.bangumi_data.ijson.items", return_value=iter(mock_items)),
-            patch.object(data, "_build_title_index"),
         ):
             items = list(data._parse_data())
             assert len(items) == 1
 
     def test_cache_miss_network_fail_no_fallback(self):
         data = _make_data()
-        data._data_cache = None
+        data._current = data._current._replace(items=None)
         data.use_cache = False
         data.local_cache_path = "/tmp/test_cache.json"
         with (
@@ -699,7 +818,6 @@ class TestParseData:
                 "app.utils.bangumi_data._request_with_retry",
                 side_effect=Exception("network err"),
             ),
-            patch.object(data, "_build_title_index"),
         ):
             items = list(data._parse_data())
             assert items == []
@@ -790,9 +908,11 @@ class TestPreloadDataToMemory:
                 "app.utils.bangumi_data.ijson.items",
                 side_effect=Exception("parse err"),
             ),
+            patch.object(data, "_download_data", return_value=False) as download,
         ):
             data._preload_data_to_memory()
             assert data._data_cache is None
+            download.assert_called_once_with(conditional=False)
 
     def test_network_preload(self):
         data = _make_data()
@@ -836,7 +956,7 @@ class TestPreloadDataToMemory:
 
 
 class TestBuildTmdbMapping:
-    """测试 _build_tmdb_mapping"""
+    """测试 TMDB 映射构建"""
 
     def test_build_mapping(self):
         data = _make_data()
@@ -853,14 +973,13 @@ class TestBuildTmdbMapping:
                 "sites": [{"site": "bangumi", "id": "200"}],
             },
         ]
-        with patch.object(data, "_parse_data", return_value=items):
-            data._build_tmdb_mapping()
-            assert data._cache_tmdb_mapping.get("tv/12345") == "番剧A"
-            assert len(data._cache_tmdb_mapping) == 1
+        data._publish([BangumiDataItem.from_raw(item) for item in items])
+        assert data._cache_tmdb_mapping.get("tv/12345") == "番剧A"
+        assert len(data._cache_tmdb_mapping) == 1
 
 
 class TestBuildTitleIndex:
-    """测试 _build_title_index"""
+    """测试标题索引构建"""
 
     def test_build_index(self):
         data = _make_data()
@@ -872,13 +991,27 @@ class TestBuildTitleIndex:
             {"title": "原名2"},
             {"title": ""},
         ]
-        with patch.object(data, "_parse_data", return_value=items):
-            data._build_title_index()
-            assert "原名" in data._title_index
-            assert "中文1" in data._title_index
-            assert "中文2" in data._title_index
-            assert "原名2" in data._title_index
-            assert "" not in data._title_index
+        data._publish([BangumiDataItem.from_raw(item) for item in items])
+        assert "原名" in data._title_index
+        assert "中文1" in data._title_index
+        assert "中文2" in data._title_index
+        assert "原名2" in data._title_index
+        assert "" not in data._title_index
+
+    def test_publish_replaces_items_and_indexes_together(self):
+        data = _make_data()
+        data._publish([BangumiDataItem(title="旧", bangumi_id="1")])
+        old = data._current
+
+        data._publish([BangumiDataItem(title="新", bangumi_id="2", tmdb_id="tv/2")])
+        state = data._current
+        assert state is not old
+        assert [item.title for item in old.items] == ["旧"]
+        assert list(old.title_index) == ["旧"]
+        assert list(state.title_index) == ["新"]
+        assert state.tmdb_mapping == {"tv/2": "新"}
+        for index in (state.ngram_index, state.date_index, state.site_index):
+            assert index.items is state.items
 
 
 class TestFindBangumiIdOptimizedTitleIndex:
@@ -886,15 +1019,17 @@ class TestFindBangumiIdOptimizedTitleIndex:
 
     def test_exact_index_hit_with_date(self):
         data = _make_data()
-        data._title_index = {
-            "标题": [
-                {
-                    "title": "标题",
-                    "begin": "2024-01-15",
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "标题": [
+                    {
+                        "title": "标题",
+                        "begin": "2024-01-15",
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         result = data._find_bangumi_id_optimized("标题", release_date="2024-01-16")
         assert result is not None
         assert result[0] == "100"
@@ -902,14 +1037,16 @@ class TestFindBangumiIdOptimizedTitleIndex:
 
     def test_exact_index_hit_no_date(self):
         data = _make_data()
-        data._title_index = {
-            "标题": [
-                {
-                    "title": "标题",
-                    "sites": [{"site": "bangumi", "id": "200"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "标题": [
+                    {
+                        "title": "标题",
+                        "sites": [{"site": "bangumi", "id": "200"}],
+                    }
+                ]
+            }
+        )
         with patch.object(data, "_parse_data", return_value=[]):
             result = data._find_bangumi_id_optimized("标题")
         assert result is not None
@@ -918,36 +1055,80 @@ class TestFindBangumiIdOptimizedTitleIndex:
 
     def test_exact_index_hit_ori_title(self):
         data = _make_data()
-        data._title_index = {
-            "OriginalTitle": [
-                {
-                    "title": "OriginalTitle",
-                    "sites": [{"site": "bangumi", "id": "300"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                normalize_title("OriginalTitle"): [
+                    {
+                        "title": "OriginalTitle",
+                        "sites": [{"site": "bangumi", "id": "300"}],
+                    }
+                ]
+            }
+        )
         with patch.object(data, "_parse_data", return_value=[]):
             result = data._find_bangumi_id_optimized("中文", ori_title="OriginalTitle")
         assert result is not None
         assert result[0] == "300"
 
+    def test_index_prefers_verbatim_title(self):
+        """规范化后同键的条目中优先原文相同的"""
+        data = _make_data()
+        data._publish(
+            [
+                BangumiDataItem(title="けいおん!", bangumi_id="1424"),
+                BangumiDataItem(title="けいおん!!", bangumi_id="7157"),
+            ]
+        )
+        assert data._find_bangumi_id_optimized("けいおん!!")[0] == "7157"
+        assert data._find_bangumi_id_optimized("けいおん!")[0] == "1424"
+
+    def test_verbatim_title_through_public_lookup(self):
+        """经由 find_bangumi_id（带匹配结果缓存）依次查找两个标题"""
+        data = _make_data()
+        data._publish(
+            [
+                BangumiDataItem(title="けいおん!", bangumi_id="1424"),
+                BangumiDataItem(title="けいおん!!", bangumi_id="7157"),
+            ]
+        )
+        assert data.find_bangumi_id("けいおん!")[0] == "1424"
+        assert data.find_bangumi_id("けいおん!!")[0] == "7157"
+
+    def test_ambiguous_index_hit_without_date_falls_through(self):
+        data = _make_data()
+        data._publish(
+            [
+                BangumiDataItem(title="けいおん!", bangumi_id="1424"),
+                BangumiDataItem(title="けいおん!!", bangumi_id="7157"),
+            ]
+        )
+        with patch.object(
+            data, "_collect_matches", wraps=data._collect_matches
+        ) as collect:
+            result = data._find_bangumi_id_optimized("けいおん")
+        # 无法区分时交给评分匹配，不随意取第一个
+        collect.assert_called_once()
+        assert result is None
+
     def test_exact_index_hit_with_date_best_match(self):
         """多个精确匹配时选择日期最近的"""
         data = _make_data()
-        data._title_index = {
-            "标题": [
-                {
-                    "title": "标题",
-                    "begin": "2024-01-01",
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                },
-                {
-                    "title": "标题",
-                    "begin": "2024-06-01",
-                    "sites": [{"site": "bangumi", "id": "200"}],
-                },
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "标题": [
+                    {
+                        "title": "标题",
+                        "begin": "2024-01-01",
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    },
+                    {
+                        "title": "标题",
+                        "begin": "2024-06-01",
+                        "sites": [{"site": "bangumi", "id": "200"}],
+                    },
+                ]
+            }
+        )
         result = data._find_bangumi_id_optimized("标题", release_date="2024-05-30")
         assert result is not None
         assert result[0] == "200"
@@ -956,16 +1137,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
         """标题索引命中但日期差>180天时，应回退线性扫描检查部分匹配"""
         data = _make_data()
         # 标题索引只有第一季（2016年）
-        data._title_index = {
-            "Re：从零开始的异世界生活": [
-                {
-                    "title": "Re:ゼロから始める異世界生活",
-                    "begin": "2016-04-01",
-                    "titleTranslate": {"zh-Hans": ["Re：从零开始的异世界生活"]},
-                    "sites": [{"site": "bangumi", "id": "140001"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "Re：从零开始的异世界生活": [
+                    {
+                        "title": "Re:ゼロから始める異世界生活",
+                        "begin": "2016-04-01",
+                        "titleTranslate": {"zh-Hans": ["Re：从零开始的异世界生活"]},
+                        "sites": [{"site": "bangumi", "id": "140001"}],
+                    }
+                ]
+            }
+        )
         # 线性扫描数据包含第一季和第四季
         all_items = [
             {
@@ -997,15 +1180,17 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_exact_index_date_diff_le_180_returns_directly(self):
         """标题索引命中且日期差≤180天时，直接返回不回退"""
         data = _make_data()
-        data._title_index = {
-            "标题": [
-                {
-                    "title": "标题",
-                    "begin": "2024-01-01",
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "标题": [
+                    {
+                        "title": "标题",
+                        "begin": "2024-01-01",
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         with patch.object(data, "_parse_data", return_value=[]):
             result = data._find_bangumi_id_optimized("标题", release_date="2024-06-01")
         assert result is not None
@@ -1017,18 +1202,20 @@ class TestFindBangumiIdOptimizedTitleIndex:
         直接返回S2 Part 2 (ID=444557, date_matched=True)"""
         data = _make_data()
         # 标题索引：搜索词"无职转生～到了异世界就拿出真本事～"精确匹配S1
-        data._title_index = {
-            "无职转生～到了异世界就拿出真本事～": [
-                {
-                    "title": "無職転生～異世界行ったら本気だす～",
-                    "begin": "2021-01-10T15:00:00.000Z",
-                    "titleTranslate": {
-                        "zh-Hans": ["无职转生～到了异世界就拿出真本事～"]
-                    },
-                    "sites": [{"site": "bangumi", "id": "277554"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "无职转生～到了异世界就拿出真本事～": [
+                    {
+                        "title": "無職転生～異世界行ったら本気だす～",
+                        "begin": "2021-01-10T15:00:00.000Z",
+                        "titleTranslate": {
+                            "zh-Hans": ["无职转生～到了异世界就拿出真本事～"]
+                        },
+                        "sites": [{"site": "bangumi", "id": "277554"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             # S1 - 精确匹配
             {
@@ -1076,18 +1263,20 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_mushoku_tensei_s3_episode_1_returns_correct_id(self):
         """无职转生 S03E01 (2026-07-04) Plex 冒号标题应匹配到 S3 (ID=501963)"""
         data = _make_data()
-        data._title_index = {
-            "无职转生：到了异世界就拿出真本事": [
-                {
-                    "title": "無職転生～異世界行ったら本気だす～",
-                    "begin": "2021-01-10T15:00:00.000Z",
-                    "titleTranslate": {
-                        "zh-Hans": ["无职转生～到了异世界就拿出真本事～"]
-                    },
-                    "sites": [{"site": "bangumi", "id": "277554"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "无职转生：到了异世界就拿出真本事": [
+                    {
+                        "title": "無職転生～異世界行ったら本気だす～",
+                        "begin": "2021-01-10T15:00:00.000Z",
+                        "titleTranslate": {
+                            "zh-Hans": ["无职转生～到了异世界就拿出真本事～"]
+                        },
+                        "sites": [{"site": "bangumi", "id": "277554"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             {
                 "title": "無職転生～異世界行ったら本気だす～",
@@ -1142,16 +1331,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_oshi_no_ko_s3_matches_517057(self):
         """【我推的孩子】 S03E01 (2026-01-14) 应匹配到 S3 (ID=517057)"""
         data = _make_data()
-        data._title_index = {
-            "【我推的孩子】": [
-                {
-                    "title": "【推しの子】",
-                    "begin": "2023-04-12T14:00:00.000Z",
-                    "titleTranslate": {"zh-Hans": ["【我推的孩子】"]},
-                    "sites": [{"site": "bangumi", "id": "386809"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "【我推的孩子】": [
+                    {
+                        "title": "【推しの子】",
+                        "begin": "2023-04-12T14:00:00.000Z",
+                        "titleTranslate": {"zh-Hans": ["【我推的孩子】"]},
+                        "sites": [{"site": "bangumi", "id": "386809"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             {
                 "title": "【推しの子】",
@@ -1183,16 +1374,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_kanojo_okarishimasu_s5_matches_533027(self):
         """租借女友 S05E01 (2026-04-09) 应匹配到 S5 (ID=533027)"""
         data = _make_data()
-        data._title_index = {
-            "租借女友": [
-                {
-                    "title": "彼女、お借りします",
-                    "begin": "2020-07-10T16:25:00.000Z",
-                    "titleTranslate": {"zh-Hans": ["租借女友"]},
-                    "sites": [{"site": "bangumi", "id": "296076"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "租借女友": [
+                    {
+                        "title": "彼女、お借りします",
+                        "begin": "2020-07-10T16:25:00.000Z",
+                        "titleTranslate": {"zh-Hans": ["租借女友"]},
+                        "sites": [{"site": "bangumi", "id": "296076"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             {
                 "title": "彼女、お借りします",
@@ -1236,16 +1429,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_youkoso_jitsuryoku_s4_matches_510710(self):
         """欢迎来到实力至上主义教室 S04E01 (2026-04-01) 应匹配到 S4 (ID=510710)"""
         data = _make_data()
-        data._title_index = {
-            "欢迎来到实力至上主义教室": [
-                {
-                    "title": "ようこそ実力至上主義の教室へ",
-                    "begin": "2017-07-12T14:30:00.000Z",
-                    "titleTranslate": {"zh-Hans": ["欢迎来到实力至上主义教室"]},
-                    "sites": [{"site": "bangumi", "id": "214272"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "欢迎来到实力至上主义教室": [
+                    {
+                        "title": "ようこそ実力至上主義の教室へ",
+                        "begin": "2017-07-12T14:30:00.000Z",
+                        "titleTranslate": {"zh-Hans": ["欢迎来到实力至上主义教室"]},
+                        "sites": [{"site": "bangumi", "id": "214272"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             {
                 "title": "ようこそ実力至上主義の教室へ",
@@ -1288,20 +1483,22 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_maou_gakuen_s2_matches_455981(self):
         """魔王学院的不适任者 S2E13 (2024-04-12) 应匹配到 S2 Part 2 (ID=455981)"""
         data = _make_data()
-        data._title_index = {
-            "魔王学院的不适任者～史上最强的魔王始祖，转生就读子孙们的学校～": [
-                {
-                    "title": "魔王学院の不適合者～史上最強の魔王の始祖、転生して子孫たちの学校へ通う～",
-                    "begin": "2020-07-04T14:30:00.000Z",
-                    "titleTranslate": {
-                        "zh-Hans": [
-                            "魔王学院的不适任者～史上最强的魔王始祖，转生就读子孙们的学校～"
-                        ]
-                    },
-                    "sites": [{"site": "bangumi", "id": "292222"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "魔王学院的不适任者～史上最强的魔王始祖，转生就读子孙们的学校～": [
+                    {
+                        "title": "魔王学院の不適合者～史上最強の魔王の始祖、転生して子孫たちの学校へ通う～",
+                        "begin": "2020-07-04T14:30:00.000Z",
+                        "titleTranslate": {
+                            "zh-Hans": [
+                                "魔王学院的不适任者～史上最强的魔王始祖，转生就读子孙们的学校～"
+                            ]
+                        },
+                        "sites": [{"site": "bangumi", "id": "292222"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             {
                 "title": "魔王学院の不適合者～史上最強の魔王の始祖、転生して子孫たちの学校へ通う～",
@@ -1347,16 +1544,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_aharen_san_s2_matches_506922(self):
         """测不准的阿波连同学 S2E9 (2025-04-07) 应匹配到 S2 (ID=506922)"""
         data = _make_data()
-        data._title_index = {
-            "测不准的阿波连同学": [
-                {
-                    "title": "阿波連さんははかれない",
-                    "begin": "2022-04-01T17:25:00.000Z",
-                    "titleTranslate": {"zh-Hans": ["测不准的阿波连同学"]},
-                    "sites": [{"site": "bangumi", "id": "343656"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "测不准的阿波连同学": [
+                    {
+                        "title": "阿波連さんははかれない",
+                        "begin": "2022-04-01T17:25:00.000Z",
+                        "titleTranslate": {"zh-Hans": ["测不准的阿波连同学"]},
+                        "sites": [{"site": "bangumi", "id": "343656"}],
+                    }
+                ]
+            }
+        )
         all_items = [
             {
                 "title": "阿波連さんははかれない",
@@ -1387,16 +1586,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_akane_banashi_chinese_title_matches_576121(self):
         """落语朱音 S1E1 (中文标题) 应匹配到 576121"""
         data = _make_data()
-        data._title_index = {
-            "落语朱音": [
-                {
-                    "title": "あかね噺",
-                    "begin": "2026-04-04T14:30:00.000Z",
-                    "titleTranslate": {"zh-Hans": ["落语朱音", "朱音落语"]},
-                    "sites": [{"site": "bangumi", "id": "576121"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "落语朱音": [
+                    {
+                        "title": "あかね噺",
+                        "begin": "2026-04-04T14:30:00.000Z",
+                        "titleTranslate": {"zh-Hans": ["落语朱音", "朱音落语"]},
+                        "sites": [{"site": "bangumi", "id": "576121"}],
+                    }
+                ]
+            }
+        )
         with patch.object(data, "_parse_data", return_value=[]):
             result = data._find_bangumi_id_optimized(
                 "落语朱音", release_date="2026-04-04"
@@ -1408,16 +1609,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_akane_banashi_japanese_title_matches_576121(self):
         """あかね噺 S1E1 (日文原标题) 应匹配到 576121"""
         data = _make_data()
-        data._title_index = {
-            "あかね噺": [
-                {
-                    "title": "あかね噺",
-                    "begin": "2026-04-04T14:30:00.000Z",
-                    "titleTranslate": {"zh-Hans": ["落语朱音", "朱音落语"]},
-                    "sites": [{"site": "bangumi", "id": "576121"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "あかね噺": [
+                    {
+                        "title": "あかね噺",
+                        "begin": "2026-04-04T14:30:00.000Z",
+                        "titleTranslate": {"zh-Hans": ["落语朱音", "朱音落语"]},
+                        "sites": [{"site": "bangumi", "id": "576121"}],
+                    }
+                ]
+            }
+        )
         with patch.object(data, "_parse_data", return_value=[]):
             result = data._find_bangumi_id_optimized(
                 "あかね噺", release_date="2026-04-04"
@@ -1431,15 +1634,17 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_index_date_diff_exactly_180_returns_directly(self):
         """标题索引日期差恰好=180天时，应直接返回（<=180边界）"""
         data = _make_data()
-        data._title_index = {
-            "标题": [
-                {
-                    "title": "标题",
-                    "begin": "2024-01-01",
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "标题": [
+                    {
+                        "title": "标题",
+                        "begin": "2024-01-01",
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         # 2024-01-01 + 180天 = 2024-06-29
         with patch.object(data, "_parse_data", return_value=[]):
             result = data._find_bangumi_id_optimized("标题", release_date="2024-06-29")
@@ -1450,16 +1655,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_index_date_diff_exactly_181_falls_through(self):
         """标题索引日期差恰好=181天时，应回退线性扫描（>180边界）"""
         data = _make_data()
-        data._title_index = {
-            "标题": [
-                {
-                    "title": "标题",
-                    "begin": "2024-01-01",
-                    "titleTranslate": {"zh-Hans": ["标题"]},
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "标题": [
+                    {
+                        "title": "标题",
+                        "begin": "2024-01-01",
+                        "titleTranslate": {"zh-Hans": ["标题"]},
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         exact_item = {
             "title": "标题",
             "begin": "2024-01-01",
@@ -1489,16 +1696,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_partial_match_date_diff_exactly_90_accepts(self):
         """部分匹配日期差恰好=90天时，应采纳（<=90边界）"""
         data = _make_data()
-        data._title_index = {
-            "测试番剧": [
-                {
-                    "title": "テスト",
-                    "begin": "2020-01-01",
-                    "titleTranslate": {"zh-Hans": ["测试番剧"]},
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "测试番剧": [
+                    {
+                        "title": "テスト",
+                        "begin": "2020-01-01",
+                        "titleTranslate": {"zh-Hans": ["测试番剧"]},
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         exact_item = {
             "title": "テスト",
             "begin": "2020-01-01",
@@ -1545,16 +1754,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_partial_match_date_diff_exactly_91_rejects(self):
         """部分匹配日期差恰好=91天时，应拒绝回退精确匹配（>90边界）"""
         data = _make_data()
-        data._title_index = {
-            "测试番剧": [
-                {
-                    "title": "テスト",
-                    "begin": "2020-01-01",
-                    "titleTranslate": {"zh-Hans": ["测试番剧"]},
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "测试番剧": [
+                    {
+                        "title": "テスト",
+                        "begin": "2020-01-01",
+                        "titleTranslate": {"zh-Hans": ["测试番剧"]},
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         exact_item = {
             "title": "テスト",
             "begin": "2020-01-01",
@@ -1600,16 +1811,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_safety_check_rejects_when_title_not_contained_and_low_score(self):
         """安全校验：标题不包含且分数<0.8时，应拒绝部分匹配"""
         data = _make_data()
-        data._title_index = {
-            "测试番剧": [
-                {
-                    "title": "テスト",
-                    "begin": "2020-01-01",
-                    "titleTranslate": {"zh-Hans": ["测试番剧"]},
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "测试番剧": [
+                    {
+                        "title": "テスト",
+                        "begin": "2020-01-01",
+                        "titleTranslate": {"zh-Hans": ["测试番剧"]},
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         exact_item = {
             "title": "テスト",
             "begin": "2020-01-01",
@@ -1657,16 +1870,18 @@ class TestFindBangumiIdOptimizedTitleIndex:
     def test_safety_check_passes_when_high_score_despite_no_containment(self):
         """安全校验：标题不包含但分数>=0.8时，应采纳部分匹配"""
         data = _make_data()
-        data._title_index = {
-            "测试番剧": [
-                {
-                    "title": "テスト",
-                    "begin": "2020-01-01",
-                    "titleTranslate": {"zh-Hans": ["测试番剧"]},
-                    "sites": [{"site": "bangumi", "id": "100"}],
-                }
-            ]
-        }
+        data._current = data._current._replace(
+            title_index={
+                "测试番剧": [
+                    {
+                        "title": "テスト",
+                        "begin": "2020-01-01",
+                        "titleTranslate": {"zh-Hans": ["测试番剧"]},
+                        "sites": [{"site": "bangumi", "id": "100"}],
+                    }
+                ]
+            }
+        )
         exact_item = {
             "title": "テスト",
             "begin": "2020-01-01",
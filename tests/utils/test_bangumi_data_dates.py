@@ -0,0 +1,102 @@
+"""bangumi-data 开播日期索引单元测试。"""
+
+from datetime import date
+from unittest.mock import patch
+
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_dates import BangumiDateIndex, date_ordinal
+from app.utils.bangumi_data_item import BangumiDataItem
+
+
+def _items():
+    return [
+        BangumiDataItem("魔法少女A", ("魔法少女甲",), "2010-04-01", "1"),
+        BangumiDataItem("魔法少女B", ("魔法少女乙",), "2015-04-01", "2"),
+        BangumiDataItem("魔法少女C", ("魔法少女丙",), "2024-04-01", "3"),
+        BangumiDataItem("魔法少女D", ("魔法少女丁",), None, "4"),
+        BangumiDataItem("魔法少女E", ("魔法少女戊",), "2024-10-01", "5"),
+    ]
+
+
+def _data(items):
+    with (
+        patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+        patch.object(BangumiData, "_preload_data_to_memory"),
+    ):
+        data = BangumiData()
+    data.use_cache = False
+    data.date_window_days = 400
+    data._publish(items)
+    return data
+
+
+class TestDateOrdinal:
+    def test_parse(self):
+        assert date_ordinal("2024-04-01") == date(2024, 4, 1).toordinal()
+        assert date_ordinal("2024-04-01T15:00:00.000Z") == date_ordinal("2024-04-01")
+        assert date_ordinal("invalid") is None
+        assert date_ordinal(None) is None
+
+    def test_cached(self):
+        date_ordinal.cache_clear()
+        date_ordinal("2024-04-01")
+        date_ordinal("2024-04-01")
+        assert date_ordinal.cache_info().hits == 1
+
+
+class TestBangumiDateIndex:
+    def test_window(self):
+        index = BangumiDateIndex(_items())
+        assert len(index) == 4
+        center = date_ordinal("2024-06-01")
+        assert index.window(center, 400) == {2, 3, 4}
+        assert index.window(center, 30) == {3}
+        assert index.window(center, 10000) == {0, 1, 2, 3, 4}
+
+    def test_window_bounds_inclusive(self):
+        index = BangumiDateIndex(_items())
+        center = date_ordinal("2024-04-11")
+        assert 2 in index.window(center, 10)
+        assert 2 not in index.window(center, 9)
+
+
+class TestFuzzyLookupInDateWindow:
+    def test_only_items_in_window_are_scored(self):
+        data = _data(_items())
+        with patch.object(
+            data, "_calculate_match_info", wraps=data._calculate_match_info
+        ) as info:
+            data.find_bangumi_id("魔法少女", release_date="2024-06-01")
+        scored = {call.args[0].bangumi_id for call in info.call_args_list}
+        assert scored == {"3", "4", "5"}
+
+    def _distinct(self):
+        return _data(
+            [
+                BangumiDataItem("銀河鉄道の夜", ("银河铁道之夜",), "2010-04-01", "1"),
+                BangumiDataItem("海辺の町", ("海边小镇",), "2024-04-01", "2"),
+            ]
+        )
+
+    def test_match_outside_window_is_skipped(self):
+        data = self._distinct()
+        assert data.find_bangumi_id("银河铁道之夜啊", release_date="2024-06-01") is None
+        result = data.find_bangumi_id("银河铁道之夜啊", release_date="2010-05-01")
+        assert result[0] == "1"
+
+    def test_window_disabled(self):
+        data = self._distinct()
+        data.date_window_days = 0
+        result = data.find_bangumi_id("银河铁道之夜啊", release_date="2024-06-01")
+        assert result[0] == "1"
+
+    def test_without_release_date_not_restricted(self):
+        data = self._distinct()
+        assert data.find_bangumi_id("银河铁道之夜啊")[0] == "1"
+
+    def test_date_diff_uses_cached_ordinals(self):
+        data = _data(_items())
+        with patch("app.utils.bangumi_data_dates.datetime") as dt:
+            date_ordinal("2010-04-01")
+            assert data._date_diff("2010-04-01", "2010-04-01") == 0
+        dt.strptime.assert_not_called()
@@ -49,7 +49,6 @@ def test_module_request_with_retry_ssl_verify_false_sets_warnings(mock_get, _sle
     mock_get.assert_called_once()
 
 
-@patch.object(bangumi_data.BangumiData, "_build_tmdb_mapping", lambda self: None)
 @patch.object(bangumi_data.BangumiData, "_preload_data_to_memory", lambda self: None)
 @patch.object(
     bangumi_data.BangumiData,
@@ -0,0 +1,131 @@
+"""bangumi-data 紧凑条目单元测试。"""
+
+import copy
+import gc
+import json
+import tracemalloc
+from unittest.mock import patch
+
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+
+RAW = {
+    "title": "葬送のフリーレン",
+    "titleTranslate": {
+        "en": ["Frieren: Beyond Journey's End"],
+        "zh-Hans": ["葬送的芙莉莲"],
+        "zh-Hant": ["葬送的芙莉蓮"],
+    },
+    "type": "tv",
+    "lang": "ja",
+    "officialSite": "https://frieren-anime.jp/",
+    "begin": "2023-09-29T14:00:00.000Z",
+    "end": "2024-03-22T14:25:00.000Z",
+    "broadcast": "R/2023-09-29T14:00:00.000Z/P7D",
+    "comment": "",
+    "sites": [
+        {"site": "bangumi", "id": "400602"},
+        {"site": "tmdb", "id": "tv/209867"},
+        {"site": "bilibili", "id": "28298079", "begin": "2023-09-29T14:00:00.000Z"},
+        {"site": "netflix", "id": "81726714", "begin": "2023-09-29T14:00:00.000Z"},
+    ],
+}
+
+
+def _raw_items(count):
+    items = []
+    for n in range(count):
+        item = copy.deepcopy(RAW)
+        item["title"] = f"{RAW['title']}{n}"
+        item["titleTranslate"]["zh-Hans"] = [f"葬送的芙莉莲{n}", f"芙莉莲{n}"]
+        item["sites"][0]["id"] = str(100000 + n)
+        item["sites"][1]["id"] = f"tv/{200000 + n}"
+        items.append(item)
+    return items
+
+
+class TestBangumiDataItem:
+    def test_keeps_matching_fields(self):
+        item = BangumiDataItem.from_raw(RAW)
+        assert item.title == "葬送のフリーレン"
+        assert item.zh_hans == ("葬送的芙莉莲",)
+        assert item.begin == "2023-09-29"
+        assert (item.bangumi_id, item.tmdb_id) == ("400602", "tv/209867")
+        assert item.site_ids == ("bilibili", "28298079", "netflix", "81726714")
+        assert not hasattr(item, "__dict__")
+
+    def test_mapping_view(self):
+        item = BangumiDataItem.from_raw(RAW)
+        assert item["titleTranslate"]["zh-Hans"] == ("葬送的芙莉莲",)
+        assert item.get("sites") == [
+            {"site": "bangumi", "id": "400602"},
+            {"site": "tmdb", "id": "tv/209867"},
+            {"site": "bilibili", "id": "28298079"},
+            {"site": "netflix", "id": "81726714"},
+        ]
+        assert BangumiDataItem(title="a", tmdb_id="tv/1").get("sites") == [
+            {"site": "tmdb", "id": "tv/1"}
+        ]
+        assert "broadcast" not in item
+        assert item.get("broadcast") is None
+        assert BangumiDataItem.from_raw({"title": "a"}) == {"title": "a"}
+
+    def test_missing_and_empty_fields(self):
+        item = BangumiDataItem.from_raw({"title": "a", "titleTranslate": {"en": ["A"]}})
+        assert "titleTranslate" not in item and "sites" not in item
+        item = BangumiDataItem.from_raw(
+            {"title": "a", "titleTranslate": {"zh-Hans": []}}
+        )
+        assert item["titleTranslate"] == {"zh-Hans": ()}
+
+    def test_strings_are_interned(self):
+        a, b = (BangumiDataItem.from_raw(json.loads(json.dumps(RAW))) for _ in range(2))
+        assert a.begin is b.begin
+        assert a.zh_hans[0] is b.zh_hans[0]
+
+    def test_memory_compared_to_raw_items(self):
+        """同一批条目：紧凑表示占用的内存不到原始 dict 的 1/4"""
+
+        def measure(build):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                kept = build()
+                size = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            del kept
+            return size
+
+        dumped = json.dumps(_raw_items(2000))
+        raw_size = measure(lambda: json.loads(dumped))
+        compact_size = measure(
+            lambda: [BangumiDataItem.from_raw(i) for i in json.loads(dumped)]
+        )
+        assert compact_size * 4 < raw_size
+
+
+class TestFindWithCompactItems:
+    def _data(self, raw_items):
+        with (
+            patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+            patch.object(BangumiData, "_preload_data_to_memory"),
+        ):
+            data = BangumiData()
+        data.use_cache = False
+        data._publish([BangumiDataItem.from_raw(i) for i in raw_items])
+        return data
+
+    def test_index_and_linear_scan(self):
+        data = self._data(_raw_items(50))
+        assert data.find_bangumi_id("芙莉莲7", release_date="2023-09-30") == (
+            "100007",
+            "芙莉莲7",
+            True,
+        )
+        # 标题索引未命中，线性扫描按相似度匹配
+        result = data.find_bangumi_id("葬送的芙莉莲 7", ori_title="葬送のフリーレン7")
+        assert result[0] == "100007"
+        assert data.get_title_by_tmdb_id("tv/200003") == "葬送のフリーレン3"
+        found = [r["bangumi_id"] for r in data.search_title("芙莉莲12")]
+        assert "100012" in found
@@ -0,0 +1,168 @@
+"""bangumi-data 后台加载与就绪状态单元测试。"""
+
+import threading
+import time
+from unittest.mock import patch
+
+from app.utils.bangumi_data import (
+    STATE_FAILED,
+    STATE_IDLE,
+    STATE_READY,
+    STATE_STALE,
+    BangumiData,
+)
+from app.utils.bangumi_data_item import BangumiDataItem
+
+ITEMS = [
+    BangumiDataItem("葬送のフリーレン", ("葬送的芙莉莲",), "2023-09-29", "400602"),
+]
+
+
+def _data():
+    data = BangumiData(background=True)
+    data.use_cache = False
+    data.ready_timeout = 5
+    return data
+
+
+def _wait_loader(data):
+    if data._loader is not None:
+        data._loader.join(5)
+
+
+class TestBackgroundLoading:
+    def test_constructor_does_no_io(self):
+        with patch.object(BangumiData, "_load") as load:
+            data = _data()
+        load.assert_not_called()
+        assert data.state == STATE_IDLE
+        assert data.get_data_version() == STATE_IDLE
+
+    def test_load_in_background(self):
+        data = _data()
+
+        def load():
+            data._publish(list(ITEMS))
+
+        with patch.object(data, "_load", side_effect=load):
+            assert data.start()
+            _wait_loader(data)
+        assert data.state == STATE_READY
+        assert data.find_bangumi_id("葬送的芙莉莲") == ("400602", "葬送的芙莉莲", False)
+        assert data.get_status()["items"] == 1
+        assert not data.start()
+
+    def test_lookup_after_force_update(self):
+        data = _data()
+
+        def load():
+            data._publish(list(ITEMS))
+
+        with patch.object(data, "_load", side_effect=load):
+            data.start()
+            _wait_loader(data)
+            with patch.object(data, "_download_data", return_value=True):
+                assert data.force_update()
+            _wait_loader(data)
+            assert data.find_bangumi_id("葬送的芙莉莲") == (
+                "400602",
+                "葬送的芙莉莲",
+                False,
+            )
+        assert data.get_status()["state"] == STATE_READY
+        assert data.get_status()["items"] == 1
+
+    def test_find_waits_at_most_ready_timeout(self):
+        data = _data()
+        data.ready_timeout = 0.2
+        release = threading.Event()
+
+        with patch.object(data, "_load", side_effect=lambda: release.wait(5)):
+            started = time.monotonic()
+            assert data.find_bangumi_id("葬送的芙莉莲") is None
+            elapsed = time.monotonic() - started
+            release.set()
+            _wait_loader(data)
+        assert elapsed < 1
+        assert data.state == STATE_FAILED
+
+    def test_find_returns_once_loaded_within_timeout(self):
+        data = _data()
+
+        def load():
+            time.sleep(0.1)
+            data._publish(list(ITEMS))
+
+        with patch.object(data, "_load", side_effect=load):
+            assert data.find_bangumi_id("葬送的芙莉莲")[0] == "400602"
+
+    def test_failed_load_retries_after_interval(self):
+        data = _data()
+        with patch.object(data, "_load", side_effect=OSError("offline")) as load:
+            data.start()
+            _wait_loader(data)
+            assert data.state == STATE_FAILED
+            assert "offline" in data.get_status()["last_error"]
+            assert not data.start()
+            data._next_reload_at = 0
+            assert data.start()
+            _wait_loader(data)
+        assert load.call_count == 2
+
+
+class TestStaleRefresh:
+    def _ready(self):
+        data = _data()
+        data.use_cache = True
+        data._publish(list(ITEMS))
+        data._state = STATE_READY
+        return data
+
+    def test_expired_cache_refreshes_in_background(self):
+        data = self._ready()
+        release = threading.Event()
+
+        def download():
+            release.wait(5)
+            return True
+
+        with (
+            patch.object(data, "_is_cache_valid", return_value=False),
+            patch.object(data, "_download_data", side_effect=download) as dl,
+            patch.object(data, "_preload_data_to_memory"),
+        ):
+            started = time.monotonic()
+            result = data.find_bangumi_id("葬送的芙莉莲")
+            elapsed = time.monotonic() - started
+            # 请求线程不等待下载，继续使用现有数据
+            assert result[0] == "400602"
+            assert elapsed < 1
+            assert data.state == STATE_STALE
+            release.set()
+            _wait_loader(data)
+        dl.assert_called_once()
+        assert data.state == STATE_READY
+
+    def test_failed_refresh_keeps_data(self):
+        data = self._ready()
+        with (
+            patch.object(data, "_is_cache_valid", return_value=False),
+            patch.object(data, "_download_data", return_value=False),
+        ):
+            data.find_bangumi_id("葬送的芙莉莲")
+            _wait_loader(data)
+            assert data.state == STATE_STALE
+            assert data.find_bangumi_id("葬送的芙莉莲")[0] == "400602"
+
+    def test_freshness_check_is_throttled(self):
+        data = self._ready()
+        with patch.object(data, "_is_cache_valid", return_value=True) as valid:
+            for _ in range(5):
+                data.find_bangumi_id("葬送的芙莉莲")
+        assert valid.call_count == 1
+
+    def test_parse_data_never_downloads(self):
+        data = self._ready()
+        with patch.object(data, "_download_data") as dl:
+            assert list(data._parse_data()) == ITEMS
+        dl.assert_not_called()
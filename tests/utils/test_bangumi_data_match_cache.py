@@ -0,0 +1,120 @@
+"""find_bangumi_id 匹配结果缓存单元测试。"""
+
+import json
+import os
+from unittest.mock import patch
+
+from app.services.mapping_service import MappingService
+from app.utils import bangumi_data as bd_mod
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+
+
+def _items():
+    return [
+        BangumiDataItem("鬼滅の刃", ("鬼灭之刃",), "2019-04-06", "248175"),
+        BangumiDataItem(
+            "ぼっち・ざ・ろっく！", ("孤独摇滚！",), "2022-10-08", "328609"
+        ),
+    ]
+
+
+def _data(items=None):
+    with (
+        patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+        patch.object(BangumiData, "_preload_data_to_memory"),
+    ):
+        data = BangumiData()
+    data.use_cache = False
+    data._publish(_items() if items is None else items)
+    return data
+
+
+class TestMatchCache:
+    def test_repeated_lookup_hits_cache(self):
+        data = _data()
+        with patch.object(
+            data, "_find_bangumi_id_uncached", wraps=data._find_bangumi_id_uncached
+        ) as uncached:
+            first = data.find_bangumi_id("鬼灭之刃", release_date="2019-04-06")
+            second = data.find_bangumi_id("鬼灭之刃", release_date="2019-04-06")
+            # 首尾空白不影响缓存键
+            third = data.find_bangumi_id(" 鬼灭之刃 ", release_date="2019-04-06")
+        assert first == second == third
+        assert first[0] == "248175"
+        assert uncached.call_count == 1
+        stats = data.get_cache_stats()
+        assert stats["match_cache_hits"] == 2
+        assert stats["match_cache_misses"] == 1
+        assert stats["match_cache_size"] == 1
+        assert round(stats["match_cache_hit_rate"]) == 67
+
+    def test_titles_differing_in_punctuation_are_cached_separately(self):
+        """规范化后同键、原文不同的标题匹配到不同条目，缓存不能混用"""
+        data = _data(
+            [
+                BangumiDataItem("けいおん!", (), "2009-04-03", "1424"),
+                BangumiDataItem("けいおん!!", (), "2010-04-07", "7157"),
+            ]
+        )
+        for _ in range(2):
+            assert data.find_bangumi_id("けいおん!")[0] == "1424"
+            assert data.find_bangumi_id("けいおん!!")[0] == "7157"
+        assert data.get_cache_stats()["match_cache_hits"] == 2
+
+    def test_negative_results_cached(self):
+        data = _data()
+        with patch.object(
+            data, "_find_bangumi_id_uncached", wraps=data._find_bangumi_id_uncached
+        ) as uncached:
+            assert data.find_bangumi_id("不存在的番剧") is None
+            assert data.find_bangumi_id("不存在的番剧") is None
+        assert uncached.call_count == 1
+
+    def test_key_includes_date_and_season(self):
+        data = _data()
+        data.find_bangumi_id("鬼灭之刃", release_date="2019-04-06")
+        data.find_bangumi_id("鬼灭之刃", release_date="2019-04-06", season=2)
+        data.find_bangumi_id("鬼灭之刃", release_date="2021-12-05")
+        assert data.get_cache_stats()["match_cache_size"] == 3
+
+    def test_bounded(self):
+        data = _data()
+        with patch.object(bd_mod, "_MATCH_CACHE_SIZE", 2):
+            for n in range(3):
+                data.find_bangumi_id(f"标题{n}")
+        assert list(data._match_cache) == [
+            ("标题1", "", "", 1),
+            ("标题2", "", "", 1),
+        ]
+
+    def test_dataset_swap_invalidates(self):
+        data = _data()
+        assert data.find_bangumi_id("新番") is None
+        data._publish(
+            _items() + [BangumiDataItem("新番", ("新番",), "2025-01-01", "500000")]
+        )
+        assert data.find_bangumi_id("新番")[0] == "500000"
+
+    def test_data_not_in_memory_is_not_cached(self):
+        data = _data()
+        data._current = data._current._replace(items=None)
+        with patch.object(data, "_parse_data", return_value=iter([])):
+            data.find_bangumi_id("鬼灭之刃")
+        assert data.get_cache_stats()["match_cache_size"] == 0
+
+    def test_mapping_file_change_invalidates(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        path = tmp_path / "bangumi_mapping.json"
+        path.write_text(json.dumps({"mappings": {"a": "1"}}), encoding="utf-8")
+        with patch(
+            "app.services.mapping_service.bangumi_data.clear_match_cache"
+        ) as clear:
+            service = MappingService()
+            service.load_custom_mappings()
+            service.load_custom_mappings()
+            assert clear.call_count == 1
+            path.write_text(json.dumps({"mappings": {"a": "2"}}), encoding="utf-8")
+            os.utime(path, (1, 1))
+            service.load_custom_mappings()
+            assert clear.call_count == 2
@@ -0,0 +1,132 @@
+"""bangumi-data 标题二元组索引单元测试。"""
+
+import random
+import time
+from unittest.mock import patch
+
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+from app.utils.bangumi_data_ngram import TitleNgramIndex, title_grams
+from app.utils.title_normalizer import normalize_title
+
+CHARS = "的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要她出也得里后自以会家"
+
+
+def _items():
+    return [
+        BangumiDataItem("葬送のフリーレン", ("葬送的芙莉莲",), "2023-09-29", "400602"),
+        BangumiDataItem(
+            "ぼっち・ざ・ろっく！", ("孤独摇滚！",), "2022-10-08", "328609"
+        ),
+        BangumiDataItem("SPY×FAMILY", ("间谍过家家",), "2022-04-09", "329906"),
+        BangumiDataItem("SPY×FAMILY 第2期", ("间谍过家家 第二季",), "2023-10-07", "0"),
+        BangumiDataItem("無題", None, "2020-01-01", "1"),
+    ]
+
+
+def _random_items(count, seed=1):
+    rng = random.Random(seed)
+
+    def text():
+        return "".join(rng.choice(CHARS) for _ in range(rng.randint(4, 12)))
+
+    return [
+        BangumiDataItem(text(), (text(),), f"20{n % 25:02d}-04-15", str(n + 1))
+        for n in range(count)
+    ]
+
+
+def _data(items):
+    with (
+        patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+        patch.object(BangumiData, "_preload_data_to_memory"),
+    ):
+        data = BangumiData()
+    data.use_cache = False
+    data._publish(items)
+    return data
+
+
+class TestTitleNgramIndex:
+    def test_normalize_and_grams(self):
+        assert normalize_title("SPY×FAMILY 第2期") == "spyfamily第2期"
+        assert title_grams("芙莉莲") == {"芙莉", "莉莲"}
+        assert title_grams("猫") == {"猫"}
+        assert title_grams("") == set()
+
+    def test_candidates_ranked_by_shared_grams(self):
+        index = TitleNgramIndex(_items())
+        assert index.candidates(["间谍过家家 第二季"], 10) == [3, 2]
+        assert index.candidates(["间谍过家家 第二季"], 1) == [3]
+        assert index.candidates(["完全无关"], 10) == []
+
+    def test_ties_broken_by_item_order(self):
+        items = [BangumiDataItem(f"测试{n}", None, None, str(n)) for n in range(5)]
+        index = TitleNgramIndex(items)
+        assert index.candidates(["测试"], 3) == [0, 1, 2]
+
+    def test_similar_filters_by_score_and_containment(self):
+        index = TitleNgramIndex(_items())
+        found = index.similar(["间谍过家家"], 50, 25)
+        assert [i.bangumi_id for i in found] == ["329906", "0"]
+        # 短查询与长标题相似度低，但存在包含关系
+        found = index.similar(["SPY"], 50, 90)
+        assert [i.bangumi_id for i in found] == ["329906", "0"]
+
+
+class TestFuzzyLookupWithIndex:
+    def test_index_built_for_data_cache(self):
+        data = _data(_items())
+        assert data._ngram_index.items is data._data_cache
+        data.clear_cache()
+        assert data._ngram_index is None
+
+    def test_fuzzy_match_uses_candidates_only(self):
+        data = _data(_items())
+        with patch.object(
+            data, "_calculate_match_info", wraps=data._calculate_match_info
+        ) as info:
+            result = data.find_bangumi_id("孤独摇滚啊", release_date="2022-10-08")
+        assert result[0] == "328609"
+        assert info.call_count == 1
+
+    def test_falls_back_to_linear_scan_without_index(self):
+        data = _data(_items())
+        data._current = data._current._replace(items=list(data._data_cache))
+        assert data._fuzzy_candidates("孤独摇滚") is None
+        assert data.find_bangumi_id("孤独摇滚")[0] == "328609"
+
+    def test_same_results_as_linear_scan(self):
+        items = _random_items(1000)
+        data = _data(items)
+        # 开播日期窗口有意缩小结果范围，这里只比较候选检索本身
+        data.date_window_days = 0
+        queries = [items[n].zh_hans[0][:-1] + "某" for n in range(0, 1000, 50)]
+        with patch.object(data, "verbose_logging", False):
+            indexed = [
+                data.find_bangumi_id(q, release_date="2010-04-01") for q in queries
+            ]
+            data._current = data._current._replace(ngram_index=None)
+            linear = [
+                data.find_bangumi_id(q, release_date="2010-04-01") for q in queries
+            ]
+        assert indexed == linear
+        assert any(indexed)
+
+    def test_lookup_is_fast(self):
+        """10000 个条目：平均每次模糊查找远快于一次完整的线性扫描"""
+        items = _random_items(10000)
+        data = _data(items)
+        queries = [items[n].zh_hans[0][:-1] + "某" for n in range(0, 10000, 500)]
+        with patch.object(data, "verbose_logging", False):
+            started = time.perf_counter()
+            for query in queries:
+                data.find_bangumi_id(query)
+            indexed = (time.perf_counter() - started) / len(queries)
+            # 无匹配的查询：线性扫描需要遍历全部条目
+            data._current = data._current._replace(ngram_index=None)
+            started = time.perf_counter()
+            assert data.find_bangumi_id("ZZZZZZZZ") is None
+            linear = time.perf_counter() - started
+        assert indexed < 0.01
+        assert indexed * 20 < linear
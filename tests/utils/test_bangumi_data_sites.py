@@ -0,0 +1,158 @@
+"""bangumi-data 站点 ID 索引单元测试。"""
+
+from unittest.mock import patch
+
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+from app.utils.bangumi_data_sites import (
+    BangumiSiteIndex,
+    external_site_ids,
+    item_site_ids,
+)
+
+
+def _items():
+    return [
+        BangumiDataItem(
+            "葬送のフリーレン",
+            ("葬送的芙莉莲",),
+            "2023-09-29",
+            "400602",
+            "tv/209867",
+            ("bilibili", "28298079"),
+        ),
+        # 第二季与第一季共用 TMDB 剧集 id
+        BangumiDataItem(
+            "葬送のフリーレン 第2期",
+            ("葬送的芙莉莲 第二季",),
+            "2026-01-16",
+            "500602",
+            "tv/209867",
+        ),
+        BangumiDataItem(
+            "【推しの子】 第2期",
+            ("【我推的孩子】 第二季",),
+            "2024-07-03",
+            "443428",
+            "tv/203737/season/2",
+        ),
+        BangumiDataItem(
+            "劇場版 呪術廻戦 0", ("咒术回战 0",), "2021-12-24", "327261", "movie/810693"
+        ),
+        # 没有 bangumi id 的条目不建立索引
+        BangumiDataItem("無名", None, "2024-01-01", None, "tv/1"),
+    ]
+
+
+def _data(items):
+    with (
+        patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+        patch.object(BangumiData, "_preload_data_to_memory"),
+    ):
+        data = BangumiData()
+    data.use_cache = False
+    data._publish(items)
+    return data
+
+
+class TestExternalSiteIds:
+    def test_tmdb_number_completed_by_media_type(self):
+        assert external_site_ids("TMDB", " 810693 ", is_movie=True) == [
+            ("tmdb", "movie/810693")
+        ]
+        assert external_site_ids("tmdb", "203737", season=2) == [
+            ("tmdb", "tv/203737/season/2"),
+            ("tmdb", "tv/203737"),
+        ]
+
+    def test_other_sites_and_empty_values(self):
+        assert external_site_ids("tmdb", "tv/1") == [("tmdb", "tv/1")]
+        assert external_site_ids("imdb", "tt0133093") == [("imdb", "tt0133093")]
+        assert external_site_ids("tvdb", "") == []
+        assert external_site_ids("", "1") == []
+
+
+class TestBangumiSiteIndex:
+    def test_every_site_indexed(self):
+        items = _items()
+        index = BangumiSiteIndex(items)
+        assert index.lookup("bilibili", "28298079") == (items[0],)
+        assert index.lookup("Bangumi", "443428") == (items[2],)
+        assert index.lookup("tmdb", "tv/209867") == (items[0], items[1])
+        assert index.lookup("tmdb", "movie/810693") == (items[3],)
+        assert index.lookup("tmdb", "tv/1") == ()
+
+    def test_item_site_ids(self):
+        item = BangumiDataItem("a", None, None, "1", "tv/2", ("netflix", "3"))
+        assert list(item_site_ids(item)) == [
+            ("bangumi", "1"),
+            ("tmdb", "tv/2"),
+            ("netflix", "3"),
+        ]
+
+
+class TestFindByExternalIds:
+    def test_movie(self):
+        data = _data(_items())
+        assert data.find_bangumi_id_by_external_ids(
+            {"tmdb": "810693"}, is_movie=True
+        ) == ("327261", "咒术回战 0", True)
+
+    def test_season_specific_tmdb_id(self):
+        data = _data(_items())
+        assert data.find_bangumi_id_by_external_ids({"tmdb": "203737"}, season=2) == (
+            "443428",
+            "【我推的孩子】 第二季",
+            True,
+        )
+
+    def test_shared_tmdb_id_chosen_by_release_date(self):
+        data = _data(_items())
+        found = data.find_bangumi_id_by_external_ids(
+            {"tmdb": "209867"}, season=2, release_date="2026-01-23"
+        )
+        assert found == ("500602", "葬送的芙莉莲 第二季", True)
+        found = data.find_bangumi_id_by_external_ids(
+            {"tmdb": "209867"}, season=1, release_date="2023-10-06"
+        )
+        assert found[0] == "400602"
+
+    def test_shared_tmdb_id_without_date_starts_from_first_season(self):
+        data = _data(_items())
+        # 无法确定季度：返回最早的条目，由调用方遍历续集
+        assert data.find_bangumi_id_by_external_ids({"tmdb": "209867"}, season=2) == (
+            "400602",
+            "葬送的芙莉莲",
+            False,
+        )
+        assert data.find_bangumi_id_by_external_ids({"tmdb": "209867"})[2] is True
+
+    def test_bangumi_id_tried_first(self):
+        data = _data(_items())
+        found = data.find_bangumi_id_by_external_ids(
+            {"imdb": "tt0000000", "tmdb": "810693", "bangumi": "443428"}
+        )
+        assert found[0] == "443428"
+
+    def test_miss_and_stale_index(self):
+        data = _data(_items())
+        assert data.find_bangumi_id_by_external_ids(None) is None
+        assert data.find_bangumi_id_by_external_ids({"tvdb": "1"}) is None
+        # 条目列表被替换而索引尚未重建时不使用旧索引
+        data._current = data._current._replace(items=list(data._data_cache))
+        assert data.find_bangumi_id_by_external_ids({"tmdb": "810693"}) is None
+        data.clear_cache()
+        assert data.find_bangumi_id_by_external_ids({"tmdb": "810693"}) is None
+
+    def test_parsed_items_keep_all_sites(self):
+        raw = {
+            "title": "葬送のフリーレン",
+            "sites": [
+                {"site": "bangumi", "id": "400602"},
+                {"site": "tmdb", "id": "tv/209867"},
+                {"site": "netflix", "id": "81726714"},
+            ],
+        }
+        data = _data([BangumiDataItem.from_raw(raw)])
+        found = data.find_bangumi_id_by_external_ids({"netflix": "81726714"})
+        assert found == ("400602", "葬送のフリーレン", True)
@@ -0,0 +1,141 @@
+"""bangumi-data 二进制快照单元测试。"""
+
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import bangumi_data_snapshot as snap_mod
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+from app.utils.bangumi_data_snapshot import (
+    load_snapshot,
+    save_snapshot,
+    snapshot_path,
+    source_digest,
+)
+
+
+def _raw_items(count):
+    return [
+        {
+            "title": f"原名{n}",
+            "titleTranslate": {"zh-Hans": [f"中文{n}"], "en": [f"English {n}"]},
+            "type": "tv",
+            "begin": "2024-01-05T15:00:00.000Z",
+            "broadcast": "R/2024-01-05T15:00:00.000Z/P7D",
+            "sites": [
+                {"site": "bangumi", "id": str(1000 + n)},
+                {"site": "tmdb", "id": f"tv/{5000 + n}"},
+                {"site": "bilibili", "id": str(n)},
+            ],
+        }
+        for n in range(count)
+    ]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "bangumi_data_cache.json"
+    path.write_text(json.dumps({"items": _raw_items(3)}), encoding="utf-8")
+    return str(path)
+
+
+def _make_data(source):
+    with (
+        patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+        patch.object(BangumiData, "_preload_data_to_memory"),
+    ):
+        data = BangumiData()
+    data.use_cache = True
+    data.local_cache_path = source
+    return data
+
+
+class TestSnapshotFile:
+    def test_round_trip(self, source):
+        items = [BangumiDataItem.from_raw(i) for i in _raw_items(3)]
+        digest = source_digest(source)
+        path = snapshot_path(source)
+        assert path.endswith("bangumi_data_cache.snapshot")
+        assert save_snapshot(path, digest, items)
+        loaded = load_snapshot(path, digest)
+        assert loaded == items
+        assert [i.tmdb_id for i in loaded] == ["tv/5000", "tv/5001", "tv/5002"]
+        assert loaded[0].title is items[0].title
+
+    def test_source_change_invalidates(self, source):
+        path = snapshot_path(source)
+        save_snapshot(path, source_digest(source), [BangumiDataItem(title="a")])
+        with open(source, "a", encoding="utf-8") as f:
+            f.write(" ")
+        assert load_snapshot(path, source_digest(source)) is None
+
+    def test_format_version_change_invalidates(self, source):
+        digest = source_digest(source)
+        path = snapshot_path(source)
+        save_snapshot(path, digest, [BangumiDataItem(title="a")])
+        with patch.object(snap_mod, "SNAPSHOT_VERSION", snap_mod.SNAPSHOT_VERSION + 1):
+            assert load_snapshot(path, digest) is None
+
+    def test_corrupt_or_missing_snapshot(self, source):
+        digest = source_digest(source)
+        path = snapshot_path(source)
+        assert load_snapshot(path, digest) is None
+        save_snapshot(path, digest, [BangumiDataItem(title="a")])
+        with open(path, "r+b") as f:
+            f.seek(snap_mod._HEADER.size)
+            f.write(b"\xff\xff")
+        assert load_snapshot(path, digest) is None
+
+
+class TestBangumiDataStartup:
+    def test_second_start_loads_snapshot(self, source):
+        first = _make_data(source)
+        first._preload_data_to_memory()
+        assert len(first._data_cache) == 3
+
+        second = _make_data(source)
+        with patch("app.utils.bangumi_data.ijson.items") as parse:
+            second._preload_data_to_memory()
+        parse.assert_not_called()
+        assert second.find_bangumi_id("中文1") == ("1001", "中文1", False)
+
+    def test_upstream_change_rebuilds(self, source):
+        _make_data(source)._preload_data_to_memory()
+        with open(source, "w", encoding="utf-8") as f:
+            json.dump({"items": _raw_items(5)}, f)
+        data = _make_data(source)
+        data._preload_data_to_memory()
+        assert len(data._data_cache) == 5
+        assert len(load_snapshot(snapshot_path(source), source_digest(source))) == 5
+
+    @pytest.mark.performance
+    @pytest.mark.skipif(
+        not os.environ.get("RUN_PERFORMANCE_TESTS"),
+        reason="耗时对比受机器负载影响，设置 RUN_PERFORMANCE_TESTS=1 时运行",
+    )
+    def test_startup_benchmark(self, tmp_path):
+        """10000 个条目：载入快照比解析 JSON 至少快 3 倍"""
+        source = tmp_path / "bangumi_data_cache.json"
+        source.write_text(json.dumps({"items": _raw_items(10000)}), encoding="utf-8")
+
+        def preload():
+            data = _make_data(str(source))
+            started = time.perf_counter()
+            data._preload_data_to_memory()
+            elapsed = time.perf_counter() - started
+            assert len(data._data_cache) == 10000
+            return elapsed
+
+        # 各取多次中的最短耗时，减少整体测试负载造成的波动
+        parse_times = []
+        for _ in range(2):
+            snapshot = snapshot_path(str(source))
+            if os.path.exists(snapshot):
+                os.remove(snapshot)
+            parse_times.append(preload())
+        snapshot_time = min(preload() for _ in range(3))
+        assert snapshot_time * 3 < min(parse_times)
@@ -0,0 +1,141 @@
+"""Bangumi API 熔断器与熔断期间暂存同步的单元测试。"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+import responses
+
+from app.core.database import DatabaseManager
+from app.utils import bgm_circuit_breaker as breaker_mod
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bgm_circuit_breaker import (
+    BangumiCircuitBreaker,
+    BangumiCircuitOpenError,
+)
+from app.utils.bgm_retry_queue import BangumiRetryQueue, defer_retries
+
+URL = "https://api.bgm.tv/v0/subjects/1"
+FAR_FUTURE = 10**12
+
+
+@pytest.fixture
+def breaker():
+    return BangumiCircuitBreaker(threshold=3, cooldown=30)
+
+
+def _later(seconds):
+    return patch.object(
+        breaker_mod.time, "time", return_value=breaker_mod.time.time() + seconds
+    )
+
+
+class TestBreaker:
+    def test_opens_after_consecutive_failures(self, breaker):
+        breaker.record_failure(URL)
+        breaker.record_failure(URL)
+        breaker.before_request(URL)
+        breaker.record_failure(URL)
+        with pytest.raises(BangumiCircuitOpenError) as exc:
+            breaker.before_request(URL)
+        assert exc.value.host == "api.bgm.tv"
+        # 其他主机不受影响
+        breaker.before_request("https://bgm-proxy.example/v0/subjects/1")
+        stats = breaker.get_stats()["hosts"]["api.bgm.tv"]
+        assert stats["state"] == "open"
+        assert stats["rejected"] == 1
+
+    def test_success_resets_failure_count(self, breaker):
+        breaker.record_failure(URL)
+        breaker.record_failure(URL)
+        breaker.record_success(URL)
+        breaker.record_failure(URL)
+        breaker.before_request(URL)
+
+    def test_half_open_allows_single_probe(self, breaker):
+        for _ in range(3):
+            breaker.record_failure(URL)
+        with _later(31):
+            breaker.before_request(URL)
+            with pytest.raises(BangumiCircuitOpenError):
+                breaker.before_request(URL)
+            breaker.record_success(URL)
+            breaker.before_request(URL)
+        assert breaker.get_stats()["hosts"]["api.bgm.tv"]["state"] == "closed"
+
+    def test_failed_probe_doubles_cooldown(self, breaker):
+        for _ in range(3):
+            breaker.record_failure(URL)
+        with _later(31):
+            breaker.before_request(URL)
+            breaker.record_failure(URL)
+        with _later(61):
+            with pytest.raises(BangumiCircuitOpenError):
+                breaker.before_request(URL)
+        with _later(92):
+            breaker.before_request(URL)
+
+    def test_zero_threshold_disables(self):
+        breaker = BangumiCircuitBreaker(threshold=0)
+        for _ in range(10):
+            breaker.record_failure(URL)
+        breaker.before_request(URL)
+        assert breaker.get_stats()["enabled"] is False
+
+
+class TestClient:
+    @responses.activate
+    def test_open_circuit_short_circuits_requests(self, breaker):
+        responses.add(responses.GET, URL, status=503)
+        with (
+            patch("app.utils.bangumi_api.bgm_circuit_breaker", breaker),
+            patch("app.utils.bangumi_api.time.sleep"),
+            defer_retries(),
+        ):
+            api = BangumiApi()
+            for _ in range(3):
+                with pytest.raises(requests.exceptions.HTTPError):
+                    api.get("subjects/1")
+            with pytest.raises(BangumiCircuitOpenError):
+                api.get("subjects/1")
+        assert len(responses.calls) == 3
+
+
+@pytest.fixture
+def queue(tmp_path):
+    db = DatabaseManager(str(tmp_path / "breaker.db"))
+    yield BangumiRetryQueue(db=db)
+    db.close()
+
+
+class TestQueueParking:
+    def test_open_circuit_parks_batch_without_attempts(self, queue):
+        retry_at = 5000.0
+        handler = MagicMock(side_effect=BangumiCircuitOpenError("api.bgm.tv", retry_at))
+        queue.register("k", handler)
+        for n in range(3):
+            queue.schedule("k", {"n": n})
+
+        assert queue.run_due(now=FAR_FUTURE) == 1
+        handler.assert_called_once()
+        tasks = queue._db.get_due_bgm_retry_tasks(FAR_FUTURE)
+        assert [(t["attempts"], t["next_run_at"]) for t in tasks] == [(0, retry_at)] * 3
+        assert queue.get_stats()["parked"] == 3
+
+    def test_schedule_uses_circuit_retry_time(self, queue):
+        error = BangumiCircuitOpenError("api.bgm.tv", breaker_mod.time.time() + 120)
+        queue.schedule("k", {}, error)
+        task = queue._db.get_due_bgm_retry_tasks(FAR_FUTURE)[0]
+        assert task["next_run_at"] == error.retry_at
+
+    def test_backlog_drains_at_interval(self, queue):
+        queue.register("k", MagicMock())
+        for n in range(3):
+            queue.schedule("k", {"n": n})
+        drain = BangumiCircuitBreaker(threshold=3, drain_interval=0.5)
+        with (
+            patch("app.utils.bgm_retry_queue.bgm_circuit_breaker", drain),
+            patch.object(queue._stopping, "wait", return_value=False) as wait,
+        ):
+            assert queue.run_due(now=FAR_FUTURE) == 3
+        assert [c.args for c in wait.call_args_list] == [(0.5,), (0.5,)]
@@ -0,0 +1,290 @@
+"""Bangumi 账号收藏账本单元测试。"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+import responses
+
+from app.core.database import DatabaseManager
+from app.utils import (
+    bangumi_api_async as async_mod,
+    bgm_collection_ledger as ledger_mod,
+)
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_async import AsyncBangumiApi
+from app.utils.bgm_collection_ledger import (
+    RECONCILE_INTERVAL_SECONDS,
+    SUBJECT_TRUST_SECONDS,
+    BangumiCollectionLedger,
+)
+
+API = "https://api.bgm.tv/v0"
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "ledger.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def ledger(db):
+    return BangumiCollectionLedger(db=db)
+
+
+def _later(seconds):
+    return patch.object(
+        ledger_mod.time, "time", return_value=ledger_mod.time.time() + seconds
+    )
+
+
+class TestLedger:
+    def test_reconcile_replaces_subjects(self, ledger):
+        assert ledger.needs_reconcile("alice")
+        ledger.record_subject("alice", 99, 3)
+        written = ledger.reconcile(
+            "alice",
+            [
+                {"subject_id": 10, "type": 3, "ep_status": 4},
+                {"subject_id": 11, "type": 2},
+                {"subject_id": None, "type": 1},
+                {"subject_id": 12, "type": "bad"},
+            ],
+        )
+        assert written == 2
+        assert not ledger.needs_reconcile("alice")
+        assert ledger.subject_type("alice", "10") == 3
+        assert ledger.subject_type("alice", 11) == 2
+        # 对账结果中不存在的条目被移除
+        assert ledger.subject_type("alice", 99) is None
+        # 账号之间互不影响
+        assert ledger.subject_type("bob", 10) is None
+        with _later(RECONCILE_INTERVAL_SECONDS + 1):
+            assert ledger.needs_reconcile("alice")
+
+    def test_subject_trust_expires(self, ledger):
+        ledger.record_subject("alice", 10, 3)
+        with _later(SUBJECT_TRUST_SECONDS + 1):
+            assert ledger.subject_type("alice", 10) is None
+        assert ledger.get_stats()["misses"] == 1
+
+    def test_watched_episodes(self, ledger):
+        ledger.record_episodes("alice", 10, [100, 101])
+        ledger.record_episodes("alice", 10, [102], collection_type=1)
+        assert ledger.watched_episodes("alice", [100, "101", 102, 103]) == {
+            "100",
+            "101",
+        }
+        assert ledger.get_stats()["episode_hits"] == 2
+
+    def test_reconcile_drops_episodes_changed_elsewhere(self, ledger):
+        ledger.record_episodes("alice", 10, [100, 101])
+        ledger.record_episodes("alice", 11, [110, 111])
+        ledger.record_episodes("alice", 12, [120])
+        ledger.reconcile(
+            "alice",
+            [
+                {"subject_id": 10, "type": 3, "ep_status": 2},
+                # 在网页端取消了一集
+                {"subject_id": 11, "type": 3, "ep_status": 1},
+                {"subject_id": 12, "type": 3},
+            ],
+        )
+        assert ledger.has_episodes("alice", 10)
+        assert not ledger.has_episodes("alice", 11)
+        assert ledger.watched_episodes("alice", [110, 111]) == set()
+        # 没有进度信息时保留
+        assert ledger.has_episodes("alice", 12)
+
+    def test_reconcile_failure_backs_off(self, ledger):
+        ledger.reconcile_failed("alice", RuntimeError("boom"))
+        assert not ledger.needs_reconcile("alice")
+        assert ledger.get_stats()["reconcile_errors"] == 1
+        with _later(ledger_mod.RECONCILE_RETRY_SECONDS + 1):
+            assert ledger.needs_reconcile("alice")
+
+    def test_clear_account(self, ledger):
+        ledger.reconcile("alice", [{"subject_id": 1, "type": 3}])
+        ledger.reconcile("bob", [{"subject_id": 2, "type": 3}])
+        assert ledger.clear("alice") == 1
+        assert ledger.needs_reconcile("alice")
+        assert not ledger.needs_reconcile("bob")
+
+
+def _sync_api(ledger):
+    return BangumiApi(username="alice", access_token="tok", collection_ledger=ledger)
+
+
+class TestSyncClient:
+    @responses.activate
+    def test_reconcile_pages_user_collections(self, ledger):
+        first = [{"subject_id": n, "type": 3} for n in range(100)]
+        responses.add(
+            responses.GET,
+            f"{API}/users/alice/collections",
+            json={"data": first, "total": 101},
+        )
+        responses.add(
+            responses.GET,
+            f"{API}/users/alice/collections",
+            json={"data": [{"subject_id": 100, "type": 2}], "total": 101},
+        )
+
+        _sync_api(ledger).reconcile_collection_ledger("alice")
+
+        params = [c.request.params for c in responses.calls]
+        assert params[0] == {"subject_type": "2", "offset": "0", "limit": "100"}
+        assert params[1]["offset"] == "100"
+        assert ledger.subject_type("alice", 100) == 2
+        assert not ledger.needs_reconcile("alice")
+
+    @responses.activate
+    def test_mark_does_not_wait_for_reconcile(self, ledger):
+        responses.add(
+            responses.GET, f"{API}/users/alice/collections/5", json={"type": 3}
+        )
+        responses.add(
+            responses.GET,
+            f"{API}/users/-/collections/5/episodes",
+            json={"data": [{"episode": {"id": 500}, "type": 0}], "total": 1},
+        )
+        responses.add(
+            responses.PUT, f"{API}/users/-/collections/-/episodes/500", status=204
+        )
+        api = _sync_api(ledger)
+        with patch("app.utils.bangumi_api.threading.Thread") as thread:
+            assert api.mark_episode_watched(5, 500) == 1
+            # 对账进行中不再重复启动
+            api.mark_episode_watched(5, 500)
+
+        thread.assert_called_once()
+        assert thread.call_args.kwargs["target"] == api.reconcile_collection_ledger
+        thread.return_value.start.assert_called_once()
+        # 空账本：查询条目状态与章节状态后点格子，不拉取收藏列表
+        assert [c.request.method for c in responses.calls] == ["GET", "GET", "PUT"]
+        assert ledger.watched_episodes("alice", [500]) == {"500"}
+
+    @responses.activate
+    def test_episode_watched_elsewhere_is_not_marked(self, ledger):
+        ledger.reconcile("alice", [{"subject_id": 5, "type": 3}])
+        responses.add(
+            responses.GET,
+            f"{API}/users/-/collections/5/episodes",
+            json={
+                "data": [
+                    {"episode": {"id": 500}, "type": 2},
+                    {"episode": {"id": 501}, "type": 0},
+                ],
+                "total": 2,
+            },
+        )
+
+        api = _sync_api(ledger)
+        assert api.mark_episode_watched(5, 500) == 0
+        # 章节状态只读取一次
+        assert api.mark_episodes_watched(5, [500]) == {500: 0}
+        assert len(responses.calls) == 1
+        assert ledger.has_episodes("alice", 5)
+
+    def test_reconcile_keeps_rows_written_meanwhile(self, ledger):
+        started_at = ledger_mod.time.time() - 1
+        ledger.record_subject("alice", 5, 3)
+        ledger.reconcile("alice", [{"subject_id": 5, "type": 1}], started_at)
+        assert ledger.subject_type("alice", 5) == 3
+
+    @responses.activate
+    def test_known_watched_episode_skips_all_requests(self, ledger):
+        ledger.reconcile("alice", [{"subject_id": 5, "type": 3}])
+        ledger.record_episodes("alice", 5, [500])
+
+        assert _sync_api(ledger).mark_episode_watched(5, 500) == 0
+        assert len(responses.calls) == 0
+
+    @responses.activate
+    def test_untrusted_subject_is_queried_and_recorded(self, ledger):
+        ledger.reconcile("alice", [])
+        responses.add(
+            responses.GET, f"{API}/users/alice/collections/5", json={"type": 2}
+        )
+
+        assert _sync_api(ledger).mark_episodes_watched(5, [500, 501]) == {
+            500: 0,
+            501: 0,
+        }
+        assert len(responses.calls) == 1
+        assert ledger.subject_type("alice", 5) == 2
+
+    @responses.activate
+    def test_batch_only_patches_unknown_episodes(self, ledger):
+        ledger.reconcile("alice", [{"subject_id": 5, "type": 1}])
+        ledger.record_episodes("alice", 5, [500])
+        responses.add(responses.POST, f"{API}/users/-/collections/5", status=204)
+        responses.add(
+            responses.PATCH, f"{API}/users/-/collections/5/episodes", status=204
+        )
+
+        assert _sync_api(ledger).mark_episodes_watched(5, [500, 501]) == {
+            500: 0,
+            501: 1,
+        }
+        assert [c.request.method for c in responses.calls] == ["POST", "PATCH"]
+        assert json.loads(responses.calls[1].request.body) == {
+            "episode_id": [501],
+            "type": 2,
+        }
+        # 想看 -> 在看 已写入账本
+        assert ledger.subject_type("alice", 5) == 3
+
+    @responses.activate
+    def test_reconcile_failure_backs_off(self, ledger):
+        responses.add(responses.GET, f"{API}/users/alice/collections", status=500)
+        api = _sync_api(ledger)
+        assert ledger.begin_reconcile("alice")
+        with patch("app.utils.bangumi_api.time.sleep"):
+            api.reconcile_collection_ledger("alice")
+        assert ledger.get_stats()["reconcile_errors"] == 1
+        assert not ledger.begin_reconcile("alice")
+
+
+class TestAsyncClient:
+    @pytest.mark.asyncio
+    async def test_async_client_uses_ledger(self, ledger):
+        calls = []
+
+        def handler(req: httpx.Request) -> httpx.Response:
+            calls.append((req.method, req.url.path))
+            if req.url.path == "/v0/users/alice/collections":
+                data = [{"subject_id": 5, "type": 3}]
+                return httpx.Response(200, json={"data": data, "total": 1})
+            if req.url.path == "/v0/users/-/collections/5/episodes":
+                data = [{"episode": {"id": 502}, "type": 2}]
+                return httpx.Response(200, json={"data": data, "total": 1})
+            if req.method == "GET":
+                return httpx.Response(200, json={"type": 3})
+            return httpx.Response(204)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        api = AsyncBangumiApi(
+            username="alice", access_token="tok", collection_ledger=ledger
+        )
+        api._client = lambda direct=False: client
+
+        assert await api.mark_episodes_watched(5, [500, 501]) == {500: 1, 501: 1}
+        # 在其他客户端看过的章节（502）来自首次读取的章节状态
+        assert await api.mark_episode_watched(5, 502) == 0
+        await asyncio.gather(*async_mod._reconcile_tasks)
+        assert not ledger.needs_reconcile("alice")
+
+        # 对账完成后条目状态与章节均来自账本
+        assert await api.mark_episode_watched(5, 501) == 0
+        assert sorted(set(calls)) == [
+            ("GET", "/v0/users/-/collections/5/episodes"),
+            ("GET", "/v0/users/alice/collections"),
+            ("GET", "/v0/users/alice/collections/5"),
+            ("PATCH", "/v0/users/-/collections/5/episodes"),
+        ]
+        assert len(calls) == 4
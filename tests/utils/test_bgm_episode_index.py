@@ -0,0 +1,175 @@
+"""长篇番剧章节索引单元测试。"""
+
+import datetime
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.database import DatabaseManager
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_async import AsyncBangumiApi
+from app.utils.bgm_episode_index import EpisodeIndex
+from app.utils.bgm_metadata_cache import BangumiMetadataCache, classify_episode_index
+
+START = datetime.date(1996, 1, 8)
+
+
+def _episodes(count, start=1, total=None):
+    """每周一集的连续章节"""
+    data = [
+        {
+            "id": 10000 + n,
+            "type": 0,
+            "sort": n,
+            "ep": n,
+            "airdate": (START + datetime.timedelta(weeks=n - 1)).isoformat(),
+        }
+        for n in range(start, start + count)
+    ]
+    return data, total if total is not None else count
+
+
+def _pages(total):
+    """按 offset 返回分页的假 _fetch_episodes_page"""
+    data, _ = _episodes(total)
+
+    def fetch(subject_id, _type=0, *, limit=200, offset=0):
+        return {"data": data[offset : offset + limit], "total": total}
+
+    return fetch
+
+
+class TestEpisodeIndex:
+    def test_find_by_sort_and_ep(self):
+        index = EpisodeIndex.from_episodes(
+            [
+                {"id": 1, "sort": 1, "ep": 1},
+                {"id": 2, "sort": 13, "ep": 1},
+                {"id": 3, "sort": 14, "ep": 2},
+                {"id": 4, "sort": 14.5},
+            ]
+        )
+        assert index.find_by_sort(13)["id"] == 2
+        assert index.find_by_sort(14.5)["id"] == 4
+        # sort 中无 2，按 ep 匹配
+        assert index.find_by_sort(2)["id"] == 3
+        assert index.find_by_ep(1)["id"] == 1
+        assert index.find_by_sort(99) is None
+
+    def test_ep_match_requires_ep_not_above_sort(self):
+        index = EpisodeIndex.from_episodes([{"id": 1, "sort": 3, "ep": 5}])
+        assert index.find_by_sort(5) is None
+
+    def test_nearest_by_airdate(self):
+        data, total = _episodes(1000)
+        index = EpisodeIndex.from_episodes(data, total)
+        row, diff = index.nearest_by_airdate(START + datetime.timedelta(weeks=499))
+        assert (row["id"], diff) == (10500, 0)
+        row, diff = index.nearest_by_airdate(START + datetime.timedelta(days=10))
+        assert (row["id"], diff) == (10002, 3)
+        assert index.nearest_by_airdate(datetime.date(1990, 1, 1), 120) is None
+
+    def test_airdate_tie_prefers_earlier_episode(self):
+        index = EpisodeIndex.from_episodes(
+            [
+                {"id": 2, "sort": 2, "airdate": "2024-01-11"},
+                {"id": 1, "sort": 1, "airdate": "2024-01-09"},
+            ]
+        )
+        row, diff = index.nearest_by_airdate(datetime.date(2024, 1, 10))
+        assert (row["id"], diff) == (2, 1)
+
+    def test_payload_round_trip(self):
+        data, total = _episodes(3)
+        data.append({"id": 5, "sort": 3.5, "airdate": ""})
+        index = EpisodeIndex.from_episodes(data, 4)
+        restored = EpisodeIndex.from_payload(index.to_payload())
+        assert [restored.row(i) for i in range(4)] == [index.row(i) for i in range(4)]
+        assert restored.row(3) == {"id": 5, "type": 0, "sort": 3.5, "airdate": ""}
+        assert restored.complete
+
+    def test_long_series_is_compact(self):
+        data, total = _episodes(1000)
+        index = EpisodeIndex.from_episodes(data, total)
+        assert index.nbytes < 100 * 1024
+
+    def test_classify(self):
+        data, total = _episodes(10)
+        index = EpisodeIndex.from_episodes(data, total)
+        assert classify_episode_index(index, datetime.date(2024, 1, 1)) == "finished"
+        assert classify_episode_index(index, datetime.date(1995, 1, 1)) == "upcoming"
+        data.append({"id": 1, "sort": 11, "airdate": ""})
+        index = EpisodeIndex.from_episodes(data)
+        assert classify_episode_index(index, datetime.date(2024, 1, 1)) == "airing"
+
+
+class TestConcurrentPaging:
+    def test_pages_fetched_concurrently_in_order(self):
+        api = BangumiApi()
+        fetch = _pages(1328)
+        threads = set()
+
+        def tracked(*args, **kwargs):
+            threads.add(threading.get_ident())
+            return fetch(*args, **kwargs)
+
+        with patch.object(
+            api, "_fetch_episodes_page", side_effect=tracked
+        ) as fetch_page:
+            index = api.get_episode_index(899)
+            api.get_episode_index(899)
+        assert fetch_page.call_count == 7
+        assert len(index) == 1328 and index.complete
+        assert index.find_by_sort(1000)["id"] == 11000
+        assert len(threads) > 1
+
+    def test_fetch_all_keeps_page_order(self):
+        api = BangumiApi()
+        with patch.object(api, "_fetch_episodes_page", side_effect=_pages(450)):
+            episodes = api.get_episodes(899, fetch_all=True)
+        assert [ep["sort"] for ep in episodes["data"]] == list(range(1, 451))
+
+    @pytest.mark.asyncio
+    async def test_async_pages(self):
+        api = AsyncBangumiApi()
+        fetch = _pages(1328)
+
+        async def fake(*args, **kwargs):
+            return fetch(*args, **kwargs)
+
+        with patch.object(api, "_fetch_episodes_page", side_effect=fake) as fetch_page:
+            found = await api._find_episode_by_sort(899, 1000)
+            result = await api._resolve_episode_by_airdate_in_subject(
+                899, (START + datetime.timedelta(weeks=1199)).isoformat()
+            )
+        assert found["id"] == 11000
+        assert result == (899, 11200)
+        assert fetch_page.call_count == 7
+
+
+class TestPersistence:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        db = DatabaseManager(str(tmp_path / "meta.db"))
+        yield BangumiMetadataCache(db=db)
+        db.close()
+
+    def test_index_shared_across_clients(self, cache):
+        api = BangumiApi(metadata_cache=cache)
+        with patch.object(api, "_fetch_episodes_page", side_effect=_pages(450)):
+            api.get_episode_index(899)
+
+        other = BangumiApi(metadata_cache=cache)
+        other._fetch_episodes_page = MagicMock()
+        assert other._find_episode_by_sort(899, 400)["id"] == 10400
+        other._fetch_episodes_page.assert_not_called()
+
+    def test_incomplete_index_not_persisted(self, cache):
+        data, _ = _episodes(10)
+        assert not cache.put(
+            "episode_index", "899:0", "899", EpisodeIndex.from_episodes(data, 50)
+        )
+        assert cache.put(
+            "episode_index", "899:0", "899", EpisodeIndex.from_episodes(data, 10)
+        )
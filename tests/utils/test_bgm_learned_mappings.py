@@ -0,0 +1,269 @@
+"""Bangumi 学习映射单元测试。"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.database import DatabaseManager
+from app.models.sync import CustomItem
+from app.services import sync_service as sync_mod
+from app.services.sync_service import SyncService
+from app.utils.bgm_learned_mappings import (
+    BangumiLearnedMappings,
+    bgm_learned_mappings,
+    learned_key,
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "learned.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def store(db):
+    return BangumiLearnedMappings(db=db)
+
+
+def _record(store, title="葬送的芙莉莲", method="bangumi_data", **kwargs):
+    args = {
+        "ori_title": "Frieren",
+        "media_type": "episode",
+        "season": 2,
+        "subject_id": "500602",
+        "season_matched": True,
+        "season_subject_id": "500602",
+    }
+    args.update(kwargs)
+    return store.record(
+        title,
+        args["ori_title"],
+        args["media_type"],
+        args["season"],
+        args["subject_id"],
+        args["season_matched"],
+        args["season_subject_id"],
+        method,
+    )
+
+
+def _lookup(store, title="葬送的芙莉莲", min_confidence=0.6, **kwargs):
+    args = {"ori_title": "Frieren", "media_type": "episode", "season": 2}
+    args.update(kwargs)
+    return store.lookup(
+        title, args["ori_title"], args["media_type"], args["season"], min_confidence
+    )
+
+
+class TestKey:
+    def test_normalizes_width_case_and_spaces(self):
+        assert learned_key("ＡＢＣ  第二季", "Foo", "episode", 2) == (
+            learned_key("abc 第二季 ", "FOO", "EPISODE", 2)
+        )
+
+    def test_season_and_type_are_part_of_key(self):
+        base = learned_key("A", "", "episode", 1)
+        assert base != learned_key("A", "", "episode", 2)
+        assert base != learned_key("A", "", "movie", 1)
+
+    def test_air_year_is_part_of_key(self):
+        base = learned_key("A", "", "episode", 1, "2009-04-03")
+        assert base == learned_key("A", "", "episode", 1, "2009-06-26")
+        assert base != learned_key("A", "", "episode", 1, "2022-04-03")
+
+
+class TestStore:
+    def test_record_then_hit(self, store):
+        assert _lookup(store) is None
+        entry = _record(store)
+        assert (entry["confidence"], entry["hits"]) == (0.8, 1)
+        found = _lookup(store, title="葬送的芙莉莲 ", ori_title="frieren")
+        assert (found["subject_id"], found["season_matched"]) == ("500602", True)
+        stats = store.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_persists_across_instances(self, store, db):
+        _record(store, season_subject_id="500603")
+        entry = _lookup(BangumiLearnedMappings(db=db))
+        assert entry["season_subject_id"] == "500603"
+        assert entry["season_matched"] is True
+
+    def test_search_result_needs_confirmation(self, store):
+        _record(store, method="search")
+        assert _lookup(store) is None
+        entry = _record(store, method="learned")
+        assert (entry["confidence"], entry["hits"]) == (0.75, 2)
+        assert _lookup(store)["method"] == "search"
+
+    def test_different_result_replaces_entry(self, store):
+        _record(store, method="search")
+        _record(store, method="learned")
+        entry = _record(store, method="external_id", subject_id="400602")
+        assert (entry["subject_id"], entry["confidence"], entry["hits"]) == (
+            "400602",
+            0.9,
+            1,
+        )
+
+    def test_learned_result_not_written_back_after_delete(self, store):
+        _record(store)
+        key = store.list_entries()[0]["cache_key"]
+        assert store.delete(key) == 1
+        assert _record(store, method="learned") is None
+        assert store.list_entries() == []
+
+    def test_manual_entry_kept(self, store):
+        _record(store)
+        key = store.list_entries()[0]["cache_key"]
+        entry = store.update(key, "600000", False)
+        assert (entry["method"], entry["confidence"]) == ("manual", 1.0)
+        assert _record(store, subject_id="500602") is None
+        assert _lookup(store, min_confidence=1.0)["subject_id"] == "600000"
+        assert store.update("missing", "1", False) is None
+
+    def test_list_and_clear(self, store):
+        _record(store, title="A")
+        _record(store, title="B")
+        assert [e["title"] for e in store.list_entries()] == ["B", "A"]
+        assert store.clear() == 2
+        assert store.list_entries() == []
+
+
+def _item(**kwargs):
+    fields = {
+        "user_name": "u",
+        "title": "葬送的芙莉莲",
+        "ori_title": "Frieren",
+        "season": 2,
+        "episode": 3,
+        "media_type": "episode",
+        "release_date": "2026-01-30",
+    }
+    fields.update(kwargs)
+    return CustomItem(**fields)
+
+
+@pytest.fixture
+def service():
+    svc = SyncService()
+    data = MagicMock()
+    data.find_bangumi_id.return_value = ("500602", "葬送的芙莉莲 第二季", True)
+    data.get_data_version.return_value = "data-1"
+    bgm = AsyncMock()
+    bgm.bgm_search.return_value = [{"id": 400602, "name": "", "name_cn": ""}]
+    mappings = {}
+    with (
+        patch.object(svc, "_load_custom_mappings", return_value=mappings),
+        patch.object(svc, "_get_bangumi_data", return_value=data),
+        patch.object(svc, "_get_async_bangumi_api_for_user", return_value=bgm),
+        patch.object(sync_mod.mapping_service, "get_version", return_value="map-1"),
+        patch.object(sync_mod.database_manager, "log_sync_record"),
+    ):
+        svc.bgm = bgm
+        svc.data = data
+        svc.mappings = mappings
+        yield svc
+
+
+def _sync_success(service, item, subject_id="500602"):
+    service._record_sync_success(item, "custom", subject_id, "9001", "芙莉莲", "ok")
+
+
+class TestSubjectLookup:
+    @pytest.mark.asyncio
+    async def test_success_is_learned_and_reused(self, service):
+        item = _item()
+        assert await service._find_subject_id_async(item) == ("500602", True, "")
+        _sync_success(service, item)
+        assert await service._find_subject_id_async(_item(episode=4)) == (
+            "500602",
+            True,
+            "",
+        )
+        service.data.find_bangumi_id.assert_called_once()
+        entry = bgm_learned_mappings.list_entries()[0]
+        assert (entry["method"], entry["hits"]) == ("bangumi_data", 1)
+
+        # 以学习映射同步成功后提高可信度
+        _sync_success(service, _item(episode=4))
+        assert bgm_learned_mappings.list_entries()[0]["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_remake_of_other_year_is_matched_again(self, service):
+        item = _item()
+        await service._find_subject_id_async(item)
+        _sync_success(service, item)
+        service.data.find_bangumi_id.return_value = ("600602", "葬送的芙莉莲", True)
+        assert await service._find_subject_id_async(
+            _item(release_date="2031-01-30")
+        ) == (
+            "600602",
+            True,
+            "",
+        )
+
+    @pytest.mark.asyncio
+    async def test_external_id_wins_over_learned(self, service):
+        item = _item()
+        await service._find_subject_id_async(item)
+        _sync_success(service, item)
+        service.data.find_bangumi_id_by_external_ids.return_value = (
+            "700602",
+            "葬送的芙莉莲 第二季",
+            True,
+        )
+        result = await service._find_subject_id_async(
+            _item(provider_ids={"tmdb": "209867"})
+        )
+        assert result == ("700602", True, "")
+
+    @pytest.mark.asyncio
+    async def test_search_result_used_after_confirmation(self, service):
+        service.data.find_bangumi_id.return_value = None
+        for episode in (1, 2, 3):
+            item = _item(episode=episode)
+            assert str((await service._find_subject_id_async(item))[0]) == "400602"
+            _sync_success(service, item, subject_id="400602")
+        # 第一次搜索结果可信度不足，第二次同步成功后才使用
+        assert service.bgm.bgm_search.call_count == 2
+        assert bgm_learned_mappings.list_entries()[0]["hits"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_sync_is_not_learned(self, service):
+        await service._find_subject_id_async(_item())
+        assert bgm_learned_mappings.list_entries() == []
+
+    @pytest.mark.asyncio
+    async def test_custom_mapping_wins_and_is_not_learned(self, service):
+        item = _item()
+        await service._find_subject_id_async(item)
+        _sync_success(service, item)
+        service.mappings["葬送的芙莉莲"] = "400602"
+        assert await service._find_subject_id_async(item) == ("400602", False, "")
+        _sync_success(service, item)
+        assert bgm_learned_mappings.list_entries()[0]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, service):
+        with patch.object(
+            sync_mod.config_manager,
+            "get_bgm_learned_config",
+            return_value={"enabled": False, "min_confidence": 0.6},
+        ):
+            item = _item()
+            await service._find_subject_id_async(item)
+            _sync_success(service, item)
+        assert bgm_learned_mappings.list_entries() == []
+
+    @pytest.mark.asyncio
+    async def test_async_lookup_uses_learned(self, service):
+        item = _item()
+        await service._find_subject_id_async(item)
+        _sync_success(service, item)
+        with patch.object(service, "_get_async_bangumi_api_for_user") as get_api:
+            result = await service._find_subject_id_async(_item(episode=4))
+        assert result == ("500602", True, "")
+        get_api.assert_not_called()
+        service.data.find_bangumi_id.assert_called_once()
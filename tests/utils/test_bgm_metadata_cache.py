@@ -0,0 +1,226 @@
+"""Bangumi 元数据二级缓存单元测试。"""
+
+import asyncio
+import datetime
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.database import DatabaseManager
+from app.utils import bangumi_api_async, bgm_metadata_cache as meta_mod
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_async import AsyncBangumiApi
+from app.utils.bgm_metadata_cache import (
+    METADATA_TTL_SECONDS,
+    BangumiMetadataCache,
+    classify_episodes,
+    classify_subject,
+)
+
+TODAY = datetime.date(2024, 6, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "meta.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def cache(db):
+    return BangumiMetadataCache(db=db)
+
+
+class TestClassify:
+    def test_subject_finished_long_ago(self):
+        assert classify_subject({"date": "2020-01-05", "eps": 12}, TODAY) == "finished"
+
+    def test_subject_airing_within_run(self):
+        assert classify_subject({"date": "2024-04-05", "eps": 12}, TODAY) == "airing"
+
+    def test_subject_upcoming_or_no_date(self):
+        assert classify_subject({"date": "2024-10-01", "eps": 12}, TODAY) == "upcoming"
+        assert classify_subject({"eps": 12}, TODAY) == "upcoming"
+
+    def test_subject_unknown_eps_uses_one_year(self):
+        assert classify_subject({"date": "2023-10-01"}, TODAY) == "airing"
+        assert classify_subject({"date": "2022-10-01"}, TODAY) == "finished"
+
+    def test_episodes_by_airdate(self):
+        finished = {"data": [{"airdate": "2024-01-01"}, {"airdate": "2024-03-01"}]}
+        airing = {"data": [{"airdate": "2024-05-01"}, {"airdate": "2024-06-08"}]}
+        upcoming = {"data": [{"airdate": "2024-07-01"}]}
+        missing = {"data": [{"airdate": "2024-01-01"}, {"airdate": ""}]}
+        assert classify_episodes(finished, TODAY) == "finished"
+        assert classify_episodes(airing, TODAY) == "airing"
+        assert classify_episodes(upcoming, TODAY) == "upcoming"
+        assert classify_episodes(missing, TODAY) == "airing"
+
+
+class TestBangumiMetadataCache:
+    def test_put_get_roundtrip(self, cache):
+        subject = {"id": 1, "name": "テスト", "date": "2010-01-01", "eps": 12}
+        assert cache.put("get_subject", "1", "1", subject) is True
+        assert cache.get("get_subject", "1") == subject
+        assert cache.get_stats()["hits"] == 1
+
+    def test_empty_results_not_persisted(self, cache):
+        assert cache.put("get_subject", "1", "1", {}) is False
+        assert (
+            cache.put("get_episodes", "1:0:0", "1", {"data": [], "total": 0}) is False
+        )
+        assert cache.put("get_related_subjects", "1", "1", []) is False
+        assert cache.get("get_subject", "1") is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_ttl_depends_on_airing_status(self, cache, db):
+        cache.put("get_subject", "1", "1", {"id": 1, "date": "2010-01-01", "eps": 12})
+        row = db.get_bgm_metadata_cache("get_subject", "1")
+        ttl = row["expires_at"] - row["fetched_at"]
+        assert ttl == pytest.approx(METADATA_TTL_SECONDS["get_subject"]["finished"])
+
+        # 关联条目按已缓存的条目状态决定有效期
+        cache.put("get_related_subjects", "1", "1", [{"id": 2}])
+        row = db.get_bgm_metadata_cache("get_related_subjects", "1")
+        ttl = row["expires_at"] - row["fetched_at"]
+        assert ttl == pytest.approx(
+            METADATA_TTL_SECONDS["get_related_subjects"]["finished"]
+        )
+
+    def test_stale_value_returned_and_refreshed(self, cache, monkeypatch):
+        subject = {"id": 1, "date": "2010-01-01", "eps": 12}
+        cache.put("get_subject", "1", "1", subject)
+        ttl = METADATA_TTL_SECONDS["get_subject"]["finished"]
+        real_time = meta_mod.time.time()
+        monkeypatch.setattr(meta_mod.time, "time", lambda: real_time + ttl + 60)
+
+        done = threading.Event()
+        refresh = MagicMock(side_effect=lambda: done.set())
+        assert cache.get("get_subject", "1", refresh=refresh) == subject
+        assert done.wait(2)
+        stats = cache.get_stats()
+        assert stats["stale_hits"] == 1
+        refresh.assert_called_once()
+
+    def test_beyond_grace_is_miss(self, cache, monkeypatch):
+        cache.put("get_subject", "1", "1", {"id": 1, "date": "2010-01-01", "eps": 1})
+        far = meta_mod.time.time() + 365 * meta_mod.DAY
+        monkeypatch.setattr(meta_mod.time, "time", lambda: far)
+        refresh = MagicMock()
+        assert cache.get("get_subject", "1", refresh=refresh) is None
+        refresh.assert_not_called()
+
+    def test_purge_subject_removes_all_categories(self, cache):
+        cache.put("get_subject", "1", "1", {"id": 1})
+        cache.put("get_episodes", "1:0:0", "1", {"data": [{"id": 10}], "total": 1})
+        cache.put("get_subject", "2", "2", {"id": 2})
+        assert cache.purge_subject("1") == 2
+        assert cache.get("get_subject", "1") is None
+        assert cache.get("get_subject", "2") == {"id": 2}
+        assert cache.get_stats()["entries"] == {
+            "get_subject": {"total": 1, "expired": 0}
+        }
+
+
+class TestBangumiApiPersistentCache:
+    def test_second_instance_served_from_disk(self, cache):
+        first = BangumiApi(metadata_cache=cache)
+        first.get = MagicMock()
+        first.get.return_value.json.return_value = {"id": 7, "name": "x"}
+        assert first.get_subject(7) == {"id": 7, "name": "x"}
+
+        # 模拟重启：新实例内存缓存为空，但无需请求网络
+        second = BangumiApi(metadata_cache=cache)
+        second.get = MagicMock()
+        assert second.get_subject(7) == {"id": 7, "name": "x"}
+        second.get.assert_not_called()
+
+    def test_episodes_persisted_per_type_and_paging(self, cache):
+        api = BangumiApi(metadata_cache=cache)
+        api.get = MagicMock()
+        api.get.return_value.json.return_value = {"data": [{"id": 1}], "total": 1}
+        api.get_episodes(7)
+
+        other = BangumiApi(metadata_cache=cache)
+        other.get = MagicMock()
+        other.get.return_value.json.return_value = {"data": [{"id": 2}], "total": 1}
+        assert other.get_episodes(7) == {"data": [{"id": 1}], "total": 1}
+        assert other.get_episodes(7, fetch_all=True) == {
+            "data": [{"id": 2}],
+            "total": 1,
+        }
+
+    def test_failed_fetch_not_persisted(self, cache):
+        api = BangumiApi(metadata_cache=cache)
+        api.get = MagicMock()
+        api.get.return_value.json.side_effect = ValueError("bad json")
+        assert api.get_subject(7) == {}
+        assert cache.get("get_subject", "7") is None
+
+    def test_purge_subject_cache_in_memory(self):
+        api = BangumiApi()
+        api._put_cache("get_subject", 7, {"id": 7})
+        api._put_cache("get_episodes", (7, 0, False), {"data": []})
+        api._put_cache("get_subject", 8, {"id": 8})
+        assert api.purge_subject_cache("7") == 2
+        assert 8 in api._cache["get_subject"]
+
+    def test_persisted_per_account(self, cache):
+        """带 token 取得的条目不提供给其他账号或匿名客户端"""
+        owner = BangumiApi(access_token="token-a", metadata_cache=cache)
+        owner.get = MagicMock()
+        owner.get.return_value.json.return_value = {"id": 7, "name": "nsfw"}
+        owner.get_subject(7)
+
+        for token in ("token-b", None):
+            other = BangumiApi(access_token=token, metadata_cache=cache)
+            other.get = MagicMock()
+            other.get.return_value.json.return_value = {"id": 7, "name": "public"}
+            assert other.get_subject(7) == {"id": 7, "name": "public"}
+            other.get.assert_called_once()
+
+        again = BangumiApi(access_token="token-a", metadata_cache=cache)
+        again.get = MagicMock()
+        assert again.get_subject(7) == {"id": 7, "name": "nsfw"}
+        again.get.assert_not_called()
+
+        # 按条目清除时各账号范围的缓存一并清除
+        assert cache.purge_subject("7") == 3
+
+
+class TestAsyncPersistentRefresh:
+    @pytest.mark.asyncio
+    async def test_stale_hit_refreshed_once_on_event_loop(self, cache, monkeypatch):
+        """过期命中在事件循环中后台刷新，同一缓存键只刷新一次，不占用刷新线程"""
+        subject = {"id": 7, "date": "2010-01-01", "eps": 12}
+        cache.put("get_subject", "7", "7", subject, scope="anon")
+        ttl = METADATA_TTL_SECONDS["get_subject"]["finished"]
+        real_time = meta_mod.time.time()
+        monkeypatch.setattr(meta_mod.time, "time", lambda: real_time + ttl + 60)
+
+        loop_thread = threading.current_thread()
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch_subject(self, subject_id):
+            calls.append(threading.current_thread())
+            await release.wait()
+            return {**subject, "name": "new"}
+
+        monkeypatch.setattr(AsyncBangumiApi, "_fetch_subject", fetch_subject)
+        first = AsyncBangumiApi(metadata_cache=cache)
+        second = AsyncBangumiApi(metadata_cache=cache)
+        assert await first.get_subject(7) == subject
+        assert await second.get_subject(7) == subject
+        tasks = list(bangumi_api_async._refresh_tasks.values())
+        assert len(tasks) == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert calls == [loop_thread]
+        assert cache.get_stats()["refreshes"] == 1
+        assert cache.get("get_subject", "7", scope="anon")["name"] == "new"
+        assert not bangumi_api_async._refresh_tasks
+        assert cache._executor is None
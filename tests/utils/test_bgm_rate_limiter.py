@@ -0,0 +1,186 @@
+"""Bangumi API 全局限速器单元测试。"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from app.utils import bgm_rate_limiter as limiter_mod
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bgm_rate_limiter import MAX_RETRY_AFTER_SECONDS, BangumiRateLimiter
+from app.utils.bgm_retry_queue import defer_retries
+
+API = "https://api.bgm.tv/v0/subjects/1"
+NEXT = "https://next.bgm.tv/p1/subjects/1"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的单调时钟：sleep 只推进时间"""
+    now = [1000.0]
+    sleeps = []
+
+    def _sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(limiter_mod.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(limiter_mod.time, "sleep", _sleep)
+    return now, sleeps
+
+
+class TestTokenBucket:
+    def test_burst_then_paced(self, clock):
+        _, sleeps = clock
+        limiter = BangumiRateLimiter(rate=2, burst=3)
+        waits = [limiter.acquire(API) for _ in range(5)]
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3:] == [pytest.approx(0.5), pytest.approx(0.5)]
+        assert sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+
+    def test_reservations_are_fifo(self, clock):
+        limiter = BangumiRateLimiter(rate=4, burst=1)
+        # 同时到达的请求依次排队，而不是一起等待同一时刻
+        waits = [limiter._reserve(API)[1] for _ in range(4)]
+        assert waits == [0.0, 0.25, 0.5, 0.75]
+        assert limiter.get_stats()["hosts"]["api.bgm.tv"]["queued"] == 4
+
+    def test_hosts_have_separate_buckets(self, clock):
+        limiter = BangumiRateLimiter(rate=1, burst=1)
+        assert limiter.acquire(API) == 0.0
+        assert limiter.acquire(NEXT) == 0.0
+        assert limiter.acquire("https://bgm-proxy.example.com/v0/me") == 0.0
+        assert set(limiter.get_stats()["hosts"]) == {
+            "api.bgm.tv",
+            "next.bgm.tv",
+            "bgm-proxy.example.com",
+        }
+
+    def test_disabled_never_waits(self, clock):
+        limiter = BangumiRateLimiter(rate=0)
+        assert all(limiter.acquire(API) == 0.0 for _ in range(50))
+        assert limiter.penalize(API, 10) is False
+        assert limiter.get_stats()["hosts"] == {}
+
+    def test_penalize_pauses_host_and_queues_callers(self, clock):
+        limiter = BangumiRateLimiter(rate=2, burst=5)
+        assert limiter.penalize(API, 3) is True
+        waits = [limiter._reserve(API)[1] for _ in range(3)]
+        assert waits == [3.0, 3.5, 4.0]
+        # 其他主机不受影响
+        assert limiter._reserve(NEXT)[1] == 0.0
+        assert limiter.get_stats()["hosts"]["api.bgm.tv"]["retry_after_pauses"] == 1
+
+    def test_stats_report_wait_time(self, clock):
+        limiter = BangumiRateLimiter(rate=1, burst=1)
+        limiter.acquire(API)
+        limiter.acquire(API)
+        host = limiter.get_stats()["hosts"]["api.bgm.tv"]
+        assert host["acquired"] == 2
+        assert host["waited"] == 1
+        assert host["max_wait_seconds"] == pytest.approx(1.0)
+        assert host["queued"] == 0
+        assert host["current_wait_seconds"] == pytest.approx(1.0)
+
+    def test_config_loaded_from_config_manager(self, clock):
+        limiter = BangumiRateLimiter()
+        with patch(
+            "app.core.config.config_manager.get_bgm_rate_limit_config",
+            return_value={"rate": 5.0, "burst": 2},
+        ):
+            assert limiter.enabled is True
+        stats = limiter.get_stats()
+        assert (stats["rate"], stats["burst"]) == (5.0, 2)
+
+    @pytest.mark.asyncio
+    async def test_acquire_async_does_not_block_loop(self):
+        limiter = BangumiRateLimiter(rate=10, burst=1)
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        try:
+            assert await limiter.acquire_async(API) == 0.0
+            before = len(ticks)
+            assert await limiter.acquire_async(API) == pytest.approx(0.1, abs=0.02)
+            # 排队等待期间其他协程继续运行
+            assert len(ticks) - before >= 3
+        finally:
+            task.cancel()
+
+
+class TestRetryAfter:
+    def test_seconds(self):
+        assert BangumiRateLimiter.parse_retry_after("7") == 7.0
+
+    def test_http_date(self):
+        with patch.object(limiter_mod.time, "time", return_value=1_700_000_000):
+            value = BangumiRateLimiter.parse_retry_after(
+                "Tue, 14 Nov 2023 22:13:40 GMT"
+            )
+        assert value == pytest.approx(20.0)
+
+    def test_invalid_and_capped(self):
+        assert BangumiRateLimiter.parse_retry_after(None) is None
+        assert BangumiRateLimiter.parse_retry_after(MagicMock()) is None
+        assert BangumiRateLimiter.parse_retry_after("soon") is None
+        assert BangumiRateLimiter.parse_retry_after("99999") == MAX_RETRY_AFTER_SECONDS
+
+
+class TestBangumiApiIntegration:
+    def test_429_retry_after_pauses_shared_limiter(self, clock):
+        limiter = BangumiRateLimiter(rate=10, burst=10)
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+        ok = MagicMock(status_code=200)
+        session = MagicMock()
+        session.get.side_effect = [throttled, ok]
+
+        api = BangumiApi()
+        with patch("app.utils.bangumi_api.bgm_rate_limiter", limiter):
+            assert api._request_with_retry("GET", session, API) is ok
+
+        # 退避由限速器在下一次取令牌时完成，只等待一次 Retry-After
+        _, sleeps = clock
+        assert sleeps == [pytest.approx(2.0)]
+        assert limiter.get_stats()["hosts"]["api.bgm.tv"]["retry_after_pauses"] == 1
+
+    def test_deferred_429_still_pauses_host(self, clock):
+        limiter = BangumiRateLimiter(rate=10, burst=10)
+        session = MagicMock()
+        session.get.return_value = MagicMock(
+            status_code=429, headers={"Retry-After": "30"}
+        )
+
+        api = BangumiApi()
+        with (
+            patch("app.utils.bangumi_api.bgm_rate_limiter", limiter),
+            defer_retries(),
+            pytest.raises(requests.exceptions.HTTPError) as exc_info,
+        ):
+            api._request_with_retry("GET", session, API)
+
+        assert exc_info.value.retry_after == 30.0
+        host = limiter.get_stats()["hosts"]["api.bgm.tv"]
+        assert host["retry_after_pauses"] == 1
+        assert host["current_wait_seconds"] == pytest.approx(30.0)
+
+    def test_server_error_backs_off_locally(self, clock):
+        limiter = BangumiRateLimiter(rate=10, burst=10)
+        session = MagicMock()
+        session.get.side_effect = [
+            MagicMock(status_code=502, headers={}),
+            MagicMock(status_code=200),
+        ]
+
+        api = BangumiApi()
+        with patch("app.utils.bangumi_api.bgm_rate_limiter", limiter):
+            api._request_with_retry("GET", session, API)
+
+        _, sleeps = clock
+        assert sleeps == [1]
+        assert limiter.get_stats()["hosts"]["api.bgm.tv"]["retry_after_pauses"] == 0
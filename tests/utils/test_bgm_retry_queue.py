@@ -0,0 +1,184 @@
+"""Bangumi 延迟重试队列单元测试。"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+import responses
+
+from app.core.database import DatabaseManager
+from app.utils import bgm_retry_queue as queue_mod
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bgm_retry_queue import (
+    MAX_RETRY_ATTEMPTS,
+    BangumiRetryQueue,
+    current_retry_task,
+    defer_retries,
+    endpoint_of,
+    is_retryable_error,
+    retry_budget,
+    with_retry_after,
+)
+
+FAR_FUTURE = 10**12
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "retry.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def queue(db):
+    q = BangumiRetryQueue(db=db)
+    yield q
+    q.stop()
+
+
+def test_defer_retries_context():
+    assert retry_budget(3) == 3
+    with defer_retries():
+        assert retry_budget(3) == 0
+    assert retry_budget(3) == 3
+
+
+def test_endpoint_and_retryable_helpers():
+    url = "https://api.bgm.tv/v0/users/-/collections/123/episodes?limit=1"
+    assert endpoint_of(url) == "/v0/users/-/collections/{id}/episodes"
+    assert is_retryable_error(requests.exceptions.ConnectionError("x"))
+    assert not is_retryable_error(requests.exceptions.JSONDecodeError("x", "", 0))
+    assert not is_retryable_error(ValueError("access_token 无效"))
+
+
+def test_schedule_persists_across_instances(queue, db):
+    task_id = queue.schedule("k", {"a": 1})
+    assert task_id is not None
+    reloaded = BangumiRetryQueue(db=db)
+    handler = MagicMock()
+    reloaded.register("k", handler)
+    # 未到期不执行
+    assert reloaded.run_due() == 0
+    assert reloaded.run_due(now=FAR_FUTURE) == 1
+    handler.assert_called_once_with({"a": 1})
+    assert reloaded.get_stats()["pending"] == {}
+
+
+def test_handler_runs_deferred_with_current_task(queue):
+    seen = []
+
+    def handler(payload):
+        seen.append((retry_budget(3), current_retry_task()["kind"]))
+
+    queue.register("k", handler)
+    queue.schedule("k", {})
+    queue.run_due(now=FAR_FUTURE)
+    assert seen == [(0, "k")]
+    assert queue.get_stats()["succeeded"] == 1
+
+
+def test_retryable_failure_reschedules_with_backoff(queue, db):
+    queue.register("k", MagicMock(side_effect=requests.exceptions.Timeout("slow")))
+    queue.schedule("k", {})
+    with patch.object(queue_mod.time, "time", return_value=1000.0):
+        queue.run_due(now=FAR_FUTURE)
+    task = db.get_due_bgm_retry_tasks(FAR_FUTURE)[0]
+    assert task["attempts"] == 1
+    assert task["next_run_at"] == 1000.0 + queue.backoff(1)
+    assert task["last_error"] == "slow"
+    assert queue.get_stats()["rescheduled"] == 1
+
+
+def test_retry_after_sets_next_attempt_time(queue, db):
+    def _throttled():
+        return with_retry_after(requests.exceptions.HTTPError("429"), 90.0)
+
+    queue.register("k", MagicMock(side_effect=_throttled()))
+    with patch.object(queue_mod.time, "time", return_value=1000.0):
+        queue.schedule("k", {}, _throttled())
+    assert db.get_due_bgm_retry_tasks(FAR_FUTURE)[0]["next_run_at"] == 1090.0
+    with patch.object(queue_mod.time, "time", return_value=2000.0):
+        queue.run_due(now=FAR_FUTURE)
+    assert db.get_due_bgm_retry_tasks(FAR_FUTURE)[0]["next_run_at"] == 2090.0
+
+
+def test_gives_up_after_max_attempts(queue):
+    give_up = MagicMock()
+    queue.register(
+        "k",
+        MagicMock(side_effect=requests.exceptions.ConnectionError("down")),
+        on_give_up=give_up,
+    )
+    queue.schedule("k", {"x": 1})
+    for _ in range(MAX_RETRY_ATTEMPTS):
+        queue.run_due(now=FAR_FUTURE)
+    give_up.assert_called_once()
+    assert give_up.call_args.args[0] == {"x": 1}
+    stats = queue.get_stats()
+    assert stats["given_up"] == 1
+    assert stats["pending"] == {}
+
+
+def test_non_retryable_failure_gives_up_immediately(queue):
+    give_up = MagicMock()
+    queue.register("k", MagicMock(side_effect=RuntimeError("bug")), give_up)
+    queue.schedule("k", {})
+    queue.run_due(now=FAR_FUTURE)
+    give_up.assert_called_once()
+
+
+def test_backoff_is_capped():
+    assert BangumiRetryQueue.backoff(0) == queue_mod.RETRY_BASE_DELAY_SECONDS
+    assert BangumiRetryQueue.backoff(30) == queue_mod.RETRY_MAX_DELAY_SECONDS
+
+
+def test_background_thread_runs_due_tasks(queue):
+    done = MagicMock()
+    queue.register("k", done)
+    with patch.object(BangumiRetryQueue, "backoff", return_value=0):
+        queue.schedule("k", {})
+        queue.start()
+        for _ in range(100):
+            if done.called:
+                break
+            time.sleep(0.05)
+    assert done.called
+    assert queue.get_stats()["running"]
+
+
+class TestHttpLayer:
+    @responses.activate
+    def test_deferred_request_fails_without_sleeping(self):
+        url = "https://api.bgm.tv/v0/subjects/5"
+        responses.add(responses.GET, url, status=503)
+        api = BangumiApi()
+        with (
+            defer_retries(),
+            patch("app.utils.bangumi_api.time.sleep") as sleep,
+            patch("app.utils.notifier.send_notify") as notify,
+        ):
+            with pytest.raises(requests.exceptions.HTTPError):
+                api.get("subjects/5")
+        assert len(responses.calls) == 1
+        sleep.assert_not_called()
+        notify.assert_not_called()
+
+    @responses.activate
+    def test_retries_counted_per_endpoint(self):
+        url = "https://api.bgm.tv/v0/subjects/5"
+        responses.add(responses.GET, url, status=502)
+        responses.add(responses.GET, url, json={"id": 5})
+        responses.add(responses.GET, "https://api.bgm.tv/v0/subjects/6", status=502)
+        counter = BangumiRetryQueue(db=MagicMock())
+        with (
+            patch("app.utils.bangumi_api.bgm_retry_queue", counter),
+            patch("app.utils.bangumi_api.time.sleep"),
+        ):
+            assert BangumiApi().get("subjects/5").status_code == 200
+            with defer_retries(), pytest.raises(requests.exceptions.HTTPError):
+                BangumiApi().get("subjects/6")
+        assert counter.get_stats()["endpoints"] == {
+            "/v0/subjects/{id}": {"retries": 1, "deferred": 1}
+        }
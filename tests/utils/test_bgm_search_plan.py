@@ -0,0 +1,264 @@
+"""bgm_search 并发搜索计划单元测试。"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_async import AsyncBangumiApi
+from app.utils.bgm_search_plan import SearchPlan
+
+
+def _ratio(title, ori_title, bgm_data):
+    return 0.9 if bgm_data.get("name") == "good" else 0.1
+
+
+def _plan(is_movie=False, premiere_date="2024-01-15"):
+    return SearchPlan("标题", "Original", premiere_date, is_movie, _ratio)
+
+
+class TestSearchPlan:
+    def test_tasks(self):
+        plan = _plan(is_movie=True)
+        assert [(t.key, t.title) for t in plan.tasks] == [
+            ("v0:0", "Original"),
+            ("v0:1", "标题"),
+            ("v0:movie", "Original"),
+            ("old:0", "Original"),
+            ("old:1", "标题"),
+        ]
+        assert plan.task("v0:movie").end_date == "2024-08-02"
+
+    def test_no_date_only_old_search(self):
+        plan = _plan(premiere_date="bad-date-format")
+        assert [t.kind for t in plan.tasks] == ["old", "old"]
+
+    def test_accepted_v0_decides_immediately(self):
+        plan = _plan()
+        plan.add_result("v0:0", [{"name": "good"}])
+        decided, task, data = plan.decide()
+        assert decided and task.key == "v0:0" and data == [{"name": "good"}]
+
+    def test_waits_for_higher_priority(self):
+        plan = _plan()
+        plan.add_result("v0:1", [{"name": "good"}])
+        plan.add_result("old:0", {"name": "good"})
+        assert plan.decide() == (False, None, None)
+        plan.add_result("v0:0", [])
+        assert plan.decide()[1].key == "v0:1"
+
+    def test_low_ratio_v0_falls_back_to_old(self):
+        plan = _plan()
+        plan.add_result("v0:0", [{"name": "bad"}])
+        plan.add_result("old:0", None)
+        assert plan.decide() == (False, None, None)
+        plan.add_result("old:1", {"name": "good"})
+        decided, task, data = plan.decide()
+        assert decided and task.key == "old:1" and data == [{"name": "good"}]
+
+    def test_all_missing(self):
+        plan = _plan()
+        for task in plan.tasks:
+            plan.add_result(task.key, None)
+        assert plan.decide() == (True, None, None)
+
+    def test_error_raised_only_when_needed(self):
+        plan = _plan()
+        plan.add_error("old:0", OSError("down"))
+        plan.add_result("v0:0", [{"name": "good"}])
+        assert plan.decide()[0]
+        plan = _plan()
+        plan.add_result("v0:0", [])
+        plan.add_result("v0:1", [])
+        plan.add_error("old:0", OSError("down"))
+        with pytest.raises(OSError):
+            plan.decide()
+
+
+class TestConcurrentSearch:
+    def test_searches_run_concurrently(self):
+        """各搜索同时发出：所有请求都已开始后才返回结果"""
+        api = BangumiApi()
+        barrier = threading.Barrier(4, timeout=5)
+
+        def search(title, **kwargs):
+            barrier.wait()
+            return []
+
+        def search_old(title):
+            barrier.wait()
+            return [{"id": 1}]
+
+        with (
+            patch.object(api, "search", side_effect=search),
+            patch.object(api, "search_old", side_effect=search_old),
+            patch.object(api, "get_subject", return_value={"id": 1, "name": "good"}),
+            patch.object(api, "title_diff_ratio", side_effect=_ratio),
+        ):
+            result = api.bgm_search("标题", "Original", "2024-01-15")
+        assert result == [{"id": 1, "name": "good"}]
+
+    def test_returns_without_waiting_for_slow_requests(self):
+        api = BangumiApi()
+        release = threading.Event()
+
+        def search_old(title):
+            release.wait(5)
+            return []
+
+        with (
+            patch.object(api, "search", return_value=[{"id": 1, "name": "good"}]),
+            patch.object(api, "search_old", side_effect=search_old),
+            patch.object(api, "title_diff_ratio", side_effect=_ratio),
+        ):
+            started = time.monotonic()
+            result = api.bgm_search("标题", "Original", "2024-01-15")
+            elapsed = time.monotonic() - started
+        release.set()
+        assert result[0]["id"] == 1
+        assert elapsed < 1
+
+    def test_decided_search_skips_follow_up_requests(self):
+        """结果确定后，仍在进行的旧版搜索不再发出后续的条目详情请求"""
+        api = BangumiApi()
+        lock = threading.Lock()
+        old_calls = []
+        old_started = threading.Event()
+        release = threading.Event()
+        finished = threading.Barrier(3, timeout=5)
+
+        def search(title, **kwargs):
+            # 两个旧版搜索都已发出后再返回结果
+            assert old_started.wait(5)
+            return [{"id": 1, "name": "good"}]
+
+        def search_old(title):
+            with lock:
+                old_calls.append(title)
+                if len(old_calls) == 2:
+                    old_started.set()
+            release.wait(5)
+            finished.wait()
+            return [{"id": 2}]
+
+        with (
+            patch.object(api, "search", side_effect=search),
+            patch.object(api, "search_old", side_effect=search_old),
+            patch.object(api, "get_subject") as get_subject,
+            patch.object(api, "title_diff_ratio", side_effect=_ratio),
+        ):
+            result = api.bgm_search("标题", "Original", "2024-01-15")
+            release.set()
+            finished.wait()
+            time.sleep(0.05)
+        assert result[0]["id"] == 1
+        get_subject.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_async_cancels_remaining_requests(self):
+        api = AsyncBangumiApi()
+        cancelled = []
+
+        async def search_old(title):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(title)
+                raise
+            return []
+
+        async def search(title, **kwargs):
+            return [{"id": 1, "name": "good"}]
+
+        with (
+            patch.object(api, "search", side_effect=search),
+            patch.object(api, "search_old", side_effect=search_old),
+            patch.object(api, "title_diff_ratio", side_effect=_ratio),
+        ):
+            result = await api.bgm_search("标题", "Original", "2024-01-15")
+            await asyncio.sleep(0)
+        assert result[0]["id"] == 1
+        assert sorted(cancelled) == ["Original", "标题"]
+
+    @pytest.mark.asyncio
+    async def test_async_falls_back_to_old_search(self):
+        api = AsyncBangumiApi()
+
+        async def search(title, **kwargs):
+            return [{"id": 1, "name": "bad"}]
+
+        async def search_old(title):
+            return [{"id": 2}] if title == "标题" else []
+
+        async def get_subject(subject_id):
+            return {"id": subject_id, "name": "good"}
+
+        with (
+            patch.object(api, "search", side_effect=search),
+            patch.object(api, "search_old", side_effect=search_old),
+            patch.object(api, "get_subject", side_effect=get_subject),
+            patch.object(api, "title_diff_ratio", side_effect=_ratio),
+        ):
+            result = await api.bgm_search("标题", "Original", "2024-01-15")
+        assert result == [{"id": 2, "name": "good"}]
+
+    @pytest.mark.asyncio
+    async def test_async_cancelled_search_does_not_cancel_shared_request(self):
+        """先确定结果的同步取消其余请求，合并到这些请求上的另一次同步仍拿到结果"""
+        decided, needs_old = AsyncBangumiApi(), AsyncBangumiApi()
+        requests = []
+
+        async def request(method, url, **kwargs):
+            requests.append(url)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"list": [{"id": 2}]})
+
+        async def good(title, **kwargs):
+            return [{"id": 1, "name": "good"}]
+
+        async def bad(title, **kwargs):
+            return [{"id": 1, "name": "bad"}]
+
+        async def get_subject(subject_id):
+            return {"id": subject_id, "name": "good"}
+
+        with (
+            patch.object(decided, "search", side_effect=good),
+            patch.object(decided, "_request_with_retry", side_effect=request),
+            patch.object(needs_old, "search", side_effect=bad),
+            patch.object(needs_old, "_request_with_retry", side_effect=request),
+            patch.object(needs_old, "get_subject", side_effect=get_subject),
+            patch.object(AsyncBangumiApi, "title_diff_ratio", side_effect=_ratio),
+        ):
+            first = asyncio.ensure_future(
+                decided.bgm_search("同名标题", "Original X", "2024-01-15")
+            )
+            await asyncio.sleep(0)
+            second = needs_old.bgm_search("同名标题", "Original X", "2024-01-15")
+            results = await asyncio.gather(first, second)
+
+        assert results[0][0]["id"] == 1
+        assert results[1] == [{"id": 2, "name": "good"}]
+        # 两次同步的旧版搜索合并为一次请求
+        assert len(requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_async_foreign_cancellation_is_search_error(self):
+        api = AsyncBangumiApi()
+
+        async def search(title, **kwargs):
+            raise asyncio.CancelledError()
+
+        async def search_old(title):
+            return []
+
+        with (
+            patch.object(api, "search", side_effect=search),
+            patch.object(api, "search_old", side_effect=search_old),
+        ):
+            with pytest.raises(RuntimeError, match="取消"):
+                await api.bgm_search("标题", "Original", "2024-01-15")
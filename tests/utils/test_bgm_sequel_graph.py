@@ -0,0 +1,219 @@
+"""Bangumi 续集链关系图单元测试。"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.database import DatabaseManager
+from app.utils import bgm_sequel_graph as graph_mod
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_async import AsyncBangumiApi
+from app.utils.bgm_sequel_graph import (
+    SEQUEL_EDGE_TTL_SECONDS,
+    SEQUEL_GRAPH_MISS,
+    BangumiSequelGraph,
+    build_node,
+)
+
+# 1 -> 2 -> 3：每期 12 集，章节 ID 为 subject_id * 100 + sort
+NAMES = {
+    1: ("A", "番剧A"),
+    2: ("A 第2期", "番剧A 第二季"),
+    3: ("A 第3期", "番剧A 第三季"),
+}
+SEQUELS = {1: [2], 2: [3], 3: []}
+START = {1: "2020-01-0", 2: "2021-01-0", 3: "2022-01-0"}
+
+
+def _subject(sid):
+    name, name_cn = NAMES[sid]
+    return {"id": sid, "type": 2, "name": name, "name_cn": name_cn}
+
+
+def _related(sid):
+    return [{"id": n, "relation": "续集"} for n in SEQUELS[sid]] + [
+        {"id": 99, "relation": "前传"}
+    ]
+
+
+def _episodes(sid, *args, **kwargs):
+    data = [
+        {"id": sid * 100 + n, "sort": n, "ep": n, "airdate": f"{START[sid]}{n % 9 + 1}"}
+        for n in range(1, 13)
+    ]
+    return {"data": data, "total": len(data)}
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "graph.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def graph(db):
+    return BangumiSequelGraph(db=db)
+
+
+def _network_api(graph):
+    api = BangumiApi(sequel_graph=graph)
+    api.get_subject = MagicMock(side_effect=_subject)
+    api.get_related_subjects = MagicMock(side_effect=_related)
+    api.get_episodes = MagicMock(side_effect=_episodes)
+    api._get_episode_sync_limits = MagicMock(return_value=(100, 9999))
+    return api
+
+
+def _offline_api(graph):
+    api = BangumiApi(sequel_graph=graph)
+    api.get_subject = MagicMock(side_effect=AssertionError("network"))
+    api.get_related_subjects = MagicMock(side_effect=AssertionError("network"))
+    api.get_episodes = MagicMock(side_effect=AssertionError("network"))
+    api._get_episode_sync_limits = MagicMock(return_value=(100, 9999))
+    return api
+
+
+def _record_chain(graph):
+    for sid in (1, 2, 3):
+        graph.record(_subject(sid), _related(sid), _episodes(sid))
+
+
+class TestBuildNode:
+    def test_keeps_sequel_edges_and_episode_fields(self):
+        episodes = {"data": [{"id": 5, "sort": 1, "ep": 1, "name": "x"}], "total": 1}
+        node = build_node(_subject(1), {"data": _related(1)}, episodes)
+        assert node["sequels"] == [2]
+        assert node["episodes"] == [{"id": 5, "sort": 1, "ep": 1}]
+
+    def test_invalid_payloads(self):
+        assert build_node({}, [], {"data": []}) is None
+        assert build_node(_subject(1), None, {"data": []}) is None
+
+
+class TestResolve:
+    def test_first_walk_records_chain_then_resolves_offline(self, graph):
+        api = _network_api(graph)
+        assert api.get_target_season_episode_id(1, 3, 5) == (3, 305)
+        assert graph.get_stats()["nodes"] == 3
+
+        offline = _offline_api(graph)
+        assert offline.get_target_season_episode_id(1, 3, 5) == (3, 305)
+        assert offline.get_target_season_episode_id(1, 2, 12) == (2, 212)
+        assert offline.get_target_season_episode_id(1, 2, 0) == 2
+        assert graph.get_stats()["hits"] == 3
+
+    def test_walk_records_only_visited_data(self, graph):
+        api = BangumiApi(sequel_graph=graph)
+        api._get_episode_sync_limits = MagicMock(return_value=(100, 9999))
+        api._fetch_subject = MagicMock(side_effect=_subject)
+        api._fetch_related_subjects = MagicMock(side_effect=_related)
+        api._fetch_episodes_page = MagicMock(side_effect=_episodes)
+        api.get_related_subjects = MagicMock(wraps=api.get_related_subjects)
+        assert api.get_target_season_episode_id(1, 1, 4) == (1, 104)
+        # 第一季在根条目内命中：不为建图额外请求关联条目或后续条目
+        assert not api._fetch_related_subjects.called
+        assert api._fetch_subject.call_count == 1
+        assert api._fetch_episodes_page.call_count == 1
+        assert graph.get_stats()["nodes"] == 1
+
+        offline = _offline_api(graph)
+        assert offline.get_target_season_episode_id(1, 1, 4) == (1, 104)
+        # 根条目的续集边尚未取得，第二季需走网络并补全节点
+        assert graph.resolve(BangumiApi(), 1, 2, 4) is SEQUEL_GRAPH_MISS
+        api.get_related_subjects.reset_mock()
+        assert api.get_target_season_episode_id(1, 2, 4) == (2, 204)
+        assert api.get_related_subjects.called
+
+        offline = _offline_api(graph)
+        assert offline.get_target_season_episode_id(1, 1, 4) == (1, 104)
+        assert offline.get_target_season_episode_id(1, 2, 4) == (2, 204)
+
+    def test_index_persists_across_instances(self, graph, db):
+        _record_chain(graph)
+        reloaded = BangumiSequelGraph(db=db)
+        assert reloaded.resolve(BangumiApi(), 1, 3, 1) == (3, 301)
+
+    def test_missing_node_falls_back_to_network(self, graph):
+        graph.record(_subject(1), _related(1), _episodes(1))
+        api = _network_api(graph)
+        assert api.get_target_season_episode_id(1, 3, 5) == (3, 305)
+        assert api.get_related_subjects.called
+        assert graph.get_stats()["misses"] == 1
+
+    def test_stale_chain_end_is_a_miss(self, graph):
+        _record_chain(graph)
+        later = graph_mod.time.time() + SEQUEL_EDGE_TTL_SECONDS + 1
+        with patch.object(graph_mod.time, "time", return_value=later):
+            assert graph.resolve(BangumiApi(), 1, 3, 5) is SEQUEL_GRAPH_MISS
+            # 链中条目仍在有效期内，不经过链尾的解析照常命中
+            assert graph.resolve(BangumiApi(), 1, 1, 5) == (1, 105)
+        assert graph.get_stats()["stale"] == 1
+
+    def test_unresolvable_episode_is_a_miss(self, graph):
+        _record_chain(graph)
+        # 第 4 季不存在：网络路径会走单条目 airdate 回退，离线不给结论
+        assert graph.resolve(BangumiApi(), 1, 4, 1) is SEQUEL_GRAPH_MISS
+
+    def test_long_episode_needs_complete_listing(self, graph):
+        episodes = {
+            "data": [{"id": 1000 + n, "sort": n, "ep": n} for n in range(1, 201)],
+            "total": 500,
+        }
+        graph.record({"id": 7, "type": 2, "name": "Long"}, [], episodes)
+        assert graph.resolve(BangumiApi(), 7, 1, 150) == (7, 1150)
+        assert graph.resolve(BangumiApi(), 7, 1, 300) is SEQUEL_GRAPH_MISS
+
+    def test_long_series_uses_recorded_episode_index(self, graph):
+        rows = [{"id": 1000 + n, "sort": n, "ep": n} for n in range(1, 501)]
+        api = BangumiApi(sequel_graph=graph)
+        api._get_episode_sync_limits = MagicMock(return_value=(100, 9999))
+        api.get_subject = MagicMock(return_value={"id": 7, "type": 2, "name": "L"})
+        api._fetch_episodes_page = MagicMock(
+            side_effect=lambda sid, _type=0, offset=0, **kw: {
+                "data": rows[offset : offset + 200],
+                "total": len(rows),
+            }
+        )
+        assert api.get_target_season_episode_id(7, 1, 300) == (7, 1300)
+
+        offline = _offline_api(graph)
+        assert offline.get_target_season_episode_id(7, 1, 300) == (7, 1300)
+        assert offline.get_target_season_episode_id(7, 1, 450) == (7, 1450)
+        assert graph.get_stats()["misses"] == 1
+
+    def test_release_date_prefers_closest_airdate(self, graph):
+        _record_chain(graph)
+        # 第 2 季第 3 集与 2022 年播出日最接近的是第三期
+        result = graph.resolve(BangumiApi(), 1, 2, 3, release_date="2022-01-04")
+        assert result == (3, 303)
+
+    def test_sequel_cycle_is_bounded(self, graph):
+        graph.record(
+            {"id": 8, "type": 2, "name": "X"},
+            [{"id": 9, "relation": "续集"}],
+            {"data": [], "total": 0},
+        )
+        graph.record(
+            {"id": 9, "type": 2, "name": "Y"},
+            [{"id": 8, "relation": "续集"}],
+            {"data": [{"id": 1, "sort": 3}], "total": 1},
+        )
+        assert graph.resolve(BangumiApi(), 8, 5, 1) is SEQUEL_GRAPH_MISS
+
+    def test_delete_and_clear(self, graph):
+        _record_chain(graph)
+        assert graph.delete_subject(3) == 1
+        assert graph.resolve(BangumiApi(), 1, 3, 5) is SEQUEL_GRAPH_MISS
+        assert graph.clear() == 2
+        assert graph.get_stats()["nodes"] == 0
+
+
+class TestAsyncClient:
+    @pytest.mark.asyncio
+    async def test_async_client_uses_index(self, graph):
+        _record_chain(graph)
+        api = AsyncBangumiApi(sequel_graph=graph)
+        api.get_subject = MagicMock(side_effect=AssertionError("network"))
+        api._get_episode_sync_limits = MagicMock(return_value=(100, 9999))
+        assert await api.get_target_season_episode_id(1, 3, 7) == (3, 307)
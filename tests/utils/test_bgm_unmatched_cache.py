@@ -0,0 +1,177 @@
+"""Bangumi 未匹配缓存单元测试。"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.database import DatabaseManager
+from app.models.sync import CustomItem
+from app.services import sync_service as sync_mod
+from app.services.sync_service import SyncService
+from app.utils import bgm_unmatched_cache as cache_mod
+from app.utils.bgm_unmatched_cache import (
+    BangumiUnmatchedCache,
+    bgm_unmatched_cache,
+    unmatched_key,
+)
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "unmatched.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def cache(db):
+    return BangumiUnmatchedCache(db=db)
+
+
+def _remember(cache, title="不存在的番", version="v1", ttl=DAY, **kwargs):
+    args = {"ori_title": "Nope", "media_type": "episode", "premiere_date": "2024-01-15"}
+    args.update(kwargs)
+    return cache.remember(
+        title,
+        args["ori_title"],
+        args["media_type"],
+        args["premiere_date"],
+        "Bangumi 搜索无结果",
+        version,
+        ttl,
+    )
+
+
+def _lookup(cache, title="不存在的番", version="v1", **kwargs):
+    args = {"ori_title": "Nope", "media_type": "episode", "premiere_date": "2024-01-15"}
+    args.update(kwargs)
+    return cache.lookup(
+        title, args["ori_title"], args["media_type"], args["premiere_date"], version
+    )
+
+
+class TestKey:
+    def test_normalizes_width_case_and_spaces(self):
+        assert unmatched_key("ＡＢＣ  第二季", "Foo", "episode", "2024-01-15") == (
+            unmatched_key("abc 第二季 ", "FOO", "EPISODE", "2024-01-15T00:00:00")
+        )
+
+    def test_traditional_and_simplified_share_key(self):
+        assert unmatched_key("鬼滅の刃", "", "episode", "2019-04-06") == (
+            unmatched_key("鬼灭之刃", "", "episode", "2019-04-06")
+        )
+
+    def test_date_and_type_are_part_of_key(self):
+        base = unmatched_key("A", "", "episode", "2024-01-15")
+        assert base != unmatched_key("A", "", "episode", "2024-04-01")
+        assert base != unmatched_key("A", "", "movie", "2024-01-15")
+
+
+class TestCache:
+    def test_remember_then_hit(self, cache):
+        assert _lookup(cache) is None
+        assert _remember(cache)
+        entry = _lookup(cache, title="不存在的番 ", ori_title="nope")
+        assert entry["detail"] == "Bangumi 搜索无结果"
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_persists_across_instances(self, cache, db):
+        _remember(cache)
+        assert _lookup(BangumiUnmatchedCache(db=db)) is not None
+
+    def test_expired_entry_misses(self, cache):
+        _remember(cache, ttl=60)
+        later = cache_mod.time.time() + 61
+        with patch.object(cache_mod.time, "time", return_value=later):
+            assert _lookup(cache) is None
+            assert cache.list_entries() == []
+
+    def test_zero_ttl_disables(self, cache):
+        assert not _remember(cache, ttl=0)
+        assert _lookup(cache) is None
+
+    def test_version_change_clears_entries(self, cache, db):
+        _remember(cache)
+        assert _lookup(cache, version="v2") is None
+        assert cache.get_stats()["invalidations"] == 1
+        assert db.get_bgm_unmatched_titles() == []
+
+    def test_delete_and_clear(self, cache):
+        _remember(cache, title="A")
+        _remember(cache, title="B")
+        key = cache.list_entries()[-1]["cache_key"]
+        assert cache.delete(key) == 1
+        assert _lookup(cache, title="A") is None
+        assert cache.clear() == 1
+        assert cache.list_entries() == []
+
+
+def _item(**kwargs):
+    fields = {
+        "user_name": "u",
+        "title": "不存在的番",
+        "ori_title": "Nope",
+        "season": 1,
+        "episode": 2,
+        "media_type": "episode",
+        "release_date": "2024-01-15",
+    }
+    fields.update(kwargs)
+    return CustomItem(**fields)
+
+
+@pytest.fixture
+def service():
+    svc = SyncService()
+    data = MagicMock()
+    data.find_bangumi_id.return_value = None
+    data.get_data_version.return_value = "data-1"
+    bgm = AsyncMock()
+    bgm.bgm_search.return_value = None
+    with (
+        patch.object(svc, "_load_custom_mappings", return_value={}),
+        patch.object(svc, "_get_bangumi_data", return_value=data),
+        patch.object(svc, "_get_async_bangumi_api_for_user", return_value=bgm),
+        patch.object(sync_mod.mapping_service, "get_version", return_value="map-1"),
+    ):
+        svc.bgm = bgm
+        svc.data = data
+        yield svc
+
+
+class TestSubjectLookup:
+    @pytest.mark.asyncio
+    async def test_repeated_miss_skips_search(self, service):
+        first = await service._find_subject_id_async(_item())
+        second = await service._find_subject_id_async(_item())
+        assert first == (None, False, "Bangumi 搜索无结果")
+        assert second[0] is None
+        assert "未匹配缓存" in second[2]
+        service.bgm.bgm_search.assert_called_once()
+        service.data.find_bangumi_id.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_data_refresh_searches_again(self, service):
+        await service._find_subject_id_async(_item())
+        service.data.get_data_version.return_value = "data-2"
+        await service._find_subject_id_async(_item())
+        assert service.bgm.bgm_search.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_search_errors_are_not_cached(self, service):
+        service.bgm.bgm_search.side_effect = OSError("down")
+        await service._find_subject_id_async(_item())
+        await service._find_subject_id_async(_item())
+        assert service.bgm.bgm_search.call_count == 2
+        assert bgm_unmatched_cache.list_entries() == []
+
+    @pytest.mark.asyncio
+    async def test_async_lookup_uses_cache(self, service):
+        await service._find_subject_id_async(_item())
+        with patch.object(service, "_get_async_bangumi_api_for_user") as get_api:
+            result = await service._find_subject_id_async(_item())
+        assert result[0] is None
+        get_api.assert_not_called()
@@ -361,3 +361,88 @@ class TestExtractJellyfinData:
         assert result.season == 1
         assert result.episode == 1
         assert result.title == "剧场版 Z"
+
+
+class TestExtractProviderIds:
+    """测试外部 ID 提取"""
+
+    def test_plex_movie_guid(self):
+        from app.utils.data_util import extract_plex_data
+
+        plex_data = {
+            "Account": {"title": "test_user"},
+            "Metadata": {
+                "type": "movie",
+                "title": "某剧场版",
+                "Guid": [
+                    {"id": "imdb://tt0133093"},
+                    {"id": "tmdb://603"},
+                    {"id": "tvdb://169"},
+                    {"id": "invalid"},
+                ],
+            },
+        }
+        result = extract_plex_data(plex_data)
+        assert result.provider_ids == {
+            "imdb": "tt0133093",
+            "tmdb": "603",
+            "tvdb": "169",
+        }
+
+    def test_plex_episode_ignores_episode_guid(self):
+        """剧集的 Guid 是单集 ID，不作为整部剧的外部 ID"""
+        from app.utils.data_util import extract_plex_data
+
+        plex_data = {
+            "Account": {"title": "test_user"},
+            "Metadata": {
+                "type": "episode",
+                "grandparentTitle": "测试番剧",
+                "parentIndex": 1,
+                "index": 1,
+                "Guid": [{"id": "tmdb://1234567"}],
+            },
+        }
+        assert extract_plex_data(plex_data).provider_ids is None
+
+    def test_emby_movie_provider_ids(self):
+        from app.utils.data_util import extract_emby_data
+
+        emby_data = {
+            "User": {"Name": "test_user"},
+            "Item": {
+                "Type": "Movie",
+                "Name": "某剧场版",
+                "ProviderIds": {"Tmdb": "603", "Imdb": "tt0133093", "Tvdb": ""},
+            },
+        }
+        result = extract_emby_data(emby_data)
+        assert result.provider_ids == {"tmdb": "603", "imdb": "tt0133093"}
+
+    def test_jellyfin_template_ids(self):
+        from app.utils.data_util import extract_jellyfin_data
+
+        jellyfin_data = {
+            "media_type": "Episode",
+            "title": "测试番剧",
+            "ori_title": " ",
+            "season": 2,
+            "episode": 3,
+            "user_name": "test_user",
+            "tmdb_id": "209867",
+            "imdb_id": "",
+            "provider_ids": {"Tvdb": 424536},
+        }
+        result = extract_jellyfin_data(jellyfin_data)
+        assert result.provider_ids == {"tvdb": "424536", "tmdb": "209867"}
+
+    def test_jellyfin_without_ids(self):
+        from app.utils.data_util import extract_jellyfin_data
+
+        jellyfin_data = {
+            "media_type": "Movie",
+            "title": "剧场版 Z",
+            "user_name": "test_user",
+            "tmdb_id": "",
+        }
+        assert extract_jellyfin_data(jellyfin_data).provider_ids is None
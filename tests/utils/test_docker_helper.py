@@ -598,7 +598,7 @@ class TestDockerProxyHelperGetProxySuggestionsExtended:
 class TestDockerProxyHelperTestProxyConnectivityExtended:
     """扩展的代理连通性测试"""
 
-    @patch("app.utils.notifier.requests.get")
+    @patch("app.utils.docker_helper.requests.get")
     def test_test_proxy_connectivity_non_json_response(self, mock_get):
         """非JSON响应"""
         mock_response = MagicMock()
@@ -0,0 +1,238 @@
+"""共享 HTTP 传输层（连接池、DNS 缓存、复用统计）单元测试。"""
+
+import asyncio
+import socket
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpcore
+import httpx
+import pytest
+import requests
+import responses
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import NewConnectionError
+
+from app.utils import http_transport
+from app.utils.http_transport import (
+    DEFAULT_TIMEOUT,
+    PooledHTTPAdapter,
+    _DnsCache,
+    get_async_client,
+    mount_pooled_adapter,
+    transport_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats():
+    transport_stats.reset()
+    yield
+    transport_stats.reset()
+
+
+class TestDnsCache:
+    def _cache(self, ttl=60.0):
+        cache = _DnsCache(ttl)
+        cache._resolve = MagicMock(return_value=[("addr",)])
+        return cache
+
+    def test_repeated_lookup_is_cached(self):
+        cache = self._cache()
+        assert cache.getaddrinfo("api.bgm.tv", 443) == [("addr",)]
+        assert cache.getaddrinfo("api.bgm.tv", 443) == [("addr",)]
+        cache._resolve.assert_called_once()
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_expired_entry_is_resolved_again(self):
+        cache = self._cache()
+        with patch.object(http_transport.time, "monotonic", side_effect=[0.0, 61.0]):
+            cache.getaddrinfo("api.bgm.tv", 443)
+            cache.getaddrinfo("api.bgm.tv", 443)
+        assert cache._resolve.call_count == 2
+
+    def test_failures_are_not_cached(self):
+        cache = self._cache()
+        cache._resolve.side_effect = [OSError("nxdomain"), [("addr",)]]
+        with pytest.raises(OSError):
+            cache.getaddrinfo("api.bgm.tv", 443)
+        assert cache.getaddrinfo("api.bgm.tv", 443) == [("addr",)]
+
+    def test_zero_ttl_disables_cache(self):
+        cache = self._cache(ttl=0)
+        cache.getaddrinfo("api.bgm.tv", 443)
+        cache.getaddrinfo("api.bgm.tv", 443)
+        assert cache._resolve.call_count == 2
+        assert cache.get_stats()["entries"] == 0
+
+    def test_process_resolver_is_not_replaced(self):
+        assert socket.getaddrinfo is not http_transport.dns_cache.getaddrinfo
+
+    @pytest.mark.asyncio
+    async def test_async_lookup_uses_cache(self):
+        cache = self._cache()
+        assert await cache.getaddrinfo_async("api.bgm.tv", 443) == [("addr",)]
+        assert await cache.getaddrinfo_async("api.bgm.tv", 443) == [("addr",)]
+        cache._resolve.assert_called_once()
+
+
+def _addrinfo(*ips):
+    return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, 443)) for ip in ips]
+
+
+class TestDnsCachedConnections:
+    def test_sync_connection_tries_each_cached_address(self):
+        conn = http_transport._DnsCachedHTTPConnection("api.bgm.tv", 80)
+        tried = []
+
+        def _connect(self):
+            tried.append(self._dns_host)
+            if len(tried) == 1:
+                raise NewConnectionError(self, "refused")
+            return "sock"
+
+        with (
+            patch.object(
+                http_transport.dns_cache,
+                "getaddrinfo",
+                return_value=_addrinfo("10.0.0.1", "10.0.0.2"),
+            ),
+            patch.object(HTTPConnection, "_new_conn", _connect),
+        ):
+            assert conn._new_conn() == "sock"
+        assert tried == ["10.0.0.1", "10.0.0.2"]
+        assert conn._dns_host == "api.bgm.tv"
+
+    def test_pools_use_dns_cached_connections(self):
+        assert (
+            http_transport._CountingHTTPSConnectionPool.ConnectionCls
+            is http_transport._DnsCachedHTTPSConnection
+        )
+
+    @pytest.mark.asyncio
+    async def test_async_backend_tries_each_cached_address(self):
+        inner = MagicMock()
+        inner.connect_tcp = AsyncMock(
+            side_effect=[httpcore.ConnectError("refused"), "stream"]
+        )
+        backend = http_transport._DnsCachedNetworkBackend(inner)
+        with patch.object(
+            http_transport.dns_cache,
+            "getaddrinfo_async",
+            AsyncMock(return_value=_addrinfo("10.0.0.1", "10.0.0.2")),
+        ):
+            assert await backend.connect_tcp("api.bgm.tv", 443) == "stream"
+        hosts = [c.args[0] for c in inner.connect_tcp.call_args_list]
+        assert hosts == ["10.0.0.1", "10.0.0.2"]
+
+    @pytest.mark.asyncio
+    async def test_async_resolution_failure_uses_original_backend(self):
+        inner = MagicMock()
+        inner.connect_tcp = AsyncMock(return_value="stream")
+        backend = http_transport._DnsCachedNetworkBackend(inner)
+        with patch.object(
+            http_transport.dns_cache,
+            "getaddrinfo_async",
+            AsyncMock(side_effect=socket.gaierror("nxdomain")),
+        ):
+            assert await backend.connect_tcp("api.bgm.tv", 443) == "stream"
+        assert inner.connect_tcp.call_args.args[0] == "api.bgm.tv"
+
+    @pytest.mark.asyncio
+    async def test_shared_clients_use_dns_cache(self):
+        connect = AsyncMock(side_effect=httpcore.ConnectError("refused"))
+        try:
+            with patch.object(
+                http_transport._DnsCachedNetworkBackend, "connect_tcp", connect
+            ):
+                for client in (get_async_client(), get_async_client("http://p:1")):
+                    with pytest.raises(httpx.ConnectError):
+                        await client.get("http://api.bgm.tv/v0/me")
+        finally:
+            await http_transport.close_async_clients()
+        hosts = [c.kwargs["host"] for c in connect.call_args_list]
+        assert hosts == ["api.bgm.tv", "p"]
+
+
+class TestSyncTransport:
+    def test_sessions_share_adapter_and_close_keeps_pools(self):
+        a = mount_pooled_adapter(requests.Session())
+        b = mount_pooled_adapter(requests.Session())
+        adapter = a.get_adapter("https://api.bgm.tv")
+        assert isinstance(adapter, PooledHTTPAdapter)
+        assert b.get_adapter("https://api.bgm.tv") is adapter
+        with patch.object(adapter.poolmanager, "clear") as clear:
+            a.close()
+        clear.assert_not_called()
+
+    @responses.activate
+    def test_requests_are_counted_with_default_timeout(self):
+        responses.add(responses.GET, "https://api.bgm.tv/v0/me", json={})
+        session = mount_pooled_adapter(requests.Session())
+        session.get("https://api.bgm.tv/v0/me")
+        session.get("https://api.bgm.tv/v0/me", timeout=3)
+        assert responses.calls[0].request.req_kwargs["timeout"] == DEFAULT_TIMEOUT
+        assert responses.calls[1].request.req_kwargs["timeout"] == 3
+        assert transport_stats.snapshot()["sync"]["requests"] == 2
+
+    def test_counting_pools_are_installed(self):
+        adapter = PooledHTTPAdapter()
+        pool = adapter.poolmanager.connection_from_url("https://api.bgm.tv")
+        assert isinstance(pool, http_transport._CountingHTTPSConnectionPool)
+        proxied = adapter.proxy_manager_for("http://proxy.test:8080")
+        assert proxied.pool_classes_by_scheme is http_transport._COUNTING_POOL_CLASSES
+
+    def test_reuse_ratio(self):
+        for _ in range(4):
+            transport_stats.request("sync")
+        transport_stats.connection("sync")
+        sync = transport_stats.snapshot()["sync"]
+        assert (sync["reused"], sync["reuse_ratio"]) == (3, 0.75)
+
+
+class TestAsyncTransport:
+    @pytest.mark.asyncio
+    async def test_client_reused_per_proxy(self):
+        a = get_async_client("http://p:1")
+        b = get_async_client("http://p:1")
+        c = get_async_client()
+        try:
+            assert a is b
+            assert a is not c
+        finally:
+            await http_transport.close_async_clients()
+        assert a.is_closed and c.is_closed
+        assert get_async_client() is not c
+        await http_transport.close_async_clients()
+
+    @pytest.mark.asyncio
+    async def test_requests_are_counted(self):
+        client = get_async_client()
+        handle = AsyncMock(return_value=httpx.Response(200))
+        try:
+            with patch.object(
+                http_transport._DnsCachedTransport, "handle_async_request", handle
+            ):
+                await client.get("https://api.bgm.tv/v0/me")
+                await client.get("https://api.bgm.tv/v0/me")
+        finally:
+            await http_transport.close_async_clients()
+        assert transport_stats.snapshot()["async"]["requests"] == 2
+
+    def test_client_of_closed_loop_is_closed(self):
+        async def get():
+            return get_async_client()
+
+        old_loop = asyncio.new_event_loop()
+        stale = old_loop.run_until_complete(get())
+        old_loop.close()
+
+        async def replace():
+            client = get_async_client()
+            await asyncio.sleep(0)
+            await http_transport.close_async_clients()
+            return client
+
+        assert asyncio.run(replace()) is not stale
+        assert stale.is_closed
+        assert http_transport._async_clients == {}
@@ -270,7 +270,7 @@ class TestNotifierBuildSimpleEmailHtml:
 class TestNotifierSendWebhookByConfig:
     """测试webhook发送"""
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_send_webhook_post_success(self, mock_post):
         """测试POST webhook成功"""
         mock_response = MagicMock()
@@ -292,7 +292,7 @@ class TestNotifierSendWebhookByConfig:
         assert result is True
         mock_post.assert_called_once()
 
-    @patch("app.utils.notifier.requests.get")
+    @patch("app.utils.http_transport.shared_session.get")
     def test_send_webhook_get_success(self, mock_get):
         """测试GET webhook成功"""
         mock_response = MagicMock()
@@ -313,7 +313,7 @@ class TestNotifierSendWebhookByConfig:
         result = notifier._send_webhook_by_config(webhook_config, "mark_success", data)
         assert result is True
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_send_webhook_failure_status(self, mock_post):
         """测试webhook返回非成功状态"""
         mock_response = MagicMock()
@@ -332,7 +332,7 @@ class TestNotifierSendWebhookByConfig:
         result = notifier._send_webhook_by_config(webhook_config, "mark_success", data)
         assert result is False
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_send_webhook_exception(self, mock_post):
         """测试webhook异常"""
         mock_post.side_effect = Exception("Network error")
@@ -700,7 +700,7 @@ class TestNotifierParseHeaders:
 class TestNotifierTestNotification:
     """测试通知测试功能"""
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_test_notification_webhook(self, mock_post):
         """测试webhook通知测试"""
         mock_response = MagicMock()
@@ -842,7 +842,7 @@ class TestNotifierGetConfigs:
 class TestNotifierSendNotificationByType:
     """测试按类型发送通知"""
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_send_notification_by_type_webhook(self, mock_post):
         """测试按类型发送webhook通知"""
         mock_response = MagicMock()
@@ -880,7 +880,7 @@ class TestNotifierSendNotificationByType:
 class TestNotifierIntegration:
     """通知集成测试"""
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_send_webhook_success(self, mock_post):
         """测试发送 webhook 成功"""
         mock_response = MagicMock()
@@ -898,7 +898,7 @@ class TestNotifierIntegration:
         # 注意：这里需要调用实际的 send_notification 方法
         # 但由于方法可能不存在，我们测试基本功能
 
-    @patch("app.utils.notifier.requests.post")
+    @patch("app.utils.http_transport.shared_session.post")
     def test_send_webhook_failure(self, mock_post):
         """测试发送 webhook 失败"""
         mock_post.side_effect = Exception("Network error")
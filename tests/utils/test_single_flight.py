@@ -0,0 +1,228 @@
+"""请求合并（single-flight）单元测试。"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from app.utils import bangumi_api as api_mod, bangumi_api_async as async_mod
+from app.utils.bangumi_api import BangumiApi
+from app.utils.bangumi_api_async import AsyncBangumiApi
+from app.utils.single_flight import SingleFlight
+
+
+def _run_concurrently(n, target):
+    results = [None] * n
+    errors = [None] * n
+
+    def _worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def _blocking(release: threading.Event, value=None, error=None):
+    calls = []
+
+    def _fn():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return value
+
+    return _fn, calls
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        fn, calls = _blocking(release, value={"id": 1})
+
+        threading.Timer(0.2, release.set).start()
+        results, errors = _run_concurrently(5, lambda: flight.do(("GET", "k"), fn))
+
+        assert calls == [1]
+        assert results == [{"id": 1}] * 5
+        assert errors == [None] * 5
+        stats = flight.get_stats()
+        assert stats["executed"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["in_flight"] == 0
+        assert stats["by_kind"] == {"GET": {"executed": 1, "coalesced": 4}}
+
+    def test_error_is_shared_with_waiters(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        fn, calls = _blocking(release, error=RuntimeError("boom"))
+
+        threading.Timer(0.2, release.set).start()
+        _, errors = _run_concurrently(3, lambda: flight.do(("GET", "k"), fn))
+
+        assert calls == [1]
+        assert all(isinstance(e, RuntimeError) for e in errors)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        fn = MagicMock(return_value=1)
+        flight.do("k", fn)
+        flight.do("k", fn)
+        assert fn.call_count == 2
+        assert flight.get_stats()["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_async_calls_share_one_await(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "v"
+
+        results = await asyncio.gather(
+            *(flight.do_async(("search", "t"), factory) for _ in range(4)),
+            flight.do_async(("search", "other"), factory),
+        )
+        assert results == ["v"] * 5
+        assert len(calls) == 2
+        assert flight.get_stats()["coalesced"] == 3
+
+    @pytest.mark.asyncio
+    async def test_async_error_without_waiters(self):
+        flight = SingleFlight()
+
+        async def factory():
+            raise ValueError("bad")
+
+        with pytest.raises(ValueError):
+            await flight.do_async("k", factory)
+        assert flight.get_stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_follower_survives_leader_cancellation(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "v"
+
+        leader = asyncio.ensure_future(flight.do_async("k", factory))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "v"
+        assert leader.cancelled()
+        assert calls == [1]
+        assert flight.get_stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_abandoned_call_is_cancelled(self):
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def factory():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.ensure_future(flight.do_async("k", factory))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert flight.get_stats()["in_flight"] == 0
+
+        async def fresh():
+            return "new"
+
+        assert await flight.do_async("k", fresh) == "new"
+
+
+class TestBangumiApiCoalescing:
+    def test_get_subject_coalesced_across_anonymous_clients(self, monkeypatch):
+        flight = SingleFlight()
+        monkeypatch.setattr(api_mod, "bgm_single_flight", flight)
+        release = threading.Event()
+        response = MagicMock()
+        response.json.return_value = {"id": 7}
+        fetch, calls = _blocking(release, value=response)
+
+        clients = [BangumiApi(username="a"), BangumiApi(username="b")]
+        for client in clients:
+            client.get = MagicMock(side_effect=lambda *a, **kw: fetch())
+
+        threading.Timer(0.2, release.set).start()
+        counter = iter(range(100))
+        results, errors = _run_concurrently(
+            4, lambda: clients[next(counter) % 2].get_subject(7)
+        )
+
+        assert errors == [None] * 4
+        assert results == [{"id": 7}] * 4
+        assert calls == [1]
+        assert flight.get_stats()["by_kind"]["get_subject"]["coalesced"] == 3
+        # 每个实例都回填了自己的缓存
+        assert all(7 in client._cache["get_subject"] for client in clients)
+
+    def test_get_keys_include_account(self):
+        a = BangumiApi(access_token="tok-a")
+        b = BangumiApi(access_token="tok-b")
+        url = "https://api.bgm.tv/v0/users/-/collections/-/episodes/1"
+        assert a._flight_key("GET", url) != b._flight_key("GET", url)
+        assert a._flight_key("GET", url, {"x": 1}) == a._flight_key(
+            "GET", url, {"x": 1}
+        )
+
+    def test_account_keys_include_token(self):
+        a = BangumiApi(access_token="tok-a")
+        b = BangumiApi(access_token="tok-b")
+        assert a._account_flight_key("search_old", "x") != b._account_flight_key(
+            "search_old", "x"
+        )
+        assert a._account_flight_key("get_subject", "7")[0] == "get_subject"
+
+    @pytest.mark.asyncio
+    async def test_async_client_issues_one_request_per_account(self, monkeypatch):
+        flight = SingleFlight()
+        monkeypatch.setattr(async_mod, "bgm_single_flight", flight)
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"id": 9})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        apis = [AsyncBangumiApi(access_token="a"), AsyncBangumiApi(access_token="b")]
+        for api in apis:
+            api._client = lambda direct=False: client
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(api.get_subject(9) for api in apis * 2))
+        assert results == [{"id": 9}] * 4
+        # 同一账号的并发请求合并；不同 token 的结果可能不同，各自请求
+        assert len(calls) == 2
+        assert {c.headers.get("Authorization") for c in calls} == {
+            "Bearer a",
+            "Bearer b",
+        }
+        assert time.monotonic() - started < 2
+        await client.aclose()
@@ -0,0 +1,108 @@
+"""番剧标题规范化单元测试。"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.bangumi_data import BangumiData
+from app.utils.bangumi_data_item import BangumiDataItem
+from app.utils.title_normalizer import (
+    contains_keyword,
+    lookup_title,
+    normalize_title,
+    strip_season_suffix,
+)
+
+
+class TestNormalizeTitle:
+    @pytest.mark.parametrize(
+        ("a", "b"),
+        [
+            ("鬼滅の刃", "鬼灭之刃"),
+            ("【推しの子】", "推しの子"),
+            ("ＳＰＹ×ＦＡＭＩＬＹ", "spy family"),
+            ("進撃の巨人", "进击之巨人"),
+            ("ぼっち・ざ・ろっく！", "ボッチ・ザ・ロック"),
+            ("葬送的芙莉蓮", "葬送的芙莉莲 "),
+            ("ﾌﾘｰﾚﾝ", "フリーレン"),
+            ("Re：ゼロから始める異世界生活", "re:ゼロから始める異世界生活"),
+        ],
+    )
+    def test_variants_fold_to_same_key(self, a, b):
+        assert normalize_title(a) == normalize_title(b)
+
+    def test_distinct_titles_stay_distinct(self):
+        assert normalize_title("间谍过家家") != normalize_title("间谍过家家 第二季")
+        assert normalize_title("孤独摇滚") != normalize_title("孤独摇滚！剧场版")
+
+    def test_empty_and_punctuation_only(self):
+        assert normalize_title("") == ""
+        assert normalize_title(None) == ""
+        assert normalize_title("！？") == ""
+
+    def test_memoized(self):
+        normalize_title.cache_clear()
+        normalize_title("鬼滅の刃")
+        normalize_title("鬼滅の刃")
+        assert normalize_title.cache_info().hits == 1
+
+    @pytest.mark.parametrize(
+        ("title", "expected"),
+        [
+            ("间谍过家家 第2期", "间谍过家家"),
+            ("进击的巨人 第3季", "进击的巨人"),
+            ("魔法禁书目录 II", "魔法禁书目录"),
+            ("葬送的芙莉莲", "葬送的芙莉莲"),
+        ],
+    )
+    def test_strip_season_suffix(self, title, expected):
+        assert strip_season_suffix(title) == expected
+
+
+class TestLookupAndKeywords:
+    def test_lookup_title(self):
+        mapping = {"鬼灭之刃": "1", "【推しの子】": "2", "空": ""}
+        assert lookup_title(mapping, "鬼滅の刃") == "1"
+        assert lookup_title(mapping, "不存在", "推しの子") == "2"
+        assert lookup_title(mapping, "空") == ""
+        assert lookup_title(mapping, None, "") == ""
+
+    def test_raw_key_wins_over_normalized(self):
+        mapping = {"鬼灭之刃": "1", "鬼滅の刃": "2"}
+        assert lookup_title(mapping, "鬼滅の刃") == "2"
+
+    def test_contains_keyword(self):
+        assert contains_keyword("某番剧 廣告特輯", "广告")
+        assert contains_keyword("ＯＶＡ 特典", "ova")
+        assert contains_keyword("番剧！！", "！！")
+        assert not contains_keyword("正片", "广告")
+
+
+class TestNormalizedTitleIndex:
+    def _data(self):
+        with (
+            patch.object(BangumiData, "_check_and_download_cache_on_startup"),
+            patch.object(BangumiData, "_preload_data_to_memory"),
+        ):
+            data = BangumiData()
+        data.use_cache = False
+        data._publish(
+            [
+                BangumiDataItem("鬼滅の刃", ("鬼灭之刃",), "2019-04-06", "248175"),
+                BangumiDataItem(
+                    "【推しの子】", ("我推的孩子",), "2023-04-12", "386809"
+                ),
+            ]
+        )
+        return data
+
+    def test_variant_titles_hit_exact_index(self):
+        data = self._data()
+        with patch.object(data, "_collect_matches") as scan:
+            assert data.find_bangumi_id("鬼滅之刃")[0] == "248175"
+            assert data.find_bangumi_id("某译名", ori_title="推しの子")[0] == "386809"
+        scan.assert_not_called()
+
+    def test_item_indexed_once_per_key(self):
+        data = self._data()
+        assert data._title_index[normalize_title("鬼灭之刃")] == [data._data_cache[0]]